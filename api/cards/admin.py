@@ -1,3 +1,16 @@
 from django.contrib import admin
 
-# Register your models here.
+from api.logger.admin import ReadOnlyAdminMixin
+from .models import EstadisticaDiaria
+
+
+@admin.register(EstadisticaDiaria)
+class EstadisticaDiariaAdmin(ReadOnlyAdminMixin, admin.ModelAdmin):
+    list_display = [
+        'fecha', 'organizacion', 'documentos', 'documentos_bytes', 'pedimentos',
+        'procesos', 'procesos_con_error', 'usuarios_activos'
+    ]
+    list_filter = ['fecha']
+    list_select_related = ['organizacion']
+    search_fields = ['organizacion__nombre']
+    ordering = ['-fecha']
@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class CardsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api.cards'
+
+    def ready(self):
+        import api.cards.signals  # noqa
+        from api.logger.sink import register_flush_listener
+        from .cache import invalidar_cards_actividad
+        from .stats import handle_log_flush
+
+        register_flush_listener(invalidar_cards_actividad)
+        # Después del listener de api.logger.rollups: lee los rollups ya actualizados
+        register_flush_listener(handle_log_flush)
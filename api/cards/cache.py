@@ -0,0 +1,213 @@
+"""
+Cache por organización de las cards del tablero.
+
+Cada card se calcula con una sola consulta (conteos condicionales,
+``Count(filter=Q(...))``) y el resultado se guarda en el cache unos segundos
+(``CARDS_CACHE['TIMEOUT']``). En un acierto la card no consulta la base de
+datos.
+
+La llave del resultado incluye:
+
+- la versión de la organización para el grupo de datos de la card
+  (documentos, procesos o actividad). Guardar o borrar un documento o un
+  proceso, o escribir un lote de actividades, borra la versión de su
+  organización y la de ``ALL_TENANTS`` (la que usan los superusuarios), así
+  que la siguiente request recalcula;
+- el SQL del queryset de la vista, que ya trae el filtrado por rol y
+  organización, y los parámetros de la card (``fecha_inicio``, ``fecha_fin``).
+
+Los cambios hechos con ``queryset.update()`` o ``bulk_create`` no mandan
+señales; esos se ven al vencer el TIMEOUT.
+
+Configuración en ``settings.CARDS_CACHE`` (ver DEFAULTS).
+"""
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db import router, transaction
+from django.db.models import Q
+from rest_framework.response import Response
+
+from core.roles import get_user_roles
+from core.singleflight import request_flight_key, single_flight
+from mixins.conditional import make_etag
+
+DEFAULTS = {
+    'ENABLED': True,
+    'TIMEOUT': 30,  # Segundos que se guarda el resultado de una card
+}
+
+SCOPE_DOCUMENTOS = 'documentos'
+SCOPE_PROCESOS = 'procesos'
+SCOPE_ACTIVIDAD = 'actividad'
+
+# Versión que cambia con cualquier organización (superusuarios)
+ALL_TENANTS = '*'
+
+
+def get_cards_cache_settings():
+    config = dict(DEFAULTS)
+    config.update(getattr(settings, 'CARDS_CACHE', {}) or {})
+    return config
+
+
+# ----------------------------------------------------------------------
+# Versiones
+# ----------------------------------------------------------------------
+def _version_key(scope, tenant):
+    return f'cards:version:{scope}:{tenant}'
+
+
+def get_card_version(scope, tenant):
+    """Versión vigente de `scope` para la organización; se crea si no existe."""
+    key = _version_key(scope, tenant)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def invalidar_cards(scope, organizacion_ids, model=None):
+    """Descarta las cards de `scope` de esas organizaciones y las de ALL_TENANTS."""
+    keys = [_version_key(scope, ALL_TENANTS)]
+    keys += [_version_key(scope, pk) for pk in set(organizacion_ids) if pk is not None]
+    cache.delete_many(keys)
+    if model is not None:
+        # Otra request pudo guardar datos de antes del commit con la versión nueva
+        transaction.on_commit(lambda: cache.delete_many(keys), using=router.db_for_write(model))
+
+
+def invalidar_cards_actividad(model, records):
+    """Listener del buffer de logs: un lote de UserActivity invalida sus organizaciones."""
+    from api.logger.models import UserActivity
+
+    if model is not UserActivity:
+        return
+    user_ids = {record.user_id for record in records}
+    organizacion_ids = (
+        get_user_model().objects.filter(pk__in=user_ids)
+        .values_list('organizacion_id', flat=True).distinct()
+    )
+    invalidar_cards(SCOPE_ACTIVIDAD, list(organizacion_ids))
+
+
+# ----------------------------------------------------------------------
+# Vistas
+# ----------------------------------------------------------------------
+def rango_fechas(request, field):
+    """Q con ?fecha_inicio= y ?fecha_fin= sobre `field`, o None sin rango."""
+    rango = Q()
+    fecha_inicio = request.query_params.get('fecha_inicio')
+    fecha_fin = request.query_params.get('fecha_fin')
+    if fecha_inicio:
+        rango &= Q(**{f'{field}__gte': fecha_inicio})
+    if fecha_fin:
+        rango &= Q(**{f'{field}__lte': fecha_fin})
+    return rango or None
+
+
+def queryset_sql(queryset):
+    """(sql, params) del queryset, o None si no consulta la base (``none()``)."""
+    try:
+        return queryset.query.sql_with_params()
+    except EmptyResultSet:
+        return None
+
+
+class CardMixin:
+    """
+    Card calculada con ``compute_card(queryset)`` a partir del queryset de la
+    vista. ``get_card_data`` también lo usa el tablero combinado
+    (api.cards.dashboard).
+
+    Requests iguales al mismo tiempo calculan la card una sola vez
+    (core.singleflight).
+    """
+
+    def compute_card(self, queryset):
+        raise NotImplementedError
+
+    def get_card_tenant(self):
+        roles = get_user_roles(self.request)
+        return ALL_TENANTS if roles.is_superuser else roles.organizacion_id
+
+    def get_card_flight_key(self, queryset):
+        """Llave del single-flight: el SQL ya trae el filtrado por rol y organización."""
+        sql = queryset_sql(queryset)
+        if sql is None:
+            return None
+        return request_flight_key(self.request, self.get_card_tenant(), type(self).__name__, sql)
+
+    def get_card_data(self):
+        """Resultado de la card, o None sin queryset."""
+        queryset = self.get_queryset()
+        if queryset is None:
+            return None
+        key = self.get_card_flight_key(queryset)
+        return single_flight(f'cards.{type(self).__name__}', key, lambda: self.compute_card(queryset))
+
+    def get(self, request):
+        data = self.get_card_data()
+        if data is None:
+            return Response({"error": "Usuario no autenticado o sin organización"}, status=401)
+        return Response(data)
+
+
+class CachedCardMixin(CardMixin):
+    """
+    Card guardada en el cache.
+
+    Va antes de ConditionalGetMixin: el ETag sale del resultado de la card y
+    no de la huella del queryset, así un acierto no hace ninguna consulta.
+
+    - card_scope: grupo de datos que invalida la card (SCOPE_*).
+    - card_params: parámetros de la URL que cambian el resultado.
+    """
+    card_scope = None
+    card_params = ('fecha_inicio', 'fecha_fin')
+
+    _card_data = None
+
+    def get_card_cache_key(self, queryset):
+        """Llave del resultado, o None si el queryset no consulta la base (``none()``)."""
+        sql = queryset_sql(queryset)
+        if sql is None:
+            return None
+        sql, params = sql
+        card_params = [(name, self.request.query_params.get(name)) for name in self.card_params]
+        digest = hashlib.md5(repr((sql, params, card_params)).encode(), usedforsecurity=False).hexdigest()
+        version = get_card_version(self.card_scope, self.get_card_tenant())
+        return f'cards:{type(self).__name__}:{version}:{digest}'
+
+    def get_card_data(self):
+        """Resultado de la card (del cache si está), o None sin queryset."""
+        if self._card_data is not None:
+            return self._card_data
+        queryset = self.get_queryset()
+        if queryset is None:
+            return None
+        config = get_cards_cache_settings()
+        key = self.get_card_cache_key(queryset)
+        data = cache.get(key) if key and config['ENABLED'] else None
+        if data is None:
+            def compute_and_store():
+                result = self.compute_card(queryset)
+                if key and config['ENABLED']:
+                    cache.set(key, result, config['TIMEOUT'])
+                return result
+
+            # Las requests que esperan al single-flight no vuelven a escribir el cache
+            data = single_flight(f'cards.{type(self).__name__}', key, compute_and_store)
+        self._card_data = data
+        return data
+
+    def get_validators(self, request):
+        data = self.get_card_data()
+        if data is None:
+            return None
+        return make_etag(self.get_request_variant(request), data), None
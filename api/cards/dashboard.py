@@ -0,0 +1,118 @@
+"""
+Tablero combinado: todas las cards en una sola respuesta.
+
+``/api/v1/cards/dashboard/`` autentica, resuelve los roles y revisa permisos
+una vez y calcula cada card con la misma request. Las cards son
+independientes, así que se calculan al mismo tiempo en un pool de hilos
+acotado (``CARDS_DASHBOARD['MAX_WORKERS']``); cada hilo usa su propia conexión
+a la base de datos y la cierra al terminar la card.
+
+Una card que no termina dentro de su tiempo (``TIMEOUT`` o ``TIMEOUTS[card]``,
+en segundos, contados desde que se piden las cards) no sale en la respuesta y
+su nombre va en ``timeouts``; el hilo sigue hasta terminar la consulta. Con
+``MAX_WORKERS`` en 0 las cards se calculan en el hilo de la request, sin
+timeouts (así corren las pruebas, ver core.test_runner).
+
+Configuración en ``settings.CARDS_DASHBOARD`` (ver DEFAULTS).
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from django.conf import settings
+from django.db import connections
+
+from core.roles import get_user_roles
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'MAX_WORKERS': 4,    # Hilos del pool por proceso; 0 calcula en el hilo de la request
+    'TIMEOUT': 5.0,      # Segundos máximos por card
+    'TIMEOUTS': {},      # Tiempo por card: {'logs': 10.0}
+}
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def get_dashboard_settings():
+    config = dict(DEFAULTS)
+    config.update(getattr(settings, 'CARDS_DASHBOARD', {}) or {})
+    return config
+
+
+def get_executor(max_workers):
+    """Pool de hilos del proceso, creado la primera vez (y de nuevo después de un fork)."""
+    global _executor, _executor_pid
+    pid = os.getpid()
+    if _executor is None or _executor_pid != pid:
+        with _executor_lock:
+            if _executor is None or _executor_pid != pid:
+                _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='cards-dashboard')
+                _executor_pid = pid
+    return _executor
+
+
+def build_card_view(view_class, request):
+    """Instancia de la vista de una card lista para ``get_card_data`` con `request`."""
+    view = view_class()
+    view.request = request
+    view.args = ()
+    view.kwargs = {}
+    view.format_kwarg = None
+    view.headers = {}
+    return view
+
+
+def _compute_card(view_class, request):
+    return build_card_view(view_class, request).get_card_data()
+
+
+def _compute_card_in_thread(view_class, request):
+    try:
+        return _compute_card(view_class, request)
+    finally:
+        # Conexiones de este hilo; la siguiente card abre la suya
+        connections.close_all()
+
+
+def compute_cards(cards, request):
+    """
+    Calcula `cards` ({nombre: clase de vista}) para `request`.
+    Regresa (resultados, nombres con timeout, {nombre: error}).
+    """
+    config = get_dashboard_settings()
+    results, timeouts, errors = {}, [], {}
+    # Los grupos se resuelven aquí una vez y los hilos comparten el resultado
+    get_user_roles(request).groups
+
+    if not config['MAX_WORKERS']:
+        for name, view_class in cards.items():
+            try:
+                results[name] = _compute_card(view_class, request)
+            except Exception:
+                logger.exception(f"Error calculando la card {name}")
+                errors[name] = "Error calculando la card"
+        return results, timeouts, errors
+
+    executor = get_executor(config['MAX_WORKERS'])
+    started = time.monotonic()
+    futures = {
+        name: executor.submit(_compute_card_in_thread, view_class, request)
+        for name, view_class in cards.items()
+    }
+    for name, future in futures.items():
+        limit = config['TIMEOUTS'].get(name, config['TIMEOUT'])
+        try:
+            results[name] = future.result(timeout=max(0, started + limit - time.monotonic()))
+        except TimeoutError:
+            future.cancel()  # Solo si todavía no empezaba
+            timeouts.append(name)
+        except Exception:
+            logger.exception(f"Error calculando la card {name}")
+            errors[name] = "Error calculando la card"
+    return results, timeouts, errors
@@ -0,0 +1,23 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.cards.stats import rebuild_estadisticas
+
+
+class Command(BaseCommand):
+    help = "Recalcula las estadísticas diarias por organización a partir de documentos, pedimentos, procesos y rollups."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help="Fecha inicial (YYYY-MM-DD). Por defecto recalcula todo.")
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = datetime.strptime(options['since'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError("--since debe tener el formato YYYY-MM-DD")
+
+        total = rebuild_estadisticas(since=since)
+        self.stdout.write(self.style.SUCCESS(f"Estadísticas diarias recalculadas: {total} filas."))
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.3 on 2026-10-18 13:20
+
+import django.db.models.deletion
+from django.db import migrations, models, router
+
+
+def rebuild_estadisticas(apps, schema_editor):
+    # Llena las estadísticas con los datos existentes (una consulta agrupada por
+    # tabla). usuarios_activos sale de los rollups, que pueden estar en otra base
+    # todavía sin migrar: se llena con `manage.py rebuild_estadisticas_diarias`.
+    from api.cards.stats import rebuild_estadisticas
+
+    model = apps.get_model('cards', 'EstadisticaDiaria')
+    if router.allow_migrate_model(schema_editor.connection.alias, model):
+        rebuild_estadisticas(apps=apps, usuarios_activos=False)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('customs', '0004_tenant_indexes'),
+        ('logger', '0009_log_database_router'),
+        ('organization', '0003_organizacion_token_version'),
+        ('record', '0002_document_document_org_created_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadisticaDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('documentos', models.IntegerField(default=0)),
+                ('documentos_bytes', models.BigIntegerField(default=0)),
+                ('pedimentos', models.IntegerField(default=0)),
+                ('procesos', models.IntegerField(default=0)),
+                ('procesos_en_espera', models.IntegerField(default=0)),
+                ('procesos_en_proceso', models.IntegerField(default=0)),
+                ('procesos_finalizados', models.IntegerField(default=0)),
+                ('procesos_con_error', models.IntegerField(default=0)),
+                ('usuarios_activos', models.IntegerField(default=0)),
+                ('organizacion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='estadisticas_diarias', to='organization.organizacion')),
+            ],
+            options={
+                'verbose_name': 'Estadística diaria',
+                'verbose_name_plural': 'Estadísticas diarias',
+                'db_table': 'cards_estadistica_diaria',
+                'ordering': ['fecha'],
+                'indexes': [models.Index(fields=['fecha'], name='estadistica_fecha_idx')],
+                'constraints': [models.UniqueConstraint(fields=('organizacion', 'fecha'), name='estadistica_org_fecha_uniq')],
+            },
+        ),
+        migrations.RunPython(rebuild_estadisticas, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,46 @@
 from django.db import models
 
-# Create your models here.
+from core.managers import TenantManager
+
+
+class EstadisticaDiaria(models.Model):
+    """
+    Resumen diario por organización para las gráficas y el uso de
+    almacenamiento. Cada fila cuenta los documentos, pedimentos y procesos
+    creados ese día que siguen existiendo; se mantiene incrementalmente con
+    señales y se puede recalcular con ``rebuild_estadisticas_diarias``
+    (ver api.cards.stats).
+    """
+    organizacion = models.ForeignKey('organization.Organizacion', on_delete=models.CASCADE, related_name='estadisticas_diarias')
+    fecha = models.DateField()
+
+    documentos = models.IntegerField(default=0)
+    documentos_bytes = models.BigIntegerField(default=0)
+    pedimentos = models.IntegerField(default=0)
+
+    # Procesos creados ese día por su estado actual
+    procesos = models.IntegerField(default=0)
+    procesos_en_espera = models.IntegerField(default=0)
+    procesos_en_proceso = models.IntegerField(default=0)
+    procesos_finalizados = models.IntegerField(default=0)
+    procesos_con_error = models.IntegerField(default=0)
+
+    # Usuarios distintos con peticiones ese día (de los rollups de RequestLog)
+    usuarios_activos = models.IntegerField(default=0)
+
+    objects = TenantManager()
+
+    class Meta:
+        verbose_name = "Estadística diaria"
+        verbose_name_plural = "Estadísticas diarias"
+        db_table = 'cards_estadistica_diaria'
+        ordering = ['fecha']
+        constraints = [
+            models.UniqueConstraint(fields=['organizacion', 'fecha'], name='estadistica_org_fecha_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['fecha'], name='estadistica_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.organizacion_id} - {self.fecha}"
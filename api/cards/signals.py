@@ -0,0 +1,47 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from api.customs.models import Pedimento, ProcesamientoPedimento
+from api.record.models import Document
+from .cache import SCOPE_DOCUMENTOS, SCOPE_PROCESOS, invalidar_cards
+from .stats import aplicar, contribucion, contribucion_guardada, diferencia
+
+# Las cards guardan su resultado en cache por organización (api.cards.cache);
+# las actividades se invalidan al escribir cada lote del buffer de logs.
+@receiver(post_save, sender=Document)
+@receiver(post_delete, sender=Document)
+def invalidar_cards_documentos(sender, instance, **kwargs):
+    invalidar_cards(SCOPE_DOCUMENTOS, [instance.organizacion_id], model=sender)
+
+
+@receiver(post_save, sender=ProcesamientoPedimento)
+@receiver(post_delete, sender=ProcesamientoPedimento)
+def invalidar_cards_procesos(sender, instance, **kwargs):
+    invalidar_cards(SCOPE_PROCESOS, [instance.organizacion_id], model=sender)
+
+
+# Estadísticas diarias por organización (api.cards.stats)
+@receiver(pre_save, sender=Document)
+@receiver(pre_save, sender=Pedimento)
+@receiver(pre_save, sender=ProcesamientoPedimento)
+def leer_estadistica_anterior(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance._estadistica_anterior = contribucion_guardada(instance)
+
+
+@receiver(post_save, sender=Document)
+@receiver(post_save, sender=Pedimento)
+@receiver(post_save, sender=ProcesamientoPedimento)
+def actualizar_estadistica(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    anterior = getattr(instance, '_estadistica_anterior', {})
+    instance._estadistica_anterior = {}
+    aplicar(diferencia(anterior, contribucion(instance)))
+
+
+@receiver(post_delete, sender=Document)
+@receiver(post_delete, sender=Pedimento)
+@receiver(post_delete, sender=ProcesamientoPedimento)
+def descontar_estadistica(sender, instance, **kwargs):
+    aplicar(diferencia(contribucion(instance), {}))
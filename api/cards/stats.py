@@ -0,0 +1,204 @@
+"""
+Estadísticas diarias por organización (EstadisticaDiaria).
+
+Las gráficas y el uso de almacenamiento leen una fila por organización y día
+en lugar de recorrer documentos, pedimentos y procesos.
+
+- Documentos, pedimentos y procesos se suman al día de su ``created_at`` con
+  señales (api.cards.signals): al crearlos, al cambiar su tamaño, estado u
+  organización y al borrarlos.
+- ``usuarios_activos`` se recalcula desde los rollups diarios de RequestLog
+  cada vez que el buffer de logs escribe un lote (api.logger.rollups).
+
+Los cambios hechos con ``queryset.update()``, ``bulk_create`` o SQL directo no
+mandan señales: ``python manage.py rebuild_estadisticas_diarias --since
+YYYY-MM-DD`` recalcula desde las tablas crudas (se puede programar a diario).
+"""
+from collections import Counter, defaultdict
+from datetime import datetime, time, timedelta
+
+from django.apps import apps as global_apps
+from django.db import IntegrityError, router, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+# Estado de ProcesamientoPedimento -> campo de EstadisticaDiaria
+ESTADO_FIELDS = {
+    1: 'procesos_en_espera',
+    2: 'procesos_en_proceso',
+    3: 'procesos_finalizados',
+    4: 'procesos_con_error',
+}
+COUNTER_FIELDS = (
+    'documentos', 'documentos_bytes', 'pedimentos', 'procesos',
+) + tuple(ESTADO_FIELDS.values()) + ('usuarios_activos',)
+
+# Campos de cada modelo que cambian su contribución
+TRACKED_FIELDS = {
+    'record.Document': ('organizacion', 'created_at', 'size'),
+    'customs.Pedimento': ('organizacion', 'created_at'),
+    'customs.ProcesamientoPedimento': ('organizacion', 'created_at', 'estado'),
+}
+
+
+def get_model(apps=None, label='cards.EstadisticaDiaria'):
+    return (apps or global_apps).get_model(label)
+
+
+# ----------------------------------------------------------------------
+# Actualización incremental
+# ----------------------------------------------------------------------
+def contribucion(instance):
+    """{(organizacion_id, fecha): Counter} que `instance` aporta a las estadísticas."""
+    label = instance._meta.label
+    if label not in TRACKED_FIELDS or not instance.organizacion_id or instance.created_at is None:
+        return {}
+    counts = Counter()
+    if label == 'record.Document':
+        counts.update(documentos=1, documentos_bytes=instance.size or 0)
+    elif label == 'customs.Pedimento':
+        counts.update(pedimentos=1)
+    else:
+        counts.update(procesos=1)
+        if instance.estado_id in ESTADO_FIELDS:
+            counts[ESTADO_FIELDS[instance.estado_id]] += 1
+    return {(instance.organizacion_id, timezone.localdate(instance.created_at)): counts}
+
+
+def contribucion_guardada(instance):
+    """Contribución de la fila que hay en la base, antes de un save (pre_save)."""
+    if instance._state.adding or instance.pk is None:
+        return {}
+    fields = TRACKED_FIELDS.get(instance._meta.label)
+    if fields is None:
+        return {}
+    stored = instance._meta.base_manager.filter(pk=instance.pk).only(*fields).first()
+    return contribucion(stored) if stored is not None else {}
+
+
+def diferencia(anterior, actual):
+    """Deltas para pasar de la contribución `anterior` a `actual`."""
+    deltas = defaultdict(Counter)
+    for key, counts in actual.items():
+        deltas[key].update(counts)
+    for key, counts in anterior.items():
+        deltas[key].subtract(counts)
+    return deltas
+
+
+def aplicar(deltas, apps=None):
+    """Suma los deltas ({(organizacion_id, fecha): Counter}) a las filas diarias."""
+    model = get_model(apps)
+    using = router.db_for_write(model)
+    for (organizacion_id, fecha), counts in deltas.items():
+        counts = {field: value for field, value in counts.items() if value}
+        if not counts:
+            continue
+        filtro = {'organizacion_id': organizacion_id, 'fecha': fecha}
+        updates = {field: F(field) + value for field, value in counts.items()}
+        try:
+            with transaction.atomic(using=using):
+                # Sin fila solo hay que crearla si algo se suma (al borrar una
+                # organización sus filas pueden borrarse antes que sus documentos)
+                if not model.objects.filter(**filtro).update(**updates) and any(v > 0 for v in counts.values()):
+                    model.objects.create(**filtro, **counts)
+        except IntegrityError:
+            # Otra request creó la fila al mismo tiempo
+            model.objects.filter(**filtro).update(**updates)
+
+
+def actualizar_usuarios_activos(pares):
+    """Recalcula usuarios_activos de cada (organizacion_id, fecha) desde RequestRollupDay."""
+    from api.logger.models import RequestRollupDay
+
+    model = get_model()
+    for organizacion_id, fecha in pares:
+        inicio = timezone.make_aware(datetime.combine(fecha, time.min))
+        activos = (
+            RequestRollupDay.objects
+            .filter(organizacion_id=organizacion_id, bucket__gte=inicio, bucket__lt=inicio + timedelta(days=1), user__isnull=False)
+            .values('user').distinct().count()
+        )
+        filtro = {'organizacion_id': organizacion_id, 'fecha': fecha}
+        try:
+            with transaction.atomic(using=router.db_for_write(model)):
+                if not model.objects.filter(**filtro).update(usuarios_activos=activos):
+                    model.objects.create(**filtro, usuarios_activos=activos)
+        except IntegrityError:
+            model.objects.filter(**filtro).update(usuarios_activos=activos)
+
+
+def handle_log_flush(model, records):
+    """Listener del buffer de logs; va después del de api.logger.rollups."""
+    from api.logger.models import RequestLog
+
+    if model is not RequestLog:
+        return
+    pares = set()
+    for record in records:
+        organizacion_id = getattr(record.user, 'organizacion_id', None) if record.user_id else None
+        if organizacion_id:
+            pares.add((organizacion_id, timezone.localdate(record.timestamp)))
+    actualizar_usuarios_activos(sorted(pares, key=str))
+
+
+# ----------------------------------------------------------------------
+# Recalcular desde las tablas crudas
+# ----------------------------------------------------------------------
+def _por_dia(queryset, field, **aggregates):
+    return (
+        queryset.filter(organizacion__isnull=False)
+        .annotate(fecha=TruncDate(field))
+        .values('organizacion_id', 'fecha')
+        .annotate(**aggregates)
+        .order_by()
+    )
+
+
+def rebuild_estadisticas(since=None, apps=None, usuarios_activos=True, batch_size=1000):
+    """
+    Borra y recalcula las estadísticas desde `since` (date) o todas, con un
+    GROUP BY por tabla. `apps` permite usarlo desde una migración; con
+    usuarios_activos=False no lee los rollups (pueden estar en otra base).
+    Regresa el número de filas escritas.
+    """
+    model = get_model(apps)
+    Document = get_model(apps, 'record.Document')
+    Pedimento = get_model(apps, 'customs.Pedimento')
+    Procesamiento = get_model(apps, 'customs.ProcesamientoPedimento')
+    RequestRollupDay = get_model(apps, 'logger.RequestRollupDay')
+
+    documentos = Document.objects.all()
+    pedimentos = Pedimento.objects.all()
+    procesos = Procesamiento.objects.all()
+    rollups = RequestRollupDay.objects.filter(user__isnull=False)
+    existentes = model.objects.all()
+    if since is not None:
+        inicio = timezone.make_aware(datetime.combine(since, time.min))
+        documentos = documentos.filter(created_at__gte=inicio)
+        pedimentos = pedimentos.filter(created_at__gte=inicio)
+        procesos = procesos.filter(created_at__gte=inicio)
+        rollups = rollups.filter(bucket__gte=inicio)
+        existentes = existentes.filter(fecha__gte=since)
+
+    filas = defaultdict(Counter)
+    for row in _por_dia(documentos, 'created_at', documentos=Count('pk'), documentos_bytes=Sum('size')):
+        filas[row['organizacion_id'], row['fecha']].update(documentos=row['documentos'], documentos_bytes=row['documentos_bytes'] or 0)
+    for row in _por_dia(pedimentos, 'created_at', pedimentos=Count('pk')):
+        filas[row['organizacion_id'], row['fecha']].update(pedimentos=row['pedimentos'])
+    estados = {field: Count('pk', filter=Q(estado=estado)) for estado, field in ESTADO_FIELDS.items()}
+    for row in _por_dia(procesos, 'created_at', procesos=Count('pk'), **estados):
+        filas[row['organizacion_id'], row['fecha']].update({field: row[field] for field in ('procesos',) + tuple(estados)})
+    if usuarios_activos:
+        for row in _por_dia(rollups, 'bucket', usuarios_activos=Count('user', distinct=True)):
+            filas[row['organizacion_id'], row['fecha']].update(usuarios_activos=row['usuarios_activos'])
+
+    objs = [
+        model(organizacion_id=organizacion_id, fecha=fecha, **counts)
+        for (organizacion_id, fecha), counts in filas.items()
+    ]
+    with transaction.atomic(using=router.db_for_write(model)):
+        existentes.delete()
+        model.objects.bulk_create(objs, batch_size=batch_size)
+    return len(objs)
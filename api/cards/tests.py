@@ -1,17 +1,37 @@
 
+import os
+import threading
+import time
+from unittest import mock
+
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import RequestFactory, SimpleTestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from django.contrib.auth import get_user_model
-from api.organization.models import Organizacion
+from api.licence.models import Licencia
+from api.organization.models import Organizacion, UsoAlmacenamiento
 from api.record.models import Document
 from api.logger.models import UserActivity, RequestLog
-from api.customs.models import ProcesamientoPedimento
+from api.customs.models import EstadoDeProcesamiento, Pedimento, ProcesamientoPedimento
+from api.logger import sink
+from core.metrics import SINGLEFLIGHT_CALLS
+from core.singleflight import single_flight
+from core.testing import QueryCountAssertionsMixin
+from .models import EstadisticaDiaria
+from .views import DocumentUtilInformation, LastDocumentView, ViewPedimentoServicesUtilInformation
 
 User = get_user_model()
 
 class CardsViewsTests(APITestCase):
+    databases = '__all__'
+
     def setUp(self):
+        cache.clear()  # Cards en cache (api.cards.cache)
         self.org = Organizacion.objects.create(nombre="OrgTest", is_active=True, is_verified=True)
         self.org2 = Organizacion.objects.create(nombre="OrgTest2", is_active=True, is_verified=True)
         self.admin = User.objects.create_user(username="admin", password="adminpass", organizacion=self.org)
@@ -77,3 +97,374 @@ class CardsViewsTests(APITestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIn('documentos', response.data)
+
+
+class CardsQueryCountTests(QueryCountAssertionsMixin, APITestCase):
+    """Número de consultas por endpoint con roles resueltos una vez por request."""
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()  # Cards en cache (api.cards.cache)
+        self.lic = Licencia.objects.create(nombre="LicTest", almacenamiento=100)
+        self.org = Organizacion.objects.create(nombre="OrgTest", licencia=self.lic, is_active=True, is_verified=True)
+        user = User.objects.create_user(username="developer", password="devpass", organizacion=self.org)
+        for name in ('developer', 'Agente Aduanal'):
+            user.groups.add(Group.objects.get_or_create(name=name)[0])
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.get(pk=user.pk))
+
+    def test_services_queryset_filters_by_organizacion_id(self):
+        for grupos in (('admin', 'Agente Aduanal'), ('developer', 'Agente Aduanal'), ()):
+            with self.subTest(grupos=grupos):
+                user = User.objects.create_user(username='_'.join(grupos) or 'sin_roles', password="x", organizacion=self.org)
+                for name in grupos:
+                    user.groups.add(Group.objects.get_or_create(name=name)[0])
+                view = ViewPedimentoServicesUtilInformation()
+                view.request = RequestFactory().get('/')
+                view.request.user = User.objects.get(pk=user.pk)
+                # Solo los grupos: sin cargar la organización del usuario ni hacer join con pedimento
+                with self.assertNumQueries(1):
+                    sql = str(view.get_queryset().query)
+                self.assertNotIn('"pedimento"', sql)
+
+    def test_services_util_information_queries(self):
+        # grupos + conteos; la huella del GET condicional sale del resultado
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('pedimento-services-util-information'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_cards_single_query_then_cached(self):
+        for name in ('document-util-information', 'pedimento-services-util-information', 'user-activity-analysis'):
+            with self.subTest(name=name):
+                # grupos + la consulta de la card
+                with self.assertNumQueries(2):
+                    self.client.get(reverse(name), {'fecha_inicio': '2020-01-01'})
+                # grupos
+                with self.assertNumQueries(1):
+                    response = self.client.get(reverse(name), {'fecha_inicio': '2020-01-01'})
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_downloaded_documents_queries(self):
+        def create_documents(n):
+            for _ in range(n):
+                pedimento = Pedimento.objects.create(organizacion=self.org, pedimento=f"L{Pedimento.objects.count()}")
+                Document.objects.create(archivo="file.pdf", organizacion=self.org, pedimento=pedimento, size=1)
+
+        response = self.assertConstantQueries(reverse('downloaded-documents'), create_documents, sizes=(1, 10))
+        self.assertEqual(response.data['documentos'][0]['organizacion'], str(self.org))
+
+    def test_request_log_analysis_queries(self):
+        # grupos + huella (GET condicional) + métodos + rutas + resumen + filtrados
+        with self.assertNumQueries(6):
+            response = self.client.get(reverse('request-log-analysis'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class CardsConditionalGetTests(APITestCase):
+    """ETag de las cards (mixins.conditional)."""
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()  # Cards en cache (api.cards.cache)
+        self.lic = Licencia.objects.create(nombre="LicTest", almacenamiento=100)
+        self.org = Organizacion.objects.create(nombre="OrgTest", licencia=self.lic, is_active=True, is_verified=True)
+        self.superuser = User.objects.create_superuser(username="superuser", password="superpass", organizacion=self.org)
+        self.pedimento = Pedimento.objects.create(organizacion=self.org, pedimento="C1")
+        Document.objects.create(archivo="file1.pdf", organizacion=self.org, pedimento=self.pedimento, size=1)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.superuser)
+
+    def test_not_modified_until_new_document(self):
+        url = reverse('document-util-information')
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+
+        Document.objects.create(archivo="file2.pdf", organizacion=self.org, pedimento=self.pedimento, size=1)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['archivos_ultimas_1_dia'], 2)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_query_params_change_etag(self):
+        url = reverse('downloaded-documents')
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, {'fecha_inicio': '2020-01-01'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class CardsCacheTests(APITestCase):
+    """Invalidación de las cards en cache (api.cards.cache)."""
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.lic = Licencia.objects.create(nombre="LicTest", almacenamiento=100)
+        self.org = Organizacion.objects.create(nombre="OrgTest", licencia=self.lic, is_active=True, is_verified=True)
+        self.org2 = Organizacion.objects.create(nombre="OrgTest2", licencia=self.lic, is_active=True, is_verified=True)
+        self.user = User.objects.create_user(username="developer", password="devpass", organizacion=self.org)
+        for name in ('developer', 'Agente Aduanal'):
+            self.user.groups.add(Group.objects.get_or_create(name=name)[0])
+        self.pedimento = Pedimento.objects.create(organizacion=self.org, pedimento="K1")
+        self.pedimento2 = Pedimento.objects.create(organizacion=self.org2, pedimento="K2")
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.get(pk=self.user.pk))
+
+    def test_document_write_invalidates_only_its_organization(self):
+        url = reverse('document-util-information')
+        self.assertEqual(self.client.get(url).data['archivos_ultimas_1_dia'], 0)
+
+        Document.objects.create(archivo="file2.pdf", organizacion=self.org2, pedimento=self.pedimento2, size=1)
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.data['archivos_ultimas_1_dia'], 0)
+
+        Document.objects.create(archivo="file1.pdf", organizacion=self.org, pedimento=self.pedimento, size=1)
+        response = self.client.get(url)
+        self.assertEqual(response.data['archivos_ultimas_1_dia'], 1)
+        self.assertEqual(response.data['archivos_filtrados'], 1)
+
+    def test_process_counts_by_estado(self):
+        estados = [EstadoDeProcesamiento.objects.get_or_create(pk=pk, defaults={"estado": f"E{pk}"})[0] for pk in (1, 2, 3, 4)]
+        url = reverse('pedimento-services-util-information')
+        self.assertEqual(self.client.get(url).data['finalizados'], 0)
+
+        for estado in (estados[0], estados[2], estados[2]):
+            ProcesamientoPedimento.objects.create(organizacion=self.org, pedimento=self.pedimento, estado=estado)
+        response = self.client.get(url)
+        self.assertEqual(response.data['en_espera'], 1)
+        self.assertEqual(response.data['finalizados'], 2)
+        self.assertEqual(response.data['procesos_filtrados'], 3)
+
+    def test_activity_flush_invalidates_card(self):
+        url = reverse('user-activity-analysis')
+        self.assertEqual(self.client.get(url).data['actions_count']['login'], 0)
+
+        log_sink = sink.get_log_sink()
+        log_sink.flush()
+        for action in ('login', 'login', 'view'):
+            log_sink.emit(UserActivity(user=self.user, action=action, ip_address='127.0.0.1'))
+        log_sink.flush()
+
+        response = self.client.get(url)
+        self.assertEqual(response.data['actions_count']['login'], 2)
+        self.assertEqual(response.data['top_users'], [{"username": "developer", "activity_count": 3}])
+        self.assertEqual(response.data['actividades_filtradas'], 3)
+
+
+class CardsDashboardTests(APITestCase):
+    """Tablero combinado (api.cards.dashboard)."""
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.lic = Licencia.objects.create(nombre="LicTest", almacenamiento=100)
+        self.org = Organizacion.objects.create(nombre="OrgTest", licencia=self.lic, is_active=True, is_verified=True)
+        user = User.objects.create_user(username="developer", password="devpass", organizacion=self.org)
+        for name in ('developer', 'Agente Aduanal'):
+            user.groups.add(Group.objects.get_or_create(name=name)[0])
+        pedimento = Pedimento.objects.create(organizacion=self.org, pedimento="D1")
+        Document.objects.create(archivo="file1.pdf", organizacion=self.org, pedimento=pedimento, size=1)
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.get(pk=user.pk))
+        self.url = reverse('cards-dashboard')
+
+    def test_all_cards_match_their_endpoints(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(response.data['cards']), ['documentos', 'servicios', 'actividad', 'logs', 'ultimos_documentos'])
+        self.assertEqual(response.data['timeouts'], [])
+        self.assertEqual(response.data['cards']['documentos'], self.client.get(reverse('document-util-information')).data)
+        self.assertEqual(response.data['cards']['ultimos_documentos']['total_filtrados'], 1)
+
+    def test_cards_selector(self):
+        response = self.client.get(self.url, {'cards': 'servicios,documentos'})
+        self.assertEqual(list(response.data['cards']), ['servicios', 'documentos'])
+
+        response = self.client.get(self.url, {'cards': 'documentos,otra'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_dashboard_single_role_resolution(self):
+        self.client.get(self.url, {'cards': 'documentos,servicios'})
+        # grupos; las dos cards están en cache
+        with self.assertNumQueries(1):
+            self.client.get(self.url, {'cards': 'documentos,servicios'})
+
+    @override_settings(CARDS_DASHBOARD={'MAX_WORKERS': 2, 'TIMEOUT': 5, 'TIMEOUTS': {'ultimos_documentos': 0.05}})
+    def test_partial_result_on_timeout(self):
+        def slow(view):
+            time.sleep(0.5)
+            return {}
+
+        with mock.patch.object(LastDocumentView, 'get_card_data', slow), \
+                mock.patch.object(DocumentUtilInformation, 'get_card_data', lambda view: {"archivos_filtrados": 1}):
+            response = self.client.get(self.url, {'cards': 'documentos,ultimos_documentos'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['cards'], {'documentos': {"archivos_filtrados": 1}})
+        self.assertEqual(response.data['timeouts'], ['ultimos_documentos'])
+
+
+class EstadisticasDiariasTests(APITestCase):
+    """Estadísticas diarias por organización (api.cards.stats)."""
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.lic = Licencia.objects.create(nombre="LicTest", almacenamiento=100)
+        self.org = Organizacion.objects.create(nombre="OrgTest", licencia=self.lic, is_active=True, is_verified=True)
+        self.user = User.objects.create_user(username="developer", password="devpass", organizacion=self.org)
+        for name in ('developer', 'Agente Aduanal'):
+            self.user.groups.add(Group.objects.get_or_create(name=name)[0])
+        self.estados = {pk: EstadoDeProcesamiento.objects.get_or_create(pk=pk, defaults={"estado": f"E{pk}"})[0] for pk in (1, 3)}
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.get(pk=self.user.pk))
+
+    def estadistica(self):
+        return EstadisticaDiaria.objects.get(organizacion=self.org, fecha=timezone.localdate())
+
+    def crear_datos(self):
+        pedimento = Pedimento.objects.create(organizacion=self.org, pedimento="S1")
+        documento = Document.objects.create(archivo="file1.pdf", organizacion=self.org, pedimento=pedimento, size=100)
+        Document.objects.create(archivo="file2.pdf", organizacion=self.org, pedimento=pedimento, size=50)
+        proceso = ProcesamientoPedimento.objects.create(organizacion=self.org, pedimento=pedimento, estado=self.estados[1])
+        return pedimento, documento, proceso
+
+    def test_incremental_updates(self):
+        pedimento, documento, proceso = self.crear_datos()
+        estadistica = self.estadistica()
+        self.assertEqual((estadistica.documentos, estadistica.documentos_bytes, estadistica.pedimentos), (2, 150, 1))
+        self.assertEqual((estadistica.procesos, estadistica.procesos_en_espera), (1, 1))
+
+        proceso.estado = self.estados[3]
+        proceso.save()
+        documento.size = 70
+        documento.save()
+        estadistica = self.estadistica()
+        self.assertEqual((estadistica.procesos_en_espera, estadistica.procesos_finalizados), (0, 1))
+        self.assertEqual(estadistica.documentos_bytes, 120)
+
+        documento.delete()
+        estadistica = self.estadistica()
+        self.assertEqual((estadistica.documentos, estadistica.documentos_bytes), (1, 50))
+
+    def test_rebuild_matches_incremental(self):
+        self.crear_datos()
+        campos = ('documentos', 'documentos_bytes', 'pedimentos', 'procesos', 'procesos_en_espera')
+        incremental = EstadisticaDiaria.objects.values(*campos).get()
+        EstadisticaDiaria.objects.update(documentos=0, documentos_bytes=0)
+        call_command('rebuild_estadisticas_diarias', stdout=open(os.devnull, 'w'))
+        self.assertEqual(EstadisticaDiaria.objects.values(*campos).get(), incremental)
+
+    def test_time_series_endpoint(self):
+        self.crear_datos()
+        url = reverse('estadisticas-diarias')
+        self.client.get(url)  # Estado de la organización en cache
+        with self.assertNumQueries(2):  # grupos + serie
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['buckets']), 1)
+        self.assertEqual(response.data['buckets'][0]['fecha'], timezone.localdate().isoformat())
+        self.assertEqual(response.data['buckets'][0]['documentos_bytes'], 150)
+
+        response = self.client.get(url, {'intervalo': 'mes'})
+        self.assertEqual(response.data['buckets'][0]['documentos'], 2)
+
+        response = self.client.get(url, {'fecha_inicio': '2020-01-01', 'fecha_fin': '2020-02-01'})
+        self.assertEqual(response.data['buckets'], [])
+
+        for params in ({'fecha_inicio': '2020-13-01'}, {'intervalo': 'anio'}):
+            self.assertEqual(self.client.get(url, params).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_storage_usage_from_snapshots(self):
+        self.crear_datos()
+        response = self.client.get(reverse('UsoAlmacenamiento-mi-organizacion'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['espacio_utilizado_bytes'], 150)
+        self.assertEqual(response.data['total_documentos'], 2)
+        self.assertEqual(response.data['total_pedimentos'], 1)
+
+    def test_storage_sync_ignores_snapshot_drift(self):
+        self.crear_datos()
+        # update() no pasa por las señales: la estadística queda en 150 bytes
+        Document.objects.filter(organizacion=self.org).update(size=500)
+        response = self.client.get(reverse('UsoAlmacenamiento-mi-organizacion'))
+        self.assertEqual(response.data['espacio_utilizado_bytes'], 1000)
+        self.assertEqual(UsoAlmacenamiento.objects.get(organizacion=self.org).espacio_utilizado, 1000)
+
+
+class SingleFlightTests(SimpleTestCase):
+    """Requests iguales al mismo tiempo (core.singleflight)."""
+
+    def setUp(self):
+        cache.clear()
+
+    def herd(self, name, fn, size=10):
+        """Llama single_flight desde `size` hilos a la vez; regresa resultados y errores."""
+        barrier = threading.Barrier(size)
+        results, errors = [], []
+
+        def worker():
+            barrier.wait()
+            try:
+                results.append(single_flight(name, 'org-1', fn))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker) for _ in range(size)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results, errors
+
+    def test_thundering_herd_computes_once(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return {"total": 42}
+
+        results, errors = self.herd('test.herd', compute)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(errors, [])
+        self.assertEqual(results, [{"total": 42}] * 10)
+        self.assertEqual(SINGLEFLIGHT_CALLS.get(name='test.herd', result='leader'), 1)
+        self.assertEqual(SINGLEFLIGHT_CALLS.get(name='test.herd', result='coalesced'), 9)
+
+        # Terminado el cálculo, la siguiente request vuelve a calcular
+        single_flight('test.herd', 'org-1', compute)
+        self.assertEqual(len(calls), 2)
+
+    def test_waiters_get_the_error(self):
+        def compute():
+            time.sleep(0.2)
+            raise ValueError("falló")
+
+        results, errors = self.herd('test.herd-error', compute, size=5)
+        self.assertEqual(results, [])
+        self.assertEqual(len(errors), 5)
+        self.assertTrue(all(isinstance(e, ValueError) for e in errors))
+
+    @override_settings(SINGLE_FLIGHT={'CROSS_WORKER': True, 'WAIT_TIMEOUT': 2, 'POLL_INTERVAL': 0.01})
+    def test_cross_worker_waits_for_other_worker(self):
+        # Otro worker tiene el lock y deja el resultado después de un momento
+        cache.add('singleflight:lock:test.remote:org-1', 'otro-worker', 30)
+
+        def other_worker():
+            time.sleep(0.2)
+            cache.set('singleflight:result:test.remote:org-1', ({"total": 7},), 5)
+            cache.delete('singleflight:lock:test.remote:org-1')
+
+        thread = threading.Thread(target=other_worker)
+        thread.start()
+        calls = []
+        result = single_flight('test.remote', 'org-1', lambda: calls.append(1) or {"total": 0})
+        thread.join()
+        self.assertEqual(result, {"total": 7})
+        self.assertEqual(calls, [])
+        self.assertEqual(SINGLEFLIGHT_CALLS.get(name='test.remote', result='remote'), 1)
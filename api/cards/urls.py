@@ -6,6 +6,8 @@ from .views import (
     UserActivityAnalysis,
     RequestLogAnalysis,
     LastDocumentView,
+    DashboardView,
+    EstadisticasDiariasView,
 )
 
 
@@ -18,4 +20,6 @@ urlpatterns = [
     path('user-activity-analysis/', UserActivityAnalysis.as_view(), name='user-activity-analysis'),
     path('request-log-analysis/', RequestLogAnalysis.as_view(), name='request-log-analysis'),
     path('downloaded-documents/', LastDocumentView.as_view(), name='downloaded-documents'),
+    path('dashboard/', DashboardView.as_view(), name='cards-dashboard'),
+    path('estadisticas/', EstadisticasDiariasView.as_view(), name='estadisticas-diarias'),
 ]
\ No newline at end of file
@@ -1,7 +1,12 @@
 from django.shortcuts import render
 from django.contrib.auth import get_user_model
 from django.utils import timezone
-from django.db.models import F
+from django.utils.dateparse import parse_date
+from django.db.models.functions import TruncMonth, TruncWeek
+import uuid
+from collections import Counter
+
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum
 from datetime import timedelta
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -13,13 +18,21 @@ from core.permissions import (
     IsSameOrganizationAndAdmin,
     IsSuperUser
 )
+from core.roles import ADMIN, AGENTE_ADUANAL, DEVELOPER, IMPORTADOR, USER, get_user_roles
 
 from api.organization.models import UsoAlmacenamiento, Organizacion
 from api.record.models import Document
 from api.customs.models import ProcesamientoPedimento
-from api.logger.models import UserActivity, RequestLog
+from api.logger.models import UserActivity, RequestLog, RequestRollupDay
+from api.logger.rollups import summarize
+from core.routers import same_database
 
 from api.logger.mixins import LoggingMixin
+from .dashboard import compute_cards
+from .models import EstadisticaDiaria
+from .stats import COUNTER_FIELDS
+from .cache import CachedCardMixin, CardMixin, SCOPE_ACTIVIDAD, SCOPE_DOCUMENTOS, SCOPE_PROCESOS, rango_fechas
+from mixins.conditional import ConditionalGetMixin
 from mixins.filtrado_organizacion import FiltroPorOrganizacionMixin, DocumentosFiltradosMixin
 
 from drf_yasg.utils import swagger_auto_schema
@@ -29,13 +42,16 @@ from api.logger.models import UserActivity, RequestLog, UserActivity
 
 
 # Create your views here.
-class DocumentUtilInformation(LoggingMixin, APIView, FiltroPorOrganizacionMixin):
+class DocumentUtilInformation(LoggingMixin, CachedCardMixin, ConditionalGetMixin, APIView, FiltroPorOrganizacionMixin):
     """
     View to get the total storage used by the organization and stats of documents added in last 1, 7, and 30 days.
     Permite filtrar por fecha usando los parámetros ?fecha_inicio=YYYY-MM-DD&fecha_fin=YYYY-MM-DD
+    Una consulta con conteos condicionales, guardada en cache (api.cards.cache).
     """
     permission_classes = [IsAuthenticated &  (IsSameOrganization | IsSameOrganizationAndAdmin | IsSameOrganizationDeveloper | IsSuperUser)]
     model = Document
+    card_scope = SCOPE_DOCUMENTOS
+    conditional_time_bucket = 60  # Ventanas de 1, 7 y 30 días desde ahora
 
     my_tags = ['Cards']
 
@@ -72,36 +88,24 @@ class DocumentUtilInformation(LoggingMixin, APIView, FiltroPorOrganizacionMixin)
     def get_queryset(self):
         return self.get_queryset_filtrado()
         
-    def get(self, request):
-        queryset = self.get_queryset()
+    def compute_card(self, queryset):
         now = timezone.now()
-        count_1 = queryset.filter(created_at__gte=now - timedelta(days=1)).count()
-        count_7 = queryset.filter(created_at__gte=now - timedelta(days=7)).count()
-        count_30 = queryset.filter(created_at__gte=now - timedelta(days=30)).count()
-
-        fecha_inicio = request.query_params.get('fecha_inicio')
-        fecha_fin = request.query_params.get('fecha_fin')
-        docs_filtrados = queryset
-
-        if fecha_inicio:
-            docs_filtrados = docs_filtrados.filter(created_at__gte=fecha_inicio)
-        if fecha_fin:
-            docs_filtrados = docs_filtrados.filter(created_at__lte=fecha_fin)
-        count_filtrados = docs_filtrados.count()
-        return Response({
-            "archivos_ultimas_1_dia": count_1,
-            "archivos_ultimos_7_dias": count_7,
-            "archivos_ultimos_30_dias": count_30,
-            "archivos_filtrados": count_filtrados
-        })
-
-class ViewPedimentoServicesUtilInformation(LoggingMixin, APIView, FiltroPorOrganizacionMixin):
+        return queryset.order_by().aggregate(
+            archivos_ultimas_1_dia=Count('pk', filter=Q(created_at__gte=now - timedelta(days=1))),
+            archivos_ultimos_7_dias=Count('pk', filter=Q(created_at__gte=now - timedelta(days=7))),
+            archivos_ultimos_30_dias=Count('pk', filter=Q(created_at__gte=now - timedelta(days=30))),
+            archivos_filtrados=Count('pk', filter=rango_fechas(self.request, 'created_at')),
+        )
+
+class ViewPedimentoServicesUtilInformation(LoggingMixin, CachedCardMixin, ConditionalGetMixin, APIView, FiltroPorOrganizacionMixin):
     """
     View para obtener información de uso de servicios relacionados con pedimentos.
     Devuelve la cantidad de procesos por estado (1: espera, 2: proceso, 3: finalizado, 4: error) para la organización.
+    Una consulta con conteos condicionales, guardada en cache (api.cards.cache).
     """
     permission_classes = [IsAuthenticated &  (IsSameOrganization | IsSameOrganizationAndAdmin | IsSameOrganizationDeveloper | IsSuperUser)]
     model = Document
+    card_scope = SCOPE_PROCESOS
     my_tags = ['Cards']
 
     @swagger_auto_schema(
@@ -137,65 +141,53 @@ class ViewPedimentoServicesUtilInformation(LoggingMixin, APIView, FiltroPorOrgan
     )
 
     def get_queryset(self):
-        if not self.request.user.is_authenticated or not hasattr(self.request.user, 'organizacion'):
+        roles = get_user_roles(self.request)
+        if not roles.is_authenticated:
             return None
         
         # Si es super usuario, devuelve todos los procesos
-        if self.request.user.is_superuser:
+        if roles.is_superuser:
             return ProcesamientoPedimento.objects.all()
 
         # Si es Administrador de la organizacion devuelve todos los servicios de la organizacion
-        if self.request.user.is_authenticated and self.request.user.groups.filter(name='admin').exists() and self.request.user.groups.filter(name='Agente Aduanal').exists():
-            return ProcesamientoPedimento.objects.filter(pedimento__organizacion=self.request.user.organizacion)
+        if roles.has(ADMIN) and roles.has(AGENTE_ADUANAL):
+            return ProcesamientoPedimento.objects.filter(organizacion=roles.organizacion_id)
 
-        # Si es Desarrollador de la organizacion devuelve todos los servicios de la organizacion
-        if self.request.user.is_authenticated and self.request.user.groups.filter(name='developer').exists() and self.request.user.groups.filter(name='Agente Aduanal').exists():
-            return self.request.user.organizacion.procesamiento_pedimentos.all()
-        
-        if self.request.user.is_authenticated and self.request.user.groups.filter(name='user').exists() and self.request.user.groups.filter(name='Agente Aduanal').exists():
-            return self.request.user.organizacion.procesamiento_pedimentos.all()
+        # Si es Desarrollador o usuario de la organizacion devuelve todos los servicios de la organizacion
+        if roles.has_any(DEVELOPER, USER) and roles.has(AGENTE_ADUANAL):
+            return ProcesamientoPedimento.objects.filter(organizacion=roles.organizacion_id)
 
         # Si es importador de la organizacion, devuelve los servicios relacionados con sus pedimentos
-        if self.request.user.is_authenticated and self.request.user.groups.filter(name='importador').exists() and self.request.user.is_importador and self.request.user.groups.filter(name='user').exists():
-            return self.request.user.organizacion.procesamiento_pedimentos.filter(pedimento__contribuyente=self.request.user.rfc)
+        if roles.has(IMPORTADOR) and self.request.user.is_importador and roles.has(USER):
+            return ProcesamientoPedimento.objects.filter(
+                organizacion=roles.organizacion_id, pedimento__contribuyente=self.request.user.rfc
+            )
 
         
         
         # Si es parte de una organización, filtrar por esa organización
-        return ProcesamientoPedimento.objects.filter(pedimento__organizacion=self.request.user.organizacion)
-
-    def get(self, request):
-        queryset = self.get_queryset()
-        if queryset is None:
-            return Response({"error": "Usuario no autenticado o sin organización"}, status=401)
-        en_espera = queryset.filter(estado=1).count()
-        en_proceso = queryset.filter(estado=2).count()
-        finalizados = queryset.filter(estado=3).count()
-        con_error = queryset.filter(estado=4).count()
-        fecha_inicio = request.query_params.get('fecha_inicio')
-        fecha_fin = request.query_params.get('fecha_fin')
-        procesos_filtrados = queryset
-        if fecha_inicio:
-            procesos_filtrados = procesos_filtrados.filter(created_at__gte=fecha_inicio)
-        if fecha_fin:
-            procesos_filtrados = procesos_filtrados.filter(created_at__lte=fecha_fin)
-        count_filtrados = procesos_filtrados.count()
-        return Response({
-            "en_espera": en_espera,
-            "en_proceso": en_proceso,
-            "finalizados": finalizados,
-            "con_error": con_error,
-            "procesos_filtrados": count_filtrados
-        })
-
-class UserActivityAnalysis(LoggingMixin, APIView, FiltroPorOrganizacionMixin):
+        return ProcesamientoPedimento.objects.filter(organizacion=roles.organizacion_id)
+
+    def compute_card(self, queryset):
+        return queryset.order_by().aggregate(
+            en_espera=Count('pk', filter=Q(estado=1)),
+            en_proceso=Count('pk', filter=Q(estado=2)),
+            finalizados=Count('pk', filter=Q(estado=3)),
+            con_error=Count('pk', filter=Q(estado=4)),
+            procesos_filtrados=Count('pk', filter=rango_fechas(self.request, 'created_at')),
+        )
+
+class UserActivityAnalysis(LoggingMixin, CachedCardMixin, ConditionalGetMixin, APIView, FiltroPorOrganizacionMixin):
     """
     Endpoint para análisis de actividades de usuario.
     Devuelve el conteo de acciones por tipo y los 5 usuarios más activos.
+    Un GROUP BY por usuario y acción, guardado en cache (api.cards.cache).
     """
     permission_classes = [IsAuthenticated &  (IsSameOrganization | IsSameOrganizationAndAdmin | IsSameOrganizationDeveloper | IsSuperUser)]
     
     model = UserActivity
+    card_scope = SCOPE_ACTIVIDAD
+    conditional_field = 'timestamp'
 
     my_tags = ['Cards']
 
@@ -255,45 +247,60 @@ class UserActivityAnalysis(LoggingMixin, APIView, FiltroPorOrganizacionMixin):
     def get_queryset(self):
         return  self.get_queryset_filtrado()
 
-    def get(self, request):
-        queryset = self.get_queryset()
+    def compute_card(self, queryset):
         User = get_user_model()
-        actions = [a[0] for a in UserActivity.ACTIONS]
-        actions_count = {a: queryset.filter(action=a).count() for a in actions}
+        # Con los logs en la misma base el username sale de la misma consulta;
+        # subconsulta y no join para seguir contando actividades de usuarios borrados
+        join_users = same_database(UserActivity, User)
+        rows = queryset.order_by().values('user', 'action').annotate(
+            total=Count('pk'),
+            filtradas=Count('pk', filter=rango_fechas(self.request, 'timestamp')),
+        )
+        if join_users:
+            rows = rows.annotate(username=Subquery(User.objects.filter(pk=OuterRef('user')).values('username')[:1]))
+
+        actions_count = {a[0]: 0 for a in UserActivity.ACTIONS}
+        por_usuario = Counter()
+        usernames = {}
+        count_filtrados = 0
+        for row in rows:
+            if row['action'] in actions_count:
+                actions_count[row['action']] += row['total']
+            por_usuario[row['user']] += row['total']
+            count_filtrados += row['filtradas']
+            if join_users:
+                usernames[row['user']] = row['username']
+
         # Top 5 usuarios más activos
-        top_users = []
-        from django.db.models import Count
-        top_users_qs = queryset.values('user').annotate(activity_count=Count('id')).order_by('-activity_count')[:5]
-        for entry in top_users_qs:
-            try:
-                user_obj = User.objects.get(pk=entry['user'])
-                top_users.append({"username": user_obj.username, "activity_count": entry['activity_count']})
-            except User.DoesNotExist:
-                continue
-        fecha_inicio = request.query_params.get('fecha_inicio')
-        fecha_fin = request.query_params.get('fecha_fin')
-        actividades_filtradas = queryset
-        if fecha_inicio:
-            actividades_filtradas = actividades_filtradas.filter(timestamp__gte=fecha_inicio)
-        if fecha_fin:
-            actividades_filtradas = actividades_filtradas.filter(timestamp__lte=fecha_fin)
-        count_filtrados = actividades_filtradas.count()
-        return Response({
+        top = por_usuario.most_common(5)
+        if not join_users and top:
+            usernames = dict(User.objects.filter(pk__in=[pk for pk, _ in top]).values_list('pk', 'username'))
+        top_users = [
+            {"username": usernames[pk], "activity_count": count}
+            for pk, count in top if pk in usernames
+        ]
+        return {
             "actions_count": actions_count,
             "top_users": top_users,
             "actividades_filtradas": count_filtrados
-        })
+        }
 
-class RequestLogAnalysis(LoggingMixin, APIView, FiltroPorOrganizacionMixin):
+class RequestLogAnalysis(LoggingMixin, CardMixin, ConditionalGetMixin, APIView, FiltroPorOrganizacionMixin):
     """
     Endpoint para análisis de logs de peticiones.
     Devuelve el conteo por método, los paths más solicitados y el promedio de tiempo de respuesta.
+    Se calcula desde los rollups diarios de RequestLog (api.logger.rollups).
     """
     permission_classes = [IsAuthenticated &  (IsSameOrganization | IsSameOrganizationAndAdmin | IsSameOrganizationDeveloper | IsSuperUser)]
-    model = RequestLog
+    model = RequestRollupDay
+    conditional_field = 'bucket'
 
     my_tags = ['Cards']
 
+    def get_fingerprint_aggregates(self):
+        # Los rollups se actualizan en su lugar: el total de requests sí cambia
+        return {**super().get_fingerprint_aggregates(), '_total': Sum('count')}
+
     @swagger_auto_schema(
         operation_description="Get analysis of request logs. Permite filtrar por fecha de logs.",
         manual_parameters=[
@@ -347,37 +354,37 @@ class RequestLogAnalysis(LoggingMixin, APIView, FiltroPorOrganizacionMixin):
     def get_queryset(self):
         return self.get_queryset_filtrado()
 
-    def get(self, request):
-        queryset = self.get_queryset()
-        from django.db.models import Count, Avg
-        from api.logger.models import RequestLog
-        methods = [m[0] for m in RequestLog.METHODS]
-        methods_count = {m: queryset.filter(method=m).count() for m in methods}
-        top_paths_qs = queryset.values('path').annotate(count=Count('id')).order_by('-count')[:5]
-        top_paths = [{"path": entry['path'], "count": entry['count']} for entry in top_paths_qs]
-        avg_response_time = queryset.aggregate(avg=Avg('response_time'))['avg'] or 0.0
+    def compute_card(self, queryset):
+        request = self.request
+        methods_count = {m[0]: 0 for m in RequestLog.METHODS}
+        for entry in queryset.values('method').annotate(count=Sum('count')):
+            methods_count[entry['method']] = entry['count']
+        top_paths_qs = queryset.values('route').annotate(count=Sum('count')).order_by('-count')[:5]
+        top_paths = [{"path": entry['route'], "count": entry['count']} for entry in top_paths_qs]
+        avg_response_time = summarize(queryset)['avg_response_time']
         fecha_inicio = request.query_params.get('fecha_inicio')
         fecha_fin = request.query_params.get('fecha_fin')
         logs_filtrados = queryset
         if fecha_inicio:
-            logs_filtrados = logs_filtrados.filter(timestamp__gte=fecha_inicio)
+            logs_filtrados = logs_filtrados.filter(bucket__gte=fecha_inicio)
         if fecha_fin:
-            logs_filtrados = logs_filtrados.filter(timestamp__lte=fecha_fin)
-        count_filtrados = logs_filtrados.count()
-        return Response({
+            logs_filtrados = logs_filtrados.filter(bucket__lte=fecha_fin)
+        count_filtrados = logs_filtrados.aggregate(total=Sum('count'))['total'] or 0
+        return {
             "methods_count": methods_count,
             "top_paths": top_paths,
-            "avg_response_time": round(avg_response_time, 2),
+            "avg_response_time": avg_response_time,
             "logs_filtrados": count_filtrados
-        })
+        }
 
-class LastDocumentView(LoggingMixin, APIView, DocumentosFiltradosMixin):
+class LastDocumentView(LoggingMixin, CardMixin, ConditionalGetMixin, APIView, DocumentosFiltradosMixin):
     """
         View que obtiene los ultimos 10 documentos agregados.
         Permite filtrar por fecha usando los parámetros ?fecha_inicio=YYYY-MM-DD&fecha_fin=YYYY-MM-DD
     """
     permission_classes = [IsAuthenticated &  (IsSameOrganization | IsSameOrganizationAndAdmin | IsSameOrganizationDeveloper | IsSuperUser)]
     model = Document
+    select_related_fields = ('organizacion', 'pedimento')  # str() de ambos en la respuesta
 
     my_tags = ['Cards']
 
@@ -427,10 +434,9 @@ class LastDocumentView(LoggingMixin, APIView, DocumentosFiltradosMixin):
     def get_queryset(self):
         return self.get_queryset_filtrado_por_organizacion()
 
-    def get(self, request):
-        queryset = self.get_queryset()
-        fecha_inicio = request.query_params.get('fecha_inicio')
-        fecha_fin = request.query_params.get('fecha_fin')
+    def compute_card(self, queryset):
+        fecha_inicio = self.request.query_params.get('fecha_inicio')
+        fecha_fin = self.request.query_params.get('fecha_fin')
         documentos = queryset
         if fecha_inicio:
             documentos = documentos.filter(created_at__gte=fecha_inicio)
@@ -450,8 +456,160 @@ class LastDocumentView(LoggingMixin, APIView, DocumentosFiltradosMixin):
                 "organizacion": str(doc.organizacion) if doc.organizacion else '',
                 "pedimento": str(doc.pedimento) if doc.pedimento else ''
             })
-        return Response({
+        return {
             "documentos": docs_serializados,
             "total_filtrados": total_filtrados
+        }
+    
+
+class EstadisticasDiariasView(LoggingMixin, APIView):
+    """
+    Serie de tiempo de las estadísticas por organización (api.cards.stats).
+    Lee las filas diarias de EstadisticaDiaria, no las tablas crudas. Por defecto los últimos 30 días.
+    Con intervalo=semana o mes, usuarios_activos suma los usuarios activos de cada día.
+    """
+    permission_classes = [IsAuthenticated &  (IsSameOrganization | IsSameOrganizationAndAdmin | IsSameOrganizationDeveloper | IsSuperUser)]
+    intervalos = {'dia': None, 'semana': TruncWeek, 'mes': TruncMonth}
+
+    my_tags = ['Cards']
+
+    @staticmethod
+    def parse_fecha(value, default):
+        if not value:
+            return default
+        try:
+            return parse_date(value)
+        except ValueError:
+            return None
+
+    @swagger_auto_schema(
+        operation_description="Estadísticas por día, semana o mes para un rango de fechas.",
+        manual_parameters=[
+            openapi.Parameter('fecha_inicio', openapi.IN_QUERY, description="Fecha de inicio (YYYY-MM-DD). Por defecto hace 30 días", type=openapi.TYPE_STRING),
+            openapi.Parameter('fecha_fin', openapi.IN_QUERY, description="Fecha de fin (YYYY-MM-DD). Por defecto hoy", type=openapi.TYPE_STRING),
+            openapi.Parameter('intervalo', openapi.IN_QUERY, description="dia (por defecto), semana o mes", type=openapi.TYPE_STRING),
+            openapi.Parameter('organizacion', openapi.IN_QUERY, description="Organización (solo superusuarios; sin ella suma todas)", type=openapi.TYPE_STRING),
+        ],
+        responses={
+            200: openapi.Response(
+                description="Serie de tiempo",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        "intervalo": openapi.Schema(type=openapi.TYPE_STRING),
+                        "fecha_inicio": openapi.Schema(type=openapi.TYPE_STRING, format="date"),
+                        "fecha_fin": openapi.Schema(type=openapi.TYPE_STRING, format="date"),
+                        "buckets": openapi.Schema(
+                            type=openapi.TYPE_ARRAY,
+                            items=openapi.Schema(
+                                type=openapi.TYPE_OBJECT,
+                                properties={
+                                    "fecha": openapi.Schema(type=openapi.TYPE_STRING, format="date", description="Inicio del periodo"),
+                                    **{field: openapi.Schema(type=openapi.TYPE_INTEGER) for field in COUNTER_FIELDS},
+                                }
+                            ),
+                            description="Solo los periodos con datos"
+                        ),
+                    }
+                ),
+            ),
+            400: openapi.Response(description="Fechas o intervalo inválidos"),
+        }
+    )
+    def get(self, request):
+        hoy = timezone.localdate()
+        fecha_inicio = self.parse_fecha(request.query_params.get('fecha_inicio'), hoy - timedelta(days=30))
+        fecha_fin = self.parse_fecha(request.query_params.get('fecha_fin'), hoy)
+        intervalo = request.query_params.get('intervalo', 'dia')
+        if fecha_inicio is None or fecha_fin is None or fecha_inicio > fecha_fin:
+            return Response({"error": "fecha_inicio y fecha_fin deben tener el formato YYYY-MM-DD y formar un rango válido"}, status=400)
+        if intervalo not in self.intervalos:
+            return Response({"error": f"intervalo debe ser uno de: {', '.join(self.intervalos)}"}, status=400)
+
+        roles = get_user_roles(request)
+        queryset = EstadisticaDiaria.objects.for_user(request.user, roles=roles).filter(fecha__gte=fecha_inicio, fecha__lte=fecha_fin)
+        organizacion = request.query_params.get('organizacion')
+        if organizacion and roles.is_superuser:
+            try:
+                queryset = queryset.filter(organizacion_id=uuid.UUID(organizacion))
+            except ValueError:
+                return Response({"error": "organizacion debe ser un UUID"}, status=400)
+
+        trunc = self.intervalos[intervalo]
+        periodo = trunc('fecha') if trunc else F('fecha')
+        buckets = (
+            queryset.order_by()
+            .annotate(periodo=periodo)
+            .values('periodo')
+            .annotate(**{field: Sum(field) for field in COUNTER_FIELDS})
+            .order_by('periodo')
+        )
+        return Response({
+            "intervalo": intervalo,
+            "fecha_inicio": fecha_inicio.isoformat(),
+            "fecha_fin": fecha_fin.isoformat(),
+            "buckets": [
+                {"fecha": row.pop('periodo').isoformat(), **row}
+                for row in buckets
+            ],
+        })
+
+
+# Cards del tablero combinado, en el orden de la respuesta
+DASHBOARD_CARDS = {
+    'documentos': DocumentUtilInformation,
+    'servicios': ViewPedimentoServicesUtilInformation,
+    'actividad': UserActivityAnalysis,
+    'logs': RequestLogAnalysis,
+    'ultimos_documentos': LastDocumentView,
+}
+
+
+class DashboardView(LoggingMixin, APIView):
+    """
+    Todas las cards en una sola respuesta, calculadas al mismo tiempo (api.cards.dashboard).
+    ?cards=documentos,servicios elige las cards; los filtros de fecha aplican a todas.
+    Las cards que no terminan a tiempo se listan en "timeouts".
+    """
+    permission_classes = [IsAuthenticated &  (IsSameOrganization | IsSameOrganizationAndAdmin | IsSameOrganizationDeveloper | IsSuperUser)]
+
+    my_tags = ['Cards']
+
+    @swagger_auto_schema(
+        operation_description="Obtiene todas las cards del tablero en una sola respuesta.",
+        manual_parameters=[
+            openapi.Parameter('cards', openapi.IN_QUERY, description=f"Cards separadas por coma: {', '.join(DASHBOARD_CARDS)}", type=openapi.TYPE_STRING),
+            openapi.Parameter('fecha_inicio', openapi.IN_QUERY, description="Fecha de inicio (YYYY-MM-DD)", type=openapi.TYPE_STRING),
+            openapi.Parameter('fecha_fin', openapi.IN_QUERY, description="Fecha de fin (YYYY-MM-DD)", type=openapi.TYPE_STRING),
+        ],
+        responses={
+            200: openapi.Response(
+                description="Cards del tablero",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        "cards": openapi.Schema(type=openapi.TYPE_OBJECT, description="Resultado de cada card, con la forma de su endpoint"),
+                        "timeouts": openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_STRING), description="Cards que no terminaron a tiempo"),
+                        "errores": openapi.Schema(type=openapi.TYPE_OBJECT, additional_properties=openapi.Schema(type=openapi.TYPE_STRING), description="Cards que fallaron"),
+                    }
+                ),
+            ),
+            400: openapi.Response(description="Card desconocida en ?cards="),
+        }
+    )
+    def get(self, request):
+        selected = request.query_params.get('cards')
+        names = [name.strip() for name in selected.split(',') if name.strip()] if selected else list(DASHBOARD_CARDS)
+        unknown = [name for name in names if name not in DASHBOARD_CARDS]
+        if unknown:
+            return Response(
+                {"error": f"Cards desconocidas: {', '.join(unknown)}. Disponibles: {', '.join(DASHBOARD_CARDS)}"},
+                status=400,
+            )
+
+        results, timeouts, errors = compute_cards({name: DASHBOARD_CARDS[name] for name in names}, request)
+        return Response({
+            "cards": {name: results[name] for name in names if name in results},
+            "timeouts": timeouts,
+            "errores": errors,
         })
-    
\ No newline at end of file
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CuserConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api.cuser'
+
+    def ready(self):
+        import api.cuser.signals  # noqa
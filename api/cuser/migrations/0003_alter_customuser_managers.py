@@ -0,0 +1,20 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:33
+
+import api.cuser.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cuser', '0002_claimsuser_customuser_token_version'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='customuser',
+            managers=[
+                ('objects', api.cuser.models.CustomUserManager()),
+            ],
+        ),
+    ]
@@ -1,6 +1,14 @@
 import uuid
 from django.db import models
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
+
+from core.managers import TenantManager
+from core.roles import ROLES_AGENCIA_USUARIO
+
+
+class CustomUserManager(TenantManager, UserManager):
+    """UserManager con el filtrado por organización (for_user)."""
+    agency_roles = ROLES_AGENCIA_USUARIO
 
 # Create your models here.
 class CustomUser(AbstractUser):
@@ -13,6 +21,9 @@ class CustomUser(AbstractUser):
 
     is_importador = models.BooleanField(default=False, help_text="Indicates if the user is an importer")
     rfc = models.CharField(max_length=13, unique=True, null=True, blank=True, help_text="RFC of the user")
+    token_version = models.PositiveIntegerField(default=0, editable=False, help_text="Incrementa al cambiar roles o datos del token; invalida los tokens emitidos antes")
+
+    objects = CustomUserManager()
 
     def __str__(self):
         return self.username
@@ -20,4 +31,21 @@ class CustomUser(AbstractUser):
     class Meta:
         verbose_name = 'Custom User'
         verbose_name_plural = 'Custom Users'
-        ordering = ['username']
\ No newline at end of file
+        ordering = ['username']
+
+
+class ClaimsUser(CustomUser):
+    """
+    Usuario armado con los claims del access token (ver core.authentication).
+    Solo trae los campos del token; el resto se carga en una sola consulta la
+    primera vez que se usa alguno.
+    """
+
+    class Meta:
+        proxy = True
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        deferred = self.get_deferred_fields()
+        if fields is not None and deferred and set(fields) <= deferred:
+            fields = list(deferred)
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
@@ -1,8 +1,13 @@
 
 from rest_framework import serializers
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 from .models import CustomUser
 from django.contrib.auth.models import Group
 
+from core.authentication import build_token_claims
+
 class CustomUserSerializer(serializers.ModelSerializer):
     """
     Serializer for the CustomUser model.
@@ -26,3 +31,61 @@ class CustomUserSerializer(serializers.ModelSerializer):
         if groups:
             user.groups.set(groups)
         return user
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    Token pair con organización, roles y versiones en los claims
+    (ver core.authentication).
+    """
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        for claim, value in build_token_claims(user).items():
+            token[claim] = value
+        return token
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Renueva el token con los claims vigentes del usuario: después de un cambio
+    de roles o de organización basta con renovar para obtener un token válido.
+    """
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM, None)
+        user = (
+            CustomUser.objects.select_related('organizacion')
+            .filter(**{api_settings.USER_ID_FIELD: user_id})
+            .first()
+        ) if user_id else None
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(
+                self.error_messages['no_active_account'],
+                'no_active_account',
+            )
+
+        for claim, value in build_token_claims(user).items():
+            refresh[claim] = value
+
+        data = {'access': str(refresh.access_token)}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                try:
+                    refresh.blacklist()
+                except AttributeError:
+                    # Sin la app token_blacklist
+                    pass
+
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+
+            data['refresh'] = str(refresh)
+
+        return data
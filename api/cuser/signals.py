@@ -0,0 +1,58 @@
+from django.contrib.auth.models import Group
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from core.authentication import TOKEN_USER_FIELDS, bump_user_token_version, token_fields_changed
+from .models import ClaimsUser, CustomUser
+
+# Los tokens llevan roles y datos del usuario (core.authentication): cualquier
+# cambio en ellos incrementa token_version y revoca los tokens emitidos antes.
+
+
+@receiver(pre_save, sender=CustomUser)
+@receiver(pre_save, sender=ClaimsUser)
+def detectar_cambios_token(sender, instance, update_fields=None, **kwargs):
+    instance._token_fields_changed = token_fields_changed(instance, TOKEN_USER_FIELDS, update_fields)
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_save, sender=ClaimsUser)
+def invalidar_tokens_usuario(sender, instance, created, **kwargs):
+    if getattr(instance, '_token_fields_changed', False):
+        instance._token_fields_changed = False
+        bump_user_token_version([instance.pk])
+        instance.token_version += 1
+
+
+@receiver(post_delete, sender=CustomUser)
+@receiver(post_delete, sender=ClaimsUser)
+def invalidar_tokens_usuario_eliminado(sender, instance, **kwargs):
+    bump_user_token_version([instance.pk])
+
+
+@receiver(m2m_changed, sender=CustomUser.groups.through)
+def invalidar_tokens_por_grupos(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        # instance es el usuario
+        if action in ('post_add', 'post_remove') and pk_set or action == 'post_clear':
+            bump_user_token_version([instance.pk])
+        return
+
+    # instance es el grupo; pk_set son usuarios
+    if action == 'pre_clear':
+        instance._usuarios_token = list(instance.user_set.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        bump_user_token_version(instance.__dict__.pop('_usuarios_token', []))
+    elif action in ('post_add', 'post_remove') and pk_set:
+        bump_user_token_version(pk_set)
+
+
+@receiver(post_save, sender=Group)
+def invalidar_tokens_grupo_renombrado(sender, instance, created, **kwargs):
+    if not created:
+        bump_user_token_version(instance.user_set.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=Group)
+def invalidar_tokens_grupo_eliminado(sender, instance, **kwargs):
+    bump_user_token_version(instance.user_set.values_list('pk', flat=True))
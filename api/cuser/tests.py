@@ -1,10 +1,17 @@
 
+from django.contrib.auth.models import Group
+from django.core.cache import cache
 from django.urls import reverse
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
 from django.contrib.auth import get_user_model
+from api.customs.models import Pedimento
+from api.licence.models import Licencia
 from api.organization.models import Organizacion
-from .models import CustomUser
+from core.authentication import ClaimsJWTAuthentication
+from core.testing import QueryCountAssertionsMixin
+from .models import ClaimsUser, CustomUser
 
 User = get_user_model()
 
@@ -89,3 +96,119 @@ class CustomUserViewSetTests(APITestCase):
         url = reverse('profile-picture', args=[str(self.user.id)])
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ClaimsTokenTests(APITestCase):
+    """Tokens con organización y roles en los claims, sin consultas de autenticación."""
+
+    def setUp(self):
+        cache.clear()
+        self.lic = Licencia.objects.create(nombre="LicTest", almacenamiento=100)
+        self.org = Organizacion.objects.create(nombre="OrgTest", licencia=self.lic, is_active=True, is_verified=True)
+        self.user = User.objects.create_user(username="agente", password="agentepass", organizacion=self.org)
+        self.groups = [Group.objects.get_or_create(name=name)[0] for name in ('admin', 'user', 'Agente Aduanal')]
+        self.user.groups.add(*self.groups)
+        for i in range(3):
+            Pedimento.objects.create(pedimento=f"P{i}", organizacion=self.org)
+        self.client = APIClient()
+
+    def obtain(self):
+        response = self.client.post(reverse('token_obtain_pair'), {'username': 'agente', 'password': 'agentepass'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def list_pedimentos(self, access):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        return self.client.get(reverse('Pedimento-list'))
+
+    def test_access_token_carries_claims(self):
+        token = AccessToken(self.obtain()['access'])
+        self.assertEqual(token['organizacion_id'], str(self.org.pk))
+        self.assertEqual(token['roles'], ['Agente Aduanal', 'admin', 'user'])
+        self.assertTrue(token['org_is_active'])
+        self.assertTrue(token['org_is_verified'])
+        self.assertFalse(token['is_importador'])
+
+    def test_list_needs_no_auth_queries(self):
+        access = self.obtain()['access']
+        self.list_pedimentos(access)  # Versiones en cache
+        # Solo la huella del GET condicional y la consulta de pedimentos
+        with self.assertNumQueries(2):
+            response = self.list_pedimentos(access)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 3)
+
+    def test_claims_user_loads_other_fields_lazily(self):
+        access = self.obtain()['access']
+        self.list_pedimentos(access)
+        claims_user = ClaimsJWTAuthentication().get_user(AccessToken(access))
+        self.assertIsInstance(claims_user, ClaimsUser)
+        self.assertEqual(claims_user.organizacion_id, self.org.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(claims_user.email, self.user.email)
+            self.assertEqual(claims_user.first_name, self.user.first_name)
+
+    def test_group_change_revokes_token(self):
+        tokens = self.obtain()
+        self.assertEqual(self.list_pedimentos(tokens['access']).status_code, status.HTTP_200_OK)
+
+        self.user.groups.remove(self.groups[0])
+        self.assertEqual(self.list_pedimentos(tokens['access']).status_code, status.HTTP_401_UNAUTHORIZED)
+
+        # El refresh emite un token con los roles vigentes
+        self.client.credentials()
+        response = self.client.post(reverse('token_refresh'), {'refresh': tokens['refresh']})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(AccessToken(response.data['access'])['roles'], ['Agente Aduanal', 'user'])
+        self.assertEqual(self.list_pedimentos(response.data['access']).status_code, status.HTTP_200_OK)
+
+    def test_organization_deactivation_revokes_token(self):
+        access = self.obtain()['access']
+        self.list_pedimentos(access)
+        self.org.is_active = False
+        self.org.save()
+        self.assertEqual(self.list_pedimentos(access).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_unrelated_change_keeps_token(self):
+        access = self.obtain()['access']
+        user = User.objects.get(pk=self.user.pk)
+        user.first_name = "Otro"
+        user.save()
+        self.assertEqual(self.list_pedimentos(access).status_code, status.HTTP_200_OK)
+
+    def test_stale_instance_does_not_restore_version(self):
+        stale = User.objects.get(pk=self.user.pk)
+        version = stale.token_version
+        self.user.groups.remove(self.groups[0])
+        stale.first_name = "Otro"
+        stale.save()
+        self.assertEqual(User.objects.get(pk=self.user.pk).token_version, version + 1)
+
+    def test_token_without_claims_loads_user(self):
+        access = str(RefreshToken.for_user(self.user).access_token)
+        response = self.list_pedimentos(access)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 3)
+
+
+class CustomUserQueryCountTests(QueryCountAssertionsMixin, APITestCase):
+    """Los grupos de los usuarios se cargan con un prefetch para todo el listado."""
+
+    def setUp(self):
+        self.lic = Licencia.objects.create(nombre="LicTest", almacenamiento=100)
+        self.org = Organizacion.objects.create(nombre="OrgTest", licencia=self.lic, is_active=True, is_verified=True)
+        self.group = Group.objects.get_or_create(name='user')[0]
+        admin = User.objects.create_user(username="admin", password="adminpass", organizacion=self.org)
+        for name in ('admin', 'user', 'Agente Aduanal'):
+            admin.groups.add(Group.objects.get_or_create(name=name)[0])
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.get(pk=admin.pk))
+
+    def create_users(self, n):
+        for _ in range(n):
+            user = User.objects.create_user(username=f"u{User.objects.count()}", password="x", organizacion=self.org)
+            user.groups.add(self.group)
+
+    def test_list_users(self):
+        response = self.assertConstantQueries(reverse('cuser:customuser-list'), self.create_users)
+        self.assertEqual(len(response.data), 11)
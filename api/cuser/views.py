@@ -13,7 +13,7 @@ from rest_framework import viewsets
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.pagination import PageNumberPagination
+from core.pagination import FlexiblePagination
 
 from rest_framework.exceptions import PermissionDenied
 from core.permissions import (
@@ -22,6 +22,7 @@ from core.permissions import (
     IsSameOrganizationAndAdmin,
     IsSuperUser
 )
+from core.roles import ADMIN, AGENTE_ADUANAL, DEVELOPER, IMPORTADOR, USER, get_user_roles
 
 from .serializers import CustomUserSerializer
 from .models import CustomUser
@@ -36,39 +37,14 @@ from rest_framework.views import APIView
 from django.utils.encoding import force_str
 from django.conf import settings
 
-class CustomPagination(PageNumberPagination):
-
+class CustomPagination(FlexiblePagination):
     """
-    Paginación personalizada con parámetros flexibles
+    Paginación personalizada con parámetros flexibles (core.pagination.FlexiblePagination)
     - Si no se especifica page_size, devuelve todos los resultados (sin paginación)
     - Si se especifica page_size, usa paginación normal
+    - Con cursor, paginación por llave (next/previous opacos)
     """
-    page_size = None  # Sin paginación por defecto
-    page_size_query_param = 'page_size'
     max_page_size = 1000  # Límite máximo de seguridad
-    page_query_param = 'page'
-    
-    def paginate_queryset(self, queryset, request, view=None):
-        """
-        Si no se especifica page_size en los parámetros, devolver None (sin paginación)
-        Si se especifica, usar paginación normal
-        """
-        # Verificar si se especificó page_size en la query
-        if self.page_size_query_param not in request.query_params:
-            # No hay page_size, devolver None para indicar "sin paginación"
-            return None
-        
-        # Hay page_size, usar paginación normal
-        try:
-            page_size = int(request.query_params[self.page_size_query_param])
-            if page_size <= 0:
-                return None
-            # Establecer el page_size temporalmente para esta request
-            self.page_size = min(page_size, self.max_page_size)
-        except (ValueError, TypeError):
-            return None
-            
-        return super().paginate_queryset(queryset, request, view)
 
 class CustomUserViewSet(viewsets.ModelViewSet, OrganizacionFiltradaMixin):
     """
@@ -78,24 +54,20 @@ class CustomUserViewSet(viewsets.ModelViewSet, OrganizacionFiltradaMixin):
     pagination_class = CustomPagination
     model = CustomUser
     serializer_class = CustomUserSerializer
+    prefetch_related_fields = ('groups',)
     filterset_fields = ['username', 'email', 'first_name', 'last_name', 'organizacion', 'is_importador']
     my_tags = ['User Profile']
     
 
     def get_permissions(self):
         # Permitir eliminar usuarios solo a admin, Agente Aduanal y user de la misma organización
+        roles = get_user_roles(self.request)
         if self.action == 'destroy':
-            user = self.request.user
-            if not (
-                user.is_superuser or
-                user.groups.filter(name='admin').exists() or
-                user.groups.filter(name='Agente Aduanal').exists() or
-                user.groups.filter(name='user').exists()
-            ):
+            if not (roles.is_superuser or roles.has_any(ADMIN, AGENTE_ADUANAL, USER)):
                 from rest_framework.exceptions import PermissionDenied
                 raise PermissionDenied("Solo admin, Agente Aduanal o user pueden eliminar usuarios.")
         elif self.action in ['create', 'update', 'partial_update']:
-            if not (self.request.user.is_superuser or self.request.user.groups.filter(name='admin').exists()):
+            if not (roles.is_superuser or roles.has(ADMIN)):
                 from rest_framework.exceptions import PermissionDenied
                 raise PermissionDenied("Solo admin o superusuario pueden modificar usuarios.")
         return super().get_permissions()
@@ -110,14 +82,15 @@ class CustomUserViewSet(viewsets.ModelViewSet, OrganizacionFiltradaMixin):
 
     def get_queryset(self):
         # Handle Swagger schema generation where user might be AnonymousUser
-        if self.request.user.groups.filter(name='importador').exists():
+        if get_user_roles(self.request).has(IMPORTADOR):
             return CustomUser.objects.none()
         
         return self.get_queryset_filtrado_por_organizacion()
 
     def perform_create(self, serializer):
         # Always assign the creator's organization
-        if self.request.user.groups.filter(name='admin').exists() and self.request.user.groups.filter(name='Agente Aduanal').exists():
+        roles = get_user_roles(self.request)
+        if roles.has(ADMIN) and roles.has(AGENTE_ADUANAL):
             if not self.request.user.organizacion:
                 raise PermissionDenied("Los administradores deben tener una organización asignada para crear usuarios.")
             user = serializer.save(organizacion=self.request.user.organizacion, is_active=False)
@@ -130,7 +103,7 @@ class CustomUserViewSet(viewsets.ModelViewSet, OrganizacionFiltradaMixin):
             send_activation_email(user, self.request)  # Usa template HTML
             return
 
-        if self.request.user.groups.filter(name='developer').exists():
+        if roles.has(DEVELOPER):
             # Developers can create users but must assign an organization
             if not self.request.user.organizacion:
                 raise PermissionDenied("Los desarrolladores deben tener una organización asignada para crear usuarios.")
@@ -138,7 +111,7 @@ class CustomUserViewSet(viewsets.ModelViewSet, OrganizacionFiltradaMixin):
             send_activation_email(user, self.request)  # Usa template HTML
             return
 
-        if self.request.user.groups.filter(name='importador').exists():
+        if roles.has(IMPORTADOR):
             # No puedes crear un usuario si eres importador
             raise PermissionDenied("Los importadores no pueden crear usuarios.")
 
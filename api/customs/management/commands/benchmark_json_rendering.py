@@ -0,0 +1,65 @@
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.customs.models import Pedimento
+from api.customs.serializers import PedimentoSerializer
+from core import middleware
+from core.renderers import FastJSONRenderer
+from mixins.values_list import compile_serializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el tiempo de render de un listado de pedimentos con el JSONRenderer de DRF y "
+        "con FastJSONRenderer (core.renderers), y los bytes enviados sin comprimir, con gzip y "
+        "con brotli (si está instalado). Solo lee datos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=50000, help="Pedimentos en el listado")
+        parser.add_argument('--repeat', type=int, default=3, help="Repeticiones; se toma la mejor")
+
+    def handle(self, *args, **options):
+        context = {'request': Request(APIRequestFactory().get('/'))}
+        queryset = Pedimento.objects.order_by('-created_at')[:options['rows']]
+        compiled = compile_serializer(PedimentoSerializer(context=context), Pedimento)
+        data = compiled.to_representation(compiled.values_queryset(queryset))
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Listado de {len(data)} pedimentos"))
+
+        renders = {}
+        for etiqueta, renderer in (('JSONRenderer (DRF)', JSONRenderer()), ('FastJSONRenderer', FastJSONRenderer())):
+            tiempo, renders[etiqueta] = self.mejor(lambda: renderer.render(data), options['repeat'])
+            self.stdout.write(f"-- {etiqueta:<20} {tiempo * 1000:>9.1f} ms  {len(renders[etiqueta]):>12,} bytes")
+
+        iguales = len(set(renders.values())) == 1
+        estilo = self.style.SUCCESS if iguales else self.style.ERROR
+        self.stdout.write(estilo(f"-- salida idéntica: {'sí' if iguales else 'NO'}"))
+
+        content = renders['FastJSONRenderer']
+        config = middleware.get_compression_settings()
+        codificaciones = [('gzip', lambda: middleware.Compressor(middleware.GZIP, config).compress(content))]
+        if middleware.brotli is not None:
+            codificaciones.append(('br', lambda: middleware.Compressor(middleware.BROTLI, config).compress(content)))
+        else:
+            self.stdout.write(self.style.WARNING("-- brotli no está instalado"))
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Bytes enviados"))
+        self.stdout.write(f"-- {'sin comprimir':<20} {'':>9}     {len(content):>12,} bytes")
+        for etiqueta, funcion in codificaciones:
+            tiempo, comprimido = self.mejor(funcion, options['repeat'])
+            self.stdout.write(
+                f"-- {etiqueta:<20} {tiempo * 1000:>9.1f} ms  {len(comprimido):>12,} bytes "
+                f"({len(comprimido) / len(content):.1%})"
+            )
+
+    def mejor(self, funcion, repeat):
+        tiempos, resultado = [], None
+        for _ in range(max(repeat, 1)):
+            inicio = time.perf_counter()
+            resultado = funcion()
+            tiempos.append(time.perf_counter() - inicio)
+        return min(tiempos), resultado
@@ -0,0 +1,77 @@
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.customs.models import Pedimento
+from api.customs.serializers import PedimentoSerializer
+from api.logger.models import RequestLog
+from api.logger.serializers import RequestLogSerializer
+from api.record.models import Document
+from api.record.serializers import DocumentSerializer
+from mixins.values_list import compile_serializer
+
+CASOS = (
+    ('Pedimento', lambda: Pedimento.objects.order_by('-created_at'), PedimentoSerializer),
+    ('Document', lambda: Document.objects.select_related('pedimento').order_by('-created_at'), DocumentSerializer),
+    (
+        'RequestLog',
+        lambda: RequestLog.objects.select_related('user_agent', 'referer', 'slowest_query')
+        .prefetch_related('user').order_by('-timestamp'),
+        RequestLogSerializer,
+    ),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara filas por segundo de los listados con el serializer (instancias del modelo) "
+        "y con .values() y el serializer compilado (mixins.values_list). También revisa que "
+        "ambas salidas sean iguales. Solo lee datos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000, help="Registros por listado")
+        parser.add_argument('--repeat', type=int, default=5, help="Repeticiones; se toma la mejor")
+
+    def handle(self, *args, **options):
+        request = Request(APIRequestFactory().get('/'))
+        context = {'request': request}
+        renderer = JSONRenderer()
+        rows = options['rows']
+
+        for nombre, queryset, serializer_class in CASOS:
+            compiled = compile_serializer(serializer_class(context=context), queryset().model)
+            if compiled is None:
+                self.stdout.write(self.style.WARNING(f"{nombre}: el serializer no se puede compilar"))
+                continue
+
+            instancias = list(queryset()[:rows])
+            filas = list(compiled.values_queryset(queryset()[:rows]))
+            casos = (
+                # Consulta + conversión, como en la vista
+                ('serializer', lambda: serializer_class(list(queryset()[:rows]), many=True, context=context).data),
+                ('values()', lambda: compiled.to_representation(compiled.values_queryset(queryset()[:rows]))),
+                # Solo la conversión, con las filas ya leídas
+                ('serializer (sin consulta)', lambda: serializer_class(instancias, many=True, context=context).data),
+                ('values() (sin consulta)', lambda: compiled.to_representation([dict(fila) for fila in filas])),
+            )
+            resultados = [(etiqueta, *self.mejor(funcion, options['repeat'])) for etiqueta, funcion in casos]
+
+            total = len(resultados[0][2])
+            iguales = renderer.render(resultados[0][2]) == renderer.render(resultados[1][2])
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n{nombre} ({total} filas)"))
+            for etiqueta, tiempo, _ in resultados:
+                self.stdout.write(f"-- {etiqueta:<26} {total / tiempo:>10,.0f} filas/s ({tiempo * 1000:.1f} ms)")
+            estilo = self.style.SUCCESS if iguales else self.style.ERROR
+            self.stdout.write(estilo(f"-- salida idéntica: {'sí' if iguales else 'NO'}"))
+
+    def mejor(self, funcion, repeat):
+        tiempos, data = [], None
+        for _ in range(max(repeat, 1)):
+            inicio = time.perf_counter()
+            data = funcion()
+            tiempos.append(time.perf_counter() - inicio)
+        return max(min(tiempos), 1e-9), data
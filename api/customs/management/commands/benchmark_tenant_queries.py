@@ -0,0 +1,78 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, router
+from django.db.models import Count
+
+from api.customs.models import Cove, EDocument, Pedimento, ProcesamientoPedimento
+from api.organization.models import Organizacion
+from api.record.models import Document
+
+MODELOS = (Pedimento, EDocument, Cove, ProcesamientoPedimento, Document)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el plan y el tiempo de los listados por organización: antes (join con "
+        "organizacion para revisar is_active/is_verified) y después (solo organizacion_id, "
+        "como Model.objects.for_user). Solo lee datos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--organizacion', help="Id de la organización. Por defecto la que tiene más pedimentos.")
+        parser.add_argument('--contribuyente', help="RFC para medir también el listado de un importador")
+        parser.add_argument('--page-size', type=int, default=100, help="Registros por consulta (como una página del listado)")
+        parser.add_argument('--repeat', type=int, default=20, help="Repeticiones para la mediana")
+        parser.add_argument('--analyze', action='store_true', help="EXPLAIN ANALYZE (PostgreSQL)")
+
+    def handle(self, *args, **options):
+        organizacion_id = options['organizacion']
+        if not organizacion_id:
+            organizacion_id = (
+                Organizacion.objects.annotate(total=Count('pedimentos'))
+                .order_by('-total').values_list('pk', flat=True).first()
+            )
+        if not organizacion_id:
+            raise CommandError("No hay organizaciones")
+
+        page_size = options['page_size']
+        casos = []
+        for model in MODELOS:
+            base = model._default_manager.order_by('-created_at')
+            casos.append((
+                model.__name__,
+                base.filter(organizacion_id=organizacion_id, organizacion__is_active=True, organizacion__is_verified=True),
+                base.filter(organizacion_id=organizacion_id),
+            ))
+        if options['contribuyente']:
+            base = Pedimento._default_manager.order_by('-created_at')
+            casos.append((
+                'Pedimento (importador)',
+                base.filter(
+                    organizacion_id=organizacion_id, contribuyente=options['contribuyente'],
+                    organizacion__is_active=True, organizacion__is_verified=True,
+                ),
+                base.filter(organizacion_id=organizacion_id, contribuyente=options['contribuyente']),
+            ))
+
+        explain_options = {'analyze': True} if options['analyze'] else {}
+        for nombre, antes, despues in casos:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n{nombre}"))
+            for etiqueta, queryset in (('antes', antes), ('después', despues)):
+                queryset = queryset[:page_size]
+                tiempo = self.mediana(queryset, options['repeat'])
+                self.stdout.write(self.style.SUCCESS(f"-- {etiqueta}: mediana {tiempo:.2f} ms"))
+                self.stdout.write(queryset.explain(**explain_options))
+
+    def mediana(self, queryset, repeat):
+        connection = connections[router.db_for_read(queryset.model)]
+        sql, params = queryset.query.sql_with_params()
+        tiempos = []
+        with connection.cursor() as cursor:
+            for _ in range(max(repeat, 1)):
+                inicio = time.perf_counter()
+                cursor.execute(sql, params)
+                cursor.fetchall()
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+        return statistics.median(tiempos)
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customs', '0003_cove'),
+        ('organization', '0003_organizacion_token_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cove',
+            index=models.Index(fields=['organizacion', '-created_at'], name='coves_org_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='edocument',
+            index=models.Index(fields=['organizacion', '-created_at'], name='edocs_org_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pedimento',
+            index=models.Index(fields=['organizacion', '-created_at'], name='pedimento_org_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pedimento',
+            index=models.Index(fields=['organizacion', 'contribuyente'], name='pedimento_org_contrib_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='procesamientopedimento',
+            index=models.Index(fields=['organizacion', '-created_at'], name='procesamiento_org_created_idx'),
+        ),
+    ]
@@ -1,6 +1,9 @@
 import uuid
 from django.db import models
 
+from core.managers import TenantManager
+from core.roles import ROLES_AGENCIA_USUARIO
+
 # Create your models here.
 
 class TipoOperacion(models.Model):
@@ -49,6 +52,8 @@ class Pedimento(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True, help_text="Fecha de creación del registro")
     updated_at = models.DateTimeField(auto_now=True, help_text="Fecha de última actualización del registro")
+
+    objects = TenantManager(contribuyente_field='contribuyente', agency_roles=ROLES_AGENCIA_USUARIO)
     
     def __str__(self):
         return f"{self.pedimento}"
@@ -58,6 +63,10 @@ class Pedimento(models.Model):
         verbose_name_plural = "Pedimentos"
         db_table = 'pedimento'
         ordering = ['pedimento']
+        indexes = [
+            models.Index(fields=['organizacion', '-created_at'], name='pedimento_org_created_idx'),
+            models.Index(fields=['organizacion', 'contribuyente'], name='pedimento_org_contrib_idx'),
+        ]
 
 class EDocument(models.Model):
     pedimento = models.ForeignKey(Pedimento, on_delete=models.CASCADE, related_name='documentos', help_text="Pedimento asociado al documento")
@@ -70,6 +79,8 @@ class EDocument(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, help_text="Fecha de creación del documento")   
     updated_at = models.DateTimeField(auto_now=True, help_text="Fecha de última actualización del documento")
 
+    objects = TenantManager(agency_roles=ROLES_AGENCIA_USUARIO)
+
     def __str__(self):
         return f"{self.descripcion} - {self.pedimento.pedimento}"
 
@@ -78,6 +89,9 @@ class EDocument(models.Model):
         verbose_name_plural = "EDocuments"
         db_table = 'edocs'
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['organizacion', '-created_at'], name='edocs_org_created_idx'),
+        ]
 
 class Cove(models.Model):
     pedimento = models.ForeignKey(Pedimento, on_delete=models.CASCADE, related_name='coves', help_text="Pedimento asociado a la cove")
@@ -86,6 +100,8 @@ class Cove(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, help_text="Fecha de creación de la cove")
     updated_at = models.DateTimeField(auto_now=True, help_text="Fecha de última actualización de la cove")
 
+    objects = TenantManager(agency_roles=ROLES_AGENCIA_USUARIO)
+
     def __str__(self):
         return f"{self.numero_cove} - {self.pedimento.pedimento}"
 
@@ -94,6 +110,9 @@ class Cove(models.Model):
         verbose_name_plural = "Coves"
         db_table = 'coves'
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['organizacion', '-created_at'], name='coves_org_created_idx'),
+        ]
 
 class EstadoDeProcesamiento(models.Model):
     estado = models.CharField(max_length=50)
@@ -145,6 +164,8 @@ class ProcesamientoPedimento(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = TenantManager(contribuyente_field='pedimento__contribuyente')
+
     def __str__(self):
         return f"{self.pedimento.pedimento} - {self.estado.estado}"
     
@@ -153,4 +174,7 @@ class ProcesamientoPedimento(models.Model):
         verbose_name_plural = "Procesamientos de Pedimento"
         db_table = 'procesamiento_pedimento'
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['organizacion', '-created_at'], name='procesamiento_org_created_idx'),
+        ]
 
@@ -9,8 +9,9 @@ from api.customs.models import (
 
 from api.record.models import Document  # Asegúrate de importar el modelo Documento
 from api.record.serializers import DocumentSerializer  
+from mixins.sparse_fields import SparseFieldsSerializerMixin
 
-class PedimentoSerializer(serializers.ModelSerializer):
+class PedimentoSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Pedimento
         fields = '__all__'
@@ -21,7 +22,10 @@ class TipoOperacionSerializer(serializers.ModelSerializer):
         model = TipoOperacion
         fields = '__all__'
 
-class ProcesamientoPedimentoSerializer(serializers.ModelSerializer):
+class ProcesamientoPedimentoSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
+    # El pedimento se devuelve completo salvo que se pida otro ?expand=
+    expandable_fields = {'pedimento': PedimentoSerializer}
+    default_expand = ('pedimento',)
 
     organizacion = serializers.PrimaryKeyRelatedField(queryset=ProcesamientoPedimento._meta.get_field('organizacion').related_model.objects.all(), required=False)
     organizacion_name = serializers.CharField(source='organizacion.nombre', read_only=True)
@@ -34,15 +38,12 @@ class ProcesamientoPedimentoSerializer(serializers.ModelSerializer):
         super().__init__(*args, **kwargs)
         request = self.context.get('request')
         # Si no es superusuario, hacer organizacion read_only
-        if request and hasattr(request, 'user') and not request.user.is_superuser:
+        if request and hasattr(request, 'user') and not request.user.is_superuser and 'organizacion' in self.fields:
             self.fields['organizacion'].read_only = True
-
-    def to_representation(self, instance):
-        representation = super().to_representation(instance)
-        representation['pedimento'] = PedimentoSerializer(instance.pedimento).data
-        return representation
     
-class EDocumentSerializer(serializers.ModelSerializer):
+class EDocumentSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
+    expandable_fields = {'pedimento': PedimentoSerializer}
+
     class Meta:
         model = EDocument
         fields = '__all__'
@@ -52,10 +53,12 @@ class EDocumentSerializer(serializers.ModelSerializer):
         super().__init__(*args, **kwargs)
         # Si no es superusuario, hacer organizacion read_only
         request = self.context.get('request')
-        if request and hasattr(request, 'user') and not request.user.is_superuser:
+        if request and hasattr(request, 'user') and not request.user.is_superuser and 'organizacion' in self.fields:
             self.fields['organizacion'].read_only = True
 
-class CoveSerializer(serializers.ModelSerializer):
+class CoveSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
+    expandable_fields = {'pedimento': PedimentoSerializer}
+
     class Meta:
         model = Cove
         fields = '__all__'
@@ -1,10 +1,35 @@
 
+import gzip
+import io
+import json
+import uuid
+import zlib
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth.models import Group
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from django.contrib.auth import get_user_model
+from api.licence.models import Licencia
 from api.organization.models import Organizacion
-from .models import Pedimento, TipoOperacion, ProcesamientoPedimento, EDocument
+from core.roles import ADMIN, IMPORTADOR, IMPORTADOR_CONTRIBUYENTE, get_user_roles
+from core.middleware import CompressionMiddleware, choose_encoding
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer, dumps as renderers_dumps
+from core.testing import QueryCountAssertionsMixin
+from .models import Pedimento, TipoOperacion, ProcesamientoPedimento, EDocument, EstadoDeProcesamiento
+from .serializers import PedimentoSerializer
+from .views import ViewSetPedimento
 
 User = get_user_model()
 
@@ -75,3 +100,595 @@ class CustomsViewsTests(APITestCase):
         self.client.force_authenticate(user=self.admin)
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class PedimentoQueryCountTests(APITestCase):
+    """Número de consultas por endpoint: los roles se resuelven una vez por request."""
+
+    def setUp(self):
+        self.lic = Licencia.objects.create(nombre="LicTest", almacenamiento=100)
+        self.org = Organizacion.objects.create(nombre="OrgTest", licencia=self.lic, is_active=True, is_verified=True)
+        self.user = User.objects.create_user(username="agente", password="agentepass", organizacion=self.org)
+        for name in ('admin', 'user', 'Agente Aduanal'):
+            self.user.groups.add(Group.objects.get_or_create(name=name)[0])
+        self.pedimentos = [
+            Pedimento.objects.create(pedimento=f"P{i}", organizacion=self.org) for i in range(3)
+        ]
+        self.client = APIClient()
+        # Instancia nueva, como la que carga la autenticación en cada request
+        self.client.force_authenticate(user=User.objects.get(pk=self.user.pk))
+
+    def test_list_queries(self):
+        # grupos + estado de la organización + huella del GET condicional + pedimentos
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('Pedimento-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 3)
+
+    def test_list_queries_with_cached_organization_status(self):
+        self.client.get(reverse('Pedimento-list'))
+        # grupos + huella del GET condicional + pedimentos
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('Pedimento-list'))
+        self.assertEqual(len(response.data), 3)
+
+    def test_retrieve_queries(self):
+        # grupos + organización + pedimento; los permisos de objeto ya no consultan
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('Pedimento-detail', args=[self.pedimentos[0].pk]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_roles_are_memoized_on_request(self):
+        request = RequestFactory().get('/')
+        request.user = self.user
+        with self.assertNumQueries(1):
+            roles = get_user_roles(request)
+            self.assertTrue(roles.is_agencia)
+            self.assertTrue(get_user_roles(request).has(ADMIN))
+        self.assertIs(get_user_roles(request), roles)
+
+
+class TenantManagerTests(APITestCase):
+    """Model.objects.for_user: filtra por organizacion_id sin join con la organización."""
+
+    def setUp(self):
+        self.lic = Licencia.objects.create(nombre="LicTest", almacenamiento=100)
+        self.org = Organizacion.objects.create(nombre="OrgTest", licencia=self.lic, is_active=True, is_verified=True)
+        self.org2 = Organizacion.objects.create(nombre="OrgTest2", licencia=self.lic, is_active=True, is_verified=True)
+        self.agente = self.crear_usuario("agente", 'admin', 'user', 'Agente Aduanal')
+        self.importador = User.objects.create_user(
+            username="importador", password="importpass", organizacion=self.org, is_importador=True, rfc="RFC123456789"
+        )
+        self.importador.groups.add(Group.objects.get_or_create(name=IMPORTADOR_CONTRIBUYENTE)[0])
+        self.propio = Pedimento.objects.create(pedimento="P1", organizacion=self.org, contribuyente="RFC123456789")
+        self.otro_contribuyente = Pedimento.objects.create(pedimento="P2", organizacion=self.org, contribuyente="OTRO")
+        self.otra_org = Pedimento.objects.create(pedimento="P3", organizacion=self.org2, contribuyente="RFC123456789")
+
+    def test_agencia_sees_own_organization(self):
+        pedimentos = set(Pedimento.objects.for_user(self.agente))
+        self.assertEqual(pedimentos, {self.propio, self.otro_contribuyente})
+
+    def test_importador_sees_own_contribuyente(self):
+        self.assertEqual(list(Pedimento.objects.for_user(self.importador)), [self.propio])
+
+    def crear_usuario(self, username, *grupos):
+        user = User.objects.create_user(username=username, password="pass", organizacion=self.org)
+        for name in grupos:
+            user.groups.add(Group.objects.get_or_create(name=name)[0])
+        return user
+
+    def test_pedimentos_require_admin_or_developer_and_user(self):
+        for grupos, visibles in (
+            (('user',), 0),
+            (('admin',), 0),
+            (('developer', 'user'), 2),
+        ):
+            with self.subTest(grupos=grupos):
+                user = self.crear_usuario('_'.join(grupos), 'Agente Aduanal', *grupos)
+                self.assertEqual(Pedimento.objects.for_user(user).count(), visibles)
+
+    def test_procesos_accept_any_organization_role(self):
+        estado = EstadoDeProcesamiento.objects.create(estado="Pendiente")
+        ProcesamientoPedimento.objects.create(organizacion=self.org, estado=estado, pedimento=self.propio)
+        for grupos in (('user',), ('admin',)):
+            with self.subTest(grupos=grupos):
+                user = self.crear_usuario('_'.join(grupos), 'Agente Aduanal', *grupos)
+                self.assertEqual(ProcesamientoPedimento.objects.for_user(user).count(), 1)
+
+    def test_importador_group_has_no_pedimento_access(self):
+        importador = User.objects.create_user(
+            username="importador2", password="importpass", organizacion=self.org, is_importador=True, rfc="RFC123456789"
+        )
+        importador.groups.add(Group.objects.get_or_create(name=IMPORTADOR)[0])
+        self.client.force_authenticate(user=importador)
+        response = self.client.get(reverse('Pedimento-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [])
+
+    def test_importador_sees_no_edocuments(self):
+        EDocument.objects.create(pedimento=self.propio, organizacion=self.org, numero_edocument="E1")
+        self.assertFalse(EDocument.objects.for_user(self.importador).exists())
+
+    def test_inactive_organization_sees_nothing(self):
+        self.org.is_active = False
+        self.org.save()
+        self.assertFalse(Pedimento.objects.for_user(User.objects.get(pk=self.agente.pk)).exists())
+
+    def test_query_does_not_join_organization(self):
+        sql = str(Pedimento.objects.for_user(self.agente).query)
+        self.assertNotIn(Organizacion._meta.db_table, sql.replace('organizacion_id', ''))
+
+
+class CursorPaginationTests(APITestCase):
+    """Paginación por cursor (core.pagination) y límite del modo sin paginar."""
+
+    def setUp(self):
+        self.lic = Licencia.objects.create(nombre="LicTest", almacenamiento=100)
+        self.org = Organizacion.objects.create(nombre="OrgTest", licencia=self.lic, is_active=True, is_verified=True)
+        self.superuser = User.objects.create_superuser(username="superuser", password="superpass")
+        for i in range(25):
+            # Algunos sin contribuyente para probar los NULL en el ordenamiento
+            Pedimento.objects.create(
+                pedimento=f"P{i:02d}", organizacion=self.org, contribuyente=None if i % 4 == 0 else f"C{i % 3}"
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.superuser)
+        self.url = reverse('Pedimento-list')
+
+    def walk(self, url, link='next'):
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            pages.append([p['pedimento'] for p in response.data['results']])
+            url = response.data[link]
+        return pages, response
+
+    def test_walks_all_pages_without_duplicates(self):
+        pages, _ = self.walk(f"{self.url}?cursor=&page_size=10")
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        esperado = list(Pedimento.objects.order_by('-created_at', '-id').values_list('pedimento', flat=True))
+        self.assertEqual(sum(pages, []), esperado)
+
+    def test_previous_links_return_same_pages(self):
+        forward, last = self.walk(f"{self.url}?cursor=&page_size=10")
+        backward, first = self.walk(last.data['previous'], link='previous')
+        self.assertEqual(backward, list(reversed(forward[:-1])))
+        self.assertIsNone(first.data['previous'])
+
+    def test_ordering_by_nullable_field(self):
+        pages, _ = self.walk(f"{self.url}?cursor=&page_size=4&ordering=contribuyente")
+        nombres = sum(pages, [])
+        self.assertEqual(len(nombres), 25)
+        self.assertEqual(len(set(nombres)), 25)
+        contribuyentes = [Pedimento.objects.get(pedimento=n).contribuyente for n in nombres]
+        con_valor = [c for c in contribuyentes if c is not None]
+        self.assertEqual(con_valor, sorted(con_valor))
+        # Los NULL al final
+        self.assertEqual(contribuyentes[len(con_valor):], [None] * (25 - len(con_valor)))
+
+    def test_invalid_cursor(self):
+        response = self.client.get(f"{self.url}?cursor=no-es-un-cursor")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_from_other_ordering_is_rejected(self):
+        response = self.client.get(f"{self.url}?cursor=&page_size=10")
+        next_url = response.data['next'] + '&ordering=pedimento'
+        self.assertEqual(self.client.get(next_url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_page_queries_are_constant(self):
+        response = self.client.get(f"{self.url}?cursor=&page_size=5")
+        # huella del GET condicional + página
+        with self.assertNumQueries(2):
+            response = self.client.get(response.data['next'])
+        with self.assertNumQueries(2):
+            self.client.get(response.data['next'])
+
+    def test_unpaginated_limit(self):
+        with patch.object(ViewSetPedimento, 'max_unpaginated_results', 10):
+            response = self.client.get(self.url)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            # Con page_size sigue funcionando
+            response = self.client.get(f"{self.url}?page_size=5")
+            self.assertEqual(response.data['count'], 25)
+        with patch.object(ViewSetPedimento, 'max_unpaginated_results', 30):
+            self.assertEqual(len(self.client.get(self.url).data), 25)
+
+    def test_unpaginated_disabled_uses_cursor(self):
+        with patch.object(ViewSetPedimento, 'max_unpaginated_results', 0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 25)
+        self.assertIsNone(response.data['next'])
+
+    def test_unpaginated_by_default(self):
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.data), 25)
+
+
+class StreamingListTests(APITestCase):
+    """Listado en streaming con ?stream= (mixins.streaming)."""
+
+    def setUp(self):
+        self.lic = Licencia.objects.create(nombre="LicTest", almacenamiento=100)
+        self.org = Organizacion.objects.create(nombre="OrgTest", licencia=self.lic, is_active=True, is_verified=True)
+        self.superuser = User.objects.create_superuser(username="superuser", password="superpass")
+        for i in range(7):
+            Pedimento.objects.create(pedimento=f"S{i}", organizacion=self.org, contribuyente=f"C{i % 2}")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.superuser)
+        self.url = reverse('Pedimento-list')
+
+    def test_json_matches_regular_list(self):
+        esperado = self.client.get(self.url).json()
+        with patch.object(ViewSetPedimento, 'stream_chunk_size', 3):
+            response = self.client.get(f"{self.url}?stream=json")
+            self.assertTrue(response.streaming)
+            self.assertEqual(response['Content-Type'], 'application/json')
+            chunks = list(response.streaming_content)
+        # '[' + 3 bloques + ']'
+        self.assertEqual(len(chunks), 5)
+        self.assertEqual(json.loads(b''.join(chunks)), esperado)
+
+    def test_ndjson_with_filters(self):
+        response = self.client.get(f"{self.url}?stream=ndjson&contribuyente=C1&ordering=pedimento")
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lineas = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(linea)['pedimento'] for linea in lineas], ['S1', 'S3', 'S5'])
+
+    def test_empty_result(self):
+        response = self.client.get(f"{self.url}?stream=json&contribuyente=NADIE")
+        self.assertEqual(json.loads(b''.join(response.streaming_content)), [])
+
+    def test_stream_queries_per_chunk(self):
+        with patch.object(ViewSetPedimento, 'stream_chunk_size', 3):
+            response = self.client.get(f"{self.url}?stream=json")
+            with CaptureQueriesContext(connection) as queries:
+                b''.join(response.streaming_content)
+        # Un solo cursor sin prefetch: una consulta para todos los bloques
+        self.assertEqual(len(queries), 1)
+
+    def test_invalid_format(self):
+        response = self.client.get(f"{self.url}?stream=xml")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_stream_honours_unpaginated_limit(self):
+        with patch.object(ViewSetPedimento, 'max_unpaginated_results', 2):
+            response = self.client.get(f"{self.url}?stream=ndjson")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        with patch.object(ViewSetPedimento, 'max_unpaginated_results', 7):
+            response = self.client.get(f"{self.url}?stream=ndjson")
+            self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 7)
+        with patch.object(ViewSetPedimento, 'max_unpaginated_results', 0):
+            response = self.client.get(f"{self.url}?stream=ndjson")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SparseFieldsetTests(APITestCase):
+    """?fields= y ?expand= (mixins.sparse_fields)."""
+
+    def setUp(self):
+        self.lic = Licencia.objects.create(nombre="LicTest", almacenamiento=100)
+        self.org = Organizacion.objects.create(nombre="OrgTest", licencia=self.lic, is_active=True, is_verified=True)
+        self.superuser = User.objects.create_superuser(username="superuser", password="superpass")
+        estado = EstadoDeProcesamiento.objects.create(estado="Pendiente")
+        for i in range(3):
+            pedimento = Pedimento.objects.create(pedimento=f"F{i}", organizacion=self.org, contribuyente="EMPRESA")
+            EDocument.objects.create(
+                pedimento=pedimento, organizacion=self.org, numero_edocument=f"E{i}",
+                cadena_original="||cadena||", sello_digital="sello",
+            )
+            ProcesamientoPedimento.objects.create(organizacion=self.org, estado=estado, pedimento=pedimento)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.superuser)
+
+    def get(self, name, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(name), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json(), ' '.join(query['sql'] for query in queries.captured_queries)
+
+    def test_fields_trim_output_and_columns(self):
+        data, sql = self.get('Pedimento-list', {'fields': 'id,pedimento'})
+        self.assertEqual(set(data[0]), {'id', 'pedimento'})
+        self.assertNotIn('"contribuyente"', sql)
+
+    def test_edocument_text_columns_only_when_requested(self):
+        data, sql = self.get('EDocument-list', {'fields': 'id,numero_edocument'})
+        self.assertEqual(set(data[0]), {'id', 'numero_edocument'})
+        self.assertNotIn('cadena_original', sql)
+        self.assertNotIn('sello_digital', sql)
+
+        data, sql = self.get('EDocument-list', {})
+        self.assertEqual(data[0]['cadena_original'], '||cadena||')
+
+    def test_procesamiento_expands_pedimento_by_default(self):
+        data, _ = self.get('ProcesamientoPedimento-list', {})
+        self.assertEqual(data[0]['pedimento']['contribuyente'], 'EMPRESA')
+
+        data, sql = self.get('ProcesamientoPedimento-list', {'expand': ''})
+        self.assertIn(data[0]['pedimento'], {str(pk) for pk in Pedimento.objects.values_list('pk', flat=True)})
+        self.assertNotIn('JOIN "pedimento"', sql)
+
+    def test_nested_fields_use_single_join(self):
+        with self.assertNumQueries(1):
+            data, sql = self.get('ProcesamientoPedimento-list', {'fields': 'id,pedimento.pedimento'})
+        self.assertEqual(sorted(row['pedimento']['pedimento'] for row in data), ['F0', 'F1', 'F2'])
+        self.assertEqual(set(data[0]['pedimento']), {'pedimento'})
+        self.assertNotIn('"contribuyente"', sql)
+
+    def test_expand_on_edocument(self):
+        with self.assertNumQueries(1):
+            data, _ = self.get('EDocument-list', {'expand': 'pedimento', 'fields': 'numero_edocument,pedimento'})
+        self.assertEqual(data[0]['pedimento']['contribuyente'], 'EMPRESA')
+
+    def test_unknown_fields(self):
+        self.assertEqual(
+            self.client.get(reverse('Pedimento-list'), {'fields': 'id,nada'}).status_code, status.HTTP_400_BAD_REQUEST
+        )
+        self.assertEqual(
+            self.client.get(reverse('Pedimento-list'), {'expand': 'organizacion'}).status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+
+    def test_fields_with_cursor_pagination(self):
+        response = self.client.get(reverse('Pedimento-list'), {'fields': 'pedimento', 'cursor': '', 'page_size': 2})
+        # huella del GET condicional + página
+        with self.assertNumQueries(2):
+            response = self.client.get(response.data['next'])
+        self.assertEqual(list(response.data['results'][0]), ['pedimento'])
+
+
+class RelationLoadingTests(QueryCountAssertionsMixin, APITestCase):
+    """Los listados no hacen una consulta por fila (N+1)."""
+
+    def setUp(self):
+        self.lic = Licencia.objects.create(nombre="LicTest", almacenamiento=100)
+        self.org = Organizacion.objects.create(nombre="OrgTest", licencia=self.lic, is_active=True, is_verified=True)
+        user = User.objects.create_user(username="developer", password="devpass", organizacion=self.org)
+        for name in ('developer', 'user', 'Agente Aduanal'):
+            user.groups.add(Group.objects.get_or_create(name=name)[0])
+        self.estado = EstadoDeProcesamiento.objects.create(estado="Pendiente")
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.get(pk=user.pk))
+        self.created = 0
+
+    def create_pedimentos(self, n):
+        pedimentos = []
+        for _ in range(n):
+            self.created += 1
+            pedimentos.append(Pedimento.objects.create(pedimento=f"N{self.created}", organizacion=self.org))
+        return pedimentos
+
+    def create_procesamientos(self, n):
+        for pedimento in self.create_pedimentos(n):
+            ProcesamientoPedimento.objects.create(organizacion=self.org, estado=self.estado, pedimento=pedimento)
+
+    def create_edocuments(self, n):
+        for pedimento in self.create_pedimentos(n):
+            EDocument.objects.create(pedimento=pedimento, organizacion=self.org, numero_edocument=f"E{pedimento.pedimento}")
+
+    def test_procesamiento_list(self):
+        response = self.assertConstantQueries(reverse('ProcesamientoPedimento-list'), self.create_procesamientos)
+        self.assertEqual(len(response.data), 10)
+        self.assertEqual(response.data[0]['organizacion_name'], 'OrgTest')
+
+    def test_pedimento_list(self):
+        self.assertConstantQueries(reverse('Pedimento-list'), self.create_pedimentos, params={'page_size': 50})
+
+    def test_edocument_list_expanded(self):
+        self.assertConstantQueries(reverse('EDocument-list'), self.create_edocuments, params={'expand': 'pedimento'})
+
+
+class ValuesListTests(APITestCase):
+    """El listado con .values() (mixins.values_list) da la misma salida que el serializer."""
+
+    def setUp(self):
+        self.lic = Licencia.objects.create(nombre="LicTest", almacenamiento=100)
+        self.org = Organizacion.objects.create(nombre="OrgTest", licencia=self.lic, is_active=True, is_verified=True)
+        self.superuser = User.objects.create_superuser(username="superuser", password="superpass")
+        tipo = TipoOperacion.objects.create(tipo="Importación", descripcion="Importación definitiva")
+        Pedimento.objects.create(pedimento="V0", organizacion=self.org)
+        Pedimento.objects.create(
+            pedimento="V1", organizacion=self.org, tipo_operacion=tipo, contribuyente="EMPRESA",
+            fecha_pago=date(2025, 7, 18), importe_total=Decimal("1234.5"), saldo_disponible=Decimal("0.1"),
+            numero_partidas=3, alerta=True,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.superuser)
+        self.url = reverse('Pedimento-list')
+
+    def both(self, params=None):
+        fast = self.client.get(self.url, params)
+        with patch.object(ViewSetPedimento, 'values_list_enabled', False):
+            slow = self.client.get(self.url, params)
+        return fast, slow
+
+    def test_parity(self):
+        for params in ({}, {'page_size': 1}, {'fields': 'id,importe_total,fecha_pago,tipo_operacion'}):
+            fast, slow = self.both(params)
+            self.assertEqual(fast.content, slow.content, params)
+
+    def test_serializer_not_used_per_row(self):
+        with patch.object(PedimentoSerializer, 'to_representation') as to_representation:
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.data), 2)
+        to_representation.assert_not_called()
+
+    def test_cursor_pages_over_values(self):
+        response = self.client.get(self.url, {'cursor': '', 'page_size': 1, 'fields': 'pedimento'})
+        segunda = self.client.get(response.data['next'])
+        self.assertEqual(
+            [response.data['results'][0]['pedimento'], segunda.data['results'][0]['pedimento']],
+            list(Pedimento.objects.order_by('-created_at', '-id').values_list('pedimento', flat=True)),
+        )
+
+    def test_stream_uses_values(self):
+        fast = b''.join(self.client.get(self.url, {'stream': 'json'}).streaming_content)
+        self.assertEqual(json.loads(fast), self.client.get(self.url).json())
+
+
+class ConditionalGetTests(APITestCase):
+    """ETag / Last-Modified en pedimentos (mixins.conditional)."""
+
+    def setUp(self):
+        self.lic = Licencia.objects.create(nombre="LicTest", almacenamiento=100)
+        self.org = Organizacion.objects.create(nombre="OrgTest", licencia=self.lic, is_active=True, is_verified=True)
+        self.superuser = User.objects.create_superuser(username="superuser", password="superpass")
+        self.pedimentos = [Pedimento.objects.create(pedimento=f"E{i}", organizacion=self.org) for i in range(3)]
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.superuser)
+        self.url = reverse('Pedimento-list')
+
+    def test_list_not_modified_without_serializing(self):
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        self.assertNotIn('Last-Modified', response)
+        self.assertIn('Authorization', response['Vary'])
+
+        with patch.object(PedimentoSerializer, 'to_representation') as to_representation, \
+                CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        to_representation.assert_not_called()
+        # Solo la huella: ninguna consulta a las filas del listado
+        self.assertEqual(sum('COUNT(' in query['sql'] for query in queries.captured_queries), 1)
+
+    def test_list_etag_changes_with_data_and_params(self):
+        etag = self.client.get(self.url)['ETag']
+
+        response = self.client.get(self.url, {'pedimento': 'E1'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        pedimento = self.pedimentos[0]
+        pedimento.contribuyente = "NUEVO"
+        pedimento.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+
+        pedimento.delete()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 2)
+
+    def test_detail_if_modified_since(self):
+        pedimento = self.pedimentos[0]
+        url = reverse('Pedimento-detail', args=[pedimento.pk])
+        response = self.client.get(url)
+        last_modified = response['Last-Modified']
+
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Pedimento.objects.filter(pk=pedimento.pk).update(updated_at=pedimento.updated_at + timedelta(minutes=5))
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['pedimento'], 'E0')
+
+    def test_detail_not_found_before_validators(self):
+        response = self.client.get(
+            reverse('Pedimento-detail', args=['00000000-0000-0000-0000-000000000000']),
+            HTTP_IF_NONE_MATCH='*',
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_streamed_list_not_modified(self):
+        etag = self.client.get(self.url, {'stream': 'ndjson'})['ETag']
+        response = self.client.get(self.url, {'stream': 'ndjson'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+class JSONRenderingTests(APITestCase):
+    """FastJSONRenderer / FastJSONParser (core.renderers) frente al JSON de DRF."""
+
+    def test_same_output_as_drf_renderer(self):
+        data = {
+            'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+            'importe': Decimal('10.50'),
+            'fecha': datetime(2025, 7, 18, 10, 30, 15, 123456, tzinfo=dt_timezone.utc),
+            'dia': date(2025, 7, 18),
+            'texto': gettext_lazy('Pedimento'),
+            'separadores': 'a\u2028b\u2029c ñ',
+            'conteos': {1: 2},
+            'filas': [{'grande': 2 ** 70}],
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        # Enteros de más de 64 bits: mismo resultado con el json estándar
+        self.assertEqual(renderers_dumps({'n': 2 ** 70}), b'{"n":1180591620717411303424}')
+
+    def test_indent_uses_drf_renderer(self):
+        rendered = FastJSONRenderer().render({'a': 1}, 'application/json; indent=2', {})
+        self.assertEqual(rendered, b'{\n  "a": 1\n}')
+
+    def test_parser(self):
+        parser = FastJSONParser()
+        self.assertEqual(parser.parse(io.BytesIO('{"pedimento": "ñ1"}'.encode())), {'pedimento': 'ñ1'})
+        for body in (b'{"a": NaN}', b'{"a": '):
+            with self.assertRaises(ParseError):
+                parser.parse(io.BytesIO(body))
+
+
+class CompressionTests(APITestCase):
+    """Compresión gzip de respuestas (core.middleware)."""
+
+    def setUp(self):
+        self.lic = Licencia.objects.create(nombre="LicTest", almacenamiento=100)
+        self.org = Organizacion.objects.create(nombre="OrgTest", licencia=self.lic, is_active=True, is_verified=True)
+        self.superuser = User.objects.create_superuser(username="superuser", password="superpass")
+        for i in range(30):
+            Pedimento.objects.create(pedimento=f"Z{i}", organizacion=self.org, contribuyente="CONTRIBUYENTE")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.superuser)
+        self.url = reverse('Pedimento-list')
+
+    def test_list_gzip(self):
+        plain = self.client.get(self.url)
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertIn('Accept-Encoding', plain['Vary'])
+
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertLess(len(response.content), len(plain.content))
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+
+    def test_small_response_not_compressed(self):
+        response = self.client.get(self.url, {'page_size': 1, 'fields': 'id'}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertNotIn('Content-Encoding', response)
+
+    def test_stream_gzip(self):
+        plain = b''.join(self.client.get(self.url, {'stream': 'ndjson'}).streaming_content)
+        with patch.object(ViewSetPedimento, 'stream_chunk_size', 7):
+            response = self.client.get(self.url, {'stream': 'ndjson'}, HTTP_ACCEPT_ENCODING='gzip')
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            chunks = list(response.streaming_content)
+        self.assertEqual(gzip.decompress(b''.join(chunks)), plain)
+        # Cada bloque de filas sale completo en cuanto se comprime (flush)
+        first_rows = zlib.decompressobj(31).decompress(chunks[0]).splitlines()
+        self.assertEqual(first_rows, plain.splitlines()[:7])
+
+    def test_weak_etag_still_not_modified(self):
+        etag = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')['ETag']
+        self.assertTrue(etag.startswith('W/"'))
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_html_and_text_not_compressed(self):
+        middleware = CompressionMiddleware(lambda request: None)
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        for content_type in ('text/html; charset=utf-8', 'text/plain'):
+            with self.subTest(content_type=content_type):
+                response = middleware.process_response(request, HttpResponse('<p>x</p>' * 500, content_type=content_type))
+                self.assertNotIn('Content-Encoding', response)
+
+    def test_choose_encoding(self):
+        self.assertEqual(choose_encoding('gzip;q=0.5, identity'), 'gzip')
+        self.assertIsNone(choose_encoding('gzip;q=0, identity'))
+        self.assertIsNone(choose_encoding(''))
+        with patch('core.middleware.brotli', object()):
+            self.assertEqual(choose_encoding('gzip, br'), 'br')
+            self.assertEqual(choose_encoding('br;q=0.1, gzip'), 'gzip')
@@ -2,7 +2,7 @@ from config.settings import SERVICE_API_URL
 from django.shortcuts import render
 from rest_framework import viewsets
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.pagination import PageNumberPagination
+from core.pagination import FlexiblePagination
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
@@ -15,6 +15,7 @@ from core.permissions import (
     IsSameOrganizationAndAdmin,
     IsSuperUser
 )
+from core.roles import get_user_roles
 from api.customs.models import (
     Pedimento,
     TipoOperacion,
@@ -30,47 +31,27 @@ from api.customs.serializers import (
     CoveSerializer
 )
 from api.logger.mixins import LoggingMixin
+from mixins.conditional import ConditionalGetMixin
 from mixins.filtrado_organizacion import OrganizacionFiltradaMixin, ProcesosPorOrganizacionMixin
+from mixins.sparse_fields import SparseFieldsetMixin
+from mixins.streaming import StreamingListMixin
+from mixins.values_list import ValuesListMixin
 import requests
+from core.metrics import timed_request
 
 
 
-class CustomPagination(PageNumberPagination):
-
+class CustomPagination(FlexiblePagination):
     """
-    Paginación personalizada con parámetros flexibles
+    Paginación personalizada con parámetros flexibles (core.pagination.FlexiblePagination)
     - Si no se especifica page_size, devuelve todos los resultados (sin paginación)
     - Si se especifica page_size, usa paginación normal
+    - Con cursor, paginación por llave (next/previous opacos)
     """
-    page_size = None  # Sin paginación por defecto
-    page_size_query_param = 'page_size'
     max_page_size = 10000  # Límite máximo de seguridad
-    page_query_param = 'page'
-    
-    def paginate_queryset(self, queryset, request, view=None):
-        """
-        Si no se especifica page_size en los parámetros, devolver None (sin paginación)
-        Si se especifica, usar paginación normal
-        """
-        # Verificar si se especificó page_size en la query
-        if self.page_size_query_param not in request.query_params:
-            # No hay page_size, devolver None para indicar "sin paginación"
-            return None
-        
-        # Hay page_size, usar paginación normal
-        try:
-            page_size = int(request.query_params[self.page_size_query_param])
-            if page_size <= 0:
-                return None
-            # Establecer el page_size temporalmente para esta request
-            self.page_size = min(page_size, self.max_page_size)
-        except (ValueError, TypeError):
-            return None
-            
-        return super().paginate_queryset(queryset, request, view)
 
 # Create your views here.
-class ViewSetPedimento(LoggingMixin, viewsets.ModelViewSet, OrganizacionFiltradaMixin): # Pendiente de permisos de creacion
+class ViewSetPedimento(LoggingMixin, ConditionalGetMixin, ValuesListMixin, SparseFieldsetMixin, StreamingListMixin, viewsets.ModelViewSet, OrganizacionFiltradaMixin): # Pendiente de permisos de creacion
     """
     ViewSet for Pedimento model.
     Soporta paginación, filtros y búsqueda.
@@ -78,6 +59,9 @@ class ViewSetPedimento(LoggingMixin, viewsets.ModelViewSet, OrganizacionFiltrada
     Parámetros disponibles:
     - page: Número de página (solo si se especifica page_size)
     - page_size: Elementos por página (si NO se especifica, devuelve TODOS los resultados)
+    - cursor: Paginación por cursor (vacío para la primera página; luego usar next/previous)
+    - stream: Todos los resultados en streaming, json (arreglo) o ndjson (uno por línea)
+    - fields: Solo estos campos (ej: id,pedimento,contribuyente); solo se leen esas columnas
     - search: Búsqueda en pedimento, contribuyente, agente_aduanal
     - pedimento: Filtro por número de pedimento
     - existe_expediente: Filtro por expediente (True/False)
@@ -94,6 +78,9 @@ class ViewSetPedimento(LoggingMixin, viewsets.ModelViewSet, OrganizacionFiltrada
     - /pedimentos/ → Devuelve TODOS los pedimentos
     - /pedimentos/?page_size=10 → Devuelve los primeros 10
     - /pedimentos/?page_size=10&page=2 → Devuelve los pedimentos 11-20
+    - /pedimentos/?cursor=&page_size=100 → Primera página por cursor (tiempo constante en páginas profundas)
+    - /pedimentos/?stream=ndjson → TODOS los pedimentos en streaming, sin cargarlos en memoria
+    - /pedimentos/?fields=id,pedimento,fecha_pago&page_size=50 → Solo las columnas de la tabla
     - /pedimentos/?pedimento=12345678 → Filtra por número de pedimento
     - /pedimentos/?existe_expediente=true → Filtra por expediente existente
     - /pedimentos/?contribuyente=EMPRESA → Filtra por contribuyente
@@ -105,6 +92,8 @@ class ViewSetPedimento(LoggingMixin, viewsets.ModelViewSet, OrganizacionFiltrada
     pagination_class = CustomPagination
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     model = Pedimento
+    # Límite del modo sin paginar: None sin límite, N responde 400 si hay más, 0 usa cursor
+    max_unpaginated_results = None
 
     filterset_fields = ['patente', 'aduana', 'tipo_operacion', 'clave_pedimento', 'pedimento', 'existe_expediente', 'contribuyente', 'curp_apoderado', 'fecha_pago']
     search_fields = ['pedimento', 'contribuyente', 'agente_aduanal']
@@ -124,7 +113,7 @@ class ViewSetPedimento(LoggingMixin, viewsets.ModelViewSet, OrganizacionFiltrada
 
         try:
             # Usar el nombre del servicio de Docker Compose en lugar de localhost
-            response = requests.request('POST', f'{SERVICE_API_URL}/services/pedimento_completo', params={},
+            response = timed_request('service_api', '/services/pedimento_completo', 'POST', f'{SERVICE_API_URL}/services/pedimento_completo', params={},
                 json={
                     'estado': 1,
                     'servicio': 3,
@@ -196,7 +185,7 @@ class ViewSetTipoOperacion(LoggingMixin, viewsets.ModelViewSet):
         
         serializer.save()
 
-class ViewSetProcesamientoPedimento(viewsets.ModelViewSet, ProcesosPorOrganizacionMixin):
+class ViewSetProcesamientoPedimento(SparseFieldsetMixin, StreamingListMixin, viewsets.ModelViewSet, ProcesosPorOrganizacionMixin):
 
     """
     ViewSet for ProcesamientoPedimento model.
@@ -205,6 +194,9 @@ class ViewSetProcesamientoPedimento(viewsets.ModelViewSet, ProcesosPorOrganizaci
     Parámetros disponibles:
     - page: Número de página (solo si se especifica page_size)
     - page_size: Elementos por página (si NO se especifica, devuelve TODOS los resultados)
+    - stream: Todos los resultados en streaming (json o ndjson)
+    - fields: Solo estos campos; pedimento.<campo> para los del pedimento (ej: id,estado,pedimento.pedimento)
+    - expand: Relaciones anidadas; por defecto pedimento (expand= vacío devuelve solo su id)
     - pedimento: Filtro por pedimento
     - estado: Filtro por estado
     - servicio: Filtro por servicio
@@ -214,11 +206,13 @@ class ViewSetProcesamientoPedimento(viewsets.ModelViewSet, ProcesosPorOrganizaci
     Ejemplos:
     - /procesamientopedimentos/ → Devuelve TODOS los procesamientos
     - /procesamientopedimentos/?page_size=5 → Devuelve los primeros 5
+    - /procesamientopedimentos/?expand= → Sin el pedimento anidado (solo su id)
     """
     permission_classes = [IsAuthenticated, IsSuperUser | IsSameOrganizationDeveloper ]
     serializer_class = ProcesamientoPedimentoSerializer
     pagination_class = CustomPagination
     model = ProcesamientoPedimento
+    max_unpaginated_results = None  # Ver ViewSetPedimento
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = {
         'pedimento': ['exact'],
@@ -268,7 +262,7 @@ class ViewSetProcesamientoPedimento(viewsets.ModelViewSet, ProcesosPorOrganizaci
             serializer.save()
             return
         
-        if (self.request.user.groups.filter(name='developer').exists() or self.request.user.groups.filter(name='admin').exists() or self.request.user.groups.filter(name='user').exists()) and self.request.user.groups.filter(name='Agente Aduanal').exists():
+        if get_user_roles(self.request).is_agencia:
             # Para usuarios normales, usar siempre su organización
             if not hasattr(self.request.user, 'organizacion') or not self.request.user.organizacion:
                 raise ValueError("Usuario sin organización")
@@ -278,9 +272,13 @@ class ViewSetProcesamientoPedimento(viewsets.ModelViewSet, ProcesosPorOrganizaci
     
     my_tags = ['Procesamientos_Pedimentos']
 
-class ViewSetEDocument(LoggingMixin, viewsets.ModelViewSet, OrganizacionFiltradaMixin):
+class ViewSetEDocument(LoggingMixin, SparseFieldsetMixin, viewsets.ModelViewSet, OrganizacionFiltradaMixin):
     """
     ViewSet for EDocument model.
+
+    - fields: Solo estos campos; sin cadena_original ni sello_digital no se leen esas columnas
+      (ej: /edocuments/?fields=id,numero_edocument,clave,descripcion)
+    - expand=pedimento: Pedimento anidado en lugar de su id
     """
     permission_classes = [IsAuthenticated &  (IsSameOrganization | IsSameOrganizationAndAdmin | IsSameOrganizationDeveloper | IsSuperUser)]
     serializer_class = EDocumentSerializer
@@ -309,7 +307,7 @@ class ViewSetEDocument(LoggingMixin, viewsets.ModelViewSet, OrganizacionFiltrada
             # Permitir que el superusuario especifique la organización
             serializer.save()
         
-        if (self.request.user.groups.filter(name='developer').exists() or self.request.user.groups.filter(name='admin').exists() or self.request.user.groups.filter(name='user').exists()) and self.request.user.groups.filter(name='Agente Aduanal').exists():
+        if get_user_roles(self.request).is_agencia:
             # Para usuarios normales, usar siempre su organización
             if not hasattr(self.request.user, 'organizacion') or not self.request.user.organizacion:
                 raise ValueError("Usuario sin organización")
@@ -329,7 +327,7 @@ class ViewSetEDocument(LoggingMixin, viewsets.ModelViewSet, OrganizacionFiltrada
             serializer.save()
             return
         
-        if (self.request.user.groups.filter(name='developer').exists() or self.request.user.groups.filter(name='admin').exists() or self.request.user.groups.filter(name='user').exists()) and self.request.user.groups.filter(name='Agente Aduanal').exists():
+        if get_user_roles(self.request).is_agencia:
             # Para usuarios normales, usar siempre su organización
             if not hasattr(self.request.user, 'organizacion') or not self.request.user.organizacion:
                 raise ValueError("Usuario sin organización")
@@ -337,9 +335,12 @@ class ViewSetEDocument(LoggingMixin, viewsets.ModelViewSet, OrganizacionFiltrada
 
         raise ValueError("Usuario no autenticado o sin permisos para actualizar EDocument")
 
-class ViewSetCove(viewsets.ModelViewSet, OrganizacionFiltradaMixin):
+class ViewSetCove(SparseFieldsetMixin, viewsets.ModelViewSet, OrganizacionFiltradaMixin):
     """
     ViewSet for Cove model.
+
+    - fields: Solo estos campos (ej: /coves/?fields=id,numero_cove)
+    - expand=pedimento: Pedimento anidado en lugar de su id
     """
     permission_classes = [IsAuthenticated &  (IsSuperUser |IsSameOrganization | IsSameOrganizationAndAdmin | IsSameOrganizationDeveloper )]
     serializer_class = CoveSerializer
@@ -368,7 +369,7 @@ class ViewSetCove(viewsets.ModelViewSet, OrganizacionFiltradaMixin):
             # Permitir que el superusuario especifique la organización
             serializer.save()
         
-        if (self.request.user.groups.filter(name='developer').exists() or self.request.user.groups.filter(name='admin').exists() or self.request.user.groups.filter(name='user').exists()) and self.request.user.groups.filter(name='Agente Aduanal').exists():
+        if get_user_roles(self.request).is_agencia:
             # Para usuarios normales, usar siempre su organización
             if not hasattr(self.request.user, 'organizacion') or not self.request.user.organizacion:
                 raise ValueError("Usuario sin organización")
@@ -388,7 +389,7 @@ class ViewSetCove(viewsets.ModelViewSet, OrganizacionFiltradaMixin):
             serializer.save()
             return
         
-        if (self.request.user.groups.filter(name='developer').exists() or self.request.user.groups.filter(name='admin').exists() or self.request.user .groups.filter(name='user').exists()) and self.request.user.groups.filter(name='Agente Aduanal').exists():
+        if get_user_roles(self.request).is_agencia:
             # Para usuarios normales, usar siempre su organización
             if not hasattr(self.request.user, 'organizacion') or not self.request.user.organizacion:
                 raise ValueError("Usuario sin organización")
@@ -1,5 +1,8 @@
 from django.db import models
 
+from core.managers import TenantManager
+from core.roles import ROLES_AGENCIA_USUARIO
+
 # Create your models here.
 class DataStage(models.Model):
     nombre = models.CharField(max_length=100, unique=True)
@@ -9,6 +12,9 @@ class DataStage(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    objects = TenantManager(agency_roles=ROLES_AGENCIA_USUARIO)
+
     class Meta:
         verbose_name = "DataStage"
         verbose_name_plural = "DataStages"
@@ -13,6 +13,7 @@ from core.permissions import (
     IsSameOrganizationAndAdmin,
     IsSuperUser
 )
+from core.roles import get_user_roles
 # Create your views here.
 
 class DataStageViewSet(LoggingMixin, viewsets.ModelViewSet, OrganizacionFiltradaMixin):
@@ -28,7 +29,7 @@ class DataStageViewSet(LoggingMixin, viewsets.ModelViewSet, OrganizacionFiltrada
     my_tags = ['DataStage']
 
     def get_queryset(self):
-        return self.filter_queryset_by_organization()
+        return self.get_queryset_filtrado_por_organizacion()
 
     def perform_create(self, serializer):
         """
@@ -42,7 +43,7 @@ class DataStageViewSet(LoggingMixin, viewsets.ModelViewSet, OrganizacionFiltrada
             serializer.save()
             return
         
-        if (self.request.user.groups.filter(name='developer').exists() or self.request.user.groups.filter(name='admin').exists() or self.request.user.groups.filter(name='user').exists()) and self.request.user.groups.filter(name='Agente Aduanal').exists():
+        if get_user_roles(self.request).is_agencia:
             serializer.save(organizacion=self.request.user.organizacion)
 
         raise ValueError("No cuentas con los permisos necesarios para crear un DataStage")
@@ -59,7 +60,7 @@ class DataStageViewSet(LoggingMixin, viewsets.ModelViewSet, OrganizacionFiltrada
             serializer.save()
             return
         
-        if (self.request.user.groups.filter(name='developer').exists() or self.request.user.groups.filter(name='admin').exists() or self.request.user.groups.filter(name='user').exists()) and self.request.user.groups.filter(name='Agente Aduanal').exists():
+        if get_user_roles(self.request).is_agencia:
             serializer.save(organizacion=self.request.user.organizacion)
         
         raise ValueError("No cuentas con los permisos necesarios para actualizar un DataStage")
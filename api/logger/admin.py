@@ -1,10 +1,12 @@
 
 from django.contrib import admin
+from django.db.models import Q
 from django.utils.html import format_html
 from django.utils.safestring import mark_safe
-from .models import RequestLog, UserActivity, ErrorLog
+from .models import RequestLog, RequestProfile, UserActivity, ErrorLog, ErrorGroup, RequestRollupDay
 import json
 from config.settings import SITE_URL
+from core.routers import ids_for_filter
 
 class ReadOnlyAdminMixin:
     """Mixin para hacer que los modelos sean solo lectura en el admin."""
@@ -19,22 +21,50 @@ class ReadOnlyAdminMixin:
         return False
 
 
+class RelatedSearchAdminMixin:
+    """
+    Búsqueda y carga de usuarios/organizaciones sin join: los logs pueden vivir
+    en otra base (core.routers). El término se busca primero en el modelo
+    relacionado y se filtra por los ids encontrados.
+    """
+    related_search_fields = {}  # {'user': ['username', 'email']}
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related(*self.related_search_fields)
+    
+    def get_search_results(self, request, queryset, search_term):
+        base = queryset
+        queryset, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if not search_term:
+            return queryset, may_have_duplicates
+        for field, lookups in self.related_search_fields.items():
+            related_model = self.model._meta.get_field(field).related_model
+            condition = Q()
+            for lookup in lookups:
+                condition |= Q(**{f'{lookup}__icontains': search_term})
+            ids = ids_for_filter(self.model, related_model.objects.filter(condition))
+            queryset |= base.filter(**{f'{field}__in': ids})
+        return queryset, may_have_duplicates
+
+
 @admin.register(RequestLog)
-class RequestLogAdmin(ReadOnlyAdminMixin, admin.ModelAdmin):
+class RequestLogAdmin(ReadOnlyAdminMixin, RelatedSearchAdminMixin, admin.ModelAdmin):
     list_display = [
-        'timestamp', 'user_display', 'method', 'path', 'status_code', 
-        'response_time', 'ip_address'
+        'timestamp', 'user_display', 'method', 'path', 'route', 'status_code', 
+        'response_time', 'query_count', 'db_time', 'ip_address'
     ]
     list_filter = [
-        'method', 'status_code', 'timestamp', 'user_agent'
+        'method', 'status_code', 'duplicate_queries', 'timestamp'
     ]
     search_fields = [
-        'path', 'ip_address', 'user__username', 'user__email'
+        'path', 'route', 'view_name', 'ip_address'
     ]
+    related_search_fields = {'user': ['username', 'email']}
     readonly_fields = [
-        'timestamp', 'user', 'method', 'path', 'query_params_display', 
-        'status_code', 'response_time', 'ip_address', 'user_agent', 
-        'body_display', 'referer'
+        'timestamp', 'user', 'method', 'path', 'route', 'view_name', 'query_params_display', 
+        'status_code', 'response_time', 'ip_address', 'user_agent_display', 
+        'body_display', 'referer_display', 'query_count', 'db_time',
+        'slowest_query_display', 'slowest_query_time', 'duplicate_queries'
     ]
     ordering = ['-timestamp']
     date_hierarchy = 'timestamp'
@@ -46,6 +76,20 @@ class RequestLogAdmin(ReadOnlyAdminMixin, admin.ModelAdmin):
         return "Anónimo"
     user_display.short_description = "Usuario"
     
+    def user_agent_display(self, obj):
+        return obj.user_agent.value if obj.user_agent else ""
+    user_agent_display.short_description = "User agent"
+    
+    def referer_display(self, obj):
+        return obj.referer.value if obj.referer else ""
+    referer_display.short_description = "Referer"
+    
+    def slowest_query_display(self, obj):
+        if obj.slowest_query:
+            return format_html('<pre style="white-space: pre-wrap;">{}</pre>', obj.slowest_query.value)
+        return ""
+    slowest_query_display.short_description = "Consulta más lenta"
+    
     def query_params_display(self, obj):
         if obj.query_params:
             try:
@@ -71,8 +115,43 @@ class RequestLogAdmin(ReadOnlyAdminMixin, admin.ModelAdmin):
     body_display.short_description = "Cuerpo del request"
 
 
+@admin.register(RequestProfile)
+class RequestProfileAdmin(ReadOnlyAdminMixin, admin.ModelAdmin):
+    list_display = [
+        'timestamp', 'method', 'path', 'status_code', 'duration',
+        'mode', 'trigger', 'sample_count'
+    ]
+    list_filter = [
+        'mode', 'trigger', 'method', 'timestamp'
+    ]
+    search_fields = [
+        'path', 'route'
+    ]
+    readonly_fields = [
+        'timestamp', 'request_log_id', 'method', 'path', 'route', 'status_code',
+        'duration', 'mode', 'trigger', 'sample_count', 'top_functions_display',
+        'collapsed_stacks_display'
+    ]
+    exclude = ['request_log', 'top_functions', 'collapsed_stacks']
+    ordering = ['-timestamp']
+    date_hierarchy = 'timestamp'
+    list_per_page = 50
+    
+    def top_functions_display(self, obj):
+        formatted = json.dumps(obj.top_functions, indent=2, ensure_ascii=False)
+        return format_html('<pre style="max-height: 400px; overflow-y: auto;">{}</pre>', formatted)
+    top_functions_display.short_description = "Funciones principales"
+    
+    def collapsed_stacks_display(self, obj):
+        return format_html(
+            '<pre style="max-height: 400px; overflow-y: auto; white-space: pre;">{}</pre>',
+            obj.collapsed_stacks[:50000]
+        )
+    collapsed_stacks_display.short_description = "Pilas colapsadas"
+
+
 @admin.register(UserActivity)
-class UserActivityAdmin(admin.ModelAdmin):
+class UserActivityAdmin(RelatedSearchAdminMixin, admin.ModelAdmin):
     list_display = [
         'timestamp', 'user_display', 'action', 'object_type', 
         'object_id', 'ip_address'
@@ -81,9 +160,9 @@ class UserActivityAdmin(admin.ModelAdmin):
         'action', 'object_type', 'timestamp'
     ]
     search_fields = [
-        'user__username', 'user__email', 'action', 'object_type', 
-        'object_id', 'ip_address', 'description'
+        'action', 'object_type', 'object_id', 'ip_address', 'description'
     ]
+    related_search_fields = {'user': ['username', 'email']}
     readonly_fields = [
         'timestamp', 'user', 'action', 'object_type', 'object_id', 
         'description', 'ip_address'
@@ -100,20 +179,20 @@ class UserActivityAdmin(admin.ModelAdmin):
 
 
 @admin.register(ErrorLog)
-class ErrorLogAdmin(ReadOnlyAdminMixin, admin.ModelAdmin):
+class ErrorLogAdmin(ReadOnlyAdminMixin, RelatedSearchAdminMixin, admin.ModelAdmin):
     list_display = [
         'timestamp', 'user_display', 'level', 'message_short', 
-        'request_path'
+        'request_path', 'group'
     ]
     list_filter = [
         'level', 'timestamp'
     ]
     search_fields = [
-        'user__username', 'user__email', 'level', 'message', 
-        'request_path', 'traceback'
+        'level', 'message', 'request_path', 'traceback'
     ]
+    related_search_fields = {'user': ['username', 'email']}
     readonly_fields = [
-        'timestamp', 'user', 'level', 'message', 'traceback_display', 
+        'timestamp', 'user', 'group', 'level', 'message', 'traceback_display', 
         'request_path', 'ip_address'
     ]
     ordering = ['-timestamp']
@@ -142,6 +221,60 @@ class ErrorLogAdmin(ReadOnlyAdminMixin, admin.ModelAdmin):
     traceback_display.short_description = "Stack trace"
 
 
+@admin.register(ErrorGroup)
+class ErrorGroupAdmin(ReadOnlyAdminMixin, admin.ModelAdmin):
+    list_display = [
+        'last_seen', 'level', 'exception_type', 'message_short', 'count',
+        'sample_count', 'first_seen'
+    ]
+    list_filter = [
+        'level', 'last_seen'
+    ]
+    search_fields = [
+        'exception_type', 'message', 'request_path', 'fingerprint'
+    ]
+    readonly_fields = [
+        'fingerprint', 'level', 'exception_type', 'message', 'frames_display',
+        'request_path', 'first_seen', 'last_seen', 'count', 'sample_count'
+    ]
+    exclude = ['frames']
+    ordering = ['-last_seen']
+    date_hierarchy = 'last_seen'
+    list_per_page = 50
+    
+    def message_short(self, obj):
+        if obj.message and len(obj.message) > 100:
+            return f"{obj.message[:100]}..."
+        return obj.message or "Sin mensaje"
+    message_short.short_description = "Mensaje"
+    
+    def frames_display(self, obj):
+        return format_html('<pre>{}</pre>', obj.frames)
+    frames_display.short_description = "Frames"
+
+
+@admin.register(RequestRollupDay)
+class RequestRollupDayAdmin(ReadOnlyAdminMixin, RelatedSearchAdminMixin, admin.ModelAdmin):
+    list_display = [
+        'bucket', 'route', 'method', 'status_code', 'organizacion',
+        'count', 'error_count', 'avg_latency_display', 'max_latency'
+    ]
+    list_filter = [
+        'method', 'status_class', 'bucket'
+    ]
+    search_fields = [
+        'route'
+    ]
+    related_search_fields = {'user': ['username'], 'organizacion': ['nombre']}
+    ordering = ['-bucket', '-count']
+    date_hierarchy = 'bucket'
+    list_per_page = 50
+
+    def avg_latency_display(self, obj):
+        return round(obj.avg_latency, 2)
+    avg_latency_display.short_description = "Latencia promedio (ms)"
+
+
 # Personalización del admin site
 admin.site.site_header = "EFC V2 "
 admin.site.site_title = "EFC V2"
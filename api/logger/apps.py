@@ -3,4 +3,15 @@ from django.apps import AppConfig
 
 class LoggerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'api.logger'
\ No newline at end of file
+    name = 'api.logger'
+
+    def ready(self):
+        from .errorgroups import flush_error_groups
+        from .profiling import save_pending_profiles
+        from .rollups import handle_log_flush
+        from .sink import register_flush_listener, register_periodic_listener
+
+        register_flush_listener(handle_log_flush)
+        register_flush_listener(save_pending_profiles)
+        register_flush_listener(flush_error_groups)
+        register_periodic_listener(flush_error_groups)
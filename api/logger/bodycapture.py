@@ -0,0 +1,154 @@
+"""
+Captura del body de las requests para RequestLog sin consumir el stream.
+
+Solo se capturan bodies JSON y formularios urlencoded, copiando los primeros
+bytes que la vista lee (``BoundedTeeStream`` envuelve ``request._stream``). Los
+uploads multipart y cualquier otro tipo de contenido nunca se leen: solo se
+registran su content type y su longitud. Los campos sensibles se enmascaran
+al armar el texto que se guarda.
+
+Configuración en ``settings.LOG_BODY_CAPTURE`` (ver DEFAULTS).
+"""
+import json
+import re
+from urllib.parse import parse_qsl, urlencode
+
+from django.conf import settings
+
+DEFAULTS = {
+    'ENABLED': True,
+    'MAX_CAPTURE_BYTES': 64 * 1024,  # Bytes copiados del stream para poder enmascarar
+    'MAX_BODY_LENGTH': 1000,         # Caracteres guardados en RequestLog.body
+    'CONTENT_TYPES': ['application/json', 'application/x-www-form-urlencoded'],
+    'REDACT_FIELDS': [
+        'password', 'password1', 'password2', 'new_password', 'old_password',
+        'token', 'access', 'refresh', 'secret', 'api_key',
+    ],
+    'REDACTED_VALUE': '********',
+}
+
+BODY_METHODS = ('POST', 'PUT', 'PATCH')
+
+
+def get_body_capture_settings():
+    config = dict(DEFAULTS)
+    config.update(getattr(settings, 'LOG_BODY_CAPTURE', {}) or {})
+    return config
+
+
+def get_content_type(request):
+    return request.META.get('CONTENT_TYPE', '').split(';')[0].strip().lower()
+
+
+def get_content_length(request):
+    try:
+        return int(request.META.get('CONTENT_LENGTH') or 0) or None
+    except ValueError:
+        return None
+
+
+def is_capturable(content_type, config):
+    if content_type.endswith('+json'):
+        return True
+    return content_type in config['CONTENT_TYPES']
+
+
+class BoundedTeeStream:
+    """Envuelve el stream de entrada y copia como máximo `limit` bytes de lo leído."""
+
+    def __init__(self, stream, limit):
+        self._stream = stream
+        self.limit = limit
+        self.buffer = bytearray()
+        self.bytes_read = 0
+
+    def _capture(self, data):
+        self.bytes_read += len(data)
+        remaining = self.limit - len(self.buffer)
+        if remaining > 0:
+            self.buffer += data[:remaining]
+        return data
+
+    def read(self, *args, **kwargs):
+        return self._capture(self._stream.read(*args, **kwargs))
+
+    def readline(self, *args, **kwargs):
+        return self._capture(self._stream.readline(*args, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+def start_capture(request, config):
+    """
+    Instala la copia acotada sobre el stream si el body es capturable.
+    No lee nada: la copia se llena a medida que la vista consume el body.
+    """
+    if request.method not in BODY_METHODS:
+        return None
+    if not is_capturable(get_content_type(request), config):
+        return None
+    stream = getattr(request, '_stream', None)
+    if stream is None or getattr(request, '_read_started', False):
+        return None
+    tee = BoundedTeeStream(stream, config['MAX_CAPTURE_BYTES'])
+    request._stream = tee
+    return tee
+
+
+# ----------------------------------------------------------------------
+# Enmascarado
+# ----------------------------------------------------------------------
+def _redact_value(data, fields, redacted):
+    if isinstance(data, dict):
+        return {
+            key: redacted if str(key).lower() in fields else _redact_value(value, fields, redacted)
+            for key, value in data.items()
+        }
+    if isinstance(data, list):
+        return [_redact_value(item, fields, redacted) for item in data]
+    return data
+
+
+def _redact_text(text, fields, redacted):
+    """Enmascarado por patrón para bodies truncados o inválidos."""
+    names = '|'.join(re.escape(field) for field in fields)
+    text = re.sub(
+        rf'("(?:{names})"\s*:\s*)"(?:[^"\\]|\\.)*("|$)',
+        lambda m: f'{m.group(1)}"{redacted}"',
+        text,
+        flags=re.IGNORECASE,
+    )
+    return re.sub(rf'(^|&)((?:{names})=)[^&]*', rf'\g<1>\g<2>{redacted}', text, flags=re.IGNORECASE)
+
+
+def redact_body(raw, content_type, complete, config):
+    """Texto del body con los campos sensibles enmascarados."""
+    fields = {field.lower() for field in config['REDACT_FIELDS']}
+    redacted = config['REDACTED_VALUE']
+    text = raw.decode('utf-8', errors='replace')
+    if complete:
+        try:
+            if content_type == 'application/x-www-form-urlencoded':
+                pairs = [(k, redacted if k.lower() in fields else v) for k, v in parse_qsl(text, keep_blank_values=True)]
+                return urlencode(pairs)
+            return json.dumps(_redact_value(json.loads(text), fields, redacted), ensure_ascii=False)
+        except ValueError:
+            pass
+    return _redact_text(text, fields, redacted)
+
+
+def get_captured_body(request, tee, config):
+    """Body a guardar en RequestLog; vacío si no hubo captura."""
+    if tee is None:
+        return ''
+    content_length = get_content_length(request)
+    # La vista no leyó el body (p. ej. rechazo por permisos): se lee solo si es pequeño
+    if not tee.bytes_read and content_length and content_length <= config['MAX_CAPTURE_BYTES']:
+        if not getattr(request, '_read_started', False):
+            request.body
+    if not tee.buffer:
+        return ''
+    complete = len(tee.buffer) == tee.bytes_read and (content_length is None or tee.bytes_read >= content_length)
+    body = redact_body(bytes(tee.buffer), get_content_type(request), complete, config)
+    return body[:config['MAX_BODY_LENGTH']]
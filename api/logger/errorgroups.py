@@ -0,0 +1,192 @@
+"""
+Agrupación de errores por fingerprint.
+
+Cada ocurrencia se resume en un fingerprint (tipo de excepción más los frames
+más internos normalizados, sin números de línea). Por fingerprint se mantiene
+una fila de ErrorGroup cuyo contador se incrementa en sitio; el traceback
+completo (ErrorLog) solo se guarda para unas pocas ocurrencias por ventana de
+tiempo.
+
+Los contadores se acumulan en memoria y se escriben junto con el siguiente lote
+del buffer de logs o, si no llegan más logs, en el siguiente intervalo del
+buffer y al detenerlo (ver apply_pending y api.logger.sink).
+
+Configuración en ``settings.ERROR_GROUPS`` (ver DEFAULTS).
+"""
+import hashlib
+import os
+import re
+import threading
+import time
+import traceback as tb
+
+from django.conf import settings
+from django.db import IntegrityError, router, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ErrorGroup
+
+DEFAULTS = {
+    'TOP_FRAMES': 5,            # Frames más internos que forman el fingerprint
+    'SAMPLES_PER_WINDOW': 5,    # ErrorLog completos por fingerprint y ventana (por proceso)
+    'SAMPLE_WINDOW': 60,        # Segundos
+}
+
+_VARIABLE_PARTS = re.compile(
+    r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}|'[^']*'|\"[^\"]*\"|\b\d+\b",
+    re.IGNORECASE,
+)
+
+
+def get_error_group_settings():
+    config = dict(DEFAULTS)
+    config.update(getattr(settings, 'ERROR_GROUPS', {}) or {})
+    return config
+
+
+def _short_filename(filename):
+    base_dir = str(settings.BASE_DIR)
+    if filename.startswith(base_dir):
+        return os.path.relpath(filename, base_dir)
+    if 'site-packages' in filename:
+        return filename.split('site-packages' + os.sep, 1)[1]
+    return os.path.basename(filename)
+
+
+def _hash(*parts):
+    return hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()
+
+
+def normalize_message(message):
+    """Quita ids, uuids y literales para agrupar mensajes equivalentes."""
+    return _VARIABLE_PARTS.sub('?', message)
+
+
+def fingerprint_exception(exception, top_frames=5):
+    """Devuelve (fingerprint, tipo de excepción, frames normalizados)."""
+    exc_type = type(exception)
+    exception_type = f"{exc_type.__module__}.{exc_type.__qualname__}"
+    frames = tb.extract_tb(exception.__traceback__)[-top_frames:] if exception.__traceback__ else []
+    normalized = '\n'.join(f"{_short_filename(frame.filename)}:{frame.name}" for frame in frames)
+    if not normalized:
+        # Sin traceback (excepción creada a mano): se agrupa por mensaje normalizado
+        normalized = normalize_message(str(exception))
+    return _hash(exception_type, normalized), exception_type, normalized
+
+
+def fingerprint_message(level, message):
+    """Fingerprint de errores registrados sin excepción (log_error)."""
+    normalized = normalize_message(message)
+    return _hash(level, normalized), '', normalized
+
+
+class ErrorGroupTracker:
+    """Contadores pendientes por fingerprint y límite de ErrorLog completos por ventana."""
+
+    def __init__(self, samples_per_window=5, sample_window=60):
+        self.samples_per_window = samples_per_window
+        self.sample_window = sample_window
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._windows = {}
+
+    def record(self, fingerprint, level, exception_type, message, frames, request_path=''):
+        """
+        Cuenta una ocurrencia. Devuelve True si se debe guardar el ErrorLog completo.
+        """
+        now = timezone.now()
+        monotonic = time.monotonic()
+        with self._lock:
+            window_start, samples = self._windows.get(fingerprint, (monotonic, 0))
+            if monotonic - window_start >= self.sample_window:
+                window_start, samples = monotonic, 0
+            sampled = samples < self.samples_per_window
+            self._windows[fingerprint] = (window_start, samples + (1 if sampled else 0))
+
+            pending = self._pending.get(fingerprint)
+            if pending is None:
+                pending = self._pending[fingerprint] = {
+                    'level': level,
+                    'exception_type': exception_type[:255],
+                    'frames': frames,
+                    'first_seen': now,
+                    'count': 0,
+                    'sample_count': 0,
+                }
+            pending['count'] += 1
+            pending['sample_count'] += 1 if sampled else 0
+            pending['last_seen'] = now
+            pending['message'] = message
+            pending['request_path'] = request_path[:500]
+        return sampled
+
+    def has_pending(self):
+        return bool(self._pending)
+
+    def apply_pending(self):
+        """Escribe los contadores acumulados. Devuelve {fingerprint: id de ErrorGroup}."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if len(self._windows) > 10000:
+                self._windows.clear()
+
+        ids = {}
+        for fingerprint, data in pending.items():
+            updates = {
+                'count': F('count') + data['count'],
+                'sample_count': F('sample_count') + data['sample_count'],
+                'last_seen': data['last_seen'],
+                'message': data['message'],
+                'request_path': data['request_path'],
+            }
+            groups = ErrorGroup.objects.filter(fingerprint=fingerprint)
+            if not groups.update(**updates):
+                try:
+                    with transaction.atomic(using=router.db_for_write(ErrorGroup)):
+                        ids[fingerprint] = ErrorGroup.objects.create(fingerprint=fingerprint, **data).pk
+                    continue
+                except IntegrityError:
+                    # Otro proceso creó el grupo al mismo tiempo
+                    groups.update(**updates)
+            ids[fingerprint] = groups.values_list('pk', flat=True).first()
+        return ids
+
+
+_tracker = None
+_tracker_lock = threading.Lock()
+
+
+def get_error_group_tracker():
+    global _tracker
+    if _tracker is None:
+        with _tracker_lock:
+            if _tracker is None:
+                config = get_error_group_settings()
+                _tracker = ErrorGroupTracker(config['SAMPLES_PER_WINDOW'], config['SAMPLE_WINDOW'])
+    return _tracker
+
+
+def resolve_error_groups(records):
+    """Asigna el grupo a los ErrorLog de un lote (hook ErrorLog.prepare_log_batch)."""
+    ids = get_error_group_tracker().apply_pending()
+    missing = {
+        record.raw_fingerprint for record in records
+        if getattr(record, 'raw_fingerprint', None) and record.raw_fingerprint not in ids
+    }
+    if missing:
+        ids.update(ErrorGroup.objects.filter(fingerprint__in=missing).values_list('fingerprint', 'pk'))
+    for record in records:
+        fingerprint = getattr(record, 'raw_fingerprint', None)
+        if fingerprint:
+            record.group_id = ids.get(fingerprint)
+
+
+def flush_error_groups(model=None, records=None):
+    """
+    Listener del buffer de logs (por lote y periódico): escribe los contadores
+    aunque no haya ErrorLog en el lote ni lleguen más logs.
+    """
+    tracker = get_error_group_tracker()
+    if tracker.has_pending():
+        tracker.apply_pending()
@@ -0,0 +1,85 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api.logger.models import RequestProfile
+from api.logger.partitions import (
+    PARTITIONED_TABLES,
+    add_months,
+    archive_partition,
+    create_partition,
+    detach_partition,
+    drop_table,
+    expired_partitions,
+    get_partition_settings,
+    is_partitioned,
+    is_supported,
+    list_partitions,
+    month_start,
+    write_manifest,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Mantenimiento de las particiones mensuales de logs: crea las particiones futuras, "
+        "desconecta las vencidas según la retención de cada tabla, las archiva como JSONL "
+        "comprimido y elimina la partición completa."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, help="Meses futuros a pre-crear (por defecto LOG_PARTITIONS['MONTHS_AHEAD'])")
+        parser.add_argument('--archive-dir', help="Directorio de archivos (por defecto LOG_PARTITIONS['ARCHIVE_DIR'])")
+        parser.add_argument('--table', action='append', choices=PARTITIONED_TABLES, help="Limitar a una tabla (repetible)")
+        parser.add_argument('--no-archive', action='store_true', help="Eliminar particiones vencidas sin archivarlas")
+        parser.add_argument('--dry-run', action='store_true', help="Mostrar las acciones sin ejecutarlas")
+
+    def handle(self, *args, **options):
+        if not is_supported():
+            raise CommandError("El particionamiento de logs solo está disponible en PostgreSQL.")
+
+        config = get_partition_settings()
+        months_ahead = options['months_ahead'] if options['months_ahead'] is not None else config['MONTHS_AHEAD']
+        archive_dir = options['archive_dir'] or config['ARCHIVE_DIR']
+        retention = config['RETENTION_MONTHS']
+        dry_run = options['dry_run']
+        today = timezone.localdate()
+
+        for table in options['table'] or PARTITIONED_TABLES:
+            if not is_partitioned(table):
+                self.stdout.write(self.style.WARNING(f"{table} no está particionada, se omite."))
+                continue
+
+            for offset in range(months_ahead + 1):
+                month = add_months(month_start(today), offset)
+                if dry_run:
+                    self.stdout.write(f"[dry-run] {table}: asegurar partición {month:%Y-%m}")
+                elif create_partition(table, month):
+                    self.stdout.write(self.style.SUCCESS(f"{table}: partición {month:%Y-%m} creada"))
+
+            for name in expired_partitions(table, list_partitions(table), today, retention.get(table)):
+                if dry_run:
+                    self.stdout.write(f"[dry-run] {table}: archivar y eliminar {name}")
+                    continue
+
+                detach_partition(table, name)
+                rows = None
+                path = None
+                if not options['no_archive']:
+                    path, rows = archive_partition(name, archive_dir)
+                    write_manifest(archive_dir, {
+                        'table': table,
+                        'partition': name,
+                        'rows': rows,
+                        'file': path,
+                        'archived_at': timezone.now().isoformat(),
+                    })
+                drop_table(name)
+                detalle = f" ({rows} filas en {path})" if path else ""
+                self.stdout.write(self.style.SUCCESS(f"{table}: partición {name} eliminada{detalle}"))
+
+            # Los perfiles no tienen FK real hacia RequestLog: se depuran con la misma retención
+            if table == 'logger_request_log' and retention.get(table) is not None and not dry_run:
+                cutoff = add_months(month_start(today), -retention[table])
+                deleted, _ = RequestProfile.objects.filter(timestamp__lt=cutoff).delete()
+                if deleted:
+                    self.stdout.write(self.style.SUCCESS(f"{deleted} perfiles de requests anteriores a {cutoff} eliminados"))
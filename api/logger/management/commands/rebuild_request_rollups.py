@@ -0,0 +1,53 @@
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import router, transaction
+from django.utils import timezone
+
+from api.logger.models import RequestLog, RequestRollupDay, RequestRollupMinute
+from api.logger.rollups import update_rollups
+
+
+class Command(BaseCommand):
+    help = "Recalcula los rollups por minuto y por día a partir de la tabla cruda de RequestLog."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help="Fecha inicial (YYYY-MM-DD). Por defecto recalcula todo.")
+        parser.add_argument('--chunk-size', type=int, default=5000, help="Registros procesados por lote")
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                fecha = datetime.strptime(options['since'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError("--since debe tener el formato YYYY-MM-DD")
+            since = timezone.make_aware(datetime.combine(fecha, time.min))
+
+        # prefetch en lugar de join: los usuarios pueden estar en otra base (core.routers)
+        logs = RequestLog.objects.prefetch_related('user').order_by('id')
+        minutes = RequestRollupMinute.objects.all()
+        days = RequestRollupDay.objects.all()
+        if since:
+            logs = logs.filter(timestamp__gte=since)
+            minutes = minutes.filter(bucket__gte=since)
+            days = days.filter(bucket__gte=since)
+
+        with transaction.atomic(using=router.db_for_write(RequestRollupDay)):
+            minutes.delete()
+            days.delete()
+
+        chunk_size = options['chunk_size']
+        chunk = []
+        total = 0
+        for log in logs.iterator(chunk_size=chunk_size):
+            chunk.append(log)
+            if len(chunk) >= chunk_size:
+                update_rollups(chunk)
+                total += len(chunk)
+                chunk = []
+        if chunk:
+            update_rollups(chunk)
+            total += len(chunk)
+
+        self.stdout.write(self.style.SUCCESS(f"Rollups recalculados a partir de {total} registros."))
@@ -3,19 +3,42 @@ import json
 import logging
 from django.utils.deprecation import MiddlewareMixin
 from django.contrib.auth.models import AnonymousUser
+from core.metrics import observe_request
 from .models import RequestLog, ErrorLog
+from .sink import emit_log
+from .rollups import normalize_route
+from .querystats import QueryStats, get_db_stats_settings
+from .profiling import ProfilingSession, get_profiling_settings, get_trigger, sampled_for_threshold
+from .errorgroups import fingerprint_exception, get_error_group_settings, get_error_group_tracker
+from .bodycapture import (
+    get_body_capture_settings, get_captured_body, get_content_length, get_content_type, start_capture,
+)
 
 logger = logging.getLogger('django')
 
 class RequestLoggingMiddleware(MiddlewareMixin):
     def process_request(self, request):
         request.start_time = time.time()
+        
+        # Copia acotada del body JSON/urlencoded mientras la vista lo lee
+        config = get_body_capture_settings()
+        request.body_capture = start_capture(request, config) if config['ENABLED'] else None
+        
+        # Contar consultas SQL y tiempo en base de datos de esta request
+        config = get_db_stats_settings()
+        if config['ENABLED']:
+            request.query_stats = QueryStats(duplicate_threshold=config['DUPLICATE_THRESHOLD'])
+            request.query_stats.install()
         return None
     
     def process_response(self, request, response):
         # Calcular tiempo de respuesta
         response_time = (time.time() - getattr(request, 'start_time', 0)) * 1000
         
+        query_stats = getattr(request, 'query_stats', None)
+        if query_stats is not None:
+            query_stats.uninstall()
+        
         # Obtener información del usuario
         user = request.user if not isinstance(request.user, AnonymousUser) else None
         
@@ -25,29 +48,54 @@ class RequestLoggingMiddleware(MiddlewareMixin):
         # Obtener query parameters
         query_params = dict(request.GET) if request.GET else {}
         
-        # Obtener body de la request (solo para POST, PUT, PATCH)
+        # Body capturado sin leer el stream (multipart y otros: solo tipo y longitud)
         body = ""
-        if request.method in ['POST', 'PUT', 'PATCH']:
-            try:
-                if hasattr(request, 'body'):
-                    body = request.body.decode('utf-8')[:1000]  # Limitar a 1000 caracteres
-            except Exception:
-                body = "Could not decode body"
-        
-        # Crear log de la request
         try:
-            RequestLog.objects.create(
+            body = get_captured_body(request, getattr(request, 'body_capture', None), get_body_capture_settings())
+        except Exception:
+            body = "Could not decode body"
+        
+        # Patrón de URL y nombre de vista (vacíos si la ruta no resolvió)
+        match = getattr(request, 'resolver_match', None)
+        route = normalize_route(match.route)[:255] if match and match.route else ''
+        view_name = (match.view_name or '')[:255] if match else ''
+        
+        # Métricas en proceso para /metrics
+        try:
+            observe_request(
+                request.method, route, response.status_code, response_time / 1000,
+                db_seconds=query_stats.total_time / 1000 if query_stats is not None else None,
+                query_count=query_stats.count if query_stats is not None else None,
+            )
+        except Exception as e:
+            logger.error(f"Error recording request metrics: {e}")
+        
+        # Encolar log de la request (se escribe por lotes en segundo plano)
+        try:
+            log = RequestLog(
                 user=user,
                 ip_address=ip_address,
-                user_agent=request.META.get('HTTP_USER_AGENT', '')[:500],
                 method=request.method,
                 path=request.path,
+                route=route,
+                view_name=view_name,
                 query_params=json.dumps(query_params),
                 body=body,
+                content_type=get_content_type(request)[:100],
+                content_length=get_content_length(request),
                 status_code=response.status_code,
                 response_time=response_time,
-                referer=request.META.get('HTTP_REFERER', '')
             )
+            # User agent y referer se convierten en ids del diccionario al escribir el lote
+            log.raw_user_agent = request.META.get('HTTP_USER_AGENT', '')[:500]
+            log.raw_referer = request.META.get('HTTP_REFERER', '')[:500]
+            if query_stats is not None:
+                query_stats.apply_to(log)
+            # Perfil generado por RequestProfilingMiddleware; se guarda al escribir el lote
+            profile = getattr(request, 'request_profile', None)
+            if profile is not None:
+                log.pending_profile = profile
+            emit_log(log)
         except Exception as e:
             logger.error(f"Error logging request: {e}")
         
@@ -61,6 +109,45 @@ class RequestLoggingMiddleware(MiddlewareMixin):
             ip = request.META.get('REMOTE_ADDR')
         return ip
 
+class RequestProfilingMiddleware(MiddlewareMixin):
+    """
+    Perfilado opcional (settings.REQUEST_PROFILING). Va después de
+    RequestLoggingMiddleware para que el perfil quede enlazado a su RequestLog.
+    """
+    def process_request(self, request):
+        config = get_profiling_settings()
+        if not config['ENABLED']:
+            return None
+        
+        trigger = get_trigger(request, config)
+        if trigger is None and not sampled_for_threshold(config):
+            return None
+        
+        session = ProfilingSession(config, trigger)
+        try:
+            session.start()
+        except Exception as e:
+            # Otro profiler activo en el hilo, etc.: la request sigue sin perfil
+            session.abort()
+            logger.error(f"Error starting request profiler: {e}")
+            return None
+        request.profiling_session = session
+        return None
+    
+    def process_response(self, request, response):
+        session = getattr(request, 'profiling_session', None)
+        if session is None:
+            return response
+        
+        try:
+            session.stop()
+            if session.should_keep():
+                request.request_profile = session.build_profile(request, response)
+        except Exception as e:
+            logger.error(f"Error profiling request: {e}")
+        
+        return response
+
 class ErrorLoggingMiddleware(MiddlewareMixin):
     def process_exception(self, request, exception):
         import traceback
@@ -69,14 +156,24 @@ class ErrorLoggingMiddleware(MiddlewareMixin):
         ip_address = self.get_client_ip(request)
         
         try:
-            ErrorLog.objects.create(
-                level='ERROR',
-                message=str(exception),
-                traceback=traceback.format_exc(),
-                user=user,
-                ip_address=ip_address,
-                request_path=request.path
+            # Se cuenta en su ErrorGroup; el traceback completo solo para algunas ocurrencias
+            fingerprint, exception_type, frames = fingerprint_exception(
+                exception, get_error_group_settings()['TOP_FRAMES']
+            )
+            sampled = get_error_group_tracker().record(
+                fingerprint, 'ERROR', exception_type, str(exception), frames, request.path
             )
+            if sampled:
+                log = ErrorLog(
+                    level='ERROR',
+                    message=str(exception),
+                    traceback=traceback.format_exc(),
+                    user=user,
+                    ip_address=ip_address,
+                    request_path=request.path
+                )
+                log.raw_fingerprint = fingerprint
+                emit_log(log)
         except Exception as e:
             logger.error(f"Error logging exception: {e}")
         
@@ -1,9 +1,27 @@
 # Generated by Django 5.2.3 on 2025-07-14 16:14
 
+import copy
+
 import django.db.models.deletion
 import django.utils.timezone
 from django.conf import settings
-from django.db import migrations, models
+from django.db import DEFAULT_DB_ALIAS, migrations, models
+
+# Las tablas se crean sin la FK hacia usuarios y la FK se agrega solo en
+# 'default': en una base de logs separada (core.routers) no existe la tabla de
+# usuarios. 0009 quita después la FK también en 'default'.
+USER_FK_MODELS = ('ErrorLog', 'RequestLog', 'UserActivity')
+
+
+def add_user_constraints(apps, schema_editor):
+    if schema_editor.connection.alias != DEFAULT_DB_ALIAS:
+        return
+    for model_name in USER_FK_MODELS:
+        model = apps.get_model('logger', model_name)
+        field = model._meta.get_field('user')
+        new_field = copy.copy(field)
+        new_field.db_constraint = True
+        schema_editor.alter_field(model, field, new_field)
 
 
 class Migration(migrations.Migration):
@@ -15,59 +33,121 @@ class Migration(migrations.Migration):
     ]
 
     operations = [
-        migrations.CreateModel(
-            name='ErrorLog',
-            fields=[
-                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
-                ('level', models.CharField(choices=[('DEBUG', 'Debug'), ('INFO', 'Info'), ('WARNING', 'Warning'), ('ERROR', 'Error'), ('CRITICAL', 'Critical')], max_length=10)),
-                ('message', models.TextField()),
-                ('traceback', models.TextField(blank=True)),
-                ('ip_address', models.GenericIPAddressField(blank=True, null=True)),
-                ('request_path', models.URLField(blank=True, max_length=500)),
-                ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
-                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='ErrorLog',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('level', models.CharField(choices=[('DEBUG', 'Debug'), ('INFO', 'Info'), ('WARNING', 'Warning'), ('ERROR', 'Error'), ('CRITICAL', 'Critical')], max_length=10)),
+                        ('message', models.TextField()),
+                        ('traceback', models.TextField(blank=True)),
+                        ('ip_address', models.GenericIPAddressField(blank=True, null=True)),
+                        ('request_path', models.URLField(blank=True, max_length=500)),
+                        ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+                        ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                    ],
+                    options={
+                        'db_table': 'logger_error_log',
+                        'ordering': ['-timestamp'],
+                    },
+                ),
+                migrations.CreateModel(
+                    name='RequestLog',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('ip_address', models.GenericIPAddressField()),
+                        ('user_agent', models.TextField(blank=True)),
+                        ('method', models.CharField(choices=[('GET', 'GET'), ('POST', 'POST'), ('PUT', 'PUT'), ('PATCH', 'PATCH'), ('DELETE', 'DELETE'), ('OPTIONS', 'OPTIONS'), ('HEAD', 'HEAD')], max_length=10)),
+                        ('path', models.URLField(max_length=500)),
+                        ('query_params', models.TextField(blank=True)),
+                        ('body', models.TextField(blank=True)),
+                        ('status_code', models.IntegerField()),
+                        ('response_time', models.FloatField()),
+                        ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+                        ('referer', models.URLField(blank=True, max_length=500)),
+                        ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                    ],
+                    options={
+                        'db_table': 'logger_request_log',
+                        'ordering': ['-timestamp'],
+                    },
+                ),
+                migrations.CreateModel(
+                    name='UserActivity',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('action', models.CharField(choices=[('login', 'Login'), ('logout', 'Logout'), ('create', 'Create'), ('update', 'Update'), ('delete', 'Delete'), ('view', 'View'), ('search', 'Search'), ('export', 'Export'), ('import', 'Import')], max_length=20)),
+                        ('object_type', models.CharField(blank=True, max_length=100)),
+                        ('object_id', models.CharField(blank=True, max_length=100)),
+                        ('description', models.TextField(blank=True)),
+                        ('ip_address', models.GenericIPAddressField()),
+                        ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+                        ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                    ],
+                    options={
+                        'db_table': 'logger_user_activity',
+                        'ordering': ['-timestamp'],
+                    },
+                ),
             ],
-            options={
-                'db_table': 'logger_error_log',
-                'ordering': ['-timestamp'],
-            },
-        ),
-        migrations.CreateModel(
-            name='RequestLog',
-            fields=[
-                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
-                ('ip_address', models.GenericIPAddressField()),
-                ('user_agent', models.TextField(blank=True)),
-                ('method', models.CharField(choices=[('GET', 'GET'), ('POST', 'POST'), ('PUT', 'PUT'), ('PATCH', 'PATCH'), ('DELETE', 'DELETE'), ('OPTIONS', 'OPTIONS'), ('HEAD', 'HEAD')], max_length=10)),
-                ('path', models.URLField(max_length=500)),
-                ('query_params', models.TextField(blank=True)),
-                ('body', models.TextField(blank=True)),
-                ('status_code', models.IntegerField()),
-                ('response_time', models.FloatField()),
-                ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
-                ('referer', models.URLField(blank=True, max_length=500)),
-                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
-            ],
-            options={
-                'db_table': 'logger_request_log',
-                'ordering': ['-timestamp'],
-            },
-        ),
-        migrations.CreateModel(
-            name='UserActivity',
-            fields=[
-                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
-                ('action', models.CharField(choices=[('login', 'Login'), ('logout', 'Logout'), ('create', 'Create'), ('update', 'Update'), ('delete', 'Delete'), ('view', 'View'), ('search', 'Search'), ('export', 'Export'), ('import', 'Import')], max_length=20)),
-                ('object_type', models.CharField(blank=True, max_length=100)),
-                ('object_id', models.CharField(blank=True, max_length=100)),
-                ('description', models.TextField(blank=True)),
-                ('ip_address', models.GenericIPAddressField()),
-                ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
-                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            database_operations=[
+                migrations.CreateModel(
+                    name='ErrorLog',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('level', models.CharField(choices=[('DEBUG', 'Debug'), ('INFO', 'Info'), ('WARNING', 'Warning'), ('ERROR', 'Error'), ('CRITICAL', 'Critical')], max_length=10)),
+                        ('message', models.TextField()),
+                        ('traceback', models.TextField(blank=True)),
+                        ('ip_address', models.GenericIPAddressField(blank=True, null=True)),
+                        ('request_path', models.URLField(blank=True, max_length=500)),
+                        ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+                        ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, db_constraint=False, to=settings.AUTH_USER_MODEL)),
+                    ],
+                    options={
+                        'db_table': 'logger_error_log',
+                        'ordering': ['-timestamp'],
+                    },
+                ),
+                migrations.CreateModel(
+                    name='RequestLog',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('ip_address', models.GenericIPAddressField()),
+                        ('user_agent', models.TextField(blank=True)),
+                        ('method', models.CharField(choices=[('GET', 'GET'), ('POST', 'POST'), ('PUT', 'PUT'), ('PATCH', 'PATCH'), ('DELETE', 'DELETE'), ('OPTIONS', 'OPTIONS'), ('HEAD', 'HEAD')], max_length=10)),
+                        ('path', models.URLField(max_length=500)),
+                        ('query_params', models.TextField(blank=True)),
+                        ('body', models.TextField(blank=True)),
+                        ('status_code', models.IntegerField()),
+                        ('response_time', models.FloatField()),
+                        ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+                        ('referer', models.URLField(blank=True, max_length=500)),
+                        ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, db_constraint=False, to=settings.AUTH_USER_MODEL)),
+                    ],
+                    options={
+                        'db_table': 'logger_request_log',
+                        'ordering': ['-timestamp'],
+                    },
+                ),
+                migrations.CreateModel(
+                    name='UserActivity',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('action', models.CharField(choices=[('login', 'Login'), ('logout', 'Logout'), ('create', 'Create'), ('update', 'Update'), ('delete', 'Delete'), ('view', 'View'), ('search', 'Search'), ('export', 'Export'), ('import', 'Import')], max_length=20)),
+                        ('object_type', models.CharField(blank=True, max_length=100)),
+                        ('object_id', models.CharField(blank=True, max_length=100)),
+                        ('description', models.TextField(blank=True)),
+                        ('ip_address', models.GenericIPAddressField()),
+                        ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+                        ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, db_constraint=False, to=settings.AUTH_USER_MODEL)),
+                    ],
+                    options={
+                        'db_table': 'logger_user_activity',
+                        'ordering': ['-timestamp'],
+                    },
+                ),
+                migrations.RunPython(add_user_constraints, migrations.RunPython.noop),
             ],
-            options={
-                'db_table': 'logger_user_activity',
-                'ordering': ['-timestamp'],
-            },
         ),
     ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.2.3 on 2026-10-18 11:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logger', '0001_initial'),
+        ('organization', '0002_remove_organizacion_membretado_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestRollupDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField(help_text='Inicio del intervalo agregado')),
+                ('route', models.CharField(max_length=500)),
+                ('method', models.CharField(choices=[('GET', 'GET'), ('POST', 'POST'), ('PUT', 'PUT'), ('PATCH', 'PATCH'), ('DELETE', 'DELETE'), ('OPTIONS', 'OPTIONS'), ('HEAD', 'HEAD')], max_length=10)),
+                ('status_class', models.CharField(choices=[('1xx', '1xx'), ('2xx', '2xx'), ('3xx', '3xx'), ('4xx', '4xx'), ('5xx', '5xx')], max_length=3)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('error_count', models.PositiveIntegerField(default=0)),
+                ('total_latency', models.FloatField(default=0)),
+                ('max_latency', models.FloatField(default=0)),
+                ('le_10', models.PositiveIntegerField(default=0)),
+                ('le_25', models.PositiveIntegerField(default=0)),
+                ('le_50', models.PositiveIntegerField(default=0)),
+                ('le_100', models.PositiveIntegerField(default=0)),
+                ('le_250', models.PositiveIntegerField(default=0)),
+                ('le_500', models.PositiveIntegerField(default=0)),
+                ('le_1000', models.PositiveIntegerField(default=0)),
+                ('le_2500', models.PositiveIntegerField(default=0)),
+                ('le_5000', models.PositiveIntegerField(default=0)),
+                ('le_inf', models.PositiveIntegerField(default=0)),
+                ('organizacion', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='organization.organizacion')),
+                ('user', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'logger_request_rollup_day',
+                'ordering': ['-bucket'],
+                'indexes': [models.Index(fields=['bucket', 'route', 'method', 'status_class'], name='rollup_day_key_idx'), models.Index(fields=['organizacion', 'bucket'], name='rollup_day_org_idx'), models.Index(fields=['user', 'bucket'], name='rollup_day_user_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='RequestRollupMinute',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField(help_text='Inicio del intervalo agregado')),
+                ('route', models.CharField(max_length=500)),
+                ('method', models.CharField(choices=[('GET', 'GET'), ('POST', 'POST'), ('PUT', 'PUT'), ('PATCH', 'PATCH'), ('DELETE', 'DELETE'), ('OPTIONS', 'OPTIONS'), ('HEAD', 'HEAD')], max_length=10)),
+                ('status_class', models.CharField(choices=[('1xx', '1xx'), ('2xx', '2xx'), ('3xx', '3xx'), ('4xx', '4xx'), ('5xx', '5xx')], max_length=3)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('error_count', models.PositiveIntegerField(default=0)),
+                ('total_latency', models.FloatField(default=0)),
+                ('max_latency', models.FloatField(default=0)),
+                ('le_10', models.PositiveIntegerField(default=0)),
+                ('le_25', models.PositiveIntegerField(default=0)),
+                ('le_50', models.PositiveIntegerField(default=0)),
+                ('le_100', models.PositiveIntegerField(default=0)),
+                ('le_250', models.PositiveIntegerField(default=0)),
+                ('le_500', models.PositiveIntegerField(default=0)),
+                ('le_1000', models.PositiveIntegerField(default=0)),
+                ('le_2500', models.PositiveIntegerField(default=0)),
+                ('le_5000', models.PositiveIntegerField(default=0)),
+                ('le_inf', models.PositiveIntegerField(default=0)),
+                ('organizacion', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='organization.organizacion')),
+                ('user', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'logger_request_rollup_minute',
+                'ordering': ['-bucket'],
+                'indexes': [models.Index(fields=['bucket', 'route', 'method', 'status_class'], name='rollup_min_key_idx'), models.Index(fields=['organizacion', 'bucket'], name='rollup_min_org_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,101 @@
+# Generated by Django 5.2.3 on 2026-10-18 11:48
+
+from datetime import date
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+# Particionamiento mensual por "timestamp" de las tablas de logs (solo PostgreSQL).
+# La llave primaria pasa a ser (id, timestamp), requisito de PostgreSQL para
+# tablas particionadas; Django sigue usando `id` como pk. La tabla nueva no
+# lleva la FK hacia usuarios: la base de logs puede no tener esa tabla
+# (core.routers) y 0009 la quita de todas formas.
+LOG_TABLES = ('logger_request_log', 'logger_user_activity', 'logger_error_log')
+MONTHS_AHEAD = 3
+
+
+def _add_months(value, months):
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _copy_table(cursor, table, partitioned):
+    old = f"{table}_old"
+    cursor.execute(f'ALTER TABLE "{table}" RENAME TO "{old}"')
+    partition_clause = ' PARTITION BY RANGE ("timestamp")' if partitioned else ''
+    cursor.execute(f'CREATE TABLE "{table}" (LIKE "{old}" INCLUDING DEFAULTS INCLUDING IDENTITY){partition_clause}')
+    # Los nombres alternan entre ambas direcciones para no chocar con los de la tabla anterior
+    suffix = 'part' if partitioned else 'plain'
+    pk_columns = 'id, "timestamp"' if partitioned else 'id'
+    cursor.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{table}_{suffix}_pk" PRIMARY KEY ({pk_columns})')
+    cursor.execute(f'CREATE INDEX "{table}_{suffix}_user_idx" ON "{table}" (user_id)')
+
+    if partitioned:
+        cursor.execute(f'CREATE TABLE "{table}_default" PARTITION OF "{table}" DEFAULT')
+        cursor.execute(f'SELECT MIN("timestamp") FROM "{old}"')
+        first = cursor.fetchone()[0] or timezone.now()
+        today = timezone.localdate()
+        month = date(first.year, first.month, 1)
+        last = _add_months(date(today.year, today.month, 1), MONTHS_AHEAD)
+        while month <= last:
+            cursor.execute(
+                f'CREATE TABLE "{table}_p{month:%Y%m}" PARTITION OF "{table}" FOR VALUES FROM (%s) TO (%s)',
+                [month.isoformat(), _add_months(month, 1).isoformat()],
+            )
+            month = _add_months(month, 1)
+
+    cursor.execute(f'INSERT INTO "{table}" SELECT * FROM "{old}"')
+    cursor.execute(
+        f"SELECT setval(pg_get_serial_sequence('\"{table}\"', 'id'), "
+        f'COALESCE((SELECT MAX(id) FROM "{table}"), 0) + 1, false)'
+    )
+    cursor.execute(f'DROP TABLE "{old}" CASCADE')
+
+
+def partition_log_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for table in LOG_TABLES:
+            _copy_table(cursor, table, partitioned=True)
+
+
+def unpartition_log_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for table in LOG_TABLES:
+            _copy_table(cursor, table, partitioned=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logger', '0002_request_rollups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_log_tables, unpartition_log_tables),
+        migrations.AddIndex(
+            model_name='errorlog',
+            index=models.Index(fields=['-timestamp'], name='error_log_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='requestlog',
+            index=models.Index(fields=['-timestamp'], name='request_log_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='requestlog',
+            index=models.Index(fields=['user', '-timestamp'], name='request_log_user_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='useractivity',
+            index=models.Index(fields=['-timestamp'], name='user_activity_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='useractivity',
+            index=models.Index(fields=['user', '-timestamp'], name='user_activity_user_ts_idx'),
+        ),
+    ]
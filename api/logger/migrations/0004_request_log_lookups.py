@@ -0,0 +1,165 @@
+# Generated by Django 5.2.3 on 2026-10-18 11:52
+
+import hashlib
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Substr
+
+# user_agent y referer pasan de texto repetido en cada fila a tablas de
+# diccionario referenciadas por id. Los textos existentes se migran con
+# operaciones por conjunto: un INSERT de los valores distintos y un
+# UPDATE ... FROM por campo (en PostgreSQL), sin un UPDATE por valor que
+# recorra la tabla de logs cada vez.
+LOOKUPS = (
+    ('user_agent', 'UserAgent'),
+    ('referer', 'Referer'),
+)
+
+
+def _set_constraints_immediate(schema_editor):
+    # Con FK diferidas pendientes PostgreSQL no permite el ALTER TABLE siguiente
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+
+def _tables(apps, model_name):
+    return apps.get_model('logger', 'RequestLog')._meta.db_table, apps.get_model('logger', model_name)._meta.db_table
+
+
+def text_to_lookups(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for field, model_name in LOOKUPS:
+            log_table, lookup_table = _tables(apps, model_name)
+            # value_hash igual a LookupValue.hash_value: sha256 hex del texto en UTF-8
+            schema_editor.execute(
+                f'INSERT INTO "{lookup_table}" (value, value_hash) '
+                f"SELECT value, encode(sha256(convert_to(value, 'UTF8')), 'hex') "
+                f'FROM (SELECT DISTINCT "{field}_text" AS value FROM "{log_table}" WHERE "{field}_text" <> \'\') AS valores '
+                f'ON CONFLICT (value_hash) DO NOTHING'
+            )
+            schema_editor.execute(
+                f'UPDATE "{log_table}" SET "{field}_id" = lookup.id FROM "{lookup_table}" AS lookup '
+                f'WHERE lookup.value = "{log_table}"."{field}_text" AND "{log_table}"."{field}_text" <> \'\''
+            )
+    else:
+        _text_to_lookups_orm(apps, schema_editor)
+    _set_constraints_immediate(schema_editor)
+
+
+def _text_to_lookups_orm(apps, schema_editor):
+    """Otras bases (SQLite en desarrollo): un INSERT por lote y un UPDATE por campo."""
+    using = schema_editor.connection.alias
+    RequestLog = apps.get_model('logger', 'RequestLog')
+    for field, model_name in LOOKUPS:
+        Lookup = apps.get_model('logger', model_name)
+        text_field = f'{field}_text'
+        values = (
+            RequestLog.objects.using(using).exclude(**{text_field: ''})
+            .values_list(text_field, flat=True).distinct().order_by()
+        )
+        batch = []
+        for value in values.iterator():
+            batch.append(Lookup(value=value, value_hash=hashlib.sha256(value.encode('utf-8')).hexdigest()))
+            if len(batch) >= 1000:
+                Lookup.objects.using(using).bulk_create(batch, ignore_conflicts=True)
+                batch = []
+        Lookup.objects.using(using).bulk_create(batch, ignore_conflicts=True)
+        lookup_id = Lookup.objects.using(using).filter(value=OuterRef(text_field)).values('id')[:1]
+        RequestLog.objects.using(using).exclude(**{text_field: ''}).update(**{f'{field}_id': Subquery(lookup_id)})
+
+
+def lookups_to_text(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for field, model_name in LOOKUPS:
+            log_table, lookup_table = _tables(apps, model_name)
+            schema_editor.execute(
+                f'UPDATE "{log_table}" SET "{field}_text" = LEFT(lookup.value, 500) FROM "{lookup_table}" AS lookup '
+                f'WHERE lookup.id = "{log_table}"."{field}_id"'
+            )
+    else:
+        using = schema_editor.connection.alias
+        RequestLog = apps.get_model('logger', 'RequestLog')
+        for field, model_name in LOOKUPS:
+            Lookup = apps.get_model('logger', model_name)
+            value = Lookup.objects.using(using).filter(pk=OuterRef(f'{field}_id')).values('value')[:1]
+            RequestLog.objects.using(using).filter(**{f'{field}__isnull': False}).update(**{f'{field}_text': Substr(Subquery(value), 1, 500)})
+    _set_constraints_immediate(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logger', '0003_partition_log_tables'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Referer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.TextField()),
+                ('value_hash', models.CharField(editable=False, max_length=64, unique=True)),
+            ],
+            options={
+                'db_table': 'logger_referer',
+            },
+        ),
+        migrations.CreateModel(
+            name='UserAgent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.TextField()),
+                ('value_hash', models.CharField(editable=False, max_length=64, unique=True)),
+            ],
+            options={
+                'db_table': 'logger_user_agent',
+            },
+        ),
+        migrations.AddField(
+            model_name='requestlog',
+            name='route',
+            field=models.CharField(blank=True, help_text='Patrón de URL resuelto, p. ej. /api/v1/record/documents/descargar/<pk>/', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='requestlog',
+            name='view_name',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.RenameField(
+            model_name='requestlog',
+            old_name='user_agent',
+            new_name='user_agent_text',
+        ),
+        migrations.RenameField(
+            model_name='requestlog',
+            old_name='referer',
+            new_name='referer_text',
+        ),
+        migrations.AddField(
+            model_name='requestlog',
+            name='user_agent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='logger.useragent'),
+        ),
+        migrations.AddField(
+            model_name='requestlog',
+            name='referer',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='logger.referer'),
+        ),
+        migrations.RunPython(text_to_lookups, lookups_to_text),
+        migrations.RemoveField(
+            model_name='requestlog',
+            name='user_agent_text',
+        ),
+        migrations.RemoveField(
+            model_name='requestlog',
+            name='referer_text',
+        ),
+        migrations.AddIndex(
+            model_name='requestlog',
+            index=models.Index(fields=['route', '-timestamp'], name='request_log_route_ts_idx'),
+        ),
+    ]
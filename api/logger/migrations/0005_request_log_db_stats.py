@@ -0,0 +1,50 @@
+# Generated by Django 5.2.3 on 2026-10-18 11:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logger', '0004_request_log_lookups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueryFingerprint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.TextField()),
+                ('value_hash', models.CharField(editable=False, max_length=64, unique=True)),
+            ],
+            options={
+                'db_table': 'logger_query_fingerprint',
+            },
+        ),
+        migrations.AddField(
+            model_name='requestlog',
+            name='db_time',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='requestlog',
+            name='duplicate_queries',
+            field=models.BooleanField(default=False, help_text='El mismo SQL se ejecutó varias veces (posible N+1)'),
+        ),
+        migrations.AddField(
+            model_name='requestlog',
+            name='query_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='requestlog',
+            name='slowest_query_time',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='requestlog',
+            name='slowest_query',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='logger.queryfingerprint'),
+        ),
+    ]
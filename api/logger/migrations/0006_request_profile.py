@@ -0,0 +1,38 @@
+# Generated by Django 5.2.3 on 2026-10-18 11:56
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logger', '0005_request_log_db_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('method', models.CharField(choices=[('GET', 'GET'), ('POST', 'POST'), ('PUT', 'PUT'), ('PATCH', 'PATCH'), ('DELETE', 'DELETE'), ('OPTIONS', 'OPTIONS'), ('HEAD', 'HEAD')], max_length=10)),
+                ('path', models.CharField(max_length=500)),
+                ('route', models.CharField(blank=True, max_length=255)),
+                ('status_code', models.IntegerField()),
+                ('duration', models.FloatField()),
+                ('mode', models.CharField(choices=[('sampling', 'Muestreo de pilas'), ('cprofile', 'cProfile')], max_length=10)),
+                ('trigger', models.CharField(choices=[('threshold', 'Umbral de latencia'), ('header', 'Encabezado'), ('path', 'Ruta'), ('sample', 'Muestreo aleatorio')], max_length=10)),
+                ('sample_count', models.PositiveIntegerField(default=0)),
+                ('collapsed_stacks', models.TextField(blank=True, help_text="Formato colapsado 'raíz;...;hoja muestras' por línea")),
+                ('top_functions', models.JSONField(blank=True, default=list)),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+                ('request_log', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='profiles', to='logger.requestlog')),
+            ],
+            options={
+                'db_table': 'logger_request_profile',
+                'ordering': ['-timestamp'],
+                'indexes': [models.Index(fields=['-timestamp'], name='request_profile_ts_idx'), models.Index(fields=['route', '-timestamp'], name='request_profile_route_ts_idx')],
+            },
+        ),
+    ]
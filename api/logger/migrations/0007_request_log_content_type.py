@@ -0,0 +1,23 @@
+# Generated by Django 5.2.3 on 2026-10-18 11:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logger', '0006_request_profile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='requestlog',
+            name='content_length',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='requestlog',
+            name='content_type',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logger', '0007_request_log_content_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ErrorGroup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(max_length=64, unique=True)),
+                ('level', models.CharField(choices=[('DEBUG', 'Debug'), ('INFO', 'Info'), ('WARNING', 'Warning'), ('ERROR', 'Error'), ('CRITICAL', 'Critical')], max_length=10)),
+                ('exception_type', models.CharField(blank=True, max_length=255)),
+                ('frames', models.TextField(blank=True, help_text='Frames más internos normalizados (archivo:función)')),
+                ('message', models.TextField(blank=True)),
+                ('request_path', models.URLField(blank=True, max_length=500)),
+                ('first_seen', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_seen', models.DateTimeField(default=django.utils.timezone.now)),
+                ('count', models.PositiveBigIntegerField(default=0)),
+                ('sample_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'logger_error_group',
+                'ordering': ['-last_seen'],
+                'indexes': [models.Index(fields=['-last_seen'], name='error_group_last_seen_idx')],
+            },
+        ),
+        migrations.AddField(
+            model_name='errorlog',
+            name='group',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='samples', to='logger.errorgroup'),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.3 on 2026-10-18 15:40
+
+import uuid
+
+import django.db.models.functions.comparison
+from django.db import migrations, models
+from django.db.models import Count, Max, Sum
+
+KEY_FIELDS = ('bucket', 'route', 'method', 'status_class', 'status_code', 'user', 'organizacion')
+COUNTER_FIELDS = (
+    'count', 'error_count', 'total_latency',
+    'le_10', 'le_25', 'le_50', 'le_100', 'le_250', 'le_500', 'le_1000', 'le_2500', 'le_5000', 'le_inf',
+)
+
+
+def merge_duplicate_rollups(apps, schema_editor):
+    """Une en una sola fila las llaves repetidas antes de crear la constraint única."""
+    using = schema_editor.connection.alias
+    for model_name in ('RequestRollupMinute', 'RequestRollupDay'):
+        model = apps.get_model('logger', model_name)
+        rows = model.objects.using(using)
+        duplicates = rows.values(*KEY_FIELDS).annotate(rows=Count('id')).filter(rows__gt=1).order_by()
+        for key in duplicates.iterator():
+            del key['rows']
+            filtro = {
+                (f'{field}__isnull' if value is None else field): (True if value is None else value)
+                for field, value in key.items()
+            }
+            group = rows.filter(**filtro).order_by('id')
+            totals = group.aggregate(max_latency=Max('max_latency'), **{field: Sum(field) for field in COUNTER_FIELDS})
+            keep = group.values_list('id', flat=True).first()
+            rows.filter(pk=keep).update(**totals)
+            group.exclude(pk=keep).delete()
+
+
+def rollup_key_constraint(name):
+    null_key = models.Value(uuid.UUID(int=0))
+    return models.UniqueConstraint(
+        models.F('bucket'), models.F('route'), models.F('method'), models.F('status_class'), models.F('status_code'),
+        django.db.models.functions.comparison.Coalesce(models.F('user'), null_key),
+        django.db.models.functions.comparison.Coalesce(models.F('organizacion'), null_key),
+        name=name,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logger', '0009_log_database_router'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='requestrollupday',
+            name='status_code',
+            field=models.PositiveSmallIntegerField(default=0, help_text='0 en filas anteriores al código exacto'),
+        ),
+        migrations.AddField(
+            model_name='requestrollupminute',
+            name='status_code',
+            field=models.PositiveSmallIntegerField(default=0, help_text='0 en filas anteriores al código exacto'),
+        ),
+        migrations.RunPython(merge_duplicate_rollups, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='requestrollupday',
+            constraint=rollup_key_constraint('rollup_day_key_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='requestrollupminute',
+            constraint=rollup_key_constraint('rollup_min_key_uniq'),
+        ),
+    ]
@@ -74,13 +74,14 @@ class LoggingMixin:
         response = super().retrieve(request, *args, **kwargs)
         
         if self.log_actions and request.user.is_authenticated:
-            instance = self.get_object()
+            # El id viene en la URL: no se vuelve a cargar el objeto ni a validar permisos
+            object_id = self.kwargs.get(self.lookup_url_kwarg or self.lookup_field, '')
             log_user_activity(
                 user=request.user,
                 action='view',
                 object_type=self.get_log_object_type(),
-                object_id=instance.pk,
-                description=f'Visto detalle de {self.get_log_object_type()} {instance.pk}',
+                object_id=object_id,
+                description=f'Visto detalle de {self.get_log_object_type()} {object_id}',
                 request=request
             )
         
@@ -1,7 +1,68 @@
+import hashlib
+import uuid
+
 from django.db import models
+from django.db.models import Value
+from django.db.models.functions import Coalesce
 from api.cuser.models import CustomUser as User  # Asegúrate de que este es el modelo de usuario correcto
 from django.utils import timezone
 
+# Caché por proceso {modelo: {valor: id}} de las tablas de diccionario
+_lookup_cache = {}
+
+
+class LookupValue(models.Model):
+    """
+    Tabla de diccionario: cada valor distinto se guarda una sola vez y los logs
+    lo referencian por id. La unicidad se aplica sobre el hash del valor.
+    """
+    value = models.TextField()
+    value_hash = models.CharField(max_length=64, unique=True, editable=False)
+
+    CACHE_SIZE = 5000  # Entradas en caché por modelo; se reinicia al llenarse
+
+    class Meta:
+        abstract = True
+
+    def __str__(self):
+        return self.value
+
+    @staticmethod
+    def hash_value(value):
+        return hashlib.sha256(value.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def resolve_ids(cls, values):
+        """Devuelve {valor: id} creando en bloque los valores que no existen."""
+        cache = _lookup_cache.setdefault(cls, {})
+        ids = {value: cache[value] for value in values if value in cache}
+        missing = {cls.hash_value(value): value for value in values if value not in ids}
+        if missing:
+            cls.objects.bulk_create(
+                [cls(value=value, value_hash=value_hash) for value_hash, value in missing.items()],
+                ignore_conflicts=True,
+            )
+            if len(cache) + len(missing) > cls.CACHE_SIZE:
+                cache.clear()
+            for value_hash, pk in cls.objects.filter(value_hash__in=missing).values_list('value_hash', 'id'):
+                ids[missing[value_hash]] = cache[missing[value_hash]] = pk
+        return ids
+
+
+class UserAgent(LookupValue):
+    class Meta:
+        db_table = 'logger_user_agent'
+
+class Referer(LookupValue):
+    class Meta:
+        db_table = 'logger_referer'
+
+class QueryFingerprint(LookupValue):
+    """SQL normalizado (sin literales) de la consulta más lenta de una request."""
+    class Meta:
+        db_table = 'logger_query_fingerprint'
+
+
 class RequestLog(models.Model):
     METHODS = (
         ('GET', 'GET'),
@@ -13,25 +74,109 @@ class RequestLog(models.Model):
         ('HEAD', 'HEAD'),
     )
     
-    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    # Campos de diccionario: el middleware asigna el texto en `raw_<campo>` y el
+    # buffer de logs lo convierte en id antes de escribir (ver prepare_log_batch)
+    LOOKUP_FIELDS = (
+        ('user_agent', UserAgent),
+        ('referer', Referer),
+        ('slowest_query', QueryFingerprint),
+    )
+
+    # Sin constraint ni borrado en cascada: los logs pueden vivir en otra base (ver core.routers)
+    user = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True)
     ip_address = models.GenericIPAddressField()
-    user_agent = models.TextField(blank=True)
+    user_agent = models.ForeignKey(UserAgent, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
     method = models.CharField(max_length=10, choices=METHODS)
     path = models.URLField(max_length=500)
+    route = models.CharField(max_length=255, blank=True, help_text="Patrón de URL resuelto, p. ej. /api/v1/record/documents/descargar/<pk>/")
+    view_name = models.CharField(max_length=255, blank=True)
     query_params = models.TextField(blank=True)
-    body = models.TextField(blank=True)
+    body = models.TextField(blank=True)  # Solo JSON/urlencoded, con campos sensibles enmascarados
+    content_type = models.CharField(max_length=100, blank=True)
+    content_length = models.BigIntegerField(null=True, blank=True)
     status_code = models.IntegerField()
     response_time = models.FloatField()  # en milisegundos
     timestamp = models.DateTimeField(default=timezone.now)
-    referer = models.URLField(max_length=500, blank=True)
+    referer = models.ForeignKey(Referer, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
+
+    # Costo en base de datos de la request (ver api.logger.querystats)
+    query_count = models.PositiveIntegerField(default=0)
+    db_time = models.FloatField(default=0)  # en milisegundos
+    slowest_query = models.ForeignKey(QueryFingerprint, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
+    slowest_query_time = models.FloatField(default=0)  # en milisegundos
+    duplicate_queries = models.BooleanField(default=False, help_text="El mismo SQL se ejecutó varias veces (posible N+1)")
     
     class Meta:
         db_table = 'logger_request_log'
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['-timestamp'], name='request_log_ts_idx'),
+            models.Index(fields=['user', '-timestamp'], name='request_log_user_ts_idx'),
+            models.Index(fields=['route', '-timestamp'], name='request_log_route_ts_idx'),
+        ]
     
     def __str__(self):
         return f"{self.method} {self.path} - {self.status_code} ({self.timestamp})"
 
+    @classmethod
+    def prepare_log_batch(cls, records):
+        """Resuelve los textos pendientes (user agent, referer, SQL) a ids del diccionario."""
+        for field, lookup in cls.LOOKUP_FIELDS:
+            attr = f'raw_{field}'
+            values = {getattr(record, attr, '') for record in records} - {''}
+            if not values:
+                continue
+            ids = lookup.resolve_ids(values)
+            for record in records:
+                value = getattr(record, attr, '')
+                if value:
+                    setattr(record, f'{field}_id', ids[value])
+
+class RequestProfile(models.Model):
+    """
+    Perfil de ejecución de una request lenta o marcada para perfilado
+    (ver api.logger.profiling).
+    """
+    MODES = (
+        ('sampling', 'Muestreo de pilas'),
+        ('cprofile', 'cProfile'),
+    )
+    TRIGGERS = (
+        ('threshold', 'Umbral de latencia'),
+        ('header', 'Encabezado'),
+        ('path', 'Ruta'),
+        ('sample', 'Muestreo aleatorio'),
+    )
+
+    # Sin constraint: en PostgreSQL la llave de RequestLog es (id, timestamp) y
+    # sus particiones se eliminan completas al vencer
+    request_log = models.ForeignKey(
+        RequestLog, on_delete=models.DO_NOTHING, db_constraint=False,
+        null=True, blank=True, related_name='profiles',
+    )
+    method = models.CharField(max_length=10, choices=RequestLog.METHODS)
+    path = models.CharField(max_length=500)
+    route = models.CharField(max_length=255, blank=True)
+    status_code = models.IntegerField()
+    duration = models.FloatField()  # en milisegundos
+    mode = models.CharField(max_length=10, choices=MODES)
+    trigger = models.CharField(max_length=10, choices=TRIGGERS)
+    sample_count = models.PositiveIntegerField(default=0)
+    collapsed_stacks = models.TextField(blank=True, help_text="Formato colapsado 'raíz;...;hoja muestras' por línea")
+    top_functions = models.JSONField(default=list, blank=True)
+    timestamp = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'logger_request_profile'
+        ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['-timestamp'], name='request_profile_ts_idx'),
+            models.Index(fields=['route', '-timestamp'], name='request_profile_route_ts_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.method} {self.path} - {self.duration:.0f} ms ({self.timestamp})"
+
 class UserActivity(models.Model):
     ACTIONS = (
         ('login', 'Login'),
@@ -45,7 +190,7 @@ class UserActivity(models.Model):
         ('import', 'Import'),
     )
     
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False)
     action = models.CharField(max_length=20, choices=ACTIONS)
     object_type = models.CharField(max_length=100, blank=True)  # modelo afectado
     object_id = models.CharField(max_length=100, blank=True)   # ID del objeto
@@ -56,23 +201,63 @@ class UserActivity(models.Model):
     class Meta:
         db_table = 'logger_user_activity'
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['-timestamp'], name='user_activity_ts_idx'),
+            models.Index(fields=['user', '-timestamp'], name='user_activity_user_ts_idx'),
+        ]
     
     def __str__(self):
-        return f"{self.user.username} - {self.action} ({self.timestamp})"
+        # El usuario pudo borrarse: la FK no tiene constraint ni cascada
+        try:
+            user = self.user.username
+        except User.DoesNotExist:
+            user = f"usuario {self.user_id}"
+        return f"{user} - {self.action} ({self.timestamp})"
+
+ERROR_LEVELS = (
+    ('DEBUG', 'Debug'),
+    ('INFO', 'Info'),
+    ('WARNING', 'Warning'),
+    ('ERROR', 'Error'),
+    ('CRITICAL', 'Critical'),
+)
+
+
+class ErrorGroup(models.Model):
+    """
+    Errores agrupados por fingerprint (ver api.logger.errorgroups). Las
+    ocurrencias se cuentan aquí; solo algunas se guardan completas en ErrorLog.
+    """
+    fingerprint = models.CharField(max_length=64, unique=True)
+    level = models.CharField(max_length=10, choices=ERROR_LEVELS)
+    exception_type = models.CharField(max_length=255, blank=True)
+    frames = models.TextField(blank=True, help_text="Frames más internos normalizados (archivo:función)")
+    message = models.TextField(blank=True)  # Último mensaje visto
+    request_path = models.URLField(max_length=500, blank=True)  # Última ruta vista
+    first_seen = models.DateTimeField(default=timezone.now)
+    last_seen = models.DateTimeField(default=timezone.now)
+    count = models.PositiveBigIntegerField(default=0)
+    sample_count = models.PositiveIntegerField(default=0)  # Ocurrencias guardadas en ErrorLog
+
+    class Meta:
+        db_table = 'logger_error_group'
+        ordering = ['-last_seen']
+        indexes = [
+            models.Index(fields=['-last_seen'], name='error_group_last_seen_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.exception_type or self.level}: {self.message[:50]} ({self.count})"
+
 
 class ErrorLog(models.Model):
-    ERROR_LEVELS = (
-        ('DEBUG', 'Debug'),
-        ('INFO', 'Info'),
-        ('WARNING', 'Warning'),
-        ('ERROR', 'Error'),
-        ('CRITICAL', 'Critical'),
-    )
+    ERROR_LEVELS = ERROR_LEVELS
     
+    group = models.ForeignKey(ErrorGroup, on_delete=models.SET_NULL, null=True, blank=True, related_name='samples')
     level = models.CharField(max_length=10, choices=ERROR_LEVELS)
     message = models.TextField()
     traceback = models.TextField(blank=True)
-    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    user = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     request_path = models.URLField(max_length=500, blank=True)
     timestamp = models.DateTimeField(default=timezone.now)
@@ -80,10 +265,111 @@ class ErrorLog(models.Model):
     class Meta:
         db_table = 'logger_error_log'
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['-timestamp'], name='error_log_ts_idx'),
+        ]
     
     def __str__(self):
         return f"{self.level}: {self.message[:50]}... ({self.timestamp})"
 
+    @classmethod
+    def prepare_log_batch(cls, records):
+        """Escribe los contadores de ErrorGroup pendientes y enlaza cada muestra con su grupo."""
+        from .errorgroups import resolve_error_groups
+
+        resolve_error_groups(records)
+
+
+# Límites superiores (ms) del histograma de latencia de los rollups
+LATENCY_BUCKETS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Valor de user/organizacion NULL en la llave única de los rollups
+NULL_KEY = uuid.UUID(int=0)
 
 
+class RequestRollupBase(models.Model):
+    """
+    Agregado de RequestLog por intervalo de tiempo, ruta, método, clase de
+    estado, usuario y organización. Se mantiene incrementalmente al escribir
+    los logs (ver api.logger.rollups).
+    """
+    STATUS_CLASSES = (
+        ('1xx', '1xx'),
+        ('2xx', '2xx'),
+        ('3xx', '3xx'),
+        ('4xx', '4xx'),
+        ('5xx', '5xx'),
+    )
+
+    bucket = models.DateTimeField(help_text="Inicio del intervalo agregado")
+    route = models.CharField(max_length=500)
+    method = models.CharField(max_length=10, choices=RequestLog.METHODS)
+    status_class = models.CharField(max_length=3, choices=STATUS_CLASSES)
+    status_code = models.PositiveSmallIntegerField(default=0, help_text="0 en filas anteriores al código exacto")
+    user = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='+')
+    organizacion = models.ForeignKey(
+        'organization.Organizacion', on_delete=models.DO_NOTHING, db_constraint=False,
+        null=True, blank=True, related_name='+'
+    )
+
+    count = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)  # status_code >= 400
+    total_latency = models.FloatField(default=0)  # en milisegundos
+    max_latency = models.FloatField(default=0)
+
+    # Histograma de latencia: le_<n> cuenta peticiones con n-1 < latencia <= n ms
+    le_10 = models.PositiveIntegerField(default=0)
+    le_25 = models.PositiveIntegerField(default=0)
+    le_50 = models.PositiveIntegerField(default=0)
+    le_100 = models.PositiveIntegerField(default=0)
+    le_250 = models.PositiveIntegerField(default=0)
+    le_500 = models.PositiveIntegerField(default=0)
+    le_1000 = models.PositiveIntegerField(default=0)
+    le_2500 = models.PositiveIntegerField(default=0)
+    le_5000 = models.PositiveIntegerField(default=0)
+    le_inf = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def avg_latency(self):
+        return self.total_latency / self.count if self.count else 0.0
 
+    def __str__(self):
+        return f"{self.bucket} {self.method} {self.route} {self.status_class} ({self.count})"
+
+    @staticmethod
+    def key_constraint(name):
+        """
+        Una fila por llave. user y organizacion pueden ser NULL: se comparan
+        con COALESCE para que dos NULL cuenten como la misma llave.
+        """
+        return models.UniqueConstraint(
+            'bucket', 'route', 'method', 'status_class', 'status_code',
+            Coalesce('user', Value(NULL_KEY)), Coalesce('organizacion', Value(NULL_KEY)),
+            name=name,
+        )
+
+
+class RequestRollupMinute(RequestRollupBase):
+    class Meta:
+        db_table = 'logger_request_rollup_minute'
+        ordering = ['-bucket']
+        indexes = [
+            models.Index(fields=['bucket', 'route', 'method', 'status_class'], name='rollup_min_key_idx'),
+            models.Index(fields=['organizacion', 'bucket'], name='rollup_min_org_idx'),
+        ]
+        constraints = [RequestRollupBase.key_constraint('rollup_min_key_uniq')]
+
+
+class RequestRollupDay(RequestRollupBase):
+    class Meta:
+        db_table = 'logger_request_rollup_day'
+        ordering = ['-bucket']
+        indexes = [
+            models.Index(fields=['bucket', 'route', 'method', 'status_class'], name='rollup_day_key_idx'),
+            models.Index(fields=['organizacion', 'bucket'], name='rollup_day_org_idx'),
+            models.Index(fields=['user', 'bucket'], name='rollup_day_user_idx'),
+        ]
+        constraints = [RequestRollupBase.key_constraint('rollup_day_key_uniq')]
@@ -0,0 +1,182 @@
+"""
+Particionamiento mensual (PostgreSQL, RANGE sobre "timestamp") de las tablas de logs.
+
+Cada tabla de logs es una tabla particionada con una partición por mes llamada
+``<tabla>_pYYYYMM`` más una partición DEFAULT para filas fuera de rango. Las
+particiones vencidas se desconectan, se archivan como JSONL comprimido y se
+eliminan completas (sin DELETE fila por fila).
+"""
+import gzip
+import json
+import os
+import re
+from datetime import date
+
+from django.conf import settings
+from django.db import connections, transaction
+
+from core.routers import get_log_database
+
+PARTITIONED_TABLES = ('logger_request_log', 'logger_user_activity', 'logger_error_log')
+
+DEFAULTS = {
+    'MONTHS_AHEAD': 3,
+    'ARCHIVE_DIR': None,  # Por defecto <BASE_DIR>/logs/archive
+    # Meses que se conservan por tabla; None conserva todo
+    'RETENTION_MONTHS': {
+        'logger_request_log': 3,
+        'logger_user_activity': 12,
+        'logger_error_log': 6,
+    },
+}
+
+_PARTITION_SUFFIX = re.compile(r'_p(\d{4})(\d{2})$')
+
+
+def get_partition_settings():
+    config = dict(DEFAULTS)
+    config.update(getattr(settings, 'LOG_PARTITIONS', {}) or {})
+    if not config['ARCHIVE_DIR']:
+        config['ARCHIVE_DIR'] = str(settings.BASE_DIR / 'logs' / 'archive')
+    return config
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def add_months(value, months):
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table, month):
+    return f"{table}_p{month.year:04d}{month.month:02d}"
+
+
+def partition_month(table, name):
+    """Mes que cubre una partición, o None si el nombre no sigue la convención."""
+    if not name.startswith(f"{table}_p"):
+        return None
+    match = _PARTITION_SUFFIX.search(name)
+    if not match:
+        return None
+    return date(int(match.group(1)), int(match.group(2)), 1)
+
+
+def expired_partitions(table, names, today, retention_months):
+    """Particiones cuyo mes completo quedó fuera de la ventana de retención."""
+    if retention_months is None:
+        return []
+    cutoff = add_months(month_start(today), -retention_months)
+    expired = []
+    for name in names:
+        month = partition_month(table, name)
+        if month is not None and add_months(month, 1) <= cutoff:
+            expired.append(name)
+    return sorted(expired)
+
+
+def get_connection():
+    """Conexión del alias donde viven las tablas de logs (ver core.routers)."""
+    return connections[get_log_database()]
+
+
+def is_supported():
+    return get_connection().vendor == 'postgresql'
+
+
+def is_partitioned(table):
+    with get_connection().cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = %s",
+            [table],
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions(table):
+    with get_connection().cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = %s
+            ORDER BY child.relname
+            """,
+            [table],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def create_partition(table, month):
+    """
+    Crea la partición del mes si no existe. Si la partición DEFAULT tiene filas
+    de ese mes, se mueven a la nueva partición en la misma transacción.
+    """
+    name = partition_name(table, month)
+    if name in list_partitions(table):
+        return False
+
+    connection = get_connection()
+    qn = connection.ops.quote_name
+    default = f"{table}_default"
+    start, end = month, add_months(month, 1)
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {qn(table)} DETACH PARTITION {qn(default)}")
+        cursor.execute(
+            f"CREATE TABLE {qn(name)} PARTITION OF {qn(table)} FOR VALUES FROM (%s) TO (%s)",
+            [start.isoformat(), end.isoformat()],
+        )
+        cursor.execute(
+            f'WITH moved AS (DELETE FROM {qn(default)} WHERE "timestamp" >= %s AND "timestamp" < %s RETURNING *) '
+            f"INSERT INTO {qn(table)} SELECT * FROM moved",
+            [start.isoformat(), end.isoformat()],
+        )
+        cursor.execute(f"ALTER TABLE {qn(table)} ATTACH PARTITION {qn(default)} DEFAULT")
+    return True
+
+
+def archive_partition(name, archive_dir, chunk_size=5000):
+    """Escribe la partición en <archive_dir>/<name>.jsonl.gz y devuelve (ruta, filas)."""
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"{name}.jsonl.gz")
+    tmp_path = f"{path}.tmp"
+    rows = 0
+    connection = get_connection()
+    qn = connection.ops.quote_name
+    with transaction.atomic(using=connection.alias), connection.chunked_cursor() as cursor:
+        cursor.execute(f"SELECT row_to_json(t)::text FROM {qn(name)} t")
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as output:
+            while True:
+                batch = cursor.fetchmany(chunk_size)
+                if not batch:
+                    break
+                for (line,) in batch:
+                    output.write(line)
+                    output.write('\n')
+                rows += len(batch)
+    os.replace(tmp_path, path)
+    return path, rows
+
+
+def detach_partition(table, name):
+    connection = get_connection()
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {qn(table)} DETACH PARTITION {qn(name)}")
+
+
+def drop_table(name):
+    connection = get_connection()
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {connection.ops.quote_name(name)}")
+
+
+def write_manifest(archive_dir, entry):
+    """Agrega una línea al índice de archivos generados."""
+    os.makedirs(archive_dir, exist_ok=True)
+    with open(os.path.join(archive_dir, 'manifest.jsonl'), 'a', encoding='utf-8') as manifest:
+        manifest.write(json.dumps(entry, ensure_ascii=False) + '\n')
@@ -0,0 +1,258 @@
+"""
+Perfilado opcional de requests lentas.
+
+Dos modos:
+
+* ``sampling``: un hilo compartido toma cada SAMPLE_INTERVAL_MS la pila del
+  hilo que atiende la request (``sys._current_frames``). Es barato y se usa
+  para el umbral de latencia en una fracción de las requests
+  (THRESHOLD_SAMPLE_RATE): el perfil solo se guarda si la request terminó
+  siendo lenta.
+* ``cprofile``: perfil determinista con cProfile más el muestreo anterior.
+  Solo se activa explícitamente: encabezado con token, prefijo de ruta o
+  muestreo aleatorio.
+
+El perfil resultante (pilas colapsadas y funciones principales) se guarda en
+RequestProfile enlazado al RequestLog de la request.
+
+Configuración en ``settings.REQUEST_PROFILING`` (ver DEFAULTS).
+"""
+import cProfile
+import hmac
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+
+from .models import RequestLog, RequestProfile
+
+TRIGGER_THRESHOLD = 'threshold'
+TRIGGER_HEADER = 'header'
+TRIGGER_PATH = 'path'
+TRIGGER_SAMPLE = 'sample'
+
+MODE_SAMPLING = 'sampling'
+MODE_CPROFILE = 'cprofile'
+
+DEFAULTS = {
+    'ENABLED': False,
+    'THRESHOLD_MS': 2000,        # Requests más lentas se guardan (None desactiva el umbral)
+    'THRESHOLD_SAMPLE_RATE': 0.1,  # Fracción de requests vigiladas por el umbral
+    'SAMPLE_INTERVAL_MS': 10,    # Intervalo del muestreo de pilas
+    'SAMPLE_RATE': 0.0,          # Fracción de requests perfiladas con cProfile
+    'PATHS': [],                 # Prefijos de ruta perfilados siempre con cProfile
+    'HEADER': 'HTTP_X_PROFILE',  # Encabezado X-Profile: <HEADER_TOKEN>
+    'HEADER_TOKEN': '',          # Vacío desactiva el encabezado
+    'TOP_FUNCTIONS': 30,
+    'MAX_STACK_DEPTH': 128,
+}
+
+
+def get_profiling_settings():
+    config = dict(DEFAULTS)
+    config.update(getattr(settings, 'REQUEST_PROFILING', {}) or {})
+    return config
+
+
+def get_trigger(request, config):
+    """Motivo por el que la request se perfila con cProfile, o None."""
+    token = config['HEADER_TOKEN']
+    header = request.META.get(config['HEADER'], '').encode()
+    if token and hmac.compare_digest(header, token.encode()):
+        return TRIGGER_HEADER
+    if any(request.path.startswith(prefix) for prefix in config['PATHS']):
+        return TRIGGER_PATH
+    if config['SAMPLE_RATE'] and random.random() < config['SAMPLE_RATE']:
+        return TRIGGER_SAMPLE
+    return None
+
+
+def _frame_label(code):
+    filename = code.co_filename
+    base_dir = str(settings.BASE_DIR)
+    if filename.startswith(base_dir):
+        filename = os.path.relpath(filename, base_dir)
+    elif 'site-packages' in filename:
+        filename = filename.split('site-packages' + os.sep, 1)[1]
+    return f"{filename}:{code.co_name}"
+
+
+def collapse_stack(frame, max_depth=128):
+    """Pila en formato colapsado (raíz;...;hoja) para flame graphs."""
+    labels = []
+    while frame is not None and len(labels) < max_depth:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class StackSampler:
+    """
+    Hilo único que muestrea las pilas de los hilos registrados. Solo corre
+    mientras haya al menos una request perfilándose.
+    """
+
+    def __init__(self, interval=0.01, max_depth=128):
+        self.interval = interval
+        self.max_depth = max_depth
+        self._targets = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self, thread_id):
+        counter = Counter()
+        with self._lock:
+            self._targets[thread_id] = counter
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='request-profiler-sampler', daemon=True)
+                self._thread.start()
+        return counter
+
+    def stop(self, thread_id):
+        with self._lock:
+            return self._targets.pop(thread_id, None)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._targets:
+                    self._thread = None
+                    return
+                targets = list(self._targets.items())
+            frames = sys._current_frames()
+            for thread_id, counter in targets:
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    counter[collapse_stack(frame, self.max_depth)] += 1
+            del frames
+            time.sleep(self.interval)
+
+
+_sampler = None
+_sampler_lock = threading.Lock()
+
+
+def get_sampler(config):
+    global _sampler
+    if _sampler is None:
+        with _sampler_lock:
+            if _sampler is None:
+                _sampler = StackSampler(config['SAMPLE_INTERVAL_MS'] / 1000, config['MAX_STACK_DEPTH'])
+    return _sampler
+
+
+def top_functions_from_samples(stacks, limit=30):
+    """Funciones con más muestras propias (hoja) e inclusivas."""
+    own = Counter()
+    inclusive = Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(';')
+        own[frames[-1]] += count
+        for label in set(frames):
+            inclusive[label] += count
+    return [
+        {'function': label, 'self_samples': samples, 'samples': inclusive[label]}
+        for label, samples in own.most_common(limit)
+    ]
+
+
+def top_functions_from_profile(profiler, limit=30):
+    """Funciones con mayor tiempo propio según cProfile (tiempos en ms)."""
+    stats = pstats.Stats(profiler).stats
+    rows = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+    return [
+        {
+            'function': f"{filename}:{lineno}({name})",
+            'calls': calls,
+            'total_time': round(total_time * 1000, 3),
+            'cumulative_time': round(cumulative_time * 1000, 3),
+        }
+        for (filename, lineno, name), (primitive_calls, calls, total_time, cumulative_time, callers) in rows
+    ]
+
+
+def sampled_for_threshold(config):
+    """Si la request entra al muestreo del umbral; el azar va antes de medir la latencia."""
+    rate = config['THRESHOLD_SAMPLE_RATE']
+    return config['THRESHOLD_MS'] is not None and bool(rate) and random.random() < rate
+
+
+class ProfilingSession:
+    """Perfilado de una request en el hilo actual."""
+
+    def __init__(self, config, trigger=None):
+        self.config = config
+        self.trigger = trigger
+        self.thread_id = threading.get_ident()
+        self.profiler = cProfile.Profile() if trigger else None
+        self.stacks = None
+        self.duration = 0.0
+        self._start = None
+
+    @property
+    def mode(self):
+        return MODE_CPROFILE if self.profiler is not None else MODE_SAMPLING
+
+    def start(self):
+        self._start = time.perf_counter()
+        get_sampler(self.config).start(self.thread_id)
+        if self.profiler is not None:
+            self.profiler.enable()
+
+    def abort(self):
+        """Deshace un start() que falló a la mitad."""
+        if self.profiler is not None:
+            try:
+                self.profiler.disable()
+            except Exception:
+                pass
+        get_sampler(self.config).stop(self.thread_id)
+
+    def stop(self):
+        if self.profiler is not None:
+            self.profiler.disable()
+        self.stacks = get_sampler(self.config).stop(self.thread_id) or Counter()
+        self.duration = (time.perf_counter() - self._start) * 1000
+
+    def should_keep(self):
+        threshold = self.config['THRESHOLD_MS']
+        return self.trigger is not None or (threshold is not None and self.duration >= threshold)
+
+    def build_profile(self, request, response):
+        """RequestProfile sin guardar; se guarda junto con el RequestLog."""
+        limit = self.config['TOP_FUNCTIONS']
+        if self.profiler is not None:
+            top = top_functions_from_profile(self.profiler, limit)
+        else:
+            top = top_functions_from_samples(self.stacks, limit)
+        return RequestProfile(
+            method=request.method,
+            path=request.path[:500],
+            status_code=response.status_code,
+            duration=round(self.duration, 3),
+            mode=self.mode,
+            trigger=self.trigger or TRIGGER_THRESHOLD,
+            sample_count=sum(self.stacks.values()),
+            collapsed_stacks='\n'.join(f"{stack} {count}" for stack, count in self.stacks.most_common()),
+            top_functions=top,
+        )
+
+
+def save_pending_profiles(model, records):
+    """Listener del buffer de logs: guarda los perfiles con el id del RequestLog ya escrito."""
+    if model is not RequestLog:
+        return
+    profiles = []
+    for record in records:
+        profile = getattr(record, 'pending_profile', None)
+        if profile is not None:
+            profile.request_log_id = record.pk
+            profile.route = record.route
+            profiles.append(profile)
+    if profiles:
+        RequestProfile.objects.bulk_create(profiles)
@@ -0,0 +1,96 @@
+"""
+Medición de consultas SQL por request.
+
+RequestLoggingMiddleware instala un QueryStats como execute wrapper en todas
+las conexiones del hilo mientras se atiende la request. El wrapper solo cuenta
+y mide tiempos; el fingerprint (SQL normalizado) se calcula una sola vez al
+final, para la consulta más lenta.
+
+Configuración en ``settings.REQUEST_DB_STATS`` (ver DEFAULTS).
+"""
+import re
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import connections
+
+DEFAULTS = {
+    'ENABLED': True,
+    # Ejecuciones del mismo SQL en una request a partir de las cuales se marca N+1
+    'DUPLICATE_THRESHOLD': 3,
+}
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*(?:%s|\?|\$\d+)\s*,?)+\)', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+
+def get_db_stats_settings():
+    config = dict(DEFAULTS)
+    config.update(getattr(settings, 'REQUEST_DB_STATS', {}) or {})
+    return config
+
+
+def fingerprint_sql(sql):
+    """
+    Normaliza una consulta para agrupar ejecuciones equivalentes:
+    literales -> ?, listas IN de cualquier tamaño -> IN (...), espacios colapsados.
+    """
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+class QueryStats:
+    """Execute wrapper que acumula número de consultas y tiempo en base de datos."""
+
+    def __init__(self, duplicate_threshold=3):
+        self.duplicate_threshold = duplicate_threshold
+        self.count = 0
+        self.total_time = 0.0      # en milisegundos
+        self.slowest_time = 0.0
+        self.slowest_sql = ''
+        self.executions = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.count += 1
+            self.total_time += elapsed
+            self.executions[sql] += 1
+            if elapsed > self.slowest_time:
+                self.slowest_time = elapsed
+                self.slowest_sql = sql
+
+    @property
+    def has_duplicates(self):
+        return bool(self.executions) and max(self.executions.values()) >= self.duplicate_threshold
+
+    def slowest_fingerprint(self):
+        return fingerprint_sql(self.slowest_sql) if self.slowest_sql else ''
+
+    def install(self):
+        """Agrega el wrapper a todas las conexiones configuradas (del hilo actual)."""
+        for alias in connections:
+            connections[alias].execute_wrappers.append(self)
+
+    def uninstall(self):
+        for alias in connections:
+            wrappers = connections[alias].execute_wrappers
+            if self in wrappers:
+                wrappers.remove(self)
+
+    def apply_to(self, log):
+        """Copia las métricas a un RequestLog sin guardar."""
+        log.query_count = self.count
+        log.db_time = round(self.total_time, 3)
+        log.slowest_query_time = round(self.slowest_time, 3)
+        log.duplicate_queries = self.has_duplicates
+        log.raw_slowest_query = self.slowest_fingerprint()
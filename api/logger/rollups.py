@@ -0,0 +1,181 @@
+"""
+Rollups de RequestLog por minuto y por día.
+
+Los agregados se actualizan incrementalmente cada vez que el buffer de logs
+escribe un lote de RequestLog (ver api.logger.sink.register_flush_listener), de
+modo que las estadísticas no necesitan recorrer la tabla cruda.
+
+Cada llave (intervalo, ruta, método, código de estado, usuario, organización)
+tiene una constraint única, así que dos hilos o workers que escriben la misma
+llave no duplican filas: el segundo suma con UPDATE. No se usa
+``bulk_create(update_conflicts=True)`` porque reemplaza los contadores en lugar
+de sumarlos.
+"""
+import re
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import IntegrityError, router, transaction
+from django.db.models import F, Max, Sum, Value
+from django.db.models.functions import Greatest
+from django.urls import Resolver404, resolve
+from django.utils import timezone
+
+from .models import LATENCY_BUCKETS, RequestLog, RequestRollupDay, RequestRollupMinute
+
+KEY_FIELDS = ('bucket', 'route', 'method', 'status_class', 'status_code', 'user_id', 'organizacion_id')
+HISTOGRAM_FIELDS = tuple(f'le_{bound}' for bound in LATENCY_BUCKETS) + ('le_inf',)
+COUNTER_FIELDS = ('count', 'error_count', 'total_latency') + HISTOGRAM_FIELDS
+
+
+def truncate_minute(value):
+    return timezone.localtime(value).replace(second=0, microsecond=0)
+
+
+def truncate_day(value):
+    return timezone.localtime(value).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def get_status_class(status_code):
+    return f"{min(max(status_code // 100, 1), 5)}xx"
+
+
+def get_histogram_field(latency):
+    for bound in LATENCY_BUCKETS:
+        if latency <= bound:
+            return f'le_{bound}'
+    return 'le_inf'
+
+
+_REGEX_GROUP = re.compile(r'\(\?P<(\w+)>[^)]*\)')
+
+
+def normalize_route(route):
+    """
+    Convierte el patrón resuelto en una plantilla legible:
+    'api/v1/customs/^pedimentos/(?P<pk>[^/.]+)/$' -> '/api/v1/customs/pedimentos/<pk>/'
+    """
+    route = _REGEX_GROUP.sub(r'<\1>', route)
+    route = route.replace('/^', '/').lstrip('^').replace('$', '')
+    return '/' + route.lstrip('/')
+
+
+def resolve_route(path):
+    """Devuelve el patrón de URL que atiende el path, o el path si no resuelve."""
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return path
+    return normalize_route(match.route) if match.route else path
+
+
+def _get_route(record):
+    return getattr(record, 'route', None) or resolve_route(record.path)
+
+
+def _get_organizacion_id(record):
+    if not record.user_id:
+        return None
+    return getattr(record.user, 'organizacion_id', None)
+
+
+def _accumulate(records, truncate):
+    groups = defaultdict(lambda: dict.fromkeys(COUNTER_FIELDS + ('max_latency',), 0))
+    for record in records:
+        key = (
+            truncate(record.timestamp),
+            _get_route(record)[:500],
+            record.method,
+            get_status_class(record.status_code),
+            record.status_code,
+            record.user_id,
+            _get_organizacion_id(record),
+        )
+        acc = groups[key]
+        acc['count'] += 1
+        acc['error_count'] += 1 if record.status_code >= 400 else 0
+        acc['total_latency'] += record.response_time
+        acc['max_latency'] = max(acc['max_latency'], record.response_time)
+        acc[get_histogram_field(record.response_time)] += 1
+    return groups
+
+
+def _apply(model, groups):
+    using = router.db_for_write(model)
+    for key, acc in groups.items():
+        filtro = dict(zip(KEY_FIELDS, key))
+        updates = {field: F(field) + acc[field] for field in COUNTER_FIELDS if acc[field]}
+        updates['max_latency'] = Greatest('max_latency', Value(float(acc['max_latency'])))
+        try:
+            with transaction.atomic(using=using):
+                if not model.objects.filter(**filtro).update(**updates):
+                    model.objects.create(**filtro, **acc)
+        except IntegrityError:
+            # Otro hilo o worker creó la llave al mismo tiempo (constraint única)
+            model.objects.filter(**filtro).update(**updates)
+
+
+def update_rollups(records):
+    """Suma un lote de RequestLog a los rollups por minuto y por día."""
+    records = list(records)
+    if not records:
+        return
+    _apply(RequestRollupMinute, _accumulate(records, truncate_minute))
+    _apply(RequestRollupDay, _accumulate(records, truncate_day))
+
+
+def handle_log_flush(model, records):
+    """Listener del buffer de logs."""
+    if model is RequestLog:
+        update_rollups(records)
+
+
+# ----------------------------------------------------------------------
+# Lectura
+# ----------------------------------------------------------------------
+def count_since(since, day_queryset=None, minute_queryset=None):
+    """
+    Peticiones desde `since`: rollups por minuto para el día parcial inicial y
+    rollups por día para los días completos posteriores.
+    """
+    day_queryset = RequestRollupDay.objects.all() if day_queryset is None else day_queryset
+    minute_queryset = RequestRollupMinute.objects.all() if minute_queryset is None else minute_queryset
+    first_full_day = truncate_day(since)
+    if first_full_day < since:
+        first_full_day += timedelta(days=1)
+    partial = minute_queryset.filter(bucket__gte=since, bucket__lt=first_full_day).aggregate(total=Sum('count'))['total']
+    full = day_queryset.filter(bucket__gte=first_full_day).aggregate(total=Sum('count'))['total']
+    return (partial or 0) + (full or 0)
+
+
+def percentile_from_histogram(histogram, max_latency, percentile):
+    """Límite superior del bucket que contiene el percentil pedido (0-100)."""
+    total = sum(histogram.values())
+    if not total:
+        return 0.0
+    threshold = total * percentile / 100
+    cumulative = 0
+    for bound in LATENCY_BUCKETS:
+        cumulative += histogram.get(f'le_{bound}') or 0
+        if cumulative >= threshold:
+            return float(min(bound, max_latency))
+    return float(max_latency)
+
+
+def summarize(queryset):
+    """Totales, latencia promedio/máxima y percentiles de un queryset de rollups."""
+    aggregates = {field: Sum(field) for field in COUNTER_FIELDS}
+    aggregates['max_latency'] = Max('max_latency')
+    totals = queryset.aggregate(**aggregates)
+    count = totals['count'] or 0
+    max_latency = totals['max_latency'] or 0.0
+    histogram = {field: totals[field] or 0 for field in HISTOGRAM_FIELDS}
+    return {
+        'count': count,
+        'error_count': totals['error_count'] or 0,
+        'avg_response_time': round((totals['total_latency'] or 0.0) / count, 2) if count else 0.0,
+        'max_response_time': round(max_latency, 2),
+        'p50_response_time': percentile_from_histogram(histogram, max_latency, 50),
+        'p95_response_time': percentile_from_histogram(histogram, max_latency, 95),
+        'p99_response_time': percentile_from_histogram(histogram, max_latency, 99),
+    }
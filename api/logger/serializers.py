@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import RequestLog, UserActivity, ErrorLog
+from .models import RequestLog, RequestProfile, UserActivity, ErrorLog, ErrorGroup
 from api.cuser.models import CustomUser
 
 class UserSimpleSerializer(serializers.ModelSerializer):
@@ -9,11 +9,24 @@ class UserSimpleSerializer(serializers.ModelSerializer):
 
 class RequestLogSerializer(serializers.ModelSerializer):
     user = UserSimpleSerializer(read_only=True)
+    user_agent = serializers.CharField(source='user_agent.value', read_only=True, default='')
+    referer = serializers.CharField(source='referer.value', read_only=True, default='')
+    slowest_query = serializers.CharField(source='slowest_query.value', read_only=True, default='')
     
     class Meta:
         model = RequestLog
         fields = '__all__'
 
+class RequestProfileListSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RequestProfile
+        exclude = ['collapsed_stacks', 'top_functions']
+
+class RequestProfileSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RequestProfile
+        fields = '__all__'
+
 class UserActivitySerializer(serializers.ModelSerializer):
     user = UserSimpleSerializer(read_only=True)
     
@@ -26,4 +39,9 @@ class ErrorLogSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = ErrorLog
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+class ErrorGroupSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ErrorGroup
+        fields = '__all__'
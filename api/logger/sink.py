@@ -0,0 +1,311 @@
+"""
+Buffer de escritura para los logs de la aplicación.
+
+Los middlewares y utilidades de logging no escriben directamente en la base de
+datos: encolan instancias de modelo (sin guardar) en una cola acotada en
+memoria y un hilo en segundo plano las vacía con ``bulk_create`` cuando se
+alcanza el tamaño de lote o el intervalo de tiempo configurado.
+
+Configuración en ``settings.LOG_SINK`` (ver valores por defecto en DEFAULTS).
+"""
+import atexit
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+from core.metrics import LOG_DROPPED, LOG_QUEUE_SIZE
+
+logger = logging.getLogger('api.logger')
+
+OVERFLOW_DROP = 'drop'
+OVERFLOW_SAMPLE = 'sample'
+OVERFLOW_BLOCK = 'block'
+OVERFLOW_POLICIES = (OVERFLOW_DROP, OVERFLOW_SAMPLE, OVERFLOW_BLOCK)
+
+DEFAULTS = {
+    'ENABLED': True,            # False: escritura síncrona (un INSERT por registro)
+    'MAX_QUEUE_SIZE': 10000,    # Registros máximos en memoria
+    'BATCH_SIZE': 500,          # Registros por bulk_create
+    'FLUSH_INTERVAL': 2.0,      # Segundos máximos entre escrituras
+    'OVERFLOW_POLICY': OVERFLOW_DROP,
+    'SAMPLE_THRESHOLD': 0.75,   # Ocupación a partir de la cual se muestrea (policy=sample)
+    'SAMPLE_RATE': 0.1,         # Fracción de registros conservados al muestrear
+    'BLOCK_TIMEOUT': 0.5,       # Espera máxima en segundos (policy=block)
+    'BACKGROUND': True,         # False: sin hilo; la cola solo se escribe con flush() (pruebas)
+}
+
+
+def get_sink_settings():
+    config = dict(DEFAULTS)
+    config.update(getattr(settings, 'LOG_SINK', {}) or {})
+    return config
+
+
+class LogSink:
+    """
+    Cola acotada de registros de log con escritura por lotes.
+
+    Acepta instancias de cualquier modelo (RequestLog, UserActivity, ErrorLog...)
+    y las agrupa por modelo al escribir.
+    """
+
+    def __init__(self, max_queue_size=10000, batch_size=500, flush_interval=2.0,
+                 overflow_policy=OVERFLOW_DROP, sample_threshold=0.75, sample_rate=0.1,
+                 block_timeout=0.5, background=True):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Política de desbordamiento inválida: {overflow_policy}")
+
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self.sample_threshold = sample_threshold
+        self.sample_rate = sample_rate
+        self.block_timeout = block_timeout
+        self.background = background
+
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._pid = None
+
+        self.enqueued = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.failed = 0
+
+    @classmethod
+    def from_settings(cls):
+        config = get_sink_settings()
+        return cls(
+            max_queue_size=config['MAX_QUEUE_SIZE'],
+            batch_size=config['BATCH_SIZE'],
+            flush_interval=config['FLUSH_INTERVAL'],
+            overflow_policy=config['OVERFLOW_POLICY'],
+            sample_threshold=config['SAMPLE_THRESHOLD'],
+            sample_rate=config['SAMPLE_RATE'],
+            block_timeout=config['BLOCK_TIMEOUT'],
+            background=config['BACKGROUND'],
+        )
+
+    # ------------------------------------------------------------------
+    # Productores
+    # ------------------------------------------------------------------
+    def emit(self, record):
+        """
+        Encola una instancia de modelo sin guardar.
+        Devuelve True si el registro fue aceptado y False si se descartó.
+        """
+        self._ensure_worker()
+
+        if self.overflow_policy == OVERFLOW_SAMPLE:
+            if self._queue.qsize() >= self.max_queue_size * self.sample_threshold:
+                if random.random() >= self.sample_rate:
+                    self._count('dropped')
+                    return False
+
+        try:
+            if self.overflow_policy == OVERFLOW_BLOCK:
+                self._queue.put(record, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(record)
+        except queue.Full:
+            self._count('dropped')
+            return False
+
+        self._count('enqueued')
+        return True
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+    def flush(self):
+        """Vacía la cola completa en la base de datos. Devuelve los registros escritos."""
+        total = 0
+        with self._flush_lock:
+            while True:
+                batch = self._drain(self.batch_size)
+                if not batch:
+                    break
+                total += self._write(batch)
+            self._run_periodic_listeners()
+        LOG_QUEUE_SIZE.set(self._queue.qsize())
+        return total
+
+    def _drain(self, limit):
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        by_model = defaultdict(list)
+        for record in batch:
+            by_model[type(record)].append(record)
+
+        written = 0
+        for model, records in by_model.items():
+            try:
+                # Hook opcional del modelo para completar los registros antes de escribirlos
+                prepare = getattr(model, 'prepare_log_batch', None)
+                if prepare is not None:
+                    prepare(records)
+                model.objects.bulk_create(records, batch_size=self.batch_size)
+            except Exception as e:
+                self._count('failed', len(records))
+                logger.error(f"Error escribiendo {len(records)} registros de {model.__name__}: {e}")
+                continue
+
+            written += len(records)
+            for callback in _flush_listeners:
+                try:
+                    callback(model, records)
+                except Exception as e:
+                    logger.error(f"Error en listener de flush {callback!r}: {e}")
+
+        self._count('flushed', written)
+        return written
+
+    def _run_periodic_listeners(self):
+        for callback in _periodic_listeners:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Error en listener periódico {callback!r}: {e}")
+
+    # ------------------------------------------------------------------
+    # Hilo en segundo plano
+    # ------------------------------------------------------------------
+    def _ensure_worker(self):
+        if not self.background:
+            return
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid and self._thread.is_alive():
+            return
+        with self._lock:
+            # Después de un fork (gunicorn --preload) el hilo del padre no existe en el hijo
+            if self._thread is not None and self._pid == pid and self._thread.is_alive():
+                return
+            self._pid = pid
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name='log-sink-flusher', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        last_flush = time.monotonic()
+        while not self._stop_event.is_set():
+            LOG_QUEUE_SIZE.set(self._queue.qsize())
+            remaining = self.flush_interval - (time.monotonic() - last_flush)
+            if self._queue.qsize() < self.batch_size and remaining > 0:
+                self._stop_event.wait(min(remaining, 0.1))
+                continue
+            close_old_connections()
+            with self._flush_lock:
+                batch = self._drain(self.batch_size)
+                if batch:
+                    self._write(batch)
+                self._run_periodic_listeners()
+            last_flush = time.monotonic()
+        connections.close_all()
+
+    def stop(self, timeout=5.0):
+        """Detiene el hilo y escribe lo pendiente. Se llama al terminar el worker."""
+        self._stop_event.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout)
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Error vaciando el buffer de logs al terminar: {e}")
+        stats = self.stats()
+        if stats['dropped'] or stats['failed']:
+            logger.warning(f"Buffer de logs detenido: {stats}")
+
+    # ------------------------------------------------------------------
+    # Contadores
+    # ------------------------------------------------------------------
+    def _count(self, name, amount=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+        if name == 'dropped':
+            LOG_DROPPED.inc(amount)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'queue_size': self._queue.qsize(),
+                'max_queue_size': self.max_queue_size,
+                'overflow_policy': self.overflow_policy,
+                'enqueued': self.enqueued,
+                'flushed': self.flushed,
+                'dropped': self.dropped,
+                'failed': self.failed,
+            }
+
+
+class SyncLogSink(LogSink):
+    """Escritura inmediata, un registro a la vez (LOG_SINK['ENABLED'] = False)."""
+
+    def __init__(self):
+        super().__init__(background=False)
+
+    def emit(self, record):
+        self._count('enqueued')
+        return self._write([record]) == 1
+
+
+_sink = None
+_sink_lock = threading.Lock()
+_flush_listeners = []
+_periodic_listeners = []
+
+
+def register_flush_listener(callback):
+    """
+    Registra una función que recibe (modelo, registros) después de cada
+    bulk_create exitoso. Permite derivar datos agregados de los logs.
+    """
+    if callback not in _flush_listeners:
+        _flush_listeners.append(callback)
+
+
+def register_periodic_listener(callback):
+    """
+    Registra una función sin argumentos que se llama en cada intervalo del
+    hilo (FLUSH_INTERVAL), en cada flush() y al detener el buffer, aunque no
+    haya registros que escribir. Sirve para escribir datos acumulados en
+    memoria que no dependen de un lote.
+    """
+    if callback not in _periodic_listeners:
+        _periodic_listeners.append(callback)
+
+
+def get_log_sink():
+    """Devuelve el buffer de logs del proceso, creándolo la primera vez."""
+    global _sink
+    if _sink is None:
+        with _sink_lock:
+            if _sink is None:
+                if get_sink_settings()['ENABLED']:
+                    _sink = LogSink.from_settings()
+                else:
+                    _sink = SyncLogSink()
+                atexit.register(_sink.stop)
+    return _sink
+
+
+def emit_log(record):
+    """Atajo para encolar un registro en el buffer del proceso."""
+    return get_log_sink().emit(record)
@@ -1,3 +1,704 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import threading
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
\ No newline at end of file
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, transaction
+from django.db.models import QuerySet
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from api.licence.models import Licencia
+from api.organization.models import Organizacion
+from .models import (
+    RequestLog, RequestProfile, UserActivity, RequestRollupDay, RequestRollupMinute,
+    UserAgent, Referer, ErrorGroup, ErrorLog, _lookup_cache,
+)
+from .rollups import update_rollups, summarize, count_since
+from .sink import LogSink, OVERFLOW_DROP, OVERFLOW_SAMPLE, OVERFLOW_BLOCK
+from .querystats import QueryStats, fingerprint_sql
+from .profiling import top_functions_from_samples
+from .bodycapture import get_body_capture_settings, redact_body
+from . import errorgroups
+from .errorgroups import ErrorGroupTracker, fingerprint_exception
+from .middleware import ErrorLoggingMiddleware
+from core.metrics import Counter, Gauge, Histogram, Registry, histogram_quantile
+from core.routers import LogDatabaseRouter, get_log_database, ids_for_filter
+from .partitions import add_months, partition_name, partition_month, expired_partitions
+
+User = get_user_model()
+
+# Las clases de prueba declaran databases = '__all__' porque api.logger puede
+# estar configurado en un alias propio (core.routers.LogDatabaseRouter).
+
+
+def build_request_log(**kwargs):
+    data = {
+        'ip_address': '127.0.0.1',
+        'method': 'GET',
+        'path': '/api/v1/customs/pedimentos/',
+        'status_code': 200,
+        'response_time': 12.5,
+    }
+    data.update(kwargs)
+    return RequestLog(**data)
+
+
+class LogSinkTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="loguser", password="logpass")
+
+    def test_flush_writes_batches_per_model(self):
+        sink = LogSink(max_queue_size=100, batch_size=3, background=False)
+        for _ in range(7):
+            sink.emit(build_request_log(user=self.user))
+        sink.emit(UserActivity(user=self.user, action='view', ip_address='127.0.0.1'))
+
+        written = sink.flush()
+
+        self.assertEqual(written, 8)
+        self.assertEqual(RequestLog.objects.count(), 7)
+        self.assertEqual(UserActivity.objects.count(), 1)
+        self.assertEqual(sink.stats()['flushed'], 8)
+        self.assertEqual(sink.stats()['queue_size'], 0)
+
+    def test_drop_policy_counts_dropped_rows(self):
+        sink = LogSink(max_queue_size=2, overflow_policy=OVERFLOW_DROP, background=False)
+        accepted = [sink.emit(build_request_log()) for _ in range(5)]
+
+        self.assertEqual(accepted, [True, True, False, False, False])
+        self.assertEqual(sink.stats()['dropped'], 3)
+        sink.flush()
+        self.assertEqual(RequestLog.objects.count(), 2)
+
+    def test_sample_policy_discards_above_threshold(self):
+        sink = LogSink(max_queue_size=10, overflow_policy=OVERFLOW_SAMPLE,
+                       sample_threshold=0.5, sample_rate=0.0, background=False)
+        for _ in range(10):
+            sink.emit(build_request_log())
+
+        self.assertEqual(sink.stats()['queue_size'], 5)
+        self.assertEqual(sink.stats()['dropped'], 5)
+
+    def test_block_policy_gives_up_after_timeout(self):
+        sink = LogSink(max_queue_size=1, overflow_policy=OVERFLOW_BLOCK,
+                       block_timeout=0.01, background=False)
+        self.assertTrue(sink.emit(build_request_log()))
+        self.assertFalse(sink.emit(build_request_log()))
+        self.assertEqual(sink.stats()['dropped'], 1)
+
+    def test_invalid_policy_raises(self):
+        with self.assertRaises(ValueError):
+            LogSink(overflow_policy='ignore')
+
+    def test_stop_flushes_pending_records(self):
+        sink = LogSink(max_queue_size=10, background=False)
+        sink.emit(build_request_log())
+        sink.stop()
+        self.assertEqual(RequestLog.objects.count(), 1)
+
+
+class RequestRollupTests(APITestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.lic = Licencia.objects.create(nombre="LicTest", almacenamiento=100)
+        self.org = Organizacion.objects.create(nombre="OrgTest", licencia=self.lic, is_active=True, is_verified=True)
+        self.user = User.objects.create_user(username="loguser", password="logpass", organizacion=self.org)
+        self.superuser = User.objects.create_superuser(username="superuser", password="superpass")
+        self.client = APIClient()
+
+    def test_update_rollups_accumulates_by_key(self):
+        now = timezone.now()
+        logs = [
+            build_request_log(user=self.user, timestamp=now, response_time=5),
+            build_request_log(user=self.user, timestamp=now, response_time=300),
+            build_request_log(user=self.user, timestamp=now, status_code=500, response_time=7000),
+            build_request_log(timestamp=now, method='POST', response_time=20),
+        ]
+        update_rollups(logs)
+        update_rollups([build_request_log(user=self.user, timestamp=now, response_time=40)])
+
+        day = RequestRollupDay.objects.get(user=self.user, status_class='2xx')
+        self.assertEqual(day.count, 3)
+        self.assertEqual(day.organizacion_id, self.org.id)
+        self.assertEqual(day.route, '/api/v1/customs/pedimentos/')
+        self.assertEqual((day.le_10, day.le_50, day.le_500), (1, 1, 1))
+        self.assertEqual(day.max_latency, 300)
+
+        error = RequestRollupMinute.objects.get(user=self.user, status_class='5xx')
+        self.assertEqual((error.count, error.error_count, error.le_inf), (1, 1, 1))
+
+        summary = summarize(RequestRollupDay.objects.all())
+        self.assertEqual(summary['count'], 5)
+        self.assertEqual(summary['error_count'], 1)
+        self.assertEqual(summary['max_response_time'], 7000)
+
+    def test_count_since_combines_minute_and_day_rollups(self):
+        now = timezone.now()
+        update_rollups([build_request_log(timestamp=now - timedelta(days=d)) for d in range(10)])
+        self.assertEqual(count_since(now - timedelta(days=3, minutes=1)), 4)
+
+    def test_statistics_endpoint_reads_rollups(self):
+        update_rollups([build_request_log(user=self.user), build_request_log(method='POST', status_code=404)])
+        self.client.force_authenticate(user=self.superuser)
+        response = self.client.get(reverse('requestlog-statistics'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_requests'], 2)
+        self.assertEqual(response.data['today_requests'], 2)
+        self.assertEqual(response.data['error_count'], 1)
+        self.assertEqual(response.data['top_endpoints'][0]['path'], '/api/v1/customs/pedimentos/')
+        self.assertEqual(
+            [dict(row) for row in response.data['status_codes']],
+            [{'status_code': 200, 'count': 1}, {'status_code': 404, 'count': 1}],
+        )
+        self.assertEqual(
+            response.data['status_classes'],
+            [{'status_class': '2xx', 'count': 1}, {'status_class': '4xx', 'count': 1}],
+        )
+
+    def test_rollup_key_is_unique_with_null_user(self):
+        now = timezone.now()
+        update_rollups([build_request_log(timestamp=now)])
+        update_rollups([build_request_log(timestamp=now, status_code=201)])
+        row = RequestRollupMinute.objects.get(user__isnull=True, status_code=200)
+        with self.assertRaises(IntegrityError), transaction.atomic(using=get_log_database()):
+            RequestRollupMinute.objects.create(
+                bucket=row.bucket, route=row.route, method=row.method,
+                status_class=row.status_class, status_code=row.status_code,
+            )
+
+    def test_concurrent_create_falls_back_to_update(self):
+        now = timezone.now()
+        update_rollups([build_request_log(timestamp=now)])
+        # Simula otro worker que creó la llave entre el UPDATE y el INSERT
+        original_update = QuerySet.update
+        calls = []
+
+        def update_once_empty(queryset, **kwargs):
+            calls.append(queryset.model)
+            if len(calls) == 1:
+                return 0
+            return original_update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', update_once_empty):
+            update_rollups([build_request_log(timestamp=now)])
+        self.assertEqual(RequestRollupMinute.objects.get(user__isnull=True).count, 2)
+        self.assertEqual(RequestRollupDay.objects.get(user__isnull=True).count, 2)
+
+
+class LogPartitionTests(TestCase):
+    databases = '__all__'
+
+    def test_partition_naming_round_trip(self):
+        name = partition_name('logger_request_log', date(2025, 7, 1))
+        self.assertEqual(name, 'logger_request_log_p202507')
+        self.assertEqual(partition_month('logger_request_log', name), date(2025, 7, 1))
+        self.assertIsNone(partition_month('logger_request_log', 'logger_request_log_default'))
+        self.assertIsNone(partition_month('logger_error_log', name))
+
+    def test_add_months_crosses_years(self):
+        self.assertEqual(add_months(date(2025, 11, 1), 3), date(2026, 2, 1))
+        self.assertEqual(add_months(date(2025, 1, 1), -1), date(2024, 12, 1))
+
+    def test_expired_partitions_respect_retention(self):
+        table = 'logger_request_log'
+        names = [partition_name(table, date(2025, m, 1)) for m in range(1, 8)] + [f'{table}_default']
+        expired = expired_partitions(table, names, date(2025, 7, 15), retention_months=3)
+        self.assertEqual(expired, [partition_name(table, date(2025, m, 1)) for m in range(1, 4)])
+        self.assertEqual(expired_partitions(table, names, date(2025, 7, 15), retention_months=None), [])
+
+
+class RequestLogLookupTests(APITestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        _lookup_cache.clear()
+        self.superuser = User.objects.create_superuser(username="superuser", password="superpass")
+        self.client = APIClient()
+
+    def test_lookup_values_are_stored_once(self):
+        sink = LogSink(max_queue_size=10, background=False)
+        for agent in ('Mozilla/5.0', 'Mozilla/5.0', 'curl/8.0'):
+            log = build_request_log()
+            log.raw_user_agent = agent
+            log.raw_referer = 'https://efc.example/'
+            sink.emit(log)
+        sink.flush()
+
+        self.assertEqual(UserAgent.objects.count(), 2)
+        self.assertEqual(Referer.objects.count(), 1)
+        agents = RequestLog.objects.order_by('id').values_list('user_agent__value', flat=True)
+        self.assertEqual(list(agents), ['Mozilla/5.0', 'Mozilla/5.0', 'curl/8.0'])
+
+    def test_middleware_records_route_template_and_view_name(self):
+        captured = []
+        self.client.force_authenticate(user=self.superuser)
+        with mock.patch('api.logger.middleware.emit_log', side_effect=captured.append):
+            self.client.get(reverse('requestlog-detail', args=[999]), HTTP_USER_AGENT='tests/1.0')
+
+        log = captured[-1]
+        self.assertEqual(log.path, '/api/v1/logger/requests/999/')
+        self.assertEqual(log.route, '/api/v1/logger/requests/<pk>/')
+        self.assertEqual(log.view_name, 'requestlog-detail')
+        self.assertEqual(log.raw_user_agent, 'tests/1.0')
+
+    def test_list_serializes_lookup_values(self):
+        log = build_request_log(route='/api/v1/customs/pedimentos/')
+        log.raw_user_agent = 'Mozilla/5.0'
+        RequestLog.prepare_log_batch([log])
+        log.save()
+
+        self.client.force_authenticate(user=self.superuser)
+        response = self.client.get(reverse('requestlog-list'), {'route': '/api/v1/customs/pedimentos/'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results'] if isinstance(response.data, dict) else response.data
+        self.assertEqual(results[0]['user_agent'], 'Mozilla/5.0')
+        self.assertEqual(results[0]['referer'], '')
+
+
+class QueryStatsTests(APITestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.superuser = User.objects.create_superuser(username="superuser", password="superpass")
+        self.client = APIClient()
+
+    def test_fingerprint_removes_literals_and_in_lists(self):
+        self.assertEqual(
+            fingerprint_sql("SELECT *  FROM t WHERE id IN (%s, %s, %s) AND name = 'x' LIMIT 21"),
+            "SELECT * FROM t WHERE id IN (...) AND name = ? LIMIT ?",
+        )
+
+    def test_detects_repeated_queries(self):
+        stats = QueryStats(duplicate_threshold=3)
+        stats.install()
+        try:
+            for pk in range(3):
+                User.objects.filter(pk=pk).first()
+        finally:
+            stats.uninstall()
+
+        self.assertEqual(stats.count, 3)
+        self.assertTrue(stats.has_duplicates)
+        self.assertGreater(stats.total_time, 0)
+        self.assertIn('FROM "cuser_customuser"', stats.slowest_fingerprint())
+
+    def test_middleware_records_db_cost(self):
+        captured = []
+        self.client.force_authenticate(user=self.superuser)
+        with mock.patch('api.logger.middleware.emit_log', side_effect=captured.append):
+            self.client.get(reverse('requestlog-list'))
+
+        log = captured[-1]
+        self.assertGreater(log.query_count, 0)
+        self.assertGreaterEqual(log.db_time, log.slowest_query_time)
+        self.assertTrue(log.raw_slowest_query.startswith('SELECT'))
+
+    def test_rank_by_db_time(self):
+        RequestLog.objects.bulk_create([
+            build_request_log(query_count=2, db_time=5),
+            build_request_log(query_count=40, db_time=120, duplicate_queries=True),
+        ])
+        self.client.force_authenticate(user=self.superuser)
+        response = self.client.get(reverse('requestlog-list'), {'ordering': '-db_time', 'query_count__gte': 10})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results'] if isinstance(response.data, dict) else response.data
+        self.assertEqual([row['query_count'] for row in results], [40])
+        self.assertTrue(results[0]['duplicate_queries'])
+
+
+class RequestProfilingTests(APITestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="loguser", password="logpass")
+        self.superuser = User.objects.create_superuser(username="superuser", password="superpass")
+        self.client = APIClient()
+
+    def _get_captured(self, **extra):
+        captured = []
+        self.client.force_authenticate(user=self.superuser)
+        with mock.patch('api.logger.middleware.emit_log', side_effect=captured.append):
+            self.client.get(reverse('requestlog-list'), **extra)
+        return captured[-1]
+
+    @override_settings(REQUEST_PROFILING={'ENABLED': True, 'THRESHOLD_MS': None, 'HEADER_TOKEN': 'secreto'})
+    def test_header_profile_is_saved_with_request_log(self):
+        log = self._get_captured(HTTP_X_PROFILE='secreto')
+        profile = log.pending_profile
+        self.assertEqual((profile.mode, profile.trigger), ('cprofile', 'header'))
+        self.assertTrue(profile.top_functions)
+
+        sink = LogSink(max_queue_size=10, background=False)
+        sink.emit(log)
+        sink.flush()
+
+        saved = RequestProfile.objects.get()
+        self.assertEqual(saved.request_log_id, log.pk)
+        self.assertEqual(saved.route, '/api/v1/logger/requests/')
+
+    @override_settings(REQUEST_PROFILING={'ENABLED': True, 'THRESHOLD_MS': 60000, 'HEADER_TOKEN': 'secreto'})
+    def test_fast_requests_and_wrong_token_are_not_kept(self):
+        log = self._get_captured(HTTP_X_PROFILE='otro')
+        self.assertIsNone(getattr(log, 'pending_profile', None))
+        log = self._get_captured(HTTP_X_PROFILE='señal')
+        self.assertIsNone(getattr(log, 'pending_profile', None))
+
+    @override_settings(REQUEST_PROFILING={'ENABLED': True, 'THRESHOLD_MS': 0, 'THRESHOLD_SAMPLE_RATE': 0})
+    def test_threshold_only_profiles_sampled_requests(self):
+        with mock.patch('api.logger.middleware.ProfilingSession') as session_class:
+            log = self._get_captured()
+        session_class.assert_not_called()
+        self.assertIsNone(getattr(log, 'pending_profile', None))
+
+    @override_settings(REQUEST_PROFILING={'ENABLED': True, 'THRESHOLD_MS': None, 'HEADER_TOKEN': 'secreto'})
+    def test_profiler_start_error_does_not_break_request(self):
+        self.client.force_authenticate(user=self.superuser)
+        captured = []
+        with mock.patch('api.logger.profiling.cProfile.Profile.enable', side_effect=ValueError('ocupado')), \
+                mock.patch('api.logger.middleware.emit_log', side_effect=captured.append):
+            response = self.client.get(reverse('requestlog-list'), HTTP_X_PROFILE='secreto')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(getattr(captured[-1], 'pending_profile', None))
+
+    def test_top_functions_from_samples(self):
+        top = top_functions_from_samples({'a;b;c': 3, 'a;b': 2, 'a;d': 1})
+        self.assertEqual(top[0], {'function': 'c', 'self_samples': 3, 'samples': 3})
+        self.assertEqual(top[1], {'function': 'b', 'self_samples': 2, 'samples': 5})
+
+    def test_profiles_api_is_superuser_only(self):
+        profile = RequestProfile.objects.create(
+            method='POST', path='/api/v1/record/documents/bulk-download/', status_code=200,
+            duration=3500, mode='sampling', trigger='threshold', sample_count=2,
+            collapsed_stacks='views.py:post;zipfile.py:write 2', top_functions=[],
+        )
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.client.get(reverse('requestprofile-list')).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.superuser)
+        response = self.client.get(reverse('requestprofile-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results'] if isinstance(response.data, dict) else response.data
+        self.assertNotIn('collapsed_stacks', results[0])
+
+        response = self.client.get(reverse('requestprofile-collapsed', args=[profile.pk]))
+        self.assertEqual(response.content.decode(), 'views.py:post;zipfile.py:write 2')
+
+
+class BodyCaptureTests(APITestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def _post_captured(self, *args, **kwargs):
+        captured = []
+        with mock.patch('api.logger.middleware.emit_log', side_effect=captured.append):
+            self.client.post(*args, **kwargs)
+        return captured[-1]
+
+    def test_json_body_is_captured_with_redaction(self):
+        User.objects.create_user(username="loguser", password="logpass")
+        log = self._post_captured(reverse('token_obtain_pair'), {'username': 'loguser', 'password': 'logpass'}, format='json')
+
+        self.assertEqual(json.loads(log.body), {'username': 'loguser', 'password': '********'})
+        self.assertEqual(log.content_type, 'application/json')
+        self.assertGreater(log.content_length, 0)
+
+    def test_multipart_body_is_never_read(self):
+        upload = SimpleUploadedFile('doc.pdf', b'%PDF-1.4' + b'0' * 4096, content_type='application/pdf')
+        with mock.patch('django.http.request.HttpRequest.body', new_callable=mock.PropertyMock) as body:
+            body.side_effect = AssertionError("body leído por el middleware")
+            log = self._post_captured(reverse('token_obtain_pair'), {'archivo': upload, 'password': 'x'})
+
+        self.assertEqual(log.body, '')
+        self.assertEqual(log.content_type, 'multipart/form-data')
+        self.assertGreater(log.content_length, 4096)
+
+    def test_truncated_body_is_redacted_by_pattern(self):
+        config = get_body_capture_settings()
+        raw = b'{"username": "a", "password": "abc\\"def", "nested": {"token": "xy'
+        text = redact_body(raw, 'application/json', complete=False, config=config)
+        self.assertNotIn('abc', text)
+        self.assertNotIn('xy', text)
+        self.assertIn('"username": "a"', text)
+        self.assertEqual(redact_body(b'user=a&password=b', 'application/x-www-form-urlencoded', True, config),
+                         'user=a&password=%2A%2A%2A%2A%2A%2A%2A%2A')
+
+
+def raise_lookup(key):
+    return {}[key]
+
+
+class ErrorGroupTests(APITestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        # El tracker es del proceso: sin esto quedan pendientes los errores de otras pruebas
+        errorgroups._tracker = None
+        self.addCleanup(setattr, errorgroups, '_tracker', None)
+        self.superuser = User.objects.create_superuser(username="superuser", password="superpass")
+        self.client = APIClient()
+
+    def _exception(self, key):
+        try:
+            raise_lookup(key)
+        except KeyError as e:
+            return e
+
+    def test_fingerprint_ignores_message_and_line_numbers(self):
+        first = fingerprint_exception(self._exception('a'))
+        second = fingerprint_exception(self._exception('b'))
+        self.assertEqual(first[0], second[0])
+        self.assertEqual(first[1], 'builtins.KeyError')
+        self.assertIn('raise_lookup', first[2])
+        self.assertNotEqual(first[0], fingerprint_exception(ValueError('a'))[0])
+
+    def test_counts_in_place_and_caps_samples(self):
+        tracker = ErrorGroupTracker(samples_per_window=2, sample_window=60)
+        fingerprint, exception_type, frames = fingerprint_exception(self._exception('a'))
+        sampled = [tracker.record(fingerprint, 'ERROR', exception_type, 'a', frames) for _ in range(5)]
+        self.assertEqual(sampled, [True, True, False, False, False])
+
+        tracker.apply_pending()
+        tracker.record(fingerprint, 'ERROR', exception_type, 'b', frames)
+        tracker.apply_pending()
+
+        group = ErrorGroup.objects.get()
+        self.assertEqual((group.count, group.sample_count, group.message), (6, 2, 'b'))
+        self.assertLessEqual(group.first_seen, group.last_seen)
+
+    def test_middleware_groups_exceptions_and_links_samples(self):
+        tracker = ErrorGroupTracker(samples_per_window=1, sample_window=60)
+        request = RequestFactory().get('/api/v1/customs/pedimentos/')
+        request.user = self.superuser
+        captured = []
+        with mock.patch('api.logger.middleware.get_error_group_tracker', return_value=tracker), \
+                mock.patch('api.logger.errorgroups.get_error_group_tracker', return_value=tracker), \
+                mock.patch('api.logger.middleware.emit_log', side_effect=captured.append):
+            for key in ('a', 'b', 'c'):
+                ErrorLoggingMiddleware(lambda r: None).process_exception(request, self._exception(key))
+
+            self.assertEqual(len(captured), 1)
+            sink = LogSink(max_queue_size=10, background=False)
+            sink.emit(captured[0])
+            sink.flush()
+
+        group = ErrorGroup.objects.get()
+        self.assertEqual(group.count, 3)
+        self.assertEqual(ErrorLog.objects.get().group_id, group.id)
+
+        self.client.force_authenticate(user=self.superuser)
+        response = self.client.get(reverse('errorlog-recent-errors'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['count'] for row in response.data], [3])
+
+    def test_pending_counts_written_without_new_logs(self):
+        tracker = errorgroups.get_error_group_tracker()
+        fingerprint, exception_type, frames = fingerprint_exception(self._exception('a'))
+        for _ in range(2):
+            tracker.record(fingerprint, 'ERROR', exception_type, 'a', frames)
+
+        # Sin registros en la cola: el flush (y el intervalo del hilo) escribe los contadores
+        self.assertEqual(LogSink(max_queue_size=10, background=False).flush(), 0)
+        self.assertEqual(ErrorGroup.objects.get().count, 2)
+        self.assertFalse(tracker.has_pending())
+
+
+class MetricsTests(APITestCase):
+    databases = '__all__'
+
+    def _registry(self, **config):
+        registry = Registry()
+        registry._config = dict({'ENABLED': True, 'MULTIPROC_DIR': '', 'WRITE_INTERVAL': 60, 'TOKEN': ''}, **config)
+        return registry
+
+    def test_histogram_exposition_and_quantiles(self):
+        registry = self._registry()
+        latency = Histogram('latency_seconds', 'Latencia', ['route'], registry=registry, buckets=(0.1, 0.5, 1.0))
+        for value in [0.05] * 90 + [0.3] * 8 + [2.0] * 2:
+            latency.observe(value, route='/api/v1/customs/pedimentos/')
+
+        text = registry.render()
+        self.assertIn('# TYPE latency_seconds histogram', text)
+        self.assertIn('latency_seconds_bucket{route="/api/v1/customs/pedimentos/",le="0.1"} 90', text)
+        self.assertIn('latency_seconds_bucket{route="/api/v1/customs/pedimentos/",le="+Inf"} 100', text)
+        self.assertIn('latency_seconds_count{route="/api/v1/customs/pedimentos/"} 100', text)
+        self.assertAlmostEqual(latency.quantile(0.5, route='/api/v1/customs/pedimentos/'), 0.0556, places=3)
+        self.assertEqual(latency.quantile(0.99, route='/api/v1/customs/pedimentos/'), 1.0)
+        self.assertEqual(histogram_quantile(0.95, (0.1,), [0, 0]), 0.0)
+
+    def test_multiprocess_aggregation(self):
+        with tempfile.TemporaryDirectory() as directory:
+            registry = self._registry(MULTIPROC_DIR=directory)
+            requests_total = Counter('requests_total', 'Requests', ['status'], registry=registry)
+            queue = Gauge('queue_size', 'Cola', registry=registry)
+            requests_total.inc(3, status='200')
+            queue.set(4)
+
+            # Snapshot de otro worker ya terminado
+            dead = {'pid': 2 ** 22 + 1, 'metrics': {
+                'requests_total': dict(requests_total.describe(), samples=[[['200'], 5]]),
+                'queue_size': dict(queue.describe(), samples=[[[], 100]]),
+            }}
+            with open(os.path.join(directory, 'metrics_dead.json'), 'w') as output:
+                json.dump(dead, output)
+
+            text = registry.render()
+        self.assertIn('requests_total{status="200"} 8', text)
+        self.assertIn('queue_size 4', text)
+
+    def test_concurrent_snapshot_writes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            registry = self._registry(MULTIPROC_DIR=directory)
+            Counter('requests_total', 'Requests', registry=registry).inc()
+            errores = []
+
+            def escribir():
+                try:
+                    for _ in range(50):
+                        registry.write_snapshot()
+                except Exception as e:
+                    errores.append(e)
+
+            hilos = [threading.Thread(target=escribir) for _ in range(4)]
+            for hilo in hilos:
+                hilo.start()
+            for hilo in hilos:
+                hilo.join()
+            self.assertEqual(errores, [])
+            self.assertIn('requests_total 1', registry.render())
+
+    @override_settings(METRICS={'TOKEN': 'secreto'})
+    def test_metrics_endpoint_exposes_request_latency(self):
+        user = User.objects.create_superuser(username="superuser", password="superpass")
+        self.client.force_authenticate(user=user)
+        self.client.get(reverse('requestlog-list'))
+
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secreto')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        text = response.content.decode()
+        self.assertIn('http_request_duration_seconds_bucket{method="GET",route="/api/v1/logger/requests/",status="200"', text)
+        self.assertIn('# TYPE log_sink_queue_size gauge', text)
+
+
+    def test_metrics_endpoint_denied_by_default(self):
+        client = Client()
+        self.assertEqual(client.get(reverse('metrics')).status_code, status.HTTP_403_FORBIDDEN)
+        with override_settings(METRICS={'TOKEN': 'secreto'}):
+            self.assertEqual(client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer otro').status_code, status.HTTP_403_FORBIDDEN)
+            self.assertEqual(client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer señal').status_code, status.HTTP_403_FORBIDDEN)
+        with override_settings(METRICS={'PUBLIC': True}):
+            self.assertEqual(client.get(reverse('metrics')).status_code, status.HTTP_200_OK)
+
+        staff = User.objects.create_user(username="staff", password="staffpass", is_staff=True)
+        client.force_login(staff)
+        self.assertEqual(client.get(reverse('metrics')).status_code, status.HTTP_200_OK)
+
+class LogDatabaseRouterTests(APITestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.lic = Licencia.objects.create(nombre="LicTest", almacenamiento=100)
+        self.org = Organizacion.objects.create(nombre="OrgTest", licencia=self.lic, is_active=True, is_verified=True)
+        self.user = User.objects.create_user(username="loguser", password="logpass", organizacion=self.org)
+        self.superuser = User.objects.create_superuser(username="superuser", password="superpass")
+
+    def test_router_sends_logger_app_to_log_alias(self):
+        router = LogDatabaseRouter()
+        with mock.patch('core.routers.get_log_database', return_value='logs'):
+            self.assertEqual(router.db_for_write(RequestLog), 'logs')
+            self.assertEqual(router.db_for_read(ErrorGroup), 'logs')
+            self.assertIsNone(router.db_for_read(User))
+            self.assertEqual(router.db_for_read(User, instance=UserActivity()), 'default')
+            self.assertTrue(router.allow_migrate('logs', 'logger'))
+            self.assertFalse(router.allow_migrate('default', 'logger'))
+            self.assertFalse(router.allow_migrate('logs', 'cuser'))
+            self.assertIsNone(router.allow_migrate('default', 'cuser'))
+            self.assertTrue(router.allow_relation(UserActivity(), self.user))
+
+    def test_ids_for_filter_evaluates_ids_across_databases(self):
+        usuarios = User.objects.filter(pk=self.user.pk)
+        with mock.patch('core.routers.same_database', return_value=False):
+            self.assertEqual(ids_for_filter(UserActivity, usuarios), [self.user.pk])
+
+    def test_logs_live_on_log_database(self):
+        UserActivity.objects.create(user=self.user, action='view', ip_address='127.0.0.1')
+        self.assertEqual(UserActivity.objects.using(get_log_database()).count(), 1)
+
+        self.client.force_authenticate(user=self.superuser)
+        response = self.client.get(reverse('useractivity-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['user']['username'], 'loguser')
+
+    def test_stream_list_prefetches_users_per_chunk(self):
+        for i in range(5):
+            UserActivity.objects.create(user=self.user, action='view', ip_address='127.0.0.1', object_id=str(i))
+        self.client.force_authenticate(user=self.superuser)
+        with mock.patch('api.logger.views.UserActivityViewSet.stream_chunk_size', 2):
+            response = self.client.get(reverse('useractivity-list'), {'stream': 'ndjson'})
+            lineas = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lineas), 5)
+        self.assertEqual({json.loads(linea)['user']['username'] for linea in lineas}, {'loguser'})
+
+    def test_deleting_user_keeps_audit_rows(self):
+        UserActivity.objects.create(user=self.user, action='view', ip_address='127.0.0.1')
+        ErrorLog.objects.create(user=self.user, level='ERROR', message='boom')
+        user_id = self.user.pk
+        self.user.delete()
+
+        actividad = UserActivity.objects.get(user_id=user_id)
+        self.assertIn(f"usuario {user_id} - view", str(actividad))
+        self.client.force_authenticate(user=self.superuser)
+        response = self.client.get(reverse('errorlog-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.data['results'][0]['user'])
+
+    def test_importador_filter_does_not_join_users(self):
+        importador = User.objects.create_user(
+            username="importador", password="imppass", organizacion=self.org, rfc="XAXX010101000", is_importador=True
+        )
+        importador.groups.create(name='importador')
+        update_rollups([build_request_log(user=importador), build_request_log(user=self.user)])
+
+        self.client.force_authenticate(user=importador)
+        response = self.client.get(reverse('request-log-analysis'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['methods_count']['GET'], 1)
+
+
+class RequestLogValuesListTests(APITestCase):
+    """Listado de requests con .values(): misma salida que RequestLogSerializer."""
+    databases = '__all__'
+
+    def setUp(self):
+        self.superuser = User.objects.create_superuser(username="superuser", password="superpass")
+        self.user = User.objects.create_user(username="loguser", password="logpass", first_name="Log")
+        agent = UserAgent.objects.create(value='tests/1.0')
+        build_request_log(user=self.user, user_agent=agent, query_count=3, db_time=1.5).save()
+        build_request_log(path='/api/v1/record/documents/', status_code=500).save()
+        borrado = User.objects.create_user(username="borrado", password="x")
+        build_request_log(user=borrado).save()
+        borrado.delete()
+        self.client.force_authenticate(user=self.superuser)
+
+    def test_parity(self):
+        from .views import RequestLogViewSet
+        url = reverse('requestlog-list')
+        fast = self.client.get(url, {'page_size': 10})
+        with mock.patch.object(RequestLogViewSet, 'values_list_enabled', False):
+            slow = self.client.get(url, {'page_size': 10})
+        self.assertEqual(fast.content, slow.content)
+        resultados = {row['path']: row for row in fast.data['results']}
+        self.assertEqual(resultados['/api/v1/record/documents/']['user_agent'], '')
+        self.assertEqual(len([row for row in fast.data['results'] if row['user'] is None]), 2)
@@ -1,9 +1,10 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import RequestLogViewSet, UserActivityViewSet, ErrorLogViewSet
+from .views import RequestLogViewSet, RequestProfileViewSet, UserActivityViewSet, ErrorLogViewSet
 
 router = DefaultRouter()
 router.register(r'requests', RequestLogViewSet)
+router.register(r'profiles', RequestProfileViewSet)
 router.register(r'activities', UserActivityViewSet)
 router.register(r'errors', ErrorLogViewSet)
 
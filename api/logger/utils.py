@@ -1,5 +1,7 @@
 from django.contrib.auth.models import User
 from .models import UserActivity, ErrorLog
+from .sink import emit_log
+from .errorgroups import fingerprint_message, get_error_group_tracker
 import logging
 
 def get_client_ip(request):
@@ -28,14 +30,14 @@ def log_user_activity(user, action, object_type='', object_id='', description=''
         ip_address = get_client_ip(request)
     
     try:
-        UserActivity.objects.create(
+        emit_log(UserActivity(
             user=user,
             action=action,
             object_type=object_type,
             object_id=str(object_id) if object_id else '',
             description=description,
             ip_address=ip_address
-        )
+        ))
     except Exception as e:
         logging.error(f"Error logging user activity: {e}")
 
@@ -58,14 +60,18 @@ def log_error(level, message, traceback='', user=None, request=None):
         request_path = request.path
     
     try:
-        ErrorLog.objects.create(
-            level=level,
-            message=message,
-            traceback=traceback,
-            user=user,
-            ip_address=ip_address,
-            request_path=request_path
-        )
+        fingerprint, exception_type, frames = fingerprint_message(level, message)
+        if get_error_group_tracker().record(fingerprint, level, exception_type, message, frames, request_path):
+            log = ErrorLog(
+                level=level,
+                message=message,
+                traceback=traceback,
+                user=user,
+                ip_address=ip_address,
+                request_path=request_path
+            )
+            log.raw_fingerprint = fingerprint
+            emit_log(log)
     except Exception as e:
         logging.error(f"Error logging custom error: {e}")
 
@@ -4,47 +4,118 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Count, Q
+from django.db.models import Count, Q, Sum
+from django.http import HttpResponse
 from django.utils import timezone
 from datetime import timedelta
-from .models import RequestLog, UserActivity, ErrorLog
-from .serializers import RequestLogSerializer, UserActivitySerializer, ErrorLogSerializer
+from .models import RequestLog, RequestProfile, UserActivity, ErrorLog, ErrorGroup, RequestRollupDay
+from .serializers import (
+    RequestLogSerializer, RequestProfileSerializer, RequestProfileListSerializer,
+    UserActivitySerializer, ErrorLogSerializer, ErrorGroupSerializer,
+)
 from .utils import log_user_activity
+from .sink import get_log_sink
+from .rollups import count_since, summarize, truncate_day
 
-from core.permissions import IsSuperUser
+from core.permissions import IsSuperUser, IsSuperUserOnly
+from mixins.streaming import StreamingListMixin
+from mixins.values_list import ValuesListMixin
 
-class RequestLogViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = RequestLog.objects.all()
+# Los usuarios se cargan con prefetch_related y no con join: los logs pueden vivir
+# en otra base (core.routers) y el usuario de un log puede ya no existir.
+# Los listados aceptan ?stream=json|ndjson para exportar sin paginar (mixins.streaming).
+# El listado de requests se arma con .values() sin instancias (mixins.values_list).
+class RequestLogViewSet(ValuesListMixin, StreamingListMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = RequestLog.objects.select_related('user_agent', 'referer', 'slowest_query').prefetch_related('user')
     serializer_class = RequestLogSerializer
     permission_classes = [IsAuthenticated, IsSuperUser]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
 
-    filterset_fields = ['method', 'status_code', 'user']
-    search_fields = ['path', 'ip_address', 'user_agent']
-    ordering_fields = ['timestamp', 'response_time', 'status_code']
+    filterset_fields = {
+        'method': ['exact'],
+        'status_code': ['exact'],
+        'user': ['exact'],
+        'route': ['exact'],
+        'view_name': ['exact'],
+        'query_count': ['exact', 'gte', 'lte'],
+        'db_time': ['gte', 'lte'],
+        'duplicate_queries': ['exact'],
+    }
+    search_fields = ['path', 'ip_address', 'user_agent__value']
+    ordering_fields = ['timestamp', 'response_time', 'status_code', 'query_count', 'db_time', 'slowest_query_time']
     ordering = ['-timestamp']
     
     @action(detail=False, methods=['get'])
     def statistics(self, request):
-        """Estadísticas de requests"""
+        """Estadísticas de requests (calculadas desde los rollups, no desde la tabla cruda)"""
         now = timezone.now()
-        today = now.date()
+        today = truncate_day(now)
         week_ago = now - timedelta(days=7)
-        
+        rollups = RequestRollupDay.objects.all()
+
+        # status_code 0: filas anteriores al código exacto (rebuild_request_rollups las recalcula)
+        status_codes = rollups.exclude(status_code=0).values('status_code').annotate(count=Sum('count')).order_by('status_code')
+        status_classes = rollups.values('status_class').annotate(count=Sum('count')).order_by('status_class')
+        summary = summarize(rollups)
+
         stats = {
-            'total_requests': self.queryset.count(),
-            'today_requests': self.queryset.filter(timestamp__date=today).count(),
-            'week_requests': self.queryset.filter(timestamp__gte=week_ago).count(),
-            'methods': self.queryset.values('method').annotate(count=Count('method')),
-            'status_codes': self.queryset.values('status_code').annotate(count=Count('status_code')),
-            'top_endpoints': self.queryset.values('path').annotate(count=Count('path')).order_by('-count')[:10],
-            'avg_response_time': self.queryset.aggregate(avg_time=Count('response_time'))['avg_time']
+            'total_requests': summary['count'],
+            'today_requests': rollups.filter(bucket=today).aggregate(total=Sum('count'))['total'] or 0,
+            'week_requests': count_since(week_ago),
+            'methods': rollups.values('method').annotate(count=Sum('count')).order_by('method'),
+            'status_codes': list(status_codes),
+            'status_classes': [{'status_class': row['status_class'], 'count': row['count']} for row in status_classes],
+            'top_endpoints': [
+                {'path': row['route'], 'count': row['count']}
+                for row in rollups.values('route').annotate(count=Sum('count')).order_by('-count')[:10]
+            ],
+            'avg_response_time': summary['avg_response_time'],
+            'p95_response_time': summary['p95_response_time'],
+            'p99_response_time': summary['p99_response_time'],
+            'error_count': summary['error_count'],
+            'log_sink': get_log_sink().stats(),
         }
         
         return Response(stats)
 
-class UserActivityViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = UserActivity.objects.all()
+class RequestProfileViewSet(StreamingListMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Perfiles de requests lentas (solo superusuarios).
+    
+    - /profiles/ → listado sin las pilas
+    - /profiles/{id}/ → perfil completo con funciones principales
+    - /profiles/{id}/collapsed/ → pilas colapsadas en texto plano (flamegraph.pl, speedscope)
+    """
+    queryset = RequestProfile.objects.all()
+    serializer_class = RequestProfileSerializer
+    permission_classes = [IsAuthenticated, IsSuperUserOnly]
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filterset_fields = {
+        'request_log': ['exact'],
+        'method': ['exact'],
+        'route': ['exact'],
+        'status_code': ['exact'],
+        'mode': ['exact'],
+        'trigger': ['exact'],
+        'duration': ['gte', 'lte'],
+    }
+    search_fields = ['path', 'route']
+    ordering_fields = ['timestamp', 'duration']
+    ordering = ['-timestamp']
+    
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return RequestProfileListSerializer
+        return super().get_serializer_class()
+    
+    @action(detail=True, methods=['get'])
+    def collapsed(self, request, pk=None):
+        """Pilas colapsadas ('raíz;...;hoja muestras') para generar un flame graph"""
+        profile = self.get_object()
+        return HttpResponse(profile.collapsed_stacks, content_type='text/plain; charset=utf-8')
+
+class UserActivityViewSet(StreamingListMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = UserActivity.objects.prefetch_related('user')
     serializer_class = UserActivitySerializer
     permission_classes = [IsAuthenticated, IsSuperUser]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -60,8 +131,8 @@ class UserActivityViewSet(viewsets.ReadOnlyModelViewSet):
         
         # Los usuarios normales solo ven su propia actividad
         if self.request.user.is_staff:
-            return UserActivity.objects.all()
-        return UserActivity.objects.filter(user=self.request.user)
+            return self.queryset.all()
+        return self.queryset.filter(user=self.request.user)
     
     @action(detail=False, methods=['get'])
     def my_activity(self, request):
@@ -69,24 +140,27 @@ class UserActivityViewSet(viewsets.ReadOnlyModelViewSet):
         if not request.user.is_authenticated:
             return Response({"error": "Usuario no autenticado"}, status=401)
         
-        activities = UserActivity.objects.filter(user=request.user)[:20]
+        activities = self.queryset.filter(user=request.user)[:20]
         serializer = self.get_serializer(activities, many=True)
         return Response(serializer.data)
 
-class ErrorLogViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = ErrorLog.objects.all()
+class ErrorLogViewSet(StreamingListMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = ErrorLog.objects.prefetch_related('user')
     serializer_class = ErrorLogSerializer
     permission_classes = [IsAuthenticated, IsSuperUser]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['level', 'user']
+    filterset_fields = ['level', 'user', 'group']
     search_fields = ['message', 'request_path']
     ordering_fields = ['timestamp']
     ordering = ['-timestamp']
     
     @action(detail=False, methods=['get'])
     def recent_errors(self, request):
-        """Errores recientes (últimas 24 horas)"""
+        """
+        Grupos de errores vistos en las últimas 24 horas, con su conteo.
+        Las ocurrencias guardadas de un grupo se consultan con ?group=<id>.
+        """
         yesterday = timezone.now() - timedelta(days=1)
-        recent_errors = self.queryset.filter(timestamp__gte=yesterday)
-        serializer = self.get_serializer(recent_errors, many=True)
+        groups = ErrorGroup.objects.filter(last_seen__gte=yesterday).order_by('-last_seen')
+        serializer = ErrorGroupSerializer(groups, many=True)
         return Response(serializer.data)
\ No newline at end of file
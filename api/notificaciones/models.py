@@ -23,6 +23,7 @@ class Notificacion(models.Model):
     mensaje = models.TextField(help_text="Mensaje de la notificación")
     fecha_envio = models.DateTimeField(blank=True, null=True, help_text="Fecha de envío de la notificación")
     created_at = models.DateTimeField(auto_now_add=True, help_text="Fecha de creación de la notificación")
+    updated_at = models.DateTimeField(auto_now=True, help_text="Fecha de última actualización de la notificación")
     visto = models.BooleanField(default=False, help_text="Indica si la notificación ha sido vista")
 
     def __str__(self):
@@ -4,6 +4,7 @@ from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from django.contrib.auth import get_user_model
 from .models import Notificacion, TipoNotificacion
+from api.licence.models import Licencia
 from api.organization.models import Organizacion
 
 User = get_user_model()
@@ -75,3 +76,30 @@ class NotificacionesViewSetTests(APITestCase):
         data = {"tipo": tipo.id, "dirigido": self.importador.id, "mensaje": "msg4"}
         response = self.client.post(url, data)
         self.assertNotIn(response.status_code, [status.HTTP_201_CREATED, status.HTTP_200_OK])
+
+
+
+class NotificacionesConditionalGetTests(APITestCase):
+    """ETag del listado de notificaciones (mixins.conditional)."""
+
+    def setUp(self):
+        lic = Licencia.objects.create(nombre="LicTest", almacenamiento=100)
+        self.org = Organizacion.objects.create(nombre="OrgTest", licencia=lic, is_active=True, is_verified=True)
+        self.admin = User.objects.create_user(username="admin", password="adminpass", organizacion=self.org)
+        self.admin.groups.create(name="admin")
+        self.client = APIClient()
+
+    def test_list_not_modified_until_visto_changes(self):
+        tipo = TipoNotificacion.objects.create(tipo="info", descripcion="informativa")
+        notif = Notificacion.objects.create(tipo=tipo, dirigido=self.admin, mensaje="msg1")
+        self.client.force_authenticate(user=self.admin)
+        url = reverse('notificacion-list')
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        notif.visto = True
+        notif.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([n['visto'] for n in response.data['results']], [True])
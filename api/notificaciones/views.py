@@ -9,6 +9,8 @@ from core.permissions import (
     IsSameOrganizationAndAdmin,
     IsSuperUser
 )
+from core.roles import ADMIN, IMPORTADOR, USER, get_user_roles
+from mixins.conditional import ConditionalGetMixin
 # Create your views here.
 
 class TipoNotificacionViewSet(viewsets.ModelViewSet):
@@ -23,7 +25,7 @@ class TipoNotificacionViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         return self.queryset.order_by('tipo')
 
-class NotificacionViewSet(viewsets.ModelViewSet):
+class NotificacionViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Notificacion.objects.all()
     serializer_class = NotificacionSerializer
     http_method_names = ['get', 'post', 'put', 'patch', 'delete']
@@ -33,11 +35,12 @@ class NotificacionViewSet(viewsets.ModelViewSet):
     my_tags = ['Notificaciones']
 
     def get_queryset(self):
-        if self.request.user.is_superuser:
+        roles = get_user_roles(self.request)
+        if roles.is_superuser:
             return Notificacion.objects.all()
-        if self.request.user.groups.filter(name='admin').exists() or self.request.user.groups.filter(name='user').exists():
-            return Notificacion.objects.filter(dirigido__organizacion=self.request.user.organizacion)
-        if self.request.user.groups.filter(name='importador').exists():
+        if roles.has_any(ADMIN, USER):
+            return Notificacion.objects.filter(dirigido__organizacion=roles.organizacion_id)
+        if roles.has(IMPORTADOR):
             return Notificacion.objects.filter(dirigido=self.request.user)
 
     def perform_create(self, serializer):
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organization', '0002_remove_organizacion_membretado_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='organizacion',
+            name='token_version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Incrementa al activar/desactivar o verificar; invalida los tokens emitidos antes'),
+        ),
+    ]
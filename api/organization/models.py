@@ -42,6 +42,7 @@ class Organizacion(models.Model):
 
     is_active = models.BooleanField(default=True)
     is_verified = models.BooleanField(default=False)
+    token_version = models.PositiveIntegerField(default=0, editable=False, help_text="Incrementa al activar/desactivar o verificar; invalida los tokens emitidos antes")
 
     inicio = models.DateField(null=True, blank=True)
     vencimiento = models.DateField(null=True, blank=True)
@@ -5,7 +5,7 @@ from .models import Organizacion, UsoAlmacenamiento#, UsuarioOrganizacion
 class OrganizacionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Organizacion
-        fields = '__all__'
+        exclude = ('token_version',)
         read_only_fields = ('created_at', 'updated_at')
 
 class UsoAlmacenamientoSerializer(serializers.ModelSerializer):
@@ -1,8 +1,30 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
+from core.authentication import TOKEN_ORGANIZACION_FIELDS, bump_organizacion_token_version, token_fields_changed
+from core.roles import invalidar_estado_organizacion
 from .models import Organizacion, UsoAlmacenamiento
 
 @receiver(post_save, sender=Organizacion)
 def crear_uso_almacenamiento(sender, instance, created, **kwargs):
     if created:
-        UsoAlmacenamiento.objects.create(organizacion=instance, espacio_utilizado=0)
\ No newline at end of file
+        UsoAlmacenamiento.objects.create(organizacion=instance, espacio_utilizado=0)
+
+# El estado de la organización viaja en los tokens (core.authentication):
+# activarla/desactivarla o verificarla revoca los tokens de sus usuarios.
+@receiver(pre_save, sender=Organizacion)
+def detectar_cambios_token(sender, instance, update_fields=None, **kwargs):
+    instance._token_fields_changed = token_fields_changed(instance, TOKEN_ORGANIZACION_FIELDS, update_fields)
+
+
+@receiver(post_save, sender=Organizacion)
+def invalidar_tokens_organizacion(sender, instance, created, **kwargs):
+    if getattr(instance, '_token_fields_changed', False):
+        instance._token_fields_changed = False
+        bump_organizacion_token_version([instance.pk])
+        instance.token_version += 1
+
+
+@receiver(post_save, sender=Organizacion)
+@receiver(post_delete, sender=Organizacion)
+def invalidar_estado_en_cache(sender, instance, **kwargs):
+    invalidar_estado_organizacion(instance.pk)
@@ -4,6 +4,7 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.response import Response
 
+from api.cards.models import EstadisticaDiaria
 from api.record.models import Document
 from core.permissions import (
     IsSameOrganization, 
@@ -11,9 +12,10 @@ from core.permissions import (
     IsSameOrganizationAndAdmin,
     IsSuperUser
 )
+from core.roles import IMPORTADOR, get_user_roles
+from core.singleflight import request_flight_key, single_flight
 from .serializers import OrganizacionSerializer, UsoAlmacenamientoSerializer
 from .models import Organizacion, UsoAlmacenamiento
-from api.customs.models import Pedimento
 from api.logger.mixins import LoggingMixin
 from mixins.filtrado_organizacion import OrganizacionFiltradaMixin
 
@@ -32,18 +34,19 @@ class ViewSetOrganizacion(LoggingMixin, viewsets.ModelViewSet, OrganizacionFiltr
     my_tags = ['Organizaciones']
 
     def get_queryset(self):
-        if not self.request.user.is_authenticated or not hasattr(self.request.user, 'organizacion'):
+        if not self.request.user.is_authenticated:
             return Organizacion.objects.none()
         
-        if self.request.user.is_superuser:
+        roles = get_user_roles(self.request)
+        if roles.is_superuser:
             # Superuser can see all organizations
             return Organizacion.objects.all()
         
-        if (self.request.user.groups.filter(name='admin').exists() or self.request.user.groups.filter('developer').exists() or self.request.user.groups.filter('user')) and self.request.user.groups.filter(name='Agente Aduanal').exists():
+        if roles.is_agencia:
             # Importers can only see their own organization
             return Organizacion.objects.filter(users=self.request.user)
         
-        if self.request.user.groups.filter(name='importador').exists():
+        if roles.has(IMPORTADOR):
             return Organizacion.objects.filter(users=self.request.user)
         
         return Organizacion.objects.none()
@@ -60,21 +63,20 @@ class UsoAlmacenamientoViewSet(LoggingMixin, viewsets.ReadOnlyModelViewSet):
     my_tags = ['Uso de Almacenamiento'] 
 
     def get_queryset(self):
-        if not self.request.user.is_authenticated or not hasattr(self.request.user, 'organizacion'):
+        if not self.request.user.is_authenticated:
             return UsoAlmacenamiento.objects.none()
         
 
-        if self.request.user.is_superuser:
+        roles = get_user_roles(self.request)
+        if roles.is_superuser:
             # Superuser can see all storage usage
             return UsoAlmacenamiento.objects.all()
         
-        if (self.request.user.groups.filter(name='developer').exists() or 
-            self.request.user.groups.filter(name='admin').exists() or 
-            self.request.user.groups.filter(name='user').exists()) and self.request.user.groups.filter(name='Agente Aduanal').exists():
+        if roles.is_agencia:
             # Developers, Admins, and Users can see their organization's storage usage
-            return UsoAlmacenamiento.objects.filter(organizacion=self.request.user.organizacion)
+            return UsoAlmacenamiento.objects.filter(organizacion_id=self.request.user.organizacion_id)
         
-        if self.request.user.groups.filter(name='importador').exists():
+        if roles.has(IMPORTADOR):
             # Importers can only see their own organization's storage usage
             raise PermissionDenied("Los importadores no tienen acceso al uso de almacenamiento.")
 
@@ -84,15 +86,27 @@ class UsoAlmacenamientoViewSet(LoggingMixin, viewsets.ReadOnlyModelViewSet):
     def mi_organizacion(self, request):
 
         """Obtiene el uso de almacenamiento de la organización del usuario actual"""
-        organizacion = request.user.organizacion
-        
+        organizacion_id = request.user.organizacion_id
+        # Requests iguales de la misma organización al mismo tiempo calculan una vez
+        key = request_flight_key(request, organizacion_id)
+        data = single_flight('organization.mi_organizacion', key, lambda: self.get_uso_organizacion(request.user.organizacion))
+        return Response(data)
+
+    def get_uso_organizacion(self, organizacion):
+        """Uso de almacenamiento y totales de `organizacion`."""
         # Obtener o crear el registro de uso
         uso, created = UsoAlmacenamiento.objects.get_or_create(
             organizacion=organizacion,
             defaults={'espacio_utilizado': 0}
         )
         
-        # Calcular el total sumando todos los documentos (en bytes)
+        # Conteos desde las estadísticas diarias (api.cards.stats), solo para mostrar
+        totales = EstadisticaDiaria.objects.filter(organizacion=organizacion).aggregate(
+            documentos=Sum('documentos'),
+            pedimentos=Sum('pedimentos'),
+        )
+        # El espacio sale de los documentos: la cuota de DocumentViewSet usa este valor
+        # y las estadísticas se desvían con update() o bulk_create
         total_utilizado = Document.objects.filter(
             organizacion=organizacion
         ).aggregate(total=Sum('size'))['total'] or 0
@@ -106,17 +120,16 @@ class UsoAlmacenamientoViewSet(LoggingMixin, viewsets.ReadOnlyModelViewSet):
         max_almacenamiento_bytes = organizacion.licencia.almacenamiento * 1024 ** 3
         porcentaje = (total_utilizado / max_almacenamiento_bytes * 100) if max_almacenamiento_bytes > 0 else 0
         
-        data = {
+        return {
             'organizacion': organizacion.nombre,
             'limite_almacenamiento_gb': organizacion.licencia.almacenamiento,
             'espacio_utilizado_bytes': total_utilizado,
             'espacio_utilizado_gb': total_utilizado / (1024 ** 3),
             'espacio_disponible_bytes': max(max_almacenamiento_bytes - total_utilizado, 0),
             'porcentaje_utilizado': round(porcentaje, 2),
-            'total_documentos': Document.objects.filter(organizacion=organizacion).count(),
-            'total_pedimentos': Pedimento.objects.filter(organizacion=organizacion).count(),
+            'total_documentos': totales['documentos'] or 0,
+            'total_pedimentos': totales['pedimentos'] or 0,
             'total_usuarios': organizacion.users.count()
         }
-        
-        return Response(data)
+
     
\ No newline at end of file
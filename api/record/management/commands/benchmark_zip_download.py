@@ -0,0 +1,121 @@
+import multiprocessing
+import os
+import resource
+import shutil
+import tempfile
+import time
+import zipfile
+from io import BytesIO
+
+from django.core.management.base import BaseCommand, CommandError
+from django.http import HttpResponse, StreamingHttpResponse
+
+from core.zipstream import CONTENT_TYPE, stream_zip
+
+MB = 1024 * 1024
+
+
+def rss_actual():
+    """RSS actual del proceso en bytes (Linux)."""
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def rss_pico():
+    """RSS máximo del proceso en bytes (ru_maxrss viene en KB en Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def respuesta_bytesio(archivos):
+    """La descarga anterior: todo el ZIP en un BytesIO y luego un HttpResponse."""
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        for nombre, path, _ in archivos:
+            with open(path, 'rb') as archivo:
+                zip_file.writestr(nombre, archivo.read())
+    buffer.seek(0)
+    return HttpResponse(buffer, content_type=CONTENT_TYPE)
+
+
+def respuesta_streaming(archivos):
+    """La descarga actual: core.zipstream con StreamingHttpResponse."""
+    entries = ((nombre, (lambda path=path: open(path, 'rb')), size) for nombre, path, size in archivos)
+    return StreamingHttpResponse(stream_zip(entries), content_type=CONTENT_TYPE)
+
+
+def medir(funcion, archivos, conn):
+    """Corre en un proceso aparte para que el RSS máximo sea solo de este caso."""
+    base = rss_actual()
+    inicio = time.perf_counter()
+    response = funcion(archivos)
+    primer_byte = None
+    enviados = 0
+    # Como el servidor WSGI: recorre la respuesta y envía cada bloque
+    for chunk in response:
+        if primer_byte is None:
+            primer_byte = time.perf_counter() - inicio
+        enviados += len(chunk)
+    total = time.perf_counter() - inicio
+    response.close()
+    conn.send((primer_byte or total, total, enviados, max(rss_pico() - base, 0)))
+    conn.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara la descarga masiva en ZIP anterior (todo en memoria) con la de core.zipstream: "
+        "memoria máxima (RSS) y tiempo al primer byte. Genera archivos temporales en disco "
+        "(PDF incompresibles y XML de texto) y no toca la base de datos. Solo Linux."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size-mb', type=int, default=1024, help="Tamaño total de los documentos en MB")
+        parser.add_argument('--files', type=int, default=64, help="Número de documentos")
+        parser.add_argument('--xml-ratio', type=float, default=0.25, help="Fracción de documentos XML (se comprimen)")
+        parser.add_argument('--dir', help="Directorio para los archivos temporales")
+
+    def handle(self, *args, **options):
+        if not os.path.exists('/proc/self/statm'):
+            raise CommandError("El benchmark lee /proc para medir la memoria (Linux)")
+        if options['files'] < 1 or options['size_mb'] < 1:
+            raise CommandError("--files y --size-mb deben ser mayores a 0")
+
+        directorio = tempfile.mkdtemp(prefix='benchmark-zip-', dir=options['dir'])
+        try:
+            archivos = self.generar(directorio, options['size_mb'] * MB, options['files'], options['xml_ratio'])
+            total = sum(size for _, _, size in archivos)
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{len(archivos)} documentos, {total / MB:,.0f} MB"))
+
+            context = multiprocessing.get_context('fork')
+            for etiqueta, funcion in (('BytesIO (anterior)', respuesta_bytesio), ('streaming', respuesta_streaming)):
+                recibir, enviar = context.Pipe(duplex=False)
+                proceso = context.Process(target=medir, args=(funcion, archivos, enviar))
+                proceso.start()
+                enviar.close()
+                primer_byte, tiempo, enviados, memoria = recibir.recv()
+                proceso.join()
+                self.stdout.write(
+                    f"-- {etiqueta:<20} primer byte {primer_byte * 1000:>9.1f} ms  total {tiempo * 1000:>9.1f} ms  "
+                    f"RSS máximo +{memoria / MB:>8.1f} MB  {enviados / MB:>8.1f} MB enviados"
+                )
+        finally:
+            shutil.rmtree(directorio, ignore_errors=True)
+
+    def generar(self, directorio, total, n, xml_ratio):
+        """Escribe los archivos por bloques de 1 MB; regresa [(nombre, path, tamaño)]."""
+        n_xml = int(n * xml_ratio)
+        size = max(total // n, 1)
+        bloque_pdf = os.urandom(MB)
+        bloque_xml = (b'<pedimento><partida>0001</partida><fraccion>84713001</fraccion></pedimento>\n' * (MB // 75 + 1))[:MB]
+        archivos = []
+        for i in range(n):
+            nombre = f"documento-{i}.xml" if i < n_xml else f"documento-{i}.pdf"
+            bloque = bloque_xml if i < n_xml else bloque_pdf
+            path = os.path.join(directorio, nombre)
+            with open(path, 'wb') as archivo:
+                pendiente = size
+                while pendiente > 0:
+                    escrito = archivo.write(bloque[:min(pendiente, MB)])
+                    pendiente -= escrito
+            archivos.append((nombre, path, size))
+        return archivos
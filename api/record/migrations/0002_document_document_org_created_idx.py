@@ -0,0 +1,19 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customs', '0004_tenant_indexes'),
+        ('organization', '0003_organizacion_token_version'),
+        ('record', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['organizacion', '-created_at'], name='document_org_created_idx'),
+        ),
+    ]
@@ -2,6 +2,7 @@ from django.db import models
 import uuid
 
 from api.organization.models import UsoAlmacenamiento
+from core.managers import TenantManager
 
 # Create your models here.
 
@@ -18,6 +19,8 @@ class Document(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = TenantManager(contribuyente_field='pedimento__contribuyente')
+
     def save(self, *args, **kwargs):
         is_new = self._state.adding
         
@@ -68,6 +71,9 @@ class Document(models.Model):
         verbose_name_plural = "Documents"
         db_table = 'document'
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['organizacion', '-created_at'], name='document_org_created_idx'),
+        ]
 
 class DocumentType(models.Model):
     nombre = models.CharField(max_length=100, unique=True)
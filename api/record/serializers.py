@@ -9,6 +9,8 @@ from api.customs.models import Pedimento
 class DocumentSerializer(serializers.ModelSerializer):
     pedimento_numero = serializers.SerializerMethodField(read_only=True)
     pedimento = serializers.PrimaryKeyRelatedField(queryset=Pedimento.objects.all())
+    # Para los listados con .values() (mixins.values_list)
+    values_sources = {'pedimento_numero': 'pedimento__pedimento'}
 
     class Meta:
         model = Document
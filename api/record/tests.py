@@ -1,12 +1,23 @@
 
+from django.contrib.auth.models import Group
+from unittest.mock import patch
+
+import shutil
+import tempfile
+import zipfile
+
+from django.test import override_settings
 from django.urls import reverse
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from django.core.files.uploadedfile import SimpleUploadedFile
+from api.licence.models import Licencia
 from api.organization.models import Organizacion, UsoAlmacenamiento
 from api.cuser.models import CustomUser
 from api.customs.models import Pedimento
+from core.testing import QueryCountAssertionsMixin
 from .models import Document
+from .views import DocumentViewSet
 import io
 
 class DocumentViewSetTests(APITestCase):
@@ -95,3 +106,104 @@ class DocumentViewSetTests(APITestCase):
         url = reverse('descargar-documento', args=[doc.id])
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class DocumentQueryCountTests(QueryCountAssertionsMixin, APITestCase):
+    """pedimento_numero sale del JOIN con pedimento, no de una consulta por documento."""
+
+    def setUp(self):
+        self.lic = Licencia.objects.create(nombre="LicTest", almacenamiento=100)
+        self.org = Organizacion.objects.create(nombre="OrgTest", licencia=self.lic, is_active=True, is_verified=True)
+        user = CustomUser.objects.create_user(username="developer", password="devpass", organizacion=self.org)
+        for name in ('developer', 'Agente Aduanal'):
+            user.groups.add(Group.objects.get_or_create(name=name)[0])
+        self.client = APIClient()
+        self.client.force_authenticate(user=CustomUser.objects.get(pk=user.pk))
+        self.created = 0
+
+    def create_documents(self, n):
+        for _ in range(n):
+            self.created += 1
+            pedimento = Pedimento.objects.create(organizacion=self.org, pedimento=f"D{self.created}")
+            Document.objects.create(organizacion=self.org, pedimento=pedimento, archivo=f"documents/{self.created}.pdf", size=1, extension="pdf")
+
+    def test_list_documents(self):
+        response = self.assertConstantQueries(reverse('Document-list'), self.create_documents)
+        self.assertEqual({d['pedimento_numero'] for d in response.data}, {f"D{i}" for i in range(1, 11)})
+
+
+class DocumentValuesListTests(APITestCase):
+    """Listado de documentos con .values(): misma salida que DocumentSerializer."""
+
+    def setUp(self):
+        self.lic = Licencia.objects.create(nombre="LicTest", almacenamiento=100)
+        self.org = Organizacion.objects.create(nombre="OrgTest", licencia=self.lic, is_active=True, is_verified=True)
+        self.superuser = CustomUser.objects.create_superuser(username="superuser", password="superpass")
+        pedimento = Pedimento.objects.create(organizacion=self.org, pedimento="P1")
+        Document.objects.create(organizacion=self.org, pedimento=pedimento, archivo="documents/uno.pdf", size=10, extension="pdf")
+        Document.objects.create(organizacion=self.org, pedimento=pedimento, archivo="documents/dos.xml", size=20)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.superuser)
+
+    def test_parity(self):
+        url = reverse('Document-list')
+        fast = self.client.get(url)
+        with patch.object(DocumentViewSet, 'values_list_enabled', False):
+            slow = self.client.get(url)
+        self.assertEqual(fast.content, slow.content)
+        self.assertTrue(fast.data[0]['archivo'].startswith('http://testserver/'))
+        self.assertEqual(fast.data[0]['pedimento_numero'], 'P1')
+
+
+class BulkDownloadZipTests(APITestCase):
+    """Descarga masiva en un ZIP armado en streaming (core.zipstream)."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root, ZIP_STREAM={'CHUNK_SIZE': 1024})
+        media.enable()
+        self.addCleanup(media.disable)
+
+        self.lic = Licencia.objects.create(nombre="LicTest", almacenamiento=100)
+        self.org = Organizacion.objects.create(nombre="OrgTest", licencia=self.lic, is_active=True, is_verified=True)
+        self.pedimento = Pedimento.objects.create(organizacion=self.org, pedimento="123456")
+        self.admin = CustomUser.objects.create_user(username="admin", password="adminpass", organizacion=self.org)
+        self.admin.groups.create(name="admin")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+        self.url = reverse('bulk-download-documents')
+
+    def create_document(self, name, content):
+        archivo = SimpleUploadedFile(name, content)
+        return Document.objects.create(organizacion=self.org, pedimento=self.pedimento, archivo=archivo, size=len(content), extension=name.rsplit('.', 1)[-1])
+
+    def test_streaming_zip(self):
+        pdf = self.create_document("factura.pdf", b"%PDF-1.4 " + bytes(range(256)) * 20)
+        xml = self.create_document("acuse.xml", b"<acuse>" + b"dato " * 1000 + b"</acuse>")
+        response = self.client.post(self.url, {"document_ids": [str(pdf.id), str(xml.id)], "pedimento_nombre": "Ped 123"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename=ped-123.zip')
+
+        chunks = list(response.streaming_content)
+        self.assertGreater(len(chunks), 2)
+        with zipfile.ZipFile(io.BytesIO(b''.join(chunks))) as zip_file:
+            self.assertIsNone(zip_file.testzip())
+            infos = {info.filename: info for info in zip_file.infolist()}
+            self.assertEqual(infos['factura.pdf'].compress_type, zipfile.ZIP_STORED)
+            self.assertEqual(infos['acuse.xml'].compress_type, zipfile.ZIP_DEFLATED)
+            # Encabezados locales con descriptor de datos (CRC y tamaños al final)
+            self.assertTrue(all(info.flag_bits & 0x08 for info in infos.values()))
+            pdf.archivo.open('rb')
+            self.assertEqual(zip_file.read('factura.pdf'), pdf.archivo.read())
+            pdf.archivo.close()
+            self.assertEqual(len(zip_file.read('acuse.xml')), xml.size)
+
+    def test_documents_of_other_org(self):
+        org2 = Organizacion.objects.create(nombre="OrgTest2", licencia=self.lic, is_active=True, is_verified=True)
+        ped2 = Pedimento.objects.create(organizacion=org2, pedimento="654321")
+        doc2 = Document.objects.create(organizacion=org2, pedimento=ped2, archivo="documents/test2.pdf", size=200, extension="pdf")
+        response = self.client.post(self.url, {"document_ids": [str(doc2.id)]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -2,7 +2,7 @@ from django.shortcuts import render
 from django.http import FileResponse, Http404
 from django.db import transaction
 
-from rest_framework.pagination import PageNumberPagination
+from core.pagination import FlexiblePagination
 from rest_framework.views import APIView
 from rest_framework import viewsets
 from rest_framework.permissions import IsAuthenticated
@@ -14,10 +14,8 @@ from rest_framework.exceptions import ValidationError
 from .serializers import DocumentSerializer
 from .models import Document
 from api.organization.models import UsoAlmacenamiento
-from io import BytesIO
-import zipfile
 from django.utils.text import slugify
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 from rest_framework.decorators import action
 from datetime import timedelta
 from django.utils import timezone
@@ -28,27 +26,27 @@ from core.permissions import (
     IsSameOrganizationAndAdmin,
     IsSuperUser
 )
+from core.metrics import FILE_IO_BYTES
+from core.zipstream import CONTENT_TYPE as ZIP_CONTENT_TYPE, stream_zip
 import logging
 logger = logging.getLogger(__name__)
 
+from mixins.conditional import ConditionalGetMixin
 from mixins.filtrado_organizacion import DocumentosFiltradosMixin
+from mixins.streaming import StreamingListMixin
+from mixins.values_list import ValuesListMixin
 
-class CustomPagination(PageNumberPagination):
-
+class CustomPagination(FlexiblePagination):
     """
-    Paginación personalizada con parámetros flexibles
+    Paginación personalizada con parámetros flexibles (core.pagination.FlexiblePagination)
     - Si no se especifica page_size, devuelve todos los resultados (sin paginación)
     - Si se especifica page_size, usa paginación normal
+    - Con cursor, paginación por llave (next/previous opacos)
     """
-    page_size = None  # Por defecto 10000 por página
-    page_size_query_param = 'page_size'
     max_page_size = 10000  # Límite máximo de seguridad
-    page_query_param = 'page'
-    
-    # Usar la paginación estándar de DRF, pero con page_size=10000 por defecto y máximo 10000
 
 # Create your views here.
-class DocumentViewSet(viewsets.ModelViewSet, DocumentosFiltradosMixin):
+class DocumentViewSet(ConditionalGetMixin, ValuesListMixin, StreamingListMixin, viewsets.ModelViewSet, DocumentosFiltradosMixin):
     """
     ViewSet for Document model.
     """
@@ -57,11 +55,14 @@ class DocumentViewSet(viewsets.ModelViewSet, DocumentosFiltradosMixin):
     
     pagination_class = CustomPagination
     serializer_class = DocumentSerializer
+    max_unpaginated_results = None  # None sin límite, N responde 400 si hay más, 0 usa cursor
+    select_related_fields = ('pedimento',)  # pedimento_numero
     # Habilitar filtro por pedimento (UUID) y pedimento_numero (campo pedimento del modelo relacionado)
     filterset_fields = ['extension', 'size', 'document_type', 'pedimento', 'pedimento__pedimento']
 
     # Puedes filtrar por pedimento usando: /api/record/documents/?pedimento=<id> o /api/record/documents/?pedimento__pedimento=<numero>
     # Ejemplo: /api/record/documents/?pedimento_numero=12345678
+    # Todos los documentos en streaming: /api/record/documents/?stream=ndjson (ver mixins.streaming)
     my_tags = ['Documents']
 
     def get_queryset(self):
@@ -120,6 +121,7 @@ class DocumentViewSet(viewsets.ModelViewSet, DocumentosFiltradosMixin):
 
         uso.espacio_utilizado = nuevo_espacio_utilizado
         uso.save()
+        FILE_IO_BYTES.inc(archivo.size, direction='upload', operation='document_create')
         
     @transaction.atomic
     def perform_update(self, serializer):
@@ -153,6 +155,7 @@ class DocumentViewSet(viewsets.ModelViewSet, DocumentosFiltradosMixin):
             serializer.save(size=new_file.size)
             uso.espacio_utilizado = nuevo_espacio_utilizado
             uso.save()
+            FILE_IO_BYTES.inc(new_file.size, direction='upload', operation='document_update')
         else:
             serializer.save()
 
@@ -184,12 +187,10 @@ class ProtectedDocumentDownloadView(APIView, DocumentosFiltradosMixin):
 
         # Verifica que el usuario pertenece a la organización del documento
         
-        if self.request.user.is_superuser:
-            return FileResponse(doc.archivo.open('rb'))
-
-        if doc.organizacion != request.user.organizacion:
+        if not self.request.user.is_superuser and doc.organizacion != request.user.organizacion:
             raise Http404("No autorizado")
 
+        FILE_IO_BYTES.inc(doc.size, direction='download', operation='document_download')
         return FileResponse(doc.archivo.open('rb'))
     
 class BulkDownloadZipView(APIView):
@@ -214,20 +215,19 @@ class BulkDownloadZipView(APIView):
         if docs.count() != len(pks):
             return Response({"error": "Uno o más documentos no existen o no pertenecen a su organización."}, status=404)
 
-        buffer = BytesIO()
-        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            for doc in docs:
+        # Los documentos se leen aquí; el generador solo abre sus archivos
+        documentos = list(docs)
+
+        def entries():
+            for doc in documentos:
                 # Usar solo el nombre del archivo sin descripcion
                 file_name = slugify(doc.archivo.name.rsplit('/', 1)[-1].rsplit('.', 1)[0])
                 ext = doc.archivo.name.split('.')[-1]
-                zip_name = f"{file_name}.{ext}"
-                doc.archivo.open('rb')
-                zip_file.writestr(zip_name, doc.archivo.read())
-                doc.archivo.close()
+                yield f"{file_name}.{ext}", (lambda archivo=doc.archivo: archivo.open('rb')), doc.size
 
-        buffer.seek(0)
+        # El ZIP se arma por bloques mientras se envía (core.zipstream)
         safe_name = slugify(pedimento_nombre)
-        response = HttpResponse(buffer, content_type='application/zip')
+        response = StreamingHttpResponse(stream_zip(entries(), operation='bulk_download_zip'), content_type=ZIP_CONTENT_TYPE)
         response['Content-Disposition'] = f'attachment; filename={safe_name or "documentos"}.zip'
         
         return response
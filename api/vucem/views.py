@@ -1,6 +1,6 @@
 from django.shortcuts import render
 from rest_framework import viewsets
-from rest_framework.pagination import PageNumberPagination
+from core.pagination import FlexiblePagination
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 from rest_framework.permissions import IsAuthenticated
@@ -18,20 +18,12 @@ from core.permissions import (
     IsSuperUser
 )
 
-class CustomVucemPagination(PageNumberPagination):
+class CustomVucemPagination(FlexiblePagination):
     """
-    Paginación personalizada para VUCEM
+    Paginación personalizada para VUCEM (core.pagination.FlexiblePagination)
     """
-    page_size = None  # Sin paginación por defecto
-    page_size_query_param = 'page_size'
-    max_page_size = 1000
-    page_query_param = 'page'
-    
-    def paginate_queryset(self, queryset, request, view=None):
-        page_size = request.query_params.get(self.page_size_query_param)
-        if page_size is None:
-            return None
-        return super().paginate_queryset(queryset, request, view)
+    max_page_size = 1000  # Límite máximo de seguridad
+
 # Create your views here.
 
 class VucemView(mixins.ListModelMixin,
@@ -57,7 +49,7 @@ class VucemView(mixins.ListModelMixin,
             # Si es superusuario, devolver todos los registros
             return self.queryset.all()
         
-        if not hasattr(self.request.user, 'organizacion') or not self.request.user.organizacion:
+        if not self.request.user.organizacion_id:
             return self.queryset.none()
             
-        return self.queryset.filter(organizacion=self.request.user.organizacion)
\ No newline at end of file
+        return self.queryset.filter(organizacion_id=self.request.user.organizacion_id)
\ No newline at end of file
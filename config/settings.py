@@ -84,6 +84,7 @@ JET_INDEX_DASHBOARD = 'core.dashboard.CustomIndexDashboard'
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',  # Debe ir antes de CommonMiddleware
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.CompressionMiddleware',  # gzip/brotli; arriba para comprimir la respuesta final
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -91,6 +92,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'api.logger.middleware.RequestLoggingMiddleware',
+    'api.logger.middleware.RequestProfilingMiddleware',
     'api.logger.middleware.ErrorLoggingMiddleware',
 ]
 
@@ -169,6 +171,87 @@ LOGGING = {
     },
 }
 
+# Buffer de escritura de logs (api.logger.sink)
+# OVERFLOW_POLICY: 'drop' descarta, 'sample' muestrea al llenarse, 'block' espera BLOCK_TIMEOUT
+LOG_SINK = {
+    'ENABLED': os.getenv('LOG_SINK_ENABLED', 'True') == 'True',
+    'MAX_QUEUE_SIZE': int(os.getenv('LOG_SINK_MAX_QUEUE_SIZE', '10000')),
+    'BATCH_SIZE': int(os.getenv('LOG_SINK_BATCH_SIZE', '500')),
+    'FLUSH_INTERVAL': float(os.getenv('LOG_SINK_FLUSH_INTERVAL', '2.0')),
+    'OVERFLOW_POLICY': os.getenv('LOG_SINK_OVERFLOW_POLICY', 'drop'),
+    'SAMPLE_THRESHOLD': 0.75,
+    'SAMPLE_RATE': 0.1,
+    'BLOCK_TIMEOUT': 0.5,
+}
+
+# Las pruebas usan el buffer de logs sin hilo de escritura (ver core.test_runner)
+TEST_RUNNER = 'core.test_runner.TestRunner'
+
+# Conteo de consultas SQL por request en RequestLog (api.logger.querystats)
+REQUEST_DB_STATS = {
+    'ENABLED': os.getenv('REQUEST_DB_STATS_ENABLED', 'True') == 'True',
+    'DUPLICATE_THRESHOLD': int(os.getenv('REQUEST_DB_STATS_DUPLICATE_THRESHOLD', '3')),
+}
+
+# Captura del body en RequestLog (api.logger.bodycapture): solo JSON/urlencoded,
+# multipart y otros tipos registran únicamente content type y longitud
+LOG_BODY_CAPTURE = {
+    'ENABLED': os.getenv('LOG_BODY_CAPTURE_ENABLED', 'True') == 'True',
+    'MAX_CAPTURE_BYTES': 64 * 1024,
+    'MAX_BODY_LENGTH': 1000,
+    'REDACT_FIELDS': [
+        'password', 'password1', 'password2', 'new_password', 'old_password',
+        'token', 'access', 'refresh', 'secret', 'api_key',
+    ],
+}
+
+# Agrupación de errores por fingerprint (api.logger.errorgroups)
+# SAMPLES_PER_WINDOW: ErrorLog con traceback completo por grupo cada SAMPLE_WINDOW segundos
+ERROR_GROUPS = {
+    'TOP_FRAMES': 5,
+    'SAMPLES_PER_WINDOW': int(os.getenv('ERROR_GROUPS_SAMPLES_PER_WINDOW', '5')),
+    'SAMPLE_WINDOW': int(os.getenv('ERROR_GROUPS_SAMPLE_WINDOW', '60')),
+}
+
+# Métricas en formato Prometheus en /metrics (core.metrics)
+# Con varios workers de gunicorn, METRICS_MULTIPROC_DIR debe apuntar a un directorio
+# compartido por los workers y vaciarse en cada despliegue.
+# /metrics exige METRICS_TOKEN (o un usuario staff con sesión); METRICS_PUBLIC=True lo abre
+METRICS = {
+    'ENABLED': os.getenv('METRICS_ENABLED', 'True') == 'True',
+    'MULTIPROC_DIR': os.getenv('METRICS_MULTIPROC_DIR', ''),
+    'WRITE_INTERVAL': float(os.getenv('METRICS_WRITE_INTERVAL', '5')),
+    'TOKEN': os.getenv('METRICS_TOKEN', ''),
+    'PUBLIC': os.getenv('METRICS_PUBLIC', 'False') == 'True',
+}
+
+# Perfilado de requests lentas (api.logger.profiling). Desactivado por defecto.
+# Con ENABLED una fracción THRESHOLD_SAMPLE_RATE de las requests se muestrea y las
+# que superan THRESHOLD_MS guardan su perfil; el encabezado X-Profile: <HEADER_TOKEN>, PATHS y SAMPLE_RATE fuerzan cProfile
+REQUEST_PROFILING = {
+    'ENABLED': os.getenv('REQUEST_PROFILING_ENABLED', 'False') == 'True',
+    'THRESHOLD_MS': int(os.getenv('REQUEST_PROFILING_THRESHOLD_MS', '2000')),
+    'THRESHOLD_SAMPLE_RATE': float(os.getenv('REQUEST_PROFILING_THRESHOLD_SAMPLE_RATE', '0.1')),
+    'SAMPLE_INTERVAL_MS': 10,
+    'SAMPLE_RATE': float(os.getenv('REQUEST_PROFILING_SAMPLE_RATE', '0')),
+    'PATHS': [p for p in os.getenv('REQUEST_PROFILING_PATHS', '').split(',') if p],
+    'HEADER': 'HTTP_X_PROFILE',
+    'HEADER_TOKEN': os.getenv('REQUEST_PROFILING_TOKEN', ''),
+    'TOP_FUNCTIONS': 30,
+}
+
+# Particiones mensuales de logs (python manage.py manage_log_partitions)
+# RETENTION_MONTHS: meses completos que se conservan por tabla; None conserva todo
+LOG_PARTITIONS = {
+    'MONTHS_AHEAD': 3,
+    'ARCHIVE_DIR': os.getenv('LOG_ARCHIVE_DIR', str(LOGS_DIR / 'archive')),
+    'RETENTION_MONTHS': {
+        'logger_request_log': int(os.getenv('LOG_RETENTION_REQUEST_MONTHS', '3')),
+        'logger_user_activity': int(os.getenv('LOG_RETENTION_ACTIVITY_MONTHS', '12')),
+        'logger_error_log': int(os.getenv('LOG_RETENTION_ERROR_MONTHS', '6')),
+    },
+}
+
 
 # autehgentication backends
 # REST_FRAMEWORK = {
@@ -183,12 +266,22 @@ LOGGING = {
 # # JWT Authentication settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.ClaimsJWTAuthentication',
         'rest_framework.authentication.TokenAuthentication',  # Añade esta línea
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # JSON con orjson si está instalado (core.renderers)
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_FILTER_BACKENDS': [
@@ -201,7 +294,7 @@ REST_FRAMEWORK = {
 SWAGGER_SETTINGS = {
     "DEFAULT_AUTO_SCHEMA_CLASS": "core.swagger.CustomAutoSchema",
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.ClaimsJWTAuthentication',
     ),
     'SECURITY_DEFINITIONS': {
         'Bearer': {
@@ -224,8 +317,12 @@ CORS_ALLOW_CREDENTIALS = True
 CORS_ALLOW_HEADERS = list(default_headers) + [
     'access-control-allow-origin',
     'access-control-allow-credentials',
+    'if-none-match',  # GET condicional (mixins.conditional)
+    'if-modified-since',
 ]
 
+CORS_EXPOSE_HEADERS = ['etag', 'last-modified']
+
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
 
@@ -262,6 +359,22 @@ DATABASES = {
     }
 }
 
+# Base de datos opcional para las tablas de auditoría y logs (api.logger).
+# Con LOG_DB_NAME definido se crea el alias 'logs' (los datos de conexión
+# no definidos se toman de DB_*); sin él los logs quedan en 'default'.
+if os.getenv('LOG_DB_NAME'):
+    DATABASES['logs'] = {
+        'ENGINE'    : 'django.db.backends.postgresql',
+        'NAME'      : os.getenv('LOG_DB_NAME'),
+        'USER'      : os.getenv('LOG_DB_USER', os.getenv('DB_USER')),
+        'PASSWORD'  : os.getenv('LOG_DB_PASSWORD', os.getenv('DB_PASSWORD')),
+        'HOST'      : os.getenv('LOG_DB_HOST', os.getenv('DB_HOST')),
+        'PORT'      : os.getenv('LOG_DB_PORT', os.getenv('DB_PORT')),
+    }
+
+LOG_DATABASE_ALIAS = 'logs' if 'logs' in DATABASES else 'default'
+DATABASE_ROUTERS = ['core.routers.LogDatabaseRouter']
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -319,6 +432,58 @@ SIMPLE_JWT = {
     'ROTATE_REFRESH_TOKENS': True,                   # Rotar refresh tokens para mayor seguridad
     'BLACKLIST_AFTER_ROTATION': True,
     'AUTH_HEADER_TYPES': ('Bearer',),
+    # Claims de organización y roles (ver core.authentication)
+    'TOKEN_OBTAIN_SERIALIZER': 'api.cuser.serializers.ClaimsTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'api.cuser.serializers.ClaimsTokenRefreshSerializer',
+}
+
+# Paginación de listados (ver core.pagination). MAX_UNPAGINATED_RESULTS vacío = sin límite
+PAGINATION = {
+    'MAX_UNPAGINATED_RESULTS': int(os.getenv('MAX_UNPAGINATED_RESULTS')) if os.getenv('MAX_UNPAGINATED_RESULTS') else None,
+    'CURSOR_PAGE_SIZE': int(os.getenv('CURSOR_PAGE_SIZE', 100)),
+}
+
+# Listados en streaming con ?stream= (ver mixins.streaming)
+STREAMING = {
+    'CHUNK_SIZE': int(os.getenv('STREAMING_CHUNK_SIZE', 500)),
+}
+
+# Compresión gzip/brotli de respuestas JSON (core.middleware); brotli si está instalado
+COMPRESSION = {
+    'ENABLED': os.getenv('COMPRESSION_ENABLED', 'True') == 'True',
+    'MIN_SIZE': int(os.getenv('COMPRESSION_MIN_SIZE', 1024)),
+}
+
+# ZIP en streaming de la descarga masiva de documentos (core.zipstream)
+ZIP_STREAM = {
+    'CHUNK_SIZE': int(os.getenv('ZIP_STREAM_CHUNK_SIZE', 64 * 1024)),
+}
+
+# Cache por organización de las cards del tablero (api.cards.cache)
+CARDS_CACHE = {
+    'ENABLED': os.getenv('CARDS_CACHE_ENABLED', 'True') == 'True',
+    'TIMEOUT': int(os.getenv('CARDS_CACHE_TIMEOUT', 30)),
+}
+
+# Tablero combinado /api/v1/cards/dashboard/ (api.cards.dashboard)
+# MAX_WORKERS: hilos por proceso (cada uno con su conexión); TIMEOUT en segundos por card
+CARDS_DASHBOARD = {
+    'MAX_WORKERS': int(os.getenv('CARDS_DASHBOARD_MAX_WORKERS', 4)),
+    'TIMEOUT': float(os.getenv('CARDS_DASHBOARD_TIMEOUT', 5)),
+    'TIMEOUTS': {},
+}
+
+# Single-flight para cálculos costosos iguales (core.singleflight): cards y uso de almacenamiento
+# CROSS_WORKER necesita un cache compartido entre workers (Redis, Memcached)
+SINGLE_FLIGHT = {
+    'ENABLED': os.getenv('SINGLE_FLIGHT_ENABLED', 'True') == 'True',
+    'CROSS_WORKER': os.getenv('SINGLE_FLIGHT_CROSS_WORKER', 'False') == 'True',
+    'WAIT_TIMEOUT': float(os.getenv('SINGLE_FLIGHT_WAIT_TIMEOUT', 10)),
+}
+
+# Versiones de token en cache: tiempo máximo para que otro proceso vea una revocación
+TOKEN_CLAIMS = {
+    'VERSION_CACHE_TIMEOUT': int(os.getenv('TOKEN_VERSION_CACHE_TIMEOUT', 30)),
 }
 
 # Configuración adicional para ReDoc
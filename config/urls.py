@@ -49,6 +49,8 @@ from rest_framework_simplejwt.views import (
     TokenRefreshView,
 )
 
+from core.metrics import metrics_view
+
 schema_view = get_schema_view(
    openapi.Info(
       title="EFC API",
@@ -86,5 +88,6 @@ urlpatterns = [
     path('api/v1/logger/', include('api.logger.urls')),  # Logger app
     path('api/v1/notificaciones/', include('api.notificaciones.urls')),  # Notificaciones app
     path('api/v1/cards/', include('api.cards.urls')),  # Cards app
+    path('metrics', metrics_view, name='metrics'),  # Prometheus
 ] + static(settings.MEDIA_URL + 'profile_pictures/', document_root=settings.MEDIA_ROOT / 'profile_pictures') \
   + static(settings.MEDIA_URL + 'membretado/', document_root=settings.MEDIA_ROOT / 'membretado')
\ No newline at end of file
@@ -0,0 +1,207 @@
+"""
+Autenticación JWT sin consultas a la base de datos.
+
+El access token lleva en sus claims la organización, los roles (grupos),
+``is_importador``, el RFC y el estado de la organización. Con ellos
+``ClaimsJWTAuthentication`` arma un ``ClaimsUser`` sin consultar usuarios ni
+grupos; los demás campos del usuario se cargan solo si la vista los usa.
+
+Para revocar tokens con datos viejos, usuario y organización tienen un
+``token_version`` que se incrementa al cambiar roles, datos del token o el
+estado de la organización (ver api.cuser.signals y api.organization.signals).
+Las versiones vigentes se leen del cache; un token con otra versión se
+rechaza y el cliente debe renovarlo (el refresh vuelve a leer los claims).
+
+Con el cache local por proceso (LocMemCache) otro proceso puede tardar hasta
+``VERSION_CACHE_TIMEOUT`` segundos en ver una versión nueva; con un cache
+compartido la revocación es inmediata.
+
+Configuración en ``settings.TOKEN_CLAIMS`` (ver DEFAULTS).
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router, transaction
+from django.db.models import F
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from api.cuser.models import ClaimsUser, CustomUser
+from api.organization.models import Organizacion
+
+DEFAULTS = {
+    'VERSION_CACHE_TIMEOUT': 30,  # Segundos que se guardan las versiones vigentes
+}
+
+# Claims que se agregan al token (además de user_id)
+CLAIM_ORGANIZACION = 'organizacion_id'
+CLAIM_ROLES = 'roles'
+CLAIM_ORG_ACTIVE = 'org_is_active'
+CLAIM_ORG_VERIFIED = 'org_is_verified'
+CLAIM_USER_VERSION = 'user_version'
+CLAIM_ORG_VERSION = 'org_version'
+
+# Campos del usuario que viajan en el token con el mismo nombre
+USER_CLAIM_FIELDS = ('username', 'is_importador', 'rfc', 'is_superuser', 'is_staff')
+
+# Campos cuyo cambio invalida los tokens del usuario
+TOKEN_USER_FIELDS = frozenset(USER_CLAIM_FIELDS + ('organizacion', 'organizacion_id', 'is_active'))
+TOKEN_ORGANIZACION_FIELDS = frozenset(('is_active', 'is_verified'))
+
+
+def get_token_claims_settings():
+    config = dict(DEFAULTS)
+    config.update(getattr(settings, 'TOKEN_CLAIMS', {}) or {})
+    return config
+
+
+def build_token_claims(user):
+    """Claims de organización, roles y versiones para los tokens de `user`."""
+    organizacion = user.organizacion
+    claims = {field: getattr(user, field) for field in USER_CLAIM_FIELDS}
+    claims.update({
+        CLAIM_ORGANIZACION: str(user.organizacion_id) if user.organizacion_id else None,
+        CLAIM_ROLES: sorted(user.groups.values_list('name', flat=True)),
+        CLAIM_ORG_ACTIVE: bool(organizacion and organizacion.is_active),
+        CLAIM_ORG_VERIFIED: bool(organizacion and organizacion.is_verified),
+        CLAIM_USER_VERSION: user.token_version,
+        CLAIM_ORG_VERSION: organizacion.token_version if organizacion else None,
+    })
+    return claims
+
+
+# ----------------------------------------------------------------------
+# Versiones
+# ----------------------------------------------------------------------
+def _user_version_key(user_id):
+    return f'auth:user-version:{user_id}'
+
+
+def _organizacion_version_key(organizacion_id):
+    return f'auth:org-version:{organizacion_id}'
+
+
+def get_token_versions(user_id, organizacion_id):
+    """
+    (versión del usuario, versión de la organización) vigentes, o None si el
+    usuario ya no existe. Sin consultas si ambas están en cache.
+    """
+    user_key = _user_version_key(user_id)
+    organizacion_key = _organizacion_version_key(organizacion_id) if organizacion_id else None
+    keys = [user_key] + ([organizacion_key] if organizacion_key else [])
+    cached = cache.get_many(keys)
+    if len(cached) == len(keys):
+        return cached[user_key], cached.get(organizacion_key)
+
+    row = (
+        CustomUser.objects.filter(pk=user_id)
+        .values_list('token_version', 'organizacion_id', 'organizacion__token_version')
+        .first()
+    )
+    if row is None:
+        return None
+    user_version, current_organizacion_id, organizacion_version = row
+    timeout = get_token_claims_settings()['VERSION_CACHE_TIMEOUT']
+    values = {user_key: user_version}
+    if current_organizacion_id:
+        values[_organizacion_version_key(current_organizacion_id)] = organizacion_version
+    cache.set_many(values, timeout)
+    if str(current_organizacion_id or '') != str(organizacion_id or ''):
+        # Cambió de organización: el token ya no corresponde
+        return user_version, None
+    return user_version, organizacion_version
+
+
+def _bump(model, pks, key):
+    pks = list(pks)
+    if not pks:
+        return
+    model.objects.filter(pk__in=pks).update(token_version=F('token_version') + 1)
+    keys = [key(pk) for pk in pks]
+    cache.delete_many(keys)
+    # Otra request pudo volver a guardar la versión anterior antes del commit
+    transaction.on_commit(lambda: cache.delete_many(keys), using=router.db_for_write(model))
+
+
+def token_fields_changed(instance, fields, update_fields=None):
+    """
+    Para pre_save: indica si el save cambia alguno de `fields`. En un save
+    completo también toma el token_version de la base, para no sobrescribir un
+    incremento hecho mientras la instancia estaba en memoria.
+    """
+    if instance._state.adding or instance.pk is None:
+        return False
+    if update_fields is not None and not (set(update_fields) & fields):
+        return False
+    attnames = sorted({instance._meta.get_field(name).attname for name in fields})
+    current = (
+        instance._meta.base_manager.filter(pk=instance.pk)
+        .values('token_version', *attnames)
+        .first()
+    )
+    if current is None:
+        return False
+    if update_fields is None:
+        instance.token_version = current['token_version']
+    return any(getattr(instance, name) != current[name] for name in attnames)
+
+
+def bump_user_token_version(user_ids):
+    """Invalida los tokens emitidos a los usuarios indicados."""
+    _bump(CustomUser, user_ids, _user_version_key)
+
+
+def bump_organizacion_token_version(organizacion_ids):
+    """Invalida los tokens de todos los usuarios de las organizaciones indicadas."""
+    _bump(Organizacion, organizacion_ids, _organizacion_version_key)
+
+
+# ----------------------------------------------------------------------
+# Autenticación
+# ----------------------------------------------------------------------
+def build_claims_user(validated_token):
+    """ClaimsUser con los campos del token; el resto queda diferido."""
+    pk_field = CustomUser._meta.pk
+    organizacion_id = validated_token.get(CLAIM_ORGANIZACION)
+    values = {field: validated_token.get(field) for field in USER_CLAIM_FIELDS}
+    values.update({
+        pk_field.attname: pk_field.to_python(validated_token[api_settings.USER_ID_CLAIM]),
+        'organizacion_id': Organizacion._meta.pk.to_python(organizacion_id) if organizacion_id else None,
+        'is_active': True,
+        'token_version': validated_token.get(CLAIM_USER_VERSION),
+    })
+    # from_db espera los valores en el orden de los campos del modelo
+    field_names = [field.attname for field in ClaimsUser._meta.concrete_fields if field.attname in values]
+    user = ClaimsUser.from_db(
+        router.db_for_read(CustomUser), field_names, [values[name] for name in field_names]
+    )
+    user.token_claims = {
+        CLAIM_ROLES: frozenset(validated_token.get(CLAIM_ROLES) or ()),
+        CLAIM_ORG_ACTIVE: bool(validated_token.get(CLAIM_ORG_ACTIVE)),
+        CLAIM_ORG_VERIFIED: bool(validated_token.get(CLAIM_ORG_VERIFIED)),
+    }
+    return user
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication que arma el usuario desde los claims del token. Los
+    tokens emitidos sin claims de roles usan la carga normal del usuario.
+    """
+
+    def get_user(self, validated_token):
+        if CLAIM_ROLES not in validated_token:
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        versions = get_token_versions(user_id, validated_token.get(CLAIM_ORGANIZACION))
+        expected = (validated_token.get(CLAIM_USER_VERSION), validated_token.get(CLAIM_ORG_VERSION))
+        if versions is None or tuple(versions) != expected:
+            raise InvalidToken(_("El token fue revocado; es necesario renovarlo"))
+
+        return build_claims_user(validated_token)
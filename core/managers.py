@@ -0,0 +1,62 @@
+"""
+Manager con el filtrado por organización (tenant) de los modelos de negocio.
+
+``Model.objects.for_user(user)`` reemplaza el filtrado que hacían por separado
+los mixins de mixins.filtrado_organizacion. El estado de la organización
+(activa y verificada) se revisa una sola vez con ``UserRoles`` (claims del
+token o cache), así que la consulta solo filtra por ``organizacion_id`` y, para
+importadores, por el contribuyente; nunca hace join con ``organizacion``.
+
+Las reglas de acceso son las de cada mixin anterior: pedimentos, edocs, coves,
+usuarios y datastage piden Agente Aduanal con admin o developer y además user
+(``ROLES_AGENCIA_USUARIO``); documentos y procesos, Agente Aduanal con
+cualquiera de developer/admin/user (``ROLES_AGENCIA``). Los importadores solo
+ven registros en los modelos con ``contribuyente_field``.
+"""
+from django.db import models
+
+from core.roles import IMPORTADOR_CONTRIBUYENTE, ROLES_AGENCIA, UserRoles
+
+
+class TenantManager(models.Manager):
+    """
+    Manager con ``for_user``.
+
+    - organizacion_field: FK a la organización del registro.
+    - contribuyente_field: lookup del RFC del contribuyente para importadores;
+      None si el modelo no aplica a importadores.
+    - agency_roles: roles que necesita un Agente Aduanal (ver UserRoles.is_agencia_con).
+    """
+    agency_roles = ROLES_AGENCIA
+
+    def __init__(self, contribuyente_field=None, organizacion_field='organizacion', agency_roles=None):
+        super().__init__()
+        self.contribuyente_field = contribuyente_field
+        self.organizacion_field = organizacion_field
+        if agency_roles is not None:
+            self.agency_roles = agency_roles
+
+    def for_user(self, user, roles=None):
+        """Registros visibles para `user`; `roles` evita recalcular los de la request."""
+        if roles is None:
+            roles = UserRoles(user)
+        queryset = self.get_queryset()
+
+        if not roles.is_authenticated:
+            return queryset.none()
+
+        if roles.is_superuser:
+            return queryset
+
+        if not roles.organizacion_activa:
+            return queryset.none()
+        filtros = {f"{self.organizacion_field}_id": roles.organizacion_id}
+
+        if roles.is_agencia_con(self.agency_roles):
+            return queryset.filter(**filtros)
+
+        if self.contribuyente_field and roles.has(IMPORTADOR_CONTRIBUYENTE) and getattr(user, 'is_importador', False):
+            filtros[self.contribuyente_field] = user.rfc
+            return queryset.filter(**filtros)
+
+        return queryset.none()
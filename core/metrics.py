@@ -0,0 +1,440 @@
+# core/metrics.py
+"""
+Registro de métricas en proceso con salida en formato de texto de Prometheus.
+
+Tipos: Counter, Gauge e Histogram (buckets fijos). Los percentiles se obtienen
+en Prometheus con ``histogram_quantile`` sobre los buckets, sin consultar la
+base de datos; ``histogram_quantile`` de este módulo hace la misma estimación
+en Python.
+
+Multi-proceso (gunicorn con varios workers): si ``METRICS['MULTIPROC_DIR']``
+está definido, cada proceso escribe su snapshot en ``metrics_<pid>.json`` cada
+WRITE_INTERVAL segundos y ``/metrics`` suma los archivos de todos los procesos.
+Counters e histogramas de procesos terminados se conservan; los gauges solo se
+suman para procesos vivos. El directorio debe vaciarse al desplegar.
+
+``/metrics`` expone latencias y tráfico por ruta, así que por defecto se niega:
+responde con ``Authorization: Bearer <TOKEN>`` o a un usuario staff con sesión
+(admin). ``PUBLIC`` lo abre sin token de forma explícita.
+"""
+import atexit
+import hmac
+import json
+import math
+import os
+import threading
+import time
+
+import requests
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+DEFAULTS = {
+    'ENABLED': True,
+    'MULTIPROC_DIR': '',     # Vacío: solo métricas del proceso actual
+    'WRITE_INTERVAL': 5.0,   # Segundos entre escrituras del snapshot del proceso
+    'TOKEN': '',             # Token para Prometheus: "Authorization: Bearer <TOKEN>"
+    'PUBLIC': False,         # True: /metrics sin token (solo detrás de una red interna)
+}
+
+# Buckets (segundos) para latencias
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def get_metrics_settings():
+    config = dict(DEFAULTS)
+    config.update(getattr(settings, 'METRICS', {}) or {})
+    return config
+
+
+def _pid_alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def histogram_quantile(quantile, buckets, counts):
+    """
+    Estima un percentil (0-1) a partir de conteos por bucket (no acumulados,
+    el último es +Inf) con interpolación lineal, como Prometheus.
+    """
+    total = sum(counts)
+    if not total:
+        return 0.0
+    rank = quantile * total
+    cumulative = 0
+    lower = 0.0
+    for bound, count in zip(tuple(buckets) + (math.inf,), counts):
+        if cumulative + count >= rank:
+            if bound == math.inf:
+                return lower
+            return lower + (bound - lower) * ((rank - cumulative) / count if count else 0)
+        cumulative += count
+        lower = bound
+    return lower
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        self.registry = registry if registry is not None else REGISTRY
+        self.registry.register(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: se esperaban las etiquetas {self.labelnames}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def describe(self):
+        return {'type': self.type, 'help': self.documentation, 'labelnames': list(self.labelnames)}
+
+    def samples(self):
+        with self._lock:
+            return [[list(key), value if not isinstance(value, list) else list(value)] for key, value in self._values.items()]
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        self.registry.touch()
+
+    def get(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+    type = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), registry=None, multiprocess_mode='livesum'):
+        # livesum: suma de procesos vivos; max: máximo de procesos vivos
+        self.multiprocess_mode = multiprocess_mode
+        super().__init__(name, documentation, labelnames, registry)
+
+    def describe(self):
+        return dict(super().describe(), mode=self.multiprocess_mode)
+
+    def set(self, value, **labels):
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+        self.registry.touch()
+
+    def inc(self, amount=1, **labels):
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        self.registry.touch()
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def get(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), registry=None, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def describe(self):
+        return dict(super().describe(), buckets=list(self.buckets))
+
+    def observe(self, value, **labels):
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        index = len(self.buckets)
+        for position, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = position
+                break
+        with self._lock:
+            # [conteo por bucket..., conteo +Inf, suma]
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            data[index] += 1
+            data[-1] += value
+        self.registry.touch()
+
+    def quantile(self, quantile, **labels):
+        data = self._values.get(self._key(labels))
+        if data is None:
+            return 0.0
+        return histogram_quantile(quantile, self.buckets, data[:-1])
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self._config = None
+        self._dirty = False
+        self._writer = None
+        self._writer_pid = None
+        self._atexit_registered = False
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Métrica duplicada: {metric.name}")
+            self._metrics[metric.name] = metric
+
+    @property
+    def config(self):
+        if self._config is None:
+            self._config = get_metrics_settings()
+        return self._config
+
+    @property
+    def enabled(self):
+        return self.config['ENABLED']
+
+    @property
+    def multiproc_dir(self):
+        return self.config['MULTIPROC_DIR']
+
+    def reset(self):
+        """Vacía los valores y recarga la configuración (pruebas)."""
+        self._config = None
+        for metric in self._metrics.values():
+            metric.clear()
+
+    # ------------------------------------------------------------------
+    # Multi-proceso
+    # ------------------------------------------------------------------
+    def touch(self):
+        """Marca cambios pendientes y asegura el hilo que escribe el snapshot del proceso."""
+        if not self.multiproc_dir:
+            return
+        self._dirty = True
+        pid = os.getpid()
+        if self._writer is not None and self._writer_pid == pid and self._writer.is_alive():
+            return
+        with self._lock:
+            if self._writer is not None and self._writer_pid == pid and self._writer.is_alive():
+                return
+            self._writer_pid = pid
+            self._writer = threading.Thread(target=self._run_writer, name='metrics-writer', daemon=True)
+            self._writer.start()
+            if not self._atexit_registered:
+                atexit.register(self.write_snapshot)
+                self._atexit_registered = True
+
+    def _run_writer(self):
+        while True:
+            time.sleep(self.config['WRITE_INTERVAL'])
+            if self._dirty:
+                self.write_snapshot()
+
+    def snapshot(self):
+        return {
+            'pid': os.getpid(),
+            'metrics': {
+                name: dict(metric.describe(), samples=metric.samples())
+                for name, metric in self._metrics.items()
+            },
+        }
+
+    def write_snapshot(self):
+        directory = self.multiproc_dir
+        if not directory:
+            return
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'metrics_{os.getpid()}.json')
+        tmp_path = f'{path}.tmp'
+        # El hilo escritor y cada /metrics escriben el mismo archivo temporal
+        with self._lock:
+            self._dirty = False
+            with open(tmp_path, 'w', encoding='utf-8') as output:
+                json.dump(self.snapshot(), output)
+            os.replace(tmp_path, path)
+
+    def _read_snapshots(self):
+        directory = self.multiproc_dir
+        self.write_snapshot()
+        snapshots = []
+        for filename in sorted(os.listdir(directory)):
+            if not (filename.startswith('metrics_') and filename.endswith('.json')):
+                continue
+            try:
+                with open(os.path.join(directory, filename), encoding='utf-8') as source:
+                    snapshots.append(json.load(source))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    def collect(self):
+        """Métricas combinadas: {nombre: descripción + samples {labels: valor}}."""
+        snapshots = self._read_snapshots() if self.multiproc_dir else [self.snapshot()]
+        merged = {}
+        for snapshot in snapshots:
+            alive = _pid_alive(snapshot['pid'])
+            for name, data in snapshot['metrics'].items():
+                if data['type'] == 'gauge' and not alive:
+                    continue
+                target = merged.setdefault(name, dict(data, samples={}))
+                for labels, value in data['samples']:
+                    key = tuple(labels)
+                    current = target['samples'].get(key)
+                    if current is None:
+                        target['samples'][key] = value
+                    elif data['type'] == 'histogram':
+                        target['samples'][key] = [a + b for a, b in zip(current, value)]
+                    elif data['type'] == 'gauge' and data.get('mode') == 'max':
+                        target['samples'][key] = max(current, value)
+                    else:
+                        target['samples'][key] = current + value
+        return merged
+
+    def render(self):
+        """Formato de exposición de texto de Prometheus (0.0.4)."""
+        lines = []
+        for name, data in sorted(self.collect().items()):
+            labelnames = data['labelnames']
+            lines.append(f"# HELP {name} {data['help']}")
+            lines.append(f"# TYPE {name} {data['type']}")
+            for labels, value in sorted(data['samples'].items()):
+                if data['type'] != 'histogram':
+                    lines.append(f"{name}{_format_labels(labelnames, labels)} {_format_value(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(data['buckets'] + [math.inf], value[:-1]):
+                    cumulative += count
+                    le = (('le', _format_value(bound)),)
+                    lines.append(f"{name}_bucket{_format_labels(labelnames, labels, le)} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labelnames, labels)} {_format_value(value[-1])}")
+                lines.append(f"{name}_count{_format_labels(labelnames, labels)} {cumulative}")
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+# ----------------------------------------------------------------------
+# Métricas de la aplicación
+# ----------------------------------------------------------------------
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Latencia de las requests por ruta y estado',
+    ['method', 'route', 'status'],
+)
+REQUEST_DB_TIME = Histogram(
+    'http_request_db_duration_seconds', 'Tiempo en base de datos por request',
+    ['route'],
+)
+REQUEST_DB_QUERIES = Counter(
+    'http_request_db_queries_total', 'Consultas SQL ejecutadas por las requests',
+    ['route'],
+)
+EXTERNAL_HTTP_LATENCY = Histogram(
+    'external_http_request_duration_seconds', 'Latencia de llamadas HTTP a servicios externos',
+    ['service', 'endpoint', 'status'],
+)
+FILE_IO_BYTES = Counter(
+    'file_io_bytes_total', 'Bytes de archivos subidos y descargados',
+    ['direction', 'operation'],
+)
+LOG_QUEUE_SIZE = Gauge(
+    'log_sink_queue_size', 'Registros de log pendientes en el buffer en memoria',
+)
+LOG_DROPPED = Counter(
+    'log_sink_dropped_total', 'Registros de log descartados por desbordamiento del buffer',
+)
+SINGLEFLIGHT_CALLS = Counter(
+    'singleflight_calls_total', 'Cálculos pedidos al single-flight por resultado (leader, coalesced, remote, timeout)',
+    ['name', 'result'],
+)
+
+
+def observe_request(method, route, status_code, seconds, db_seconds=None, query_count=None):
+    """Registra una request atendida (lo llama RequestLoggingMiddleware)."""
+    route = route or '<unmatched>'
+    REQUEST_LATENCY.observe(seconds, method=method, route=route, status=status_code)
+    if db_seconds is not None:
+        REQUEST_DB_TIME.observe(db_seconds, route=route)
+    if query_count:
+        REQUEST_DB_QUERIES.inc(query_count, route=route)
+
+
+def timed_request(service, endpoint, method, url, **kwargs):
+    """
+    requests.request con métricas de latencia y estado ('error' si la llamada
+    falla sin respuesta). `endpoint` debe ser la ruta sin ids para acotar etiquetas.
+    """
+    start = time.perf_counter()
+    status = 'error'
+    try:
+        response = requests.request(method, url, **kwargs)
+        status = response.status_code
+        return response
+    finally:
+        EXTERNAL_HTTP_LATENCY.observe(time.perf_counter() - start, service=service, endpoint=endpoint, status=status)
+
+
+def metrics_access_allowed(request, config=None):
+    """Token de METRICS, usuario staff con sesión o PUBLIC."""
+    config = config or get_metrics_settings()
+    if config['PUBLIC']:
+        return True
+    token = config['TOKEN']
+    # En bytes: compare_digest no acepta str con caracteres no ASCII
+    authorization = request.META.get('HTTP_AUTHORIZATION', '').encode()
+    if token and hmac.compare_digest(authorization, f'Bearer {token}'.encode()):
+        return True
+    user = getattr(request, 'user', None)
+    return bool(user is not None and user.is_authenticated and user.is_staff)
+
+
+def metrics_view(request):
+    """Endpoint /metrics para Prometheus."""
+    if not metrics_access_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,167 @@
+"""
+Compresión de respuestas con gzip y brotli.
+
+``CompressionMiddleware`` comprime las respuestas JSON y NDJSON de la API si
+el cliente lo acepta (``Accept-Encoding``). Usa brotli (``br``) si el paquete
+``brotli`` está instalado y el cliente lo prefiere o lo acepta, y si no gzip.
+
+- Respuestas normales: solo si el cuerpo mide al menos ``MIN_SIZE`` bytes y
+  el resultado es más chico que el original.
+- Streaming (``?stream=``): se comprime bloque por bloque y cada bloque se
+  envía al cliente en cuanto se comprime (flush), así el primer byte sigue
+  saliendo con el primer bloque.
+- Los archivos (PDF, ZIP, imágenes, texto) no se comprimen: no están en
+  ``CONTENT_TYPES``.
+- Las páginas HTML (admin, jet) tampoco: llevan el token CSRF y comprimirlas
+  sin relleno aleatorio las expone a BREACH.
+- Un ETag fuerte se marca como débil (``W/``), como hace GZipMiddleware de
+  Django; If-None-Match compara en débil y el 304 sigue funcionando.
+
+Configuración en ``settings.COMPRESSION`` (ver DEFAULTS). Debe ir arriba en
+MIDDLEWARE (después de CorsMiddleware y SecurityMiddleware) para comprimir la
+respuesta final.
+"""
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional
+    brotli = None
+
+DEFAULTS = {
+    'ENABLED': True,
+    'MIN_SIZE': 1024,        # Bytes; las respuestas más chicas se envían sin comprimir
+    'GZIP_LEVEL': 6,
+    'BROTLI_QUALITY': 4,     # 0-11; arriba de 5 es lento para respuestas dinámicas
+    'CONTENT_TYPES': ('application/json', 'application/x-ndjson'),
+}
+
+GZIP = 'gzip'
+BROTLI = 'br'
+
+
+def get_compression_settings():
+    config = dict(DEFAULTS)
+    config.update(getattr(settings, 'COMPRESSION', {}) or {})
+    return config
+
+
+def parse_accept_encoding(header):
+    """{codificación: q} del encabezado Accept-Encoding."""
+    accepted = {}
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    return accepted
+
+
+def choose_encoding(header):
+    """'br', 'gzip' o None según el Accept-Encoding y lo instalado."""
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get('*', 0.0)
+    candidates = [BROTLI, GZIP] if brotli is not None else [GZIP]
+    best, best_q = None, 0.0
+    for encoding in candidates:
+        q = accepted.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class Compressor:
+    """Compresor incremental; ``chunk`` devuelve los bytes listos para enviar."""
+
+    def __init__(self, encoding, config):
+        self.encoding = encoding
+        if encoding == BROTLI:
+            self._compressor = brotli.Compressor(quality=config['BROTLI_QUALITY'])
+        else:
+            # wbits=31: formato gzip (encabezado y CRC)
+            self._compressor = zlib.compressobj(config['GZIP_LEVEL'], zlib.DEFLATED, 31)
+
+    def chunk(self, data):
+        if self.encoding == BROTLI:
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.encoding == BROTLI:
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+    def compress(self, data):
+        """Todo el contenido de una vez (sin flush intermedio)."""
+        if self.encoding == BROTLI:
+            return self._compressor.process(data) + self._compressor.finish()
+        return self._compressor.compress(data) + self._compressor.flush()
+
+
+def compress_sequence(sequence, compressor):
+    for item in sequence:
+        data = compressor.chunk(item)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def acompress_sequence(sequence, compressor):
+    async for item in sequence:
+        data = compressor.chunk(item)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+
+    def is_compressible(self, response, config):
+        if response.has_header('Content-Encoding') or not 200 <= response.status_code < 300:
+            return False
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        if not content_type.startswith(tuple(config['CONTENT_TYPES'])):
+            return False
+        return response.streaming or len(response.content) >= config['MIN_SIZE']
+
+    def process_response(self, request, response):
+        config = get_compression_settings()
+        if not config['ENABLED'] or not self.is_compressible(response, config):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        compressor = Compressor(encoding, config)
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = acompress_sequence(response.streaming_content, compressor)
+            else:
+                response.streaming_content = compress_sequence(response.streaming_content, compressor)
+            # La longitud final no se conoce
+            del response.headers['Content-Length']
+        else:
+            compressed = compressor.compress(response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
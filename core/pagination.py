@@ -0,0 +1,261 @@
+"""
+Paginación de los listados.
+
+``FlexiblePagination`` conserva el comportamiento de las CustomPagination de
+cada app (sin ``page_size`` devuelve todos los resultados; con ``page_size``
+pagina por número de página) y agrega un modo por cursor:
+
+- ``?cursor=`` (vacío para la primera página) activa la paginación por llave
+  (keyset) sobre (campo de ordenamiento, id). Cada página es un
+  ``WHERE (campo, id) > (último valor)`` con LIMIT, así que cuesta lo mismo
+  en la página 1 que en la 10 000. La respuesta trae ``next`` y ``previous``
+  con cursores opacos y no incluye ``count``.
+- Funciona con el ``ordering`` de la vista y con ``?ordering=``: el primer
+  campo del ordenamiento más el id como desempate.
+
+Límite del modo "todos los resultados", por vista con el atributo
+``max_unpaginated_results`` o global en ``settings.PAGINATION``:
+
+- None: sin límite (comportamiento anterior).
+- N > 0: si hay más de N resultados se responde 400 pidiendo paginar.
+- 0: deshabilitado; sin ``page_size`` se usa el modo cursor.
+
+El mismo límite aplica a ``?stream=`` (mixins.streaming).
+"""
+import base64
+import binascii
+import json
+from collections import OrderedDict
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+DEFAULTS = {
+    'MAX_UNPAGINATED_RESULTS': None,  # Límite global del modo sin paginar (ver arriba)
+    'CURSOR_PAGE_SIZE': 100,          # page_size por defecto en modo cursor
+}
+
+
+def get_pagination_settings():
+    config = dict(DEFAULTS)
+    config.update(getattr(settings, 'PAGINATION', {}) or {})
+    return config
+
+
+def get_max_unpaginated_results(view):
+    """Límite del modo sin paginar de la vista, o el global de settings.PAGINATION."""
+    limit = getattr(view, 'max_unpaginated_results', None)
+    if limit is None:
+        limit = get_pagination_settings()['MAX_UNPAGINATED_RESULTS']
+    return limit
+
+
+class KeysetPagination(BasePagination):
+    """Paginación por llave (campo de ordenamiento, id) con cursores opacos."""
+
+    cursor_query_param = 'cursor'
+    page_query_param = 'page'
+    default_ordering = '-created_at'
+    invalid_cursor_message = 'Cursor inválido'
+
+    def __init__(self, page_size):
+        self.page_size = page_size
+
+    # ------------------------------------------------------------------
+    # Ordenamiento
+    # ------------------------------------------------------------------
+    def get_ordering(self, queryset):
+        """(campo, descendente) a partir del primer criterio de orden del queryset."""
+        model = queryset.model
+        ordering = list(queryset.query.order_by) or list(model._meta.ordering)
+        first = ordering[0] if ordering and isinstance(ordering[0], str) else self.default_ordering
+        descending = first.startswith('-')
+        name = first.lstrip('-')
+        if name == 'pk':
+            return model._meta.pk, descending
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            field = None
+        if field is None or not field.concrete or field.is_relation:
+            # Orden por relaciones o expresiones: se usa el orden por defecto
+            name = self.default_ordering.lstrip('-')
+            field = model._meta.get_field(name) if name != 'pk' else model._meta.pk
+            descending = self.default_ordering.startswith('-')
+        return field, descending
+
+    def order_by(self, field, descending, reverse=False):
+        if reverse:
+            descending = not descending
+        pk_name = self.pk.name
+        if field.primary_key:
+            return [f'-{pk_name}' if descending else pk_name]
+        # Los NULL siempre al final del orden pedido (al inicio si se recorre al revés)
+        nulls = {'nulls_first': True} if reverse else {'nulls_last': True}
+        expression = F(field.name).desc(**nulls) if descending else F(field.name).asc(**nulls)
+        return [expression, f'-{pk_name}' if descending else pk_name]
+
+    # ------------------------------------------------------------------
+    # Filtros por posición
+    # ------------------------------------------------------------------
+    def after(self, field, descending, value, pk):
+        """Filas posteriores a la posición (value, pk) en el orden pedido."""
+        op = 'lt' if descending else 'gt'
+        pk_after = Q(**{f'pk__{op}': pk})
+        if field.primary_key:
+            return pk_after
+        if value is None:
+            return Q(**{f'{field.name}__isnull': True}) & pk_after
+        condition = Q(**{f'{field.name}__{op}': value}) | (Q(**{field.name: value}) & pk_after)
+        if field.null:
+            condition |= Q(**{f'{field.name}__isnull': True})
+        return condition
+
+    def before(self, field, descending, value, pk):
+        """Filas anteriores a la posición (value, pk) en el orden pedido."""
+        op = 'gt' if descending else 'lt'
+        pk_before = Q(**{f'pk__{op}': pk})
+        if field.primary_key:
+            return pk_before
+        if value is None:
+            return Q(**{f'{field.name}__isnull': False}) | (Q(**{f'{field.name}__isnull': True}) & pk_before)
+        return Q(**{f'{field.name}__{op}': value}) | (Q(**{field.name: value}) & pk_before)
+
+    # ------------------------------------------------------------------
+    # Cursores
+    # ------------------------------------------------------------------
+    @staticmethod
+    def position_value(obj, field):
+        """Valor de `field` como texto; `obj` puede ser una instancia o una fila de .values()."""
+        if isinstance(obj, dict):
+            obj = SimpleNamespace(**{field.attname: obj[field.name]})
+        if getattr(obj, field.attname) is None:
+            return None
+        return field.value_to_string(obj)
+
+    def encode_cursor(self, obj, reverse):
+        position = {
+            'o': self.ordering_key,
+            'v': self.position_value(obj, self.field),
+            'k': self.position_value(obj, self.pk),
+            'r': reverse,
+        }
+        token = base64.urlsafe_b64encode(json.dumps(position, separators=(',', ':')).encode()).decode()
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, token.rstrip('='))
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param, '')
+        if not token:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+            position = json.loads(raw)
+            if position['o'] != self.ordering_key:
+                raise ValueError('El cursor corresponde a otro ordenamiento')
+            value = None if position['v'] is None else self.field.to_python(position['v'])
+            return value, self.pk.to_python(position['k']), bool(position['r'])
+        except (binascii.Error, ValueError, TypeError, KeyError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    # ------------------------------------------------------------------
+    # Paginación
+    # ------------------------------------------------------------------
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.pk = queryset.model._meta.pk
+        self.field, self.descending = self.get_ordering(queryset)
+        self.ordering_key = f"{'-' if self.descending else ''}{self.field.name}"
+        values_fields = queryset.query.values_select
+        if values_fields:
+            # Filas de .values(): el cursor necesita el campo de orden y el pk
+            missing = [field.name for field in (self.field, self.pk) if field.name not in values_fields]
+            if missing:
+                queryset = queryset.values(*values_fields, *missing)
+        cursor = self.decode_cursor(request)
+
+        if cursor is None or not cursor[2]:
+            queryset = queryset.order_by(*self.order_by(self.field, self.descending))
+            if cursor is not None:
+                queryset = queryset.filter(self.after(self.field, self.descending, cursor[0], cursor[1]))
+            rows = list(queryset[:self.page_size + 1])
+            self.has_next = len(rows) > self.page_size
+            self.has_previous = cursor is not None
+            self.page = rows[:self.page_size]
+        else:
+            # Página anterior: se recorre al revés desde el cursor y se invierte
+            queryset = queryset.order_by(*self.order_by(self.field, self.descending, reverse=True))
+            queryset = queryset.filter(self.before(self.field, self.descending, cursor[0], cursor[1]))
+            rows = list(queryset[:self.page_size + 1])
+            self.has_previous = len(rows) > self.page_size
+            self.has_next = True
+            self.page = list(reversed(rows[:self.page_size]))
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+
+class FlexiblePagination(PageNumberPagination):
+    """
+    Sin page_size: todos los resultados (con el límite de la vista). Con
+    page_size: paginación por número de página. Con cursor: paginación por
+    llave (KeysetPagination).
+    """
+    page_size = None  # Sin paginación por defecto
+    page_size_query_param = 'page_size'
+    max_page_size = 10000  # Límite máximo de seguridad
+    page_query_param = 'page'
+    cursor_query_param = 'cursor'
+
+    def get_max_unpaginated_results(self, view):
+        return get_max_unpaginated_results(view)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        page_size = self.get_page_size(request) if self.page_size_query_param in request.query_params else None
+        max_unpaginated = self.get_max_unpaginated_results(view)
+
+        if self.cursor_query_param in request.query_params or (not page_size and max_unpaginated == 0):
+            self.keyset = KeysetPagination(page_size or get_pagination_settings()['CURSOR_PAGE_SIZE'])
+            self.keyset.cursor_query_param = self.cursor_query_param
+            self.keyset.page_query_param = self.page_query_param
+            return self.keyset.paginate_queryset(queryset, request, view)
+
+        if not page_size:
+            # Sin paginación: se revisa el límite sin cargar los resultados
+            if max_unpaginated and queryset[max_unpaginated:max_unpaginated + 1].exists():
+                raise ValidationError({
+                    self.page_size_query_param: (
+                        f"Hay más de {max_unpaginated} resultados; "
+                        f"usa {self.page_size_query_param} o {self.cursor_query_param}."
+                    )
+                })
+            return None
+
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
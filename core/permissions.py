@@ -1,6 +1,16 @@
 # permissions.py
 from rest_framework import permissions
 from api.cuser.models import CustomUser
+from core.roles import ADMIN, AGENTE_ADUANAL, DEVELOPER, USER, get_user_roles
+
+
+def misma_organizacion(obj, roles):
+    """Compara por id para no cargar las organizaciones del objeto y del usuario."""
+    if hasattr(obj, 'organizacion_id'):
+        return obj.organizacion_id == roles.organizacion_id
+    if hasattr(obj, 'organizacion'):
+        return obj.organizacion == roles.organizacion
+    return False
 
 class IsSameOrganization(permissions.BasePermission):
     """
@@ -14,7 +24,8 @@ class IsSameOrganization(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         # Permite operaciones sobre un objeto específico solo si:
         # - El objeto pertenece a la misma organización (acceso por usuario relacionado)
-        return (getattr(obj, 'dirigido', None) and obj.dirigido.organizacion == request.user.organizacion)
+        dirigido = getattr(obj, 'dirigido', None)
+        return bool(dirigido and dirigido.organizacion_id == get_user_roles(request).organizacion_id)
     
 class IsSameOrganizationAndAdmin(permissions.BasePermission):
     """
@@ -27,13 +38,10 @@ class IsSameOrganizationAndAdmin(permissions.BasePermission):
 
     def has_object_permission(self, request, view, obj):
         # Permite operaciones solo si el usuario es admin, Agente Aduanal o user y la organización coincide
-        allowed_groups = ['admin', 'Agente Aduanal', 'user']
-        user_in_group = request.user.groups.filter(name__in=allowed_groups).exists()
-        if not user_in_group:
+        roles = get_user_roles(request)
+        if not roles.has_any(ADMIN, AGENTE_ADUANAL, USER):
             return False
-        if hasattr(obj, 'organizacion'):
-            return obj.organizacion == request.user.organizacion
-        return False
+        return misma_organizacion(obj, roles)
     
 class IsSameOrganizationDeveloper(permissions.BasePermission):
     """
@@ -46,25 +54,29 @@ class IsSameOrganizationDeveloper(permissions.BasePermission):
 
     def has_object_permission(self, request, view, obj):
         # Permite operaciones solo si el usuario es developer, Agente Aduanal o user y la organización coincide
-        allowed_groups = ['developer', 'Agente Aduanal', 'user']
-        user_in_group = request.user.groups.filter(name__in=allowed_groups).exists()
-        if not user_in_group:
+        roles = get_user_roles(request)
+        if not roles.has_any(DEVELOPER, AGENTE_ADUANAL, USER):
             return False
-        if hasattr(obj, 'organizacion'):
-            return obj.organizacion == request.user.organizacion
-        return False
+        return misma_organizacion(obj, roles)
     
 class IsOwnerOrOrgAdmin(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         return (
             obj == request.user or
             request.user.is_staff or
-            request.user.groups.filter(name='admin').exists()
+            get_user_roles(request).has(ADMIN)
         )
     
 class IsSuperUser(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         return request.user.is_superuser
+
+class IsSuperUserOnly(permissions.BasePermission):
+    """
+    Solo superusuarios, también en listados (IsSuperUser solo valida objetos).
+    """
+    def has_permission(self, request, view):
+        return bool(request.user and request.user.is_superuser)
     
 class HasStoragePermission(permissions.BasePermission):
     """
@@ -0,0 +1,68 @@
+"""
+JSON rápido para las respuestas, los listados en streaming y los bodies.
+
+Con orjson instalado el JSON se genera y se lee con orjson (en C, UUID y
+fechas nativos); sin orjson se usa el json de la librería estándar, como DRF.
+La salida es la misma que la del JSONRenderer de DRF: las fechas y los tipos
+que orjson no conoce (Decimal, textos lazy, QuerySet...) pasan por el
+``default`` del JSONEncoder de DRF, y U+2028/U+2029 se escapan igual.
+
+El renderer de DRF se sigue usando si el Accept pide indentación
+(``application/json; indent=4``) o si ``COMPACT_JSON`` o ``UNICODE_JSON``
+están desactivados en REST_FRAMEWORK.
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils import json
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional
+    orjson = None
+
+# Fechas por el encoder de DRF (milisegundos y 'Z'); llaves no str como json
+ORJSON_OPTIONS = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+_encoder = JSONEncoder()
+
+
+def _escape_line_separators(content):
+    if b'\xe2\x80\xa8' in content or b'\xe2\x80\xa9' in content:
+        content = content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+    return content
+
+
+def uses_orjson():
+    return orjson is not None and api_settings.COMPACT_JSON and api_settings.UNICODE_JSON
+
+
+def dumps(data):
+    """JSON compacto en bytes, igual al de JSONRenderer sin indentación."""
+    if uses_orjson():
+        try:
+            return _escape_line_separators(orjson.dumps(data, default=_encoder.default, option=ORJSON_OPTIONS))
+        except TypeError:
+            pass  # Enteros de más de 64 bits y tipos que solo acepta json
+    return JSONRenderer().render(data)
+
+
+def loads(content):
+    """JSON de bytes; rechaza NaN/Infinity como el JSONParser de DRF."""
+    if orjson is not None:
+        try:
+            return orjson.loads(content)
+        except orjson.JSONDecodeError:
+            pass  # json da el mismo mensaje de error que DRF y acepta enteros grandes
+    return json.loads(content)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer con orjson (ver el docstring del módulo)."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if not uses_orjson() or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
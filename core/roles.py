@@ -0,0 +1,121 @@
+"""
+Roles del usuario resueltos una sola vez por request.
+
+Permisos, mixins de filtrado y vistas preguntan varias veces por los grupos
+del usuario y por su organización. ``get_user_roles(request)`` carga los
+nombres de grupo con una sola consulta (y la organización al primer uso) y
+guarda el resultado en la request, de modo que las siguientes preguntas no
+vuelven a consultar la base de datos.
+
+Si el usuario viene de un access token con claims (core.authentication), los
+grupos y el estado de la organización salen del token sin consultas; si no, el
+estado de la organización se lee del cache (ver get_organizacion_activa).
+"""
+from django.core.cache import cache
+from django.utils.functional import cached_property
+
+ADMIN = 'admin'
+DEVELOPER = 'developer'
+USER = 'user'
+AGENTE_ADUANAL = 'Agente Aduanal'
+IMPORTADOR = 'importador'
+
+# Roles con acceso a los datos de su organización (junto con Agente Aduanal)
+ROLES_ORGANIZACION = (DEVELOPER, ADMIN, USER)
+
+# Reglas de agencia de los listados (core.managers): cada tupla pide al menos uno de sus roles
+ROLES_AGENCIA = (ROLES_ORGANIZACION,)
+ROLES_AGENCIA_USUARIO = ((ADMIN, DEVELOPER), (USER,))
+
+# Grupo con el que los listados por organización dan acceso a importadores (no es IMPORTADOR)
+IMPORTADOR_CONTRIBUYENTE = 'Importador'
+
+# Segundos que se guarda el estado de una organización; al guardarla se invalida
+ORGANIZACION_STATUS_TIMEOUT = 60
+
+
+def _organizacion_status_key(organizacion_id):
+    return f'tenant:org-status:{organizacion_id}'
+
+
+def get_organizacion_activa(organizacion_id):
+    """La organización está activa y verificada (consulta solo si no está en cache)."""
+    from api.organization.models import Organizacion
+
+    key = _organizacion_status_key(organizacion_id)
+    activa = cache.get(key)
+    if activa is None:
+        activa = Organizacion.objects.filter(pk=organizacion_id, is_active=True, is_verified=True).exists()
+        cache.set(key, activa, ORGANIZACION_STATUS_TIMEOUT)
+    return activa
+
+
+def invalidar_estado_organizacion(organizacion_id):
+    cache.delete(_organizacion_status_key(organizacion_id))
+
+
+class UserRoles:
+    """Grupos, organización y estado de la organización de un usuario."""
+
+    def __init__(self, user):
+        self.user = user
+        self.is_authenticated = bool(user is not None and user.is_authenticated)
+        self.is_superuser = self.is_authenticated and user.is_superuser
+        self.is_staff = self.is_authenticated and user.is_staff
+        self.token_claims = getattr(user, 'token_claims', None) if self.is_authenticated else None
+
+    @cached_property
+    def groups(self):
+        if not self.is_authenticated:
+            return frozenset()
+        if self.token_claims is not None:
+            return self.token_claims['roles']
+        return frozenset(self.user.groups.values_list('name', flat=True))
+
+    def has(self, name):
+        return name in self.groups
+
+    def has_any(self, *names):
+        return not self.groups.isdisjoint(names)
+
+    @property
+    def is_agencia(self):
+        """Agente Aduanal con rol developer, admin o user."""
+        return self.has(AGENTE_ADUANAL) and self.has_any(*ROLES_ORGANIZACION)
+
+    def is_agencia_con(self, agency_roles):
+        """Agente Aduanal con al menos un rol de cada tupla de `agency_roles`."""
+        return self.has(AGENTE_ADUANAL) and all(self.has_any(*roles) for roles in agency_roles)
+
+    @property
+    def organizacion_id(self):
+        return getattr(self.user, 'organizacion_id', None) if self.is_authenticated else None
+
+    @cached_property
+    def organizacion(self):
+        if self.organizacion_id is None:
+            return None
+        return self.user.organizacion
+
+    @property
+    def organizacion_activa(self):
+        """La organización existe, está activa y verificada."""
+        if self.token_claims is not None:
+            return bool(
+                self.organizacion_id
+                and self.token_claims['org_is_active']
+                and self.token_claims['org_is_verified']
+            )
+        return bool(self.organizacion_id) and get_organizacion_activa(self.organizacion_id)
+
+
+def get_user_roles(request):
+    """UserRoles del usuario de la request, calculado una vez por request."""
+    # Se guarda en la HttpRequest para compartirlo entre la vista DRF y los middlewares
+    http_request = getattr(request, '_request', request)
+    user = getattr(request, 'user', None)
+    roles = getattr(http_request, '_user_roles', None)
+    if roles is None or roles.user is not user:
+        roles = UserRoles(user)
+        http_request._user_roles = roles
+    return roles
@@ -0,0 +1,79 @@
+"""
+Ruteo de base de datos para las tablas de auditoría y logs.
+
+Todas las tablas de ``api.logger`` (RequestLog, UserActivity, ErrorLog,
+rollups, perfiles, grupos de errores y tablas de lookup) se leen, escriben y
+migran en el alias ``settings.LOG_DATABASE_ALIAS``. Si el alias no está
+configurado en DATABASES todo queda en 'default'.
+
+Las llaves foráneas de los logs hacia usuarios y organizaciones no tienen
+constraint en la base de datos (``db_constraint=False``) para poder vivir en
+otra base; por lo mismo no se pueden hacer joins entre ambas: en lugar de
+``select_related('user')`` o filtros ``user__campo`` se usa
+``prefetch_related('user')`` o una lista de ids (ver ``ids_for_filter``).
+
+Las migraciones de api.logger no crean constraints hacia esas tablas fuera de
+'default' (0001 solo agrega la FK de usuarios en 'default' y 0009 la quita),
+así que una base de logs vacía se migra con ``migrate --database=logs``.
+"""
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, router
+
+LOG_APP_LABELS = {'logger'}
+
+
+def get_log_database():
+    """Alias donde viven las tablas de logs."""
+    alias = getattr(settings, 'LOG_DATABASE_ALIAS', DEFAULT_DB_ALIAS) or DEFAULT_DB_ALIAS
+    return alias if alias in settings.DATABASES else DEFAULT_DB_ALIAS
+
+
+def is_log_model(model):
+    return model._meta.app_label in LOG_APP_LABELS
+
+
+def same_database(model, other):
+    return router.db_for_read(model) == router.db_for_read(other)
+
+
+def ids_for_filter(model, queryset):
+    """
+    Valor para filtrar `model` por una relación hacia `queryset`: el queryset
+    mismo (subconsulta) si ambos están en la misma base, o la lista de ids.
+    """
+    if same_database(model, queryset.model):
+        return queryset.values('pk')
+    return list(queryset.values_list('pk', flat=True))
+
+
+class LogDatabaseRouter:
+    """Envía las tablas de api.logger al alias de logs."""
+
+    def _db_for_model(self, model, hints):
+        if is_log_model(model):
+            return get_log_database()
+        # Relación desde un log (p. ej. log.user): sin esto Django usaría la base del log
+        instance = hints.get('instance')
+        if instance is not None and is_log_model(type(instance)):
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self._db_for_model(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self._db_for_model(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Las FK de los logs hacia usuarios/organizaciones no tienen constraint
+        if is_log_model(type(obj1)) or is_log_model(type(obj2)):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        log_database = get_log_database()
+        if app_label in LOG_APP_LABELS:
+            return db == log_database
+        if log_database != DEFAULT_DB_ALIAS and db == log_database:
+            return False
+        return None
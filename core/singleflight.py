@@ -0,0 +1,142 @@
+"""
+Single-flight: una sola ejecución de un cálculo costoso para requests iguales.
+
+Cuando varias requests piden lo mismo al mismo tiempo (p. ej. todos los
+usuarios de una organización abren el tablero), la primera calcula y las
+demás del mismo proceso esperan su resultado en lugar de repetir la consulta.
+La llave la arma quien llama (organización, endpoint y parámetros
+normalizados, ver ``request_flight_key``).
+
+Con ``CROSS_WORKER`` el primer proceso toma además un lock en el cache
+compartido (``cache.add``) y deja el resultado unos segundos
+(``RESULT_TIMEOUT``) para los otros workers, que lo esperan hasta
+``WAIT_TIMEOUT``. Requiere un cache compartido (Redis, Memcached); con
+LocMemCache cada proceso tiene su propio lock.
+
+Una request que se cansa de esperar (``WAIT_TIMEOUT``) calcula por su cuenta.
+Si el cálculo falla, las requests que esperaban reciben la misma excepción.
+
+Métrica: ``singleflight_calls_total{name, result}`` con result = leader
+(calculó), coalesced (esperó a otra request del proceso), remote (usó el
+resultado de otro worker) o timeout (se cansó de esperar y calculó).
+
+Configuración en ``settings.SINGLE_FLIGHT`` (ver DEFAULTS).
+"""
+import hashlib
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.metrics import SINGLEFLIGHT_CALLS
+
+DEFAULTS = {
+    'ENABLED': True,
+    'CROSS_WORKER': False,   # Lock y resultado en el cache compartido
+    'WAIT_TIMEOUT': 10.0,    # Segundos máximos esperando a otra request
+    'LOCK_TIMEOUT': 30,      # Segundos que dura el lock entre workers si el proceso muere
+    'RESULT_TIMEOUT': 5,     # Segundos que se guarda el resultado para otros workers
+    'POLL_INTERVAL': 0.05,   # Segundos entre lecturas del cache esperando a otro worker
+}
+
+_calls = {}
+_calls_lock = threading.Lock()
+
+
+def get_singleflight_settings():
+    config = dict(DEFAULTS)
+    config.update(getattr(settings, 'SINGLE_FLIGHT', {}) or {})
+    return config
+
+
+def request_flight_key(request, tenant, *extra):
+    """Llave con la organización, el path y los parámetros de la URL en orden."""
+    params = sorted((name, sorted(values)) for name, values in request.query_params.lists())
+    return hashlib.md5(repr((tenant, request.path, params, extra)).encode(), usedforsecurity=False).hexdigest()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def single_flight(name, key, fn):
+    """
+    Regresa ``fn()``; si otra request del proceso ya calcula `key` de `name`,
+    espera su resultado en lugar de llamar a `fn`.
+    """
+    config = get_singleflight_settings()
+    if not config['ENABLED'] or key is None:
+        return fn()
+
+    flight_key = f'{name}:{key}'
+    with _calls_lock:
+        call = _calls.get(flight_key)
+        leader = call is None
+        if leader:
+            call = _calls[flight_key] = _Call()
+
+    if not leader:
+        if not call.done.wait(config['WAIT_TIMEOUT']):
+            SINGLEFLIGHT_CALLS.inc(name=name, result='timeout')
+            return fn()
+        SINGLEFLIGHT_CALLS.inc(name=name, result='coalesced')
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    try:
+        if config['CROSS_WORKER']:
+            call.result = _cross_worker(name, flight_key, fn, config)
+        else:
+            call.result = fn()
+            SINGLEFLIGHT_CALLS.inc(name=name, result='leader')
+    except Exception as e:
+        call.error = e
+        raise
+    finally:
+        with _calls_lock:
+            _calls.pop(flight_key, None)
+        call.done.set()
+    return call.result
+
+
+def _cross_worker(name, flight_key, fn, config):
+    lock_key = f'singleflight:lock:{flight_key}'
+    result_key = f'singleflight:result:{flight_key}'
+    token = uuid.uuid4().hex
+
+    if cache.add(lock_key, token, config['LOCK_TIMEOUT']):
+        try:
+            # Un resultado de una ejecución anterior ya no vale para los que esperen esta
+            cache.delete(result_key)
+            result = fn()
+            # En una tupla: el resultado puede ser None
+            cache.set(result_key, (result,), config['RESULT_TIMEOUT'])
+            SINGLEFLIGHT_CALLS.inc(name=name, result='leader')
+            return result
+        finally:
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+
+    deadline = time.monotonic() + config['WAIT_TIMEOUT']
+    while time.monotonic() < deadline:
+        cached = cache.get(result_key)
+        if cached is not None:
+            SINGLEFLIGHT_CALLS.inc(name=name, result='remote')
+            return cached[0]
+        if cache.get(lock_key) is None:
+            # El otro worker terminó sin dejar resultado (falló) o el lock venció
+            break
+        time.sleep(config['POLL_INTERVAL'])
+
+    cached = cache.get(result_key)
+    if cached is not None:
+        SINGLEFLIGHT_CALLS.inc(name=name, result='remote')
+        return cached[0]
+    SINGLEFLIGHT_CALLS.inc(name=name, result='timeout')
+    return fn()
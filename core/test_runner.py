@@ -0,0 +1,24 @@
+"""
+Runner de pruebas del proyecto.
+
+El buffer de logs (api.logger.sink) escribe desde un hilo propio con otra
+conexión, fuera de la transacción de cada prueba: lo que escribiera quedaría
+guardado entre pruebas. Durante las pruebas el buffer no tiene hilo y los
+registros solo se escriben cuando una prueba llama a flush().
+
+Por lo mismo las cards del tablero combinado (api.cards.dashboard) se calculan
+en el hilo de la prueba: otra conexión no vería los datos de la transacción.
+"""
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+from api.logger import sink
+
+
+class TestRunner(DiscoverRunner):
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.LOG_SINK = {**(getattr(settings, 'LOG_SINK', {}) or {}), 'BACKGROUND': False}
+        sink._sink = None
+        settings.CARDS_DASHBOARD = {**(getattr(settings, 'CARDS_DASHBOARD', {}) or {}), 'MAX_WORKERS': 0}
@@ -0,0 +1,38 @@
+"""
+Utilidades para las pruebas.
+
+``QueryCountAssertionsMixin.assertConstantQueries`` revisa que un listado haga
+el mismo número de consultas con pocos y con muchos registros, es decir, que
+no haya una consulta por fila (N+1).
+"""
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+
+
+class QueryCountAssertionsMixin:
+    """Para usar en un APITestCase junto con self.client."""
+
+    def assertConstantQueries(self, url, create_rows, sizes=(1, 10), params=None, using=DEFAULT_DB_ALIAS):
+        """
+        Lista `url` después de crear registros con `create_rows(n)` hasta
+        llegar a cada tamaño de `sizes` y compara las consultas de cada
+        respuesta. Regresa la última respuesta.
+        """
+        counts = {}
+        created = 0
+        # Primera request para llenar caches (estado de la organización, versiones del token)
+        self.client.get(url, params)
+        for size in sizes:
+            create_rows(size - created)
+            created = size
+            with CaptureQueriesContext(connections[using]) as queries:
+                response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            counts[size] = len(queries)
+        self.assertEqual(
+            len(set(counts.values())), 1,
+            f"El número de consultas crece con los registros {counts}:\n"
+            + "\n".join(query['sql'] for query in queries.captured_queries),
+        )
+        return response
@@ -0,0 +1,117 @@
+"""
+ZIP en streaming para descargas de varios archivos.
+
+``stream_zip`` arma el ZIP mientras lo envía: cada archivo se lee en bloques
+de ``CHUNK_SIZE`` bytes y el encabezado local, los datos y el descriptor de
+datos (CRC y tamaños, que se conocen hasta terminar el archivo) salen en
+cuanto se escriben; el directorio central va al final. La memoria depende del
+tamaño del bloque y no del total, y el primer byte sale con el primer bloque
+del primer archivo.
+
+Usa ``zipfile`` de la biblioteca estándar sobre una salida sin ``seek``, que
+ya escribe descriptores de datos y ZIP64 (archivos o ZIP de más de 4 GB).
+
+Los tipos ya comprimidos (``STORED_EXTENSIONS``: PDF, JPG, PNG, ZIP...) van
+sin comprimir (ZIP_STORED): deflate no les quita casi nada y cuesta CPU. El
+resto va con ZIP_DEFLATED.
+
+Configuración en ``settings.ZIP_STREAM`` (ver DEFAULTS).
+"""
+import time
+import zipfile
+
+from django.conf import settings
+
+from core.metrics import FILE_IO_BYTES
+
+DEFAULTS = {
+    'CHUNK_SIZE': 64 * 1024,  # Bytes leídos de cada archivo por bloque
+    'STORED_EXTENSIONS': (
+        'pdf', 'jpg', 'jpeg', 'png', 'gif', 'webp', 'tif', 'tiff',
+        'zip', 'gz', 'tgz', 'bz2', 'xz', '7z', 'rar',
+        'docx', 'xlsx', 'pptx', 'odt', 'ods',
+        'mp3', 'mp4', 'mov',
+    ),
+}
+
+CONTENT_TYPE = 'application/zip'
+
+
+def get_zipstream_settings():
+    config = dict(DEFAULTS)
+    config.update(getattr(settings, 'ZIP_STREAM', {}) or {})
+    return config
+
+
+class _StreamSink:
+    """Salida sin ``seek`` para zipfile: junta lo escrito hasta que se lee con ``drain``."""
+
+    def __init__(self):
+        self._parts = []
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def compress_type_for(name, config=None):
+    """ZIP_STORED para extensiones ya comprimidas, ZIP_DEFLATED para las demás."""
+    config = config or get_zipstream_settings()
+    ext = name.rsplit('.', 1)[-1].lower() if '.' in name else ''
+    return zipfile.ZIP_STORED if ext in config['STORED_EXTENSIONS'] else zipfile.ZIP_DEFLATED
+
+
+def stream_zip(entries, operation=None):
+    """
+    Bytes de un ZIP con `entries`: iterable de (nombre, abrir, tamaño), donde
+    `abrir()` regresa el archivo binario (se cierra al terminar) y `tamaño` es
+    el tamaño esperado o None; con None o más de ~4 GB la entrada usa ZIP64.
+
+    Con `operation` suma los bytes leídos y enviados a ``file_io_bytes_total``.
+    """
+    config = get_zipstream_settings()
+    chunk_size = config['CHUNK_SIZE']
+    sink = _StreamSink()
+    sent = 0
+
+    with zipfile.ZipFile(sink, 'w', allowZip64=True) as zip_file:
+        for name, open_file, size in entries:
+            info = zipfile.ZipInfo(name, date_time=time.localtime(time.time())[:6])
+            info.compress_type = compress_type_for(name, config)
+            # zipfile decide ZIP64 con el tamaño esperado
+            info.file_size = size or 0
+            read = 0
+            with open_file() as source, zip_file.open(info, 'w', force_zip64=size is None) as target:
+                while True:
+                    chunk = source.read(chunk_size)
+                    if not chunk:
+                        break
+                    read += len(chunk)
+                    target.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        sent += len(data)
+                        yield data
+            if operation:
+                FILE_IO_BYTES.inc(read, direction='read', operation=operation)
+            # Descriptor de datos de la entrada
+            data = sink.drain()
+            if data:
+                sent += len(data)
+                yield data
+
+    # Directorio central y fin del ZIP
+    data = sink.drain()
+    if data:
+        sent += len(data)
+        yield data
+    if operation:
+        FILE_IO_BYTES.inc(sent, direction='download', operation=operation)
@@ -0,0 +1,159 @@
+"""
+GET condicional (ETag / Last-Modified) para listados, detalles y cards.
+
+Los tableros consultan los mismos endpoints cada pocos segundos. Con este
+mixin la respuesta trae un validador y, si el cliente lo manda de vuelta
+(``If-None-Match`` o ``If-Modified-Since``) y nada cambió, la vista responde
+304 sin cuerpo, antes de cargar el listado y de serializar.
+
+- Detalle: ETag y Last-Modified a partir del ``updated_at`` del registro.
+- Listado o card: ETag a partir de una huella de la colección, una sola
+  consulta ``aggregate`` con ``Max(updated_at)`` y ``Count`` sobre el
+  queryset de la vista (ya filtrado por organización y por los filtros), más
+  los parámetros de la URL, el usuario y el formato de la respuesta. Los
+  listados no llevan Last-Modified: borrar un registro no mueve el máximo.
+
+La huella no ve cambios hechos con ``queryset.update()`` (no tocan
+``updated_at``) ni cambios en modelos relacionados que salgan en la
+respuesta. Las cards con ventanas relativas a la hora actual usan
+``conditional_time_bucket`` para que la huella caduque.
+
+La respuesta lleva ``Cache-Control: private, no-cache`` (el navegador guarda
+la respuesta pero siempre revalida) y ``Vary: Authorization``.
+"""
+import hashlib
+import time
+
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework.generics import GenericAPIView
+
+CONDITIONAL_METHODS = ('GET', 'HEAD')
+
+
+class NotModified(Exception):
+    """Corta la vista en ``initial`` con la respuesta 304."""
+
+    def __init__(self, response):
+        self.response = response
+
+
+def make_etag(*parts):
+    return '"%s"' % hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified en GET. Sirve para ViewSets (list y retrieve) y para
+    APIViews con ``get_queryset`` (las cards, que se tratan como listado).
+
+    - conditional_field: campo con la fecha de última modificación.
+    - conditional_time_bucket: segundos; la huella cambia al pasar cada
+      intervalo aunque los datos no cambien (ventanas "últimos N días").
+    """
+    conditional_field = 'updated_at'
+    conditional_time_bucket = None
+
+    _validators = None
+    _conditional_object = None
+
+    def get_conditional_action(self):
+        """'retrieve', 'list' o None si la acción no usa validadores."""
+        action = getattr(self, 'action', 'list')
+        return action if action in ('list', 'retrieve') else None
+
+    def get_conditional_queryset(self):
+        """Queryset de la huella: el de la vista con sus filtros, sin paginar."""
+        queryset = self.get_queryset()
+        if queryset is None:
+            return None
+        if isinstance(self, GenericAPIView):
+            # Solo los filter_backends: ?fields= y .values() no cambian las filas
+            queryset = GenericAPIView.filter_queryset(self, queryset)
+        return queryset
+
+    def get_fingerprint_aggregates(self):
+        # Nombres que no choquen con campos del modelo
+        return {'_last': Max(self.conditional_field), '_count': Count('pk')}
+
+    def get_collection_fingerprint(self, queryset):
+        fingerprint = queryset.order_by().aggregate(**self.get_fingerprint_aggregates())
+        return tuple(sorted(fingerprint.items()))
+
+    def get_request_variant(self, request):
+        """Lo que cambia la respuesta además de los datos."""
+        accepted = getattr(request, 'accepted_media_type', None)
+        bucket = int(time.time() // self.conditional_time_bucket) if self.conditional_time_bucket else None
+        return (
+            type(self).__name__,
+            request.path,
+            sorted(request.query_params.lists()),
+            getattr(request.user, 'pk', None),
+            accepted,
+            bucket,
+        )
+
+    def get_validators(self, request):
+        """(etag, last_modified o None), o None si la acción no usa validadores."""
+        action = self.get_conditional_action()
+        if action == 'retrieve':
+            obj = self.get_object()
+            self._conditional_object = obj
+            last_modified = getattr(obj, self.conditional_field, None)
+            if last_modified is None:
+                return None
+            etag = make_etag(self.get_request_variant(request), obj._meta.label, str(obj.pk), last_modified.isoformat())
+            return etag, last_modified
+        if action == 'list':
+            queryset = self.get_conditional_queryset()
+            if queryset is None:
+                return None
+            return make_etag(self.get_request_variant(request), self.get_collection_fingerprint(queryset)), None
+        return None
+
+    def check_conditional_request(self, request):
+        self._validators = self.get_validators(request)
+        if self._validators is None:
+            return
+        etag, last_modified = self._validators
+        placeholder = HttpResponse()
+        self.set_conditional_headers(placeholder)
+        response = get_conditional_response(
+            request._request,
+            etag=etag,
+            last_modified=int(last_modified.timestamp()) if last_modified else None,
+            response=placeholder,
+        )
+        if response is not placeholder:
+            raise NotModified(response)
+
+    def set_conditional_headers(self, response):
+        etag, last_modified = self._validators
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        response['Cache-Control'] = 'private, no-cache'
+        patch_vary_headers(response, ('Authorization',))
+
+    def get_object(self):
+        if self._conditional_object is not None:
+            return self._conditional_object
+        return super().get_object()
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in CONDITIONAL_METHODS:
+            self.check_conditional_request(request)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self._validators and request.method in CONDITIONAL_METHODS and response.status_code == 200:
+            self.set_conditional_headers(response)
+        return response
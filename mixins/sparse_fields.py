@@ -0,0 +1,198 @@
+"""
+Campos dispersos (``?fields=``) y expansión explícita (``?expand=``).
+
+- ``?fields=id,pedimento,contribuyente``: la respuesta solo trae esos campos y
+  el listado solo lee esas columnas (``only()``).
+- ``?expand=pedimento``: la relación se devuelve como objeto anidado en lugar
+  de su id (solo las declaradas en ``expandable_fields`` del serializer).
+- Con puntos se eligen campos de una relación expandida:
+  ``?fields=id,estado,pedimento.pedimento`` expande pedimento y solo trae su
+  número.
+
+Sin parámetros la respuesta es la de siempre. Los JOIN (``select_related``) y
+``prefetch_related`` del listado se eligen a partir de los campos que se van a
+serializar. Solo aplica a lecturas (GET); en escrituras el serializer usa todos
+sus campos.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.utils.functional import cached_property
+from rest_framework.exceptions import ValidationError
+from rest_framework.fields import get_attribute
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.relations import RelatedField
+
+
+def parse_field_tree(value):
+    """'a,b.c,b.d' -> {'a': {}, 'b': {'c': {}, 'd': {}}}"""
+    tree = {}
+    for path in value.split(','):
+        node = tree
+        for name in filter(None, (part.strip() for part in path.split('.'))):
+            node = node.setdefault(name, {})
+    return tree
+
+
+class SparseFieldsSerializerMixin:
+    """
+    Serializer que acepta ``fields`` y ``expand`` (árboles de parse_field_tree).
+
+    - expandable_fields: {campo: serializer anidado} que se pueden expandir.
+    - default_expand: campos expandidos si no se pide ``expand``.
+
+    La expansión solo cambia la representación: en escrituras el campo sigue
+    recibiendo el id.
+    """
+    expandable_fields = {}
+    default_expand = ()
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        self.requested_fields = fields
+        if expand is None:
+            expand = {name: {} for name in self.default_expand}
+        # Un campo con subcampos en `fields` se expande
+        expand = dict(expand)
+        for name, subfields in (fields or {}).items():
+            if subfields and name in self.expandable_fields:
+                expand.setdefault(name, {})
+        self.requested_expand = expand
+        super().__init__(*args, **kwargs)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        unknown_expand = set(self.requested_expand) - set(self.expandable_fields)
+        if unknown_expand:
+            raise ValidationError({'expand': f"No se pueden expandir: {', '.join(sorted(unknown_expand))}"})
+        if self.requested_fields is None:
+            return fields
+        unknown = set(self.requested_fields) - set(fields)
+        if unknown:
+            raise ValidationError({'fields': f"Campos desconocidos: {', '.join(sorted(unknown))}"})
+        return {name: field for name, field in fields.items() if name in self.requested_fields}
+
+    @cached_property
+    def expanded_serializers(self):
+        """Serializers anidados de los campos expandidos, creados una vez por listado."""
+        requested_fields = self.requested_fields or {}
+        return {
+            name: self.expandable_fields[name](
+                fields=requested_fields.get(name) or None, expand=expand, context=self.context
+            )
+            for name, expand in self.requested_expand.items()
+            if name in self.fields
+        }
+
+    def to_representation(self, instance):
+        representation = super().to_representation(instance)
+        for name, serializer in self.expanded_serializers.items():
+            value = get_attribute(instance, self.fields[name].source_attrs)
+            representation[name] = None if value is None else serializer.to_representation(value)
+        return representation
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+    def get_query_plan(self, model, prefix=''):
+        """
+        (columnas para only() o None si algún campo no se puede resolver a
+        columnas, lookups de select_related, lookups de prefetch_related).
+        """
+        only = {prefix + model._meta.pk.name}
+        select, prefetch = set(), set()
+        trimmable = True
+        expanded = self.expanded_serializers
+
+        for name, field in self.fields.items():
+            if field.write_only:
+                continue
+            if field.source == '*':
+                trimmable = False
+                continue
+            current, path = model, []
+            for position, attr in enumerate(field.source_attrs):
+                try:
+                    model_field = current._meta.get_field(attr)
+                except FieldDoesNotExist:
+                    # Propiedad o método del modelo: puede usar cualquier columna
+                    trimmable = False
+                    break
+                path.append(attr)
+                lookup = prefix + '__'.join(path)
+                last = position == len(field.source_attrs) - 1
+                if model_field.many_to_many or model_field.one_to_many:
+                    prefetch.add(lookup)
+                    break
+                if not model_field.is_relation:
+                    only.add(lookup)
+                    break
+                if not model_field.concrete:
+                    trimmable = False
+                    break
+                if last and name not in expanded and isinstance(field, RelatedField) and field.use_pk_only_optimization():
+                    # Solo el id: la columna de la llave foránea, sin JOIN
+                    only.add(lookup)
+                    break
+                select.add(lookup)
+                if last and name in expanded:
+                    nested_only, nested_select, nested_prefetch = expanded[name].get_query_plan(
+                        model_field.related_model, lookup + '__'
+                    )
+                    only.update(nested_only if nested_only is not None else {lookup})
+                    select.update(nested_select)
+                    prefetch.update(nested_prefetch)
+                elif last:
+                    only.add(lookup)  # Modelo relacionado completo
+                current = model_field.related_model
+
+        return (only if trimmable else None), select, prefetch
+
+    @staticmethod
+    def concrete_field_names(model):
+        return {field.name for field in model._meta.concrete_fields} | {'pk'}
+
+    def optimize_queryset(self, queryset):
+        """Aplica el plan de get_query_plan; only() solo si se pidieron campos."""
+        only, select, prefetch = self.get_query_plan(queryset.model)
+        if select:
+            queryset = queryset.select_related(*sorted(select))
+        if prefetch:
+            queryset = queryset.prefetch_related(*sorted(prefetch))
+        if only is not None and self.requested_fields is not None:
+            # Las columnas del ordenamiento también (las usa el cursor de paginación)
+            for ordering in queryset.query.order_by:
+                name = ordering.lstrip('-') if isinstance(ordering, str) else None
+                if name and '__' not in name and name in self.concrete_field_names(queryset.model):
+                    only.add(name)
+            queryset = queryset.only(*sorted(only))
+        return queryset
+
+
+class SparseFieldsetMixin:
+    """
+    ViewSet con ``?fields=`` y ``?expand=``. El serializer debe usar
+    SparseFieldsSerializerMixin; debe ir antes del ViewSet en las bases.
+    """
+    fields_query_param = 'fields'
+    expand_query_param = 'expand'
+
+    def get_sparse_fieldset(self):
+        request = getattr(self, 'request', None)
+        if request is None or request.method not in SAFE_METHODS:
+            return {}
+        params = request.query_params
+        sparse = {}
+        if params.get(self.fields_query_param):
+            sparse['fields'] = parse_field_tree(params[self.fields_query_param])
+        if self.expand_query_param in params:
+            sparse['expand'] = parse_field_tree(params[self.expand_query_param])
+        return sparse
+
+    def get_serializer(self, *args, **kwargs):
+        for key, value in self.get_sparse_fieldset().items():
+            kwargs.setdefault(key, value)
+        return super().get_serializer(*args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if getattr(self, 'action', None) != 'list':
+            return queryset
+        return self.get_serializer().optimize_queryset(queryset)
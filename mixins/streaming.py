@@ -0,0 +1,125 @@
+"""
+Listados en streaming para colecciones grandes.
+
+Con ``?stream=json`` (o ``?stream=ndjson``) el listado no arma la lista
+completa en memoria: recorre el queryset con ``iterator(chunk_size=...)``
+(cursor del lado del servidor en PostgreSQL), serializa por bloques y va
+escribiendo la respuesta con ``StreamingHttpResponse``. La memoria depende del
+tamaño del bloque y no del total, y el primer byte sale con el primer bloque.
+
+- json: un arreglo JSON, igual al listado sin paginar.
+- ndjson: un objeto JSON por línea (application/x-ndjson).
+
+Cada fila se codifica con ``core.renderers.dumps`` (orjson si está instalado).
+Con CompressionMiddleware (core.middleware) la respuesta se comprime por
+bloque.
+
+Se aplican los filtros, la búsqueda y el ordenamiento de la vista; la
+paginación (page_size, cursor) no. El límite ``max_unpaginated_results`` sí
+(core.pagination): con 0 el streaming responde 400 y con N también si hay más
+de N resultados.
+Detrás de un pooler en modo transacción (pgbouncer) hay que usar
+``DISABLE_SERVER_SIDE_CURSORS`` en la base de datos.
+
+Configuración en ``settings.STREAMING`` (ver DEFAULTS); cada vista puede
+cambiar el tamaño de bloque con ``stream_chunk_size``.
+"""
+from itertools import islice
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import ValidationError
+
+from core.pagination import get_max_unpaginated_results
+from core.renderers import dumps
+
+DEFAULTS = {
+    'CHUNK_SIZE': 500,  # Registros por bloque (consulta y serialización)
+}
+
+JSON = 'json'
+NDJSON = 'ndjson'
+CONTENT_TYPES = {
+    JSON: 'application/json',
+    NDJSON: 'application/x-ndjson',
+}
+
+
+def get_streaming_settings():
+    config = dict(DEFAULTS)
+    config.update(getattr(settings, 'STREAMING', {}) or {})
+    return config
+
+
+def iter_chunks(queryset, chunk_size):
+    """Bloques de `chunk_size` instancias leídos con un solo cursor."""
+    iterator = queryset.iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def stream_rows(rows, stream_format):
+    """Bytes del arreglo JSON o NDJSON para un iterable de bloques de diccionarios."""
+    first = True
+    if stream_format == JSON:
+        yield b'['
+    for chunk in rows:
+        if not chunk:
+            continue
+        encoded = [dumps(row) for row in chunk]
+        if stream_format == NDJSON:
+            yield b'\n'.join(encoded) + b'\n'
+        else:
+            yield (b'' if first else b',') + b','.join(encoded)
+        first = False
+    if stream_format == JSON:
+        yield b']'
+
+
+class StreamingListMixin:
+    """
+    Agrega el modo ``?stream=`` al ``list`` de un ViewSet. Debe ir antes del
+    ViewSet en las bases de la clase (después de LoggingMixin).
+    """
+    stream_query_param = 'stream'
+    stream_chunk_size = None
+
+    def get_stream_format(self, request):
+        value = request.query_params.get(self.stream_query_param)
+        if value is None:
+            return None
+        value = value.lower()
+        if value in ('', '1', 'true', JSON):
+            return JSON
+        if value == NDJSON:
+            return NDJSON
+        raise ValidationError({self.stream_query_param: f"Valores válidos: {JSON}, {NDJSON}"})
+
+    def get_stream_chunk_size(self):
+        return self.stream_chunk_size or get_streaming_settings()['CHUNK_SIZE']
+
+    def check_stream_limit(self, queryset):
+        """Aplica max_unpaginated_results: el streaming también es un listado sin paginar."""
+        limit = get_max_unpaginated_results(self)
+        if limit == 0:
+            raise ValidationError({self.stream_query_param: "El listado completo está deshabilitado; usa page_size o cursor."})
+        if limit and queryset[limit:limit + 1].exists():
+            raise ValidationError({self.stream_query_param: f"Hay más de {limit} resultados; usa page_size o cursor."})
+
+    def serialize_chunks(self, queryset):
+        for chunk in iter_chunks(queryset, self.get_stream_chunk_size()):
+            yield self.get_serializer(chunk, many=True).data
+
+    def list(self, request, *args, **kwargs):
+        stream_format = self.get_stream_format(request)
+        if stream_format is None:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        self.check_stream_limit(queryset)
+        return StreamingHttpResponse(
+            stream_rows(self.serialize_chunks(queryset), stream_format),
+            content_type=CONTENT_TYPES[stream_format],
+        )
@@ -0,0 +1,310 @@
+"""
+Listados de solo lectura sin instancias de modelo ni serializers por fila.
+
+En un listado grande la mayor parte del tiempo se va en crear las instancias
+del modelo y en recorrer los campos del serializer fila por fila.
+``ValuesListMixin`` lee las filas con ``.values()`` y las convierte con una
+función por campo que se arma una sola vez por request a partir del
+serializer de la vista (``compile_serializer``). Hay conversiones directas
+para UUID, Decimal, date, datetime, texto y números; los demás campos usan el
+``to_representation`` del campo del serializer. Los nombres y el formato de la
+salida son los mismos que los del serializer.
+
+- Los serializers anidados sobre una llave foránea (p. ej. el usuario de un
+  log) se cargan con una consulta ``.values()`` por página, como un
+  ``prefetch_related``, y funcionan aunque la relación esté en otra base.
+- Los ``SerializerMethodField`` se pueden declarar en el serializer con
+  ``values_sources = {'campo': 'lookup'}``.
+- Si el serializer tiene un campo que no se puede resolver a columnas, el
+  listado usa el camino normal.
+"""
+import decimal
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import router
+from rest_framework import ISO_8601, serializers
+from rest_framework.fields import empty
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.settings import api_settings
+
+# Un campo que el serializer omite de la salida (SkipField)
+SKIP = object()
+
+
+class NotCompilable(Exception):
+    """El serializer tiene campos que no salen de columnas."""
+
+
+# ----------------------------------------------------------------------
+# Conversiones por tipo de campo
+# ----------------------------------------------------------------------
+def _uses(field, base):
+    """El campo usa el to_representation de `base` sin cambios."""
+    return type(field).to_representation is base.to_representation
+
+
+def _datetime_converter(field):
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if output_format is None or output_format.lower() != ISO_8601 or field_timezone is None:
+        return field.to_representation
+
+    def convert(value):
+        if not value or isinstance(value, str) or value.tzinfo is None:
+            return field.to_representation(value)
+        text = value.astimezone(field_timezone).isoformat()
+        return text[:-6] + 'Z' if text.endswith('+00:00') else text
+    return convert
+
+
+def _date_converter(field):
+    output_format = getattr(field, 'format', api_settings.DATE_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601:
+        return field.to_representation
+
+    def convert(value):
+        if not value or isinstance(value, str):
+            return field.to_representation(value)
+        return value.isoformat()
+    return convert
+
+
+def _decimal_converter(field):
+    coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    if not coerce_to_string or field.localize or field.decimal_places is None:
+        return field.to_representation
+    exponent = decimal.Decimal('.1') ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+
+    def convert(value):
+        if not isinstance(value, decimal.Decimal):
+            return field.to_representation(value)
+        return '{:f}'.format(value.quantize(exponent, rounding=field.rounding, context=context))
+    return convert
+
+
+def _file_converter(field, model_field, context):
+    if not getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL):
+        return lambda name: name or None
+    storage = model_field.storage
+    request = context.get('request')
+
+    def convert(name):
+        if not name:
+            return None
+        url = storage.url(name)
+        return request.build_absolute_uri(url) if request is not None else url
+    return convert
+
+
+def get_converter(field, model_field, context):
+    """Función valor de columna -> valor de salida para `field`."""
+    if isinstance(field, serializers.FileField) and _uses(field, serializers.FileField):
+        return _file_converter(field, model_field, context)
+    if isinstance(field, serializers.DateTimeField) and _uses(field, serializers.DateTimeField):
+        return _datetime_converter(field)
+    if isinstance(field, serializers.DateField) and _uses(field, serializers.DateField):
+        return _date_converter(field)
+    if isinstance(field, serializers.DecimalField) and _uses(field, serializers.DecimalField):
+        return _decimal_converter(field)
+    if isinstance(field, serializers.UUIDField) and _uses(field, serializers.UUIDField):
+        return str if field.uuid_format == 'hex_verbose' else field.to_representation
+    if isinstance(field, serializers.CharField) and _uses(field, serializers.CharField):
+        return str
+    if isinstance(field, serializers.IntegerField) and _uses(field, serializers.IntegerField):
+        return int
+    if isinstance(field, serializers.FloatField) and _uses(field, serializers.FloatField):
+        return float
+    if isinstance(field, serializers.BooleanField) and _uses(field, serializers.BooleanField):
+        return bool
+    if isinstance(field, serializers.ReadOnlyField):
+        return lambda value: value
+    return field.to_representation
+
+
+def _missing_policy(field):
+    """Qué devuelve DRF si una relación intermedia del source es None."""
+    if field.default is not empty:
+        return field.get_default
+    if field.allow_null:
+        return lambda: None
+    if not field.required:
+        return lambda: SKIP
+    raise NotCompilable(f"{field.field_name}: relación nula sin default")
+
+
+def _column_getter(column, convert, null_hops=(), missing=None):
+    def get(row):
+        for hop in null_hops:
+            if row[hop] is None:
+                return missing()
+        value = row[column]
+        return None if value is None else convert(value)
+    return get
+
+
+# ----------------------------------------------------------------------
+# Serializer compilado
+# ----------------------------------------------------------------------
+class CompiledSerializer:
+    """
+    Representación de filas de ``.values()`` equivalente a la del serializer.
+
+    - columns: lookups para ``.values()``.
+    - getters: (nombre, función fila -> valor) en el orden del serializer.
+    - nested: (columna de la llave, clave en la fila, CompiledSerializer) de
+      los serializers anidados que se cargan por página.
+    """
+
+    def __init__(self, serializer, model):
+        self.model = model
+        self.columns = {model._meta.pk.name}
+        self.getters = []
+        self.nested = []
+        expanded = getattr(serializer, 'expanded_serializers', {})
+        values_sources = getattr(serializer, 'values_sources', {})
+        context = serializer.context
+
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if name in values_sources:
+                self.add_lookup(name, field, values_sources[name].split('__'), context)
+                continue
+            if isinstance(field, serializers.SerializerMethodField) or field.source == '*':
+                raise NotCompilable(f"{name}: campo calculado")
+            nested = expanded.get(name)
+            if nested is None and isinstance(field, serializers.BaseSerializer):
+                nested = field
+            if nested is not None:
+                self.add_nested(name, nested, field.source_attrs)
+            else:
+                self.add_lookup(name, field, field.source_attrs, context)
+
+    def walk(self, attrs):
+        """(campos del modelo del recorrido) o NotCompilable."""
+        current, model_fields = self.model, []
+        for position, attr in enumerate(attrs):
+            try:
+                model_field = current._meta.get_field(attr)
+            except FieldDoesNotExist:
+                raise NotCompilable(f"{attr}: no es un campo del modelo")
+            if model_field.many_to_many or model_field.one_to_many or (model_field.is_relation and not model_field.concrete):
+                raise NotCompilable(f"{attr}: relación múltiple o inversa")
+            if position < len(attrs) - 1:
+                if not model_field.is_relation:
+                    raise NotCompilable(f"{attr}: no es una relación")
+                current = model_field.related_model
+            model_fields.append(model_field)
+        return model_fields
+
+    def add_lookup(self, name, field, attrs, context):
+        model_fields = self.walk(attrs)
+        last = model_fields[-1]
+        column = '__'.join(attrs)
+        if isinstance(field, serializers.SerializerMethodField):
+            convert = lambda value: value  # values_sources: el valor que devolvería el método
+        elif last.is_relation:
+            if not (isinstance(field, PrimaryKeyRelatedField) and _uses(field, PrimaryKeyRelatedField)) or field.pk_field:
+                raise NotCompilable(f"{name}: relación sin optimización de pk")
+            convert = lambda value: value  # El id tal cual, como PKOnlyObject.pk
+        else:
+            convert = get_converter(field, last, context)
+        null_hops = ['__'.join(attrs[:position + 1]) for position, hop in enumerate(model_fields[:-1]) if hop.null]
+        self.columns.add(column)
+        self.columns.update(null_hops)
+        missing = _missing_policy(field) if null_hops else None
+        self.getters.append((name, _column_getter(column, convert, null_hops, missing)))
+
+    def add_nested(self, name, serializer, attrs):
+        model_fields = self.walk(attrs)
+        if len(model_fields) != 1 or not model_fields[0].is_relation:
+            raise NotCompilable(f"{name}: serializer anidado fuera de una llave foránea")
+        column = attrs[0]
+        key = f'__nested_{name}'
+        compiled = CompiledSerializer(serializer, model_fields[0].related_model)
+        self.columns.add(column)
+        self.nested.append((column, key, compiled))
+        self.getters.append((name, lambda row: row[key]))
+
+    def values_queryset(self, queryset):
+        return queryset.prefetch_related(None).values(*sorted(self.columns))
+
+    def load(self, ids):
+        """{pk: representación} de los registros relacionados, en una consulta."""
+        if not ids:
+            return {}
+        pk_name = self.model._meta.pk.name
+        queryset = self.model._base_manager.using(router.db_for_read(self.model)).filter(pk__in=ids)
+        return {row[pk_name]: representation for row, representation in self.represent_rows(queryset.values(*sorted(self.columns)))}
+
+    def represent_rows(self, rows):
+        rows = list(rows)
+        for column, key, compiled in self.nested:
+            related = compiled.load({row[column] for row in rows if row[column] is not None})
+            for row in rows:
+                row[key] = related.get(row[column])
+        for row in rows:
+            representation = {}
+            for name, get in self.getters:
+                value = get(row)
+                if value is not SKIP:
+                    representation[name] = value
+            yield row, representation
+
+    def to_representation(self, rows):
+        return [representation for _, representation in self.represent_rows(rows)]
+
+
+def compile_serializer(serializer, model):
+    """CompiledSerializer o None si el serializer no se puede compilar."""
+    try:
+        return CompiledSerializer(serializer, model)
+    except NotCompilable:
+        return None
+
+
+class ValuesSerializer:
+    """Lo que usa la vista de un serializer con many=True: solo ``.data``."""
+
+    def __init__(self, compiled, rows):
+        self.compiled = compiled
+        self.rows = rows
+
+    @property
+    def data(self):
+        return self.compiled.to_representation(self.rows)
+
+
+class ValuesListMixin:
+    """
+    Listado (GET) con ``.values()`` y el serializer compilado. Debe ir antes
+    de SparseFieldsetMixin y StreamingListMixin en las bases, para compilar
+    el serializer con los campos pedidos.
+    """
+    values_list_enabled = True
+    compiled_serializer = None
+
+    def use_values_list(self):
+        return (
+            self.values_list_enabled
+            and getattr(self, 'action', None) == 'list'
+            and self.request.method in SAFE_METHODS
+        )
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if not self.use_values_list():
+            return queryset
+        self.compiled_serializer = compile_serializer(self.get_serializer(), queryset.model)
+        if self.compiled_serializer is None:
+            return queryset
+        return self.compiled_serializer.values_queryset(queryset)
+
+    def get_serializer(self, *args, **kwargs):
+        if self.compiled_serializer is not None and args and kwargs.get('many'):
+            return ValuesSerializer(self.compiled_serializer, args[0])
+        return super().get_serializer(*args, **kwargs)